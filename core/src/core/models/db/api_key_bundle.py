@@ -5,7 +5,6 @@ import logging
 
 from core.utils.time_util import get_current_time
 
-
 logger = logging.getLogger(__name__)
 
 
@@ -23,6 +22,9 @@ class APIKeyBundle(Document):
     # Updatable
     tokens_in_use: int
     updated_at: datetime
+    # created_at (unix seconds) of the newest batch listed from OpenAI; batches
+    # created before it are only synced while they are still open
+    batch_sync_cursor: int | None = None
 
     async def add_tokens_in_use(self, tokens: int):
         self.tokens_in_use += tokens
@@ -34,6 +36,12 @@ class APIKeyBundle(Document):
             self.tokens_in_use = 0
         await self.save()
 
+    async def advance_batch_sync_cursor(self, created_at: int):
+        if self.batch_sync_cursor is not None and created_at <= self.batch_sync_cursor:
+            return
+        self.batch_sync_cursor = created_at
+        await self.save()
+
     # latest_external_batch_id: str | None
 
     # async def update_latest_external_batch_id(
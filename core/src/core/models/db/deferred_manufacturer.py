@@ -59,4 +59,8 @@ db.deferred_manufacturers.createIndex(
     unique: true
   }
 );
+db.deferred_manufacturers.createIndex(
+  { updated_at: 1 },
+  { name: "deferred_mfg_updated_at_idx" }
+);
 """
@@ -0,0 +1,39 @@
+from typing import ClassVar
+
+from pydantic import BaseModel, PrivateAttr
+
+
+class DirtyFieldsMixin(BaseModel):
+    """
+    Remembers which fields were assigned since the document was loaded or last
+    written, so that a write can $set just those instead of replacing the whole
+    document.
+
+    Only assignments are seen (`doc.field = value`, `setattr(doc, ...)`). After
+    changing a value in place, e.g. `doc.batches.append(batch)`, call
+    `doc.mark_dirty("batches")`.
+    """
+
+    _dirty_fields: set[str] = PrivateAttr(default_factory=set)
+
+    _untracked_fields: ClassVar[frozenset[str]] = frozenset({"id", "revision_id"})
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if name in type(self).model_fields and name not in self._untracked_fields:
+            self._dirty_fields.add(name)
+
+    def mark_dirty(self, *fields: str) -> None:
+        for field in fields:
+            if field not in type(self).model_fields:
+                raise ValueError(f"{type(self).__name__} has no field {field!r}")
+            self._dirty_fields.add(field)
+
+    def get_dirty_fields(self) -> set[str]:
+        return set(self._dirty_fields)
+
+    def pop_dirty_fields(self) -> set[str]:
+        """Dirty fields, which are no longer dirty afterwards."""
+        fields = self._dirty_fields
+        self._dirty_fields = set()
+        return fields
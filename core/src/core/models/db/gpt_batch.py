@@ -3,6 +3,8 @@ from beanie import Document
 from enum import Enum
 from pydantic import BaseModel
 
+from core.models.db.dirty_fields import DirtyFieldsMixin
+
 
 class GPTBatchStatus(
     str, Enum
@@ -43,7 +45,7 @@ class GPTBatchMetadata(BaseModel):
     api_key_label: str
 
 
-class GPTBatch(Document):
+class GPTBatch(DirtyFieldsMixin, Document):
     # Read/Sync only
     external_batch_id: str  # e.g. "batch_abc123"
     endpoint: str  # e.g. "/v1/chat/completions"
@@ -74,6 +76,15 @@ class GPTBatch(Document):
             GPTBatchStatus.EXPIRED,
         ]
 
+    def is_status_final(self) -> bool:
+        """OpenAI will not change this batch anymore."""
+        return self.status in [
+            GPTBatchStatus.COMPLETED,
+            GPTBatchStatus.FAILED,
+            GPTBatchStatus.EXPIRED,
+            GPTBatchStatus.CANCELLED,
+        ]
+
     def is_our_processing_complete(self) -> bool:
         return self.processing_completed_at != None
 
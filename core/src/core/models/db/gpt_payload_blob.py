@@ -0,0 +1,18 @@
+from beanie import Document
+from datetime import datetime
+
+
+class GPTPayloadBlob(Document):
+    """
+    A message content shared by many GPTBatchRequests (system prompts, chunks
+    asked about several fields), stored once. The id is the sha256 hex digest
+    of the content, so identical contents map to the same document.
+    """
+
+    id: str  # sha256 of content
+    content: str
+    created_at: datetime
+    last_stored_at: datetime  # last time a request referring to it was written
+
+    class Settings:
+        name = "gpt_payload_blobs"
@@ -10,6 +10,7 @@ from core.models.keyword_extraction_results import KeywordExtractionResults
 from core.models.binary_classification_result import (
     BinaryClassificationResult,
 )
+from core.models.db.dirty_fields import DirtyFieldsMixin
 from core.utils.time_util import get_current_time
 
 logger = logging.getLogger(__name__)
@@ -61,7 +62,7 @@ class BusinessDescriptionResult(BaseModel):
     description: Optional[str]
 
 
-class Manufacturer(Document):
+class Manufacturer(DirtyFieldsMixin, Document):
     etld1: MfgETLDType  # effective top-level domain plus one, e.g. "example.com"; ".com" is top level domain, "example" is the second-level domain
     url_accessible_at: MfgURLType
 
@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import argparse
+from datetime import timedelta
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from core.dependencies.load_core_env import load_core_env
+from scraper_app.dependencies.load_scraper_env import load_scraper_env
+from open_ai_key_app.dependencies.load_open_ai_app_env import load_open_ai_app_env
+from data_etl_app.dependencies.load_data_etl_env import load_data_etl_env
+
+# Load environment variables
+load_core_env()
+load_scraper_env()
+load_data_etl_env()
+load_open_ai_app_env()
+
+from core.models.db.gpt_batch_request import GPTBatchRequest
+from core.models.gpt_batch_request_blob import GPTBatchRequestBlobBody
+from core.services.gpt_payload_blob_service import (
+    dehydrate_request_body,
+    delete_unreferenced_payload_blobs,
+    estimate_payload_dedup,
+    is_request_body_hydrated,
+    store_payload_blobs,
+)
+from core.utils.mongo_client import init_db
+from core.utils.time_util import get_current_time
+
+logger = logging.getLogger(__name__)
+
+# requests whose message contents are still stored inline
+INLINE_FILTER = {"request.body.messages.content": {"$exists": True}}
+
+
+async def report(sample_size: int):
+    """Print the storage saved by content refs on a sample, writing nothing."""
+    collection = GPTBatchRequest.get_pymongo_collection()
+    print(f"Measuring {sample_size:,} inline GPTBatchRequest documents...")
+    docs = await collection.find(INLINE_FILTER).limit(sample_size).to_list()
+    print(estimate_payload_dedup(docs).summary())
+
+
+async def flush(collection, bulk_operations, payloads) -> int:
+    # blobs first, so a stored request never refers to a missing blob
+    await store_payload_blobs(payloads, stored_at=get_current_time())
+    try:
+        result = await collection.bulk_write(bulk_operations, ordered=False)
+        return result.modified_count
+    except BulkWriteError as bwe:
+        logger.error(f"Bulk write error: {bwe.details}")
+        return bwe.details.get("nModified", 0)
+
+
+async def iterate(limit=None, skip_confirmation=False):
+    print("Starting migration of GPTBatchRequest message contents to payload blobs...")
+    collection = GPTBatchRequest.get_pymongo_collection()
+
+    total = await collection.count_documents(INLINE_FILTER)
+    print(f"Total documents to update: {total}")
+
+    # Ask for confirmation unless --yes flag is provided
+    if not skip_confirmation:
+        if total == 0:
+            print("No documents to update. Exiting.")
+            return
+
+        response = (
+            input(
+                f"\nDo you want to proceed with updating {total} documents? (yes/no): "
+            )
+            .strip()
+            .lower()
+        )
+        if response not in ["yes", "y"]:
+            print("Migration cancelled by user.")
+            return
+        print("Proceeding with migration...")
+
+    # Apply limit if specified
+    if limit:
+        print(f"Limiting to {limit} documents")
+        cursor = collection.find(INLINE_FILTER, {"request.body": 1}).limit(limit)
+    else:
+        cursor = collection.find(INLINE_FILTER, {"request.body": 1})
+
+    bulk_operations = []
+    payloads: dict[str, str] = {}
+    batch_size = 5_000  # request bodies are large, keep batches well under 48MB
+    total_count = 0
+    processed = 0
+
+    async for doc in cursor:
+        processed += 1
+        if processed % 1000 == 0:
+            print(
+                f"Processing document {processed}/{min(limit, total) if limit else total}"
+            )
+
+        body = GPTBatchRequestBlobBody(**doc["request"]["body"])
+        dehydrated_body = dehydrate_request_body(body, payloads)
+        if is_request_body_hydrated(dehydrated_body):
+            continue  # nothing long enough to move
+
+        bulk_operations.append(
+            UpdateOne(
+                {"_id": doc["_id"]},
+                {"$set": {"request.body": dehydrated_body.model_dump()}},
+                upsert=False,
+            )
+        )
+
+        # Execute bulk operation when batch size is reached
+        if len(bulk_operations) >= batch_size:
+            print(f"Executing batch of {len(bulk_operations)} update operations...")
+            try:
+                modified = await flush(collection, bulk_operations, payloads)
+                total_count += modified
+                print(
+                    f"Batch complete: {modified} documents updated (Total: {total_count})"
+                )
+            except Exception as e:
+                logger.error(f"Unexpected error: {e}")
+            bulk_operations = []
+            payloads = {}
+
+    # Execute remaining operations
+    if bulk_operations:
+        print(f"Executing final batch of {len(bulk_operations)} update operations...")
+        try:
+            modified = await flush(collection, bulk_operations, payloads)
+            total_count += modified
+            print(f"Final batch complete: {modified} documents updated")
+        except Exception as e:
+            logger.error(f"Unexpected final error: {e}")
+
+    print(f"\nMigration complete: {total_count} documents updated successfully.")
+
+
+async def main():
+    parser = argparse.ArgumentParser(
+        description=(
+            "Move long GPTBatchRequest message contents to the content-addressed "
+            "gpt_payload_blobs collection"
+        )
+    )
+    parser.add_argument(
+        "--limit",
+        type=int,
+        help="Limit the number of documents to process",
+        default=None,
+    )
+    parser.add_argument(
+        "--yes",
+        "-y",
+        action="store_true",
+        help="Skip confirmation prompt and proceed with migration",
+        default=False,
+    )
+    parser.add_argument(
+        "--report",
+        type=int,
+        metavar="SAMPLE_SIZE",
+        help=(
+            "Only print the storage that would be saved on a sample of inline "
+            "documents"
+        ),
+        default=None,
+    )
+    parser.add_argument(
+        "--delete-unreferenced-older-than-days",
+        type=int,
+        help=(
+            "Only delete payload blobs no request refers to, last stored more than "
+            "this many days ago"
+        ),
+        default=None,
+    )
+    args = parser.parse_args()
+
+    await init_db()
+    print("Database initialized.")
+    if args.report is not None:
+        await report(args.report)
+    elif args.delete_unreferenced_older_than_days is not None:
+        stored_before = get_current_time() - timedelta(
+            days=args.delete_unreferenced_older_than_days
+        )
+        deleted = await delete_unreferenced_payload_blobs(stored_before)
+        print(f"Deleted {deleted:,} unreferenced payload blobs.")
+    else:
+        await iterate(limit=args.limit, skip_confirmation=args.yes)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -190,7 +190,12 @@ class DatabaseIndexSeeder:
             {
                 "keys": [("mfg_etld1", 1)],
                 "options": {"name": "deferred_mfg_etld1_unique_idx", "unique": True},
-            }
+            },
+            {
+                # order of the pending request discovery in batch file generation
+                "keys": [("updated_at", 1)],
+                "options": {"name": "deferred_mfg_updated_at_idx"},
+            },
         ]
 
         for index in indexes:
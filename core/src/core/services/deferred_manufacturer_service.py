@@ -1,8 +1,11 @@
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional
+from typing import AsyncIterator, Optional
 import logging
 
 from core.models.db.deferred_manufacturer import DeferredManufacturer
+from core.models.db.gpt_batch_request import GPTBatchRequest
+from core.models.gpt_batch_request_blob import GPTBatchRequestBlob
 from open_ai_key_app.models.field_types import GPTBatchRequestCustomID
 from data_etl_app.models.types_and_enums import (
     BasicFieldTypeEnum,
@@ -177,6 +180,137 @@ def get_embedded_gpt_request_ids(
     return custom_ids
 
 
+def _get_map_values_expression(map_path: str, value_field: str = "") -> dict:
+    """The values of an embedded dict field, or one field of each value."""
+    return {
+        "$map": {
+            "input": {"$objectToArray": {"$ifNull": [map_path, {}]}},
+            "as": "entry",
+            "in": f"$$entry.v.{value_field}" if value_field else "$$entry.v",
+        }
+    }
+
+
+def get_embedded_gpt_request_ids_expression() -> dict:
+    """
+    Aggregation expression for the custom ids get_embedded_gpt_request_ids
+    returns, computed by MongoDB on a deferred_manufacturers document.
+    """
+    id_arrays = [
+        _get_map_values_expression(f"${field}.chunk_request_id_map")
+        for field in (
+            "is_manufacturer",
+            "is_contract_manufacturer",
+            "is_product_manufacturer",
+            "products",
+        )
+    ]
+    id_arrays.append(["$addresses.gpt_request_id", "$business_desc.gpt_request_id"])
+    for field in ("certificates", "industries", "process_caps", "material_caps"):
+        id_arrays.append(
+            _get_map_values_expression(
+                f"${field}.chunk_request_bundle_map", "llm_search_request_id"
+            )
+        )
+        id_arrays.append([f"${field}.llm_mapping_request_id"])
+    return {
+        "$filter": {
+            "input": {"$setUnion": id_arrays},
+            # absent fields and unset mapping requests come out as null
+            "cond": {"$eq": [{"$type": "$$this"}, "string"]},
+        }
+    }
+
+
+@dataclass
+class DeferredManufacturerPendingRequests:
+    mfg_etld1: str
+    scraped_text_file_version_id: str
+    embedded_custom_ids: set[GPTBatchRequestCustomID]
+    found_custom_ids: set[GPTBatchRequestCustomID]
+    pending_request_blobs: list[GPTBatchRequestBlob]
+
+    @property
+    def missing_custom_ids(self) -> set[GPTBatchRequestCustomID]:
+        return self.embedded_custom_ids - self.found_custom_ids
+
+
+async def iterate_deferred_manufacturer_pending_requests(
+    query_filter: dict,
+    sort: dict,
+    limit: Optional[int] = None,
+) -> AsyncIterator[DeferredManufacturerPendingRequests]:
+    """
+    Stream the DeferredManufacturers matching query_filter, in sort order,
+    with their pending GPTBatchRequest blobs, in one aggregation.
+
+    The embedded custom ids are computed server side and joined on the
+    unique request.custom_id index. Only the request blobs of pending
+    requests are sent back, the others only report their custom id.
+    """
+    pipeline: list[dict] = [{"$match": query_filter}, {"$sort": sort}]
+    if limit:
+        pipeline.append({"$limit": limit})
+    pipeline += [
+        {
+            "$project": {
+                "_id": 0,
+                "mfg_etld1": 1,
+                "scraped_text_file_version_id": 1,
+                "custom_ids": get_embedded_gpt_request_ids_expression(),
+            }
+        },
+        {
+            "$lookup": {
+                "from": GPTBatchRequest.Settings.name,
+                "localField": "custom_ids",
+                "foreignField": "request.custom_id",
+                "pipeline": [
+                    {
+                        "$project": {
+                            "_id": 0,
+                            "custom_id": "$request.custom_id",
+                            "request": {
+                                "$cond": [
+                                    # GPTBatchRequest.is_batch_request_pending()
+                                    {
+                                        "$in": [
+                                            {"$type": "$batch_id"},
+                                            ["null", "missing"],
+                                        ]
+                                    },
+                                    "$request",
+                                    "$$REMOVE",
+                                ]
+                            },
+                        }
+                    }
+                ],
+                "as": "gpt_batch_requests",
+            }
+        },
+    ]
+
+    cursor = await DeferredManufacturer.get_pymongo_collection().aggregate(
+        pipeline, allowDiskUse=True
+    )
+    async with cursor:
+        async for doc in cursor:
+            yield DeferredManufacturerPendingRequests(
+                mfg_etld1=doc["mfg_etld1"],
+                scraped_text_file_version_id=doc["scraped_text_file_version_id"],
+                embedded_custom_ids=set(doc["custom_ids"]),
+                found_custom_ids={
+                    gpt_req["custom_id"] for gpt_req in doc["gpt_batch_requests"]
+                },
+                pending_request_blobs=[
+                    GPTBatchRequestBlob(**gpt_req["request"])
+                    for gpt_req in doc["gpt_batch_requests"]
+                    if "request" in gpt_req
+                ],
+            )
+
+
 '''
 async def upsert_deferred_manufacturer(
     timestamp: datetime,
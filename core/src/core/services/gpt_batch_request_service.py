@@ -9,6 +9,11 @@ from pymongo import UpdateOne
 from core.models.prompt import Prompt
 from core.models.db.gpt_batch import GPTBatch
 from core.models.db.gpt_batch_request import GPTBatchRequest
+from core.services.gpt_payload_blob_service import (
+    dehydrate_request_body,
+    store_payload_blobs,
+)
+from core.utils.time_util import get_current_time
 
 from open_ai_key_app.models.field_types import GPTBatchRequestCustomID
 from open_ai_key_app.models.gpt_model import (
@@ -527,17 +532,34 @@ async def _upsert_chunk_with_only_request_body(
     """
     Upsert a single chunk of batch requests.
     Only inserts if no document exists with the same request.custom_id.
+    Long message contents are stored in gpt_payload_blobs and referenced.
 
     Returns:
         Dict with keys: upserted_count, modified_count, write_errors, unexpected_error
     """
+    payloads: dict[str, str] = {}
+    bodies = [dehydrate_request_body(req.request.body, payloads) for req in chunk]
+    try:
+        # blobs first, so a stored request never refers to a missing blob
+        await store_payload_blobs(payloads, stored_at=get_current_time())
+    except Exception as e:
+        logger.error(
+            f"Chunk {chunk_num}/{total_chunks}: Could not store payload blobs for {mfg_etld1}: {e}"
+        )
+        return {
+            "upserted_count": 0,
+            "modified_count": 0,
+            "write_errors": [],
+            "unexpected_error": f"Chunk {chunk_num}: payload blobs: {str(e)}",
+        }
+
     try:
         operations = [
             UpdateOne(
                 {"request.custom_id": req.request.custom_id},  # Filter by custom_id
                 {
                     "$set": {
-                        "request.body": req.request.body.model_dump(),  # Update body on both insert and update
+                        "request.body": body.model_dump(),  # Update body on both insert and update
                         "updated_at": req.updated_at,
                     },
                     "$setOnInsert": {  # Set these required fields only on insert
@@ -556,7 +578,7 @@ async def _upsert_chunk_with_only_request_body(
                 },
                 upsert=True,
             )
-            for req in chunk
+            for req, body in zip(chunk, bodies, strict=True)
         ]
 
         result = await GPTBatchRequest.get_pymongo_collection().bulk_write(
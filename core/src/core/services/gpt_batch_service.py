@@ -7,6 +7,7 @@ from openai.types import Batch
 
 from core.models.db.gpt_batch import GPTBatch, GPTBatchStatus, GPTBatchMetadata
 from core.models.db.api_key_bundle import APIKeyBundle
+from core.utils.partial_update_util import PartialUpdateWriter
 
 # Configure logging
 logging.basicConfig(
@@ -17,6 +18,8 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+_gpt_batch_writer = PartialUpdateWriter()
+
 
 async def find_latest_gpt_batch_by_external_batch_id(
     external_batch_id: str,
@@ -168,40 +171,56 @@ async def insert_gpt_batch_from_response(
 
 async def update_gpt_batch_from_response(
     batch_response: Batch, gpt_batch: GPTBatch
-) -> None:
+) -> bool:
+    """
+    Write the fields of the batch that changed on OpenAI's side, if any.
+    Returns whether anything was written.
+    """
     try:
         # Update fields that may have changed
-        gpt_batch.status = batch_response.status
-        gpt_batch.output_file_id = batch_response.output_file_id
-        gpt_batch.error_file_id = batch_response.error_file_id
+        changes = {
+            "status": batch_response.status,
+            "output_file_id": batch_response.output_file_id,
+            "error_file_id": batch_response.error_file_id,
+        }
 
         if batch_response.in_progress_at:
-            gpt_batch.in_progress_at = datetime.fromtimestamp(
+            changes["in_progress_at"] = datetime.fromtimestamp(
                 batch_response.in_progress_at
             )
 
         if batch_response.completed_at:
-            gpt_batch.completed_at = datetime.fromtimestamp(batch_response.completed_at)
+            changes["completed_at"] = datetime.fromtimestamp(
+                batch_response.completed_at
+            )
 
         if batch_response.failed_at:
-            gpt_batch.failed_at = datetime.fromtimestamp(batch_response.failed_at)
+            changes["failed_at"] = datetime.fromtimestamp(batch_response.failed_at)
 
         if batch_response.expired_at:
-            gpt_batch.expired_at = datetime.fromtimestamp(batch_response.expired_at)
+            changes["expired_at"] = datetime.fromtimestamp(batch_response.expired_at)
 
         # Update request counts
         if batch_response.request_counts:
-            gpt_batch.request_counts = batch_response.request_counts.model_dump()
+            changes["request_counts"] = batch_response.request_counts.model_dump()
 
-        # Save updates to database
-        await gpt_batch.save()
+        for field, value in changes.items():
+            if getattr(gpt_batch, field) != value:
+                setattr(gpt_batch, field, value)
+
+        # Save updates to database, nothing is written when nothing changed
+        report = await _gpt_batch_writer.write(gpt_batch)
+        if not report.fields:
+            return False
 
         logger.debug(
             f"Updated batch {gpt_batch.external_batch_id}: "
             f"api_key={gpt_batch.api_key_label}, "
             f"status={gpt_batch.status}, "
-            f"requests={gpt_batch.request_counts}"
+            f"requests={gpt_batch.request_counts}, "
+            f"fields={report.fields}"
         )
+        return True
 
     except OpenAIError as e:
         logger.error(f"Error checking batch {gpt_batch.external_batch_id}: {e}")
@@ -214,6 +233,13 @@ async def update_gpt_batch_from_response(
         raise
 
 
+async def find_unprocessed_gpt_batches(api_key_label: str) -> list[GPTBatch]:
+    """Batches of the key that we have not finished processing."""
+    return await GPTBatch.find(
+        {"api_key_label": api_key_label, "processing_completed_at": None}
+    ).to_list()
+
+
 async def get_pending_batches_mapped_by_api_key_label() -> dict[str, GPTBatch]:
     pending_batches: list[GPTBatch] = await GPTBatch.find(
         {
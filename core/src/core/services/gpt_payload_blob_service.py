@@ -0,0 +1,317 @@
+"""
+Content-addressed storage of GPTBatchRequest message contents.
+
+The same system prompt is sent with every chunk of every manufacturer, and the
+same chunk is asked about several fields, so storing message contents inline
+repeats them millions of times. Before a request body is written to Mongo,
+every message content of at least PAYLOAD_BLOB_MIN_CHARS characters is moved
+to the gpt_payload_blobs collection, keyed by its sha256, and the message keeps
+only {"role": ..., "content_ref": <sha256>}. Bodies are hydrated back to the
+full messages when the batch JSONL lines are written.
+"""
+
+import hashlib
+import logging
+import os
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable
+
+import bson
+from pymongo import UpdateOne
+
+from core.models.db.gpt_batch_request import GPTBatchRequest
+from core.models.db.gpt_payload_blob import GPTPayloadBlob
+from core.models.gpt_batch_request_blob import (
+    GPTBatchRequestBlob,
+    GPTBatchRequestBlobBody,
+)
+
+logger = logging.getLogger(__name__)
+
+CONTENT_REF_KEY = "content_ref"
+# a reference costs ~80 bytes, shorter contents are cheaper to keep inline
+PAYLOAD_BLOB_MIN_CHARS = int(os.getenv("PAYLOAD_BLOB_MIN_CHARS", "256"))
+PAYLOAD_BLOB_CACHE_MAX_MB = int(os.getenv("PAYLOAD_BLOB_CACHE_MAX_MB", "64"))
+
+
+def get_payload_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class PayloadBlobCache:
+    """LRU of payload hash -> content, bounded by total content length."""
+
+    def __init__(self, max_chars: int):
+        self.max_chars = max_chars
+        self._contents: OrderedDict[str, str] = OrderedDict()
+        self._chars = 0
+
+    def get(self, payload_hash: str) -> str | None:
+        content = self._contents.get(payload_hash)
+        if content is not None:
+            self._contents.move_to_end(payload_hash)
+        return content
+
+    def put(self, payload_hash: str, content: str) -> None:
+        if len(content) > self.max_chars or payload_hash in self._contents:
+            return
+        self._contents[payload_hash] = content
+        self._chars += len(content)
+        while self._chars > self.max_chars:
+            _, evicted = self._contents.popitem(last=False)
+            self._chars -= len(evicted)
+
+    def clear(self) -> None:
+        self._contents.clear()
+        self._chars = 0
+
+
+# hydrated contents, mostly the system prompts; a hash always names the same content
+_payload_blob_cache = PayloadBlobCache(PAYLOAD_BLOB_CACHE_MAX_MB * 1024 * 1024)
+
+
+def dehydrate_request_body(
+    body: GPTBatchRequestBlobBody, payloads: dict[str, str]
+) -> GPTBatchRequestBlobBody:
+    """
+    Body with long message contents replaced by content refs. The contents to
+    store are added to payloads, as {hash: content}.
+    """
+    messages = []
+    for message in body.messages:
+        content = message.get("content")
+        if isinstance(content, str) and len(content) >= PAYLOAD_BLOB_MIN_CHARS:
+            payload_hash = get_payload_hash(content)
+            payloads[payload_hash] = content
+            message = {key: value for key, value in message.items() if key != "content"}
+            message[CONTENT_REF_KEY] = payload_hash
+        messages.append(message)
+    return body.model_copy(update={"messages": messages})
+
+
+def is_request_body_hydrated(body: GPTBatchRequestBlobBody) -> bool:
+    return not any(CONTENT_REF_KEY in message for message in body.messages)
+
+
+async def store_payload_blobs(payloads: dict[str, str], stored_at: datetime) -> int:
+    """
+    Insert the payloads that are not stored yet and mark all of them as stored
+    at stored_at, which keeps them from being collected as unreferenced while
+    the requests referring to them are written. Returns how many were inserted.
+    """
+    if not payloads:
+        return 0
+
+    result = await GPTPayloadBlob.get_pymongo_collection().bulk_write(
+        [
+            UpdateOne(
+                {"_id": payload_hash},
+                {
+                    "$setOnInsert": {"content": content, "created_at": stored_at},
+                    "$set": {"last_stored_at": stored_at},
+                },
+                upsert=True,
+            )
+            for payload_hash, content in payloads.items()
+        ],
+        ordered=False,
+    )
+    return result.upserted_count
+
+
+async def _load_payloads(payload_hashes: set[str]) -> dict[str, str]:
+    contents: dict[str, str] = {}
+    missing = []
+    for payload_hash in payload_hashes:
+        content = _payload_blob_cache.get(payload_hash)
+        if content is None:
+            missing.append(payload_hash)
+        else:
+            contents[payload_hash] = content
+
+    if missing:
+        cursor = GPTPayloadBlob.get_pymongo_collection().find(
+            {"_id": {"$in": missing}}, {"content": 1}
+        )
+        async for doc in cursor:
+            contents[doc["_id"]] = doc["content"]
+            _payload_blob_cache.put(doc["_id"], doc["content"])
+
+    not_found = payload_hashes - contents.keys()
+    if not_found:
+        raise LookupError(
+            f"{len(not_found):,} payload blob(s) are missing from gpt_payload_blobs, "
+            f"e.g. {sorted(not_found)[:3]}"
+        )
+    return contents
+
+
+async def hydrate_request_blobs(
+    request_blobs: list[GPTBatchRequestBlob],
+) -> list[GPTBatchRequestBlob]:
+    """Request blobs with every content ref replaced by the content it names."""
+    payload_hashes = {
+        message[CONTENT_REF_KEY]
+        for request_blob in request_blobs
+        for message in request_blob.body.messages
+        if CONTENT_REF_KEY in message
+    }
+    if not payload_hashes:
+        return request_blobs
+
+    contents = await _load_payloads(payload_hashes)
+
+    def hydrate_message(message: dict) -> dict:
+        if CONTENT_REF_KEY not in message:
+            return message
+        hydrated = {
+            key: value for key, value in message.items() if key != CONTENT_REF_KEY
+        }
+        hydrated["content"] = contents[message[CONTENT_REF_KEY]]
+        return hydrated
+
+    return [
+        (
+            request_blob
+            if is_request_body_hydrated(request_blob.body)
+            else request_blob.model_copy(
+                update={
+                    "body": request_blob.body.model_copy(
+                        update={
+                            "messages": [
+                                hydrate_message(message)
+                                for message in request_blob.body.messages
+                            ]
+                        }
+                    )
+                }
+            )
+        )
+        for request_blob in request_blobs
+    ]
+
+
+async def delete_unreferenced_payload_blobs(
+    stored_before: datetime, batch_size: int = 10_000
+) -> int:
+    """
+    Delete payload blobs no GPTBatchRequest refers to. Only blobs last stored
+    before stored_before are considered, so requests being written right now
+    (blobs first, then the request) cannot lose theirs.
+    """
+    referenced: set[str] = set()
+    cursor = await GPTBatchRequest.get_pymongo_collection().aggregate(
+        [
+            {"$match": {f"request.body.messages.{CONTENT_REF_KEY}": {"$exists": True}}},
+            {
+                "$project": {
+                    "_id": 0,
+                    "refs": f"$request.body.messages.{CONTENT_REF_KEY}",
+                }
+            },
+            {"$unwind": "$refs"},
+            {"$group": {"_id": "$refs"}},
+        ],
+        allowDiskUse=True,
+    )
+    async for doc in cursor:
+        referenced.add(doc["_id"])
+    logger.info(f"{len(referenced):,} payload blobs are referenced.")
+
+    collection = GPTPayloadBlob.get_pymongo_collection()
+    deleted = 0
+    unreferenced: list[str] = []
+
+    async def delete_batch():
+        nonlocal deleted
+        result = await collection.delete_many({"_id": {"$in": unreferenced}})
+        deleted += result.deleted_count
+        unreferenced.clear()
+
+    async with collection.find(
+        {"last_stored_at": {"$lt": stored_before}}, {"_id": 1}
+    ) as cursor:
+        async for doc in cursor:
+            if doc["_id"] not in referenced:
+                unreferenced.append(doc["_id"])
+                if len(unreferenced) >= batch_size:
+                    await delete_batch()
+    if unreferenced:
+        await delete_batch()
+    logger.info(f"Deleted {deleted:,} unreferenced payload blobs.")
+    return deleted
+
+
+@dataclass
+class PayloadDedupReport:
+    documents: int = 0
+    inline_bytes: int = 0  # the request documents as stored inline
+    dehydrated_bytes: int = 0  # the same documents holding content refs
+    blob_bytes: int = 0  # the gpt_payload_blobs documents they need
+    payload_refs: int = 0
+    unique_payloads: int = 0
+
+    @property
+    def total_bytes(self) -> int:
+        return self.dehydrated_bytes + self.blob_bytes
+
+    @property
+    def saved_bytes(self) -> int:
+        return self.inline_bytes - self.total_bytes
+
+    @property
+    def saved_ratio(self) -> float:
+        return self.saved_bytes / self.inline_bytes if self.inline_bytes else 0.0
+
+    def summary(self) -> str:
+        mb = 1024 * 1024
+        return (
+            f"{self.documents:,} requests: {self.inline_bytes / mb:.1f}MB inline -> "
+            f"{self.dehydrated_bytes / mb:.1f}MB requests + {self.blob_bytes / mb:.1f}MB "
+            f"blobs ({self.unique_payloads:,} unique of {self.payload_refs:,} payloads); "
+            f"saves {self.saved_bytes / mb:.1f}MB ({self.saved_ratio:.1%})"
+        )
+
+
+def estimate_payload_dedup(request_docs: Iterable[dict]) -> PayloadDedupReport:
+    """
+    Storage of raw gpt_batch_requests documents inline versus with content refs,
+    measured as BSON sizes. Nothing is written.
+    """
+    report = PayloadDedupReport()
+    seen: set[str] = set()
+    stored_at = datetime.now()
+    for doc in request_docs:
+        report.documents += 1
+        report.inline_bytes += len(bson.encode(doc))
+
+        payloads: dict[str, str] = {}
+        body = GPTBatchRequestBlobBody(**doc["request"]["body"])
+        dehydrated_body = dehydrate_request_body(body, payloads)
+        dehydrated_doc = {
+            **doc,
+            "request": {**doc["request"], "body": dehydrated_body.model_dump()},
+        }
+        report.dehydrated_bytes += len(bson.encode(dehydrated_doc))
+
+        for message in dehydrated_body.messages:
+            if CONTENT_REF_KEY in message:
+                report.payload_refs += 1
+        for payload_hash, content in payloads.items():
+            if payload_hash in seen:
+                continue
+            seen.add(payload_hash)
+            report.unique_payloads += 1
+            report.blob_bytes += len(
+                bson.encode(
+                    {
+                        "_id": payload_hash,
+                        "content": content,
+                        "created_at": stored_at,
+                        "last_stored_at": stored_at,
+                    }
+                )
+            )
+    return report
@@ -3,11 +3,17 @@ import logging
 
 from core.models.db.manufacturer import Manufacturer
 from core.models.field_types import MfgURLType, MfgETLDType
+from core.utils.partial_update_util import (
+    PartialUpdateWriter,
+    PartialWriteReport,
+    PartialWriteStats,
+)
 from core.utils.url_util import get_etld1_from_host
 
-
 logger = logging.getLogger(__name__)
 
+_manufacturer_writer = PartialUpdateWriter()
+
 
 def reset_llm_extracted_fields(manufacturer: Manufacturer):
     """
@@ -30,10 +36,29 @@ def reset_llm_extracted_fields(manufacturer: Manufacturer):
     )
 
 
-async def update_manufacturer(updated_at: datetime, manufacturer: Manufacturer):
+async def update_manufacturer(
+    updated_at: datetime, manufacturer: Manufacturer
+) -> PartialWriteReport:
+    """
+    Persist the fields assigned on the manufacturer since it was loaded or last
+    written, as one $set. Concurrent updates of the same manufacturer object are
+    coalesced into one write; new manufacturers are inserted whole.
+    """
     manufacturer.updated_at = updated_at
-    logger.info(f"Saving manufacturer {manufacturer.etld1} to the database.")
-    await manufacturer.save()
+    report = await _manufacturer_writer.write(manufacturer)
+    logger.info(
+        f"Saved {list(report.fields)} of manufacturer {manufacturer.etld1} "
+        f"({report.bytes_written} bytes) to the database."
+    )
+    return report
+
+
+def get_manufacturer_write_stats() -> PartialWriteStats:
+    return _manufacturer_writer.stats
+
+
+def log_manufacturer_write_stats() -> None:
+    _manufacturer_writer.log_stats("Manufacturer writes")
 
 
 # unused
@@ -0,0 +1,300 @@
+"""
+Batched SQS consumption for the queue bots.
+
+SQSBatchConsumer receives up to 10 messages per call, as many as there are free
+handler slots, and hands each parsed item to an async handler. While a handler
+runs, a heartbeat keeps extending its message's visibility, so long extractions
+are not redelivered to another consumer midway. Handled messages are deleted
+in batches of up to 10. Backpressure comes from a semaphore of handler slots:
+the receive loop waits for a free slot instead of polling for one.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Generic, TypeVar
+
+from core.constants import LONG_POLL_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# SQS limit for receive_message and the *_batch calls
+MAX_SQS_BATCH_SIZE = 10
+DEFAULT_VISIBILITY_TIMEOUT = 5 * 60  # seconds
+DEFAULT_HEARTBEAT_INTERVAL = 60  # seconds
+DEFAULT_DELETE_FLUSH_INTERVAL = 1.0  # seconds
+
+
+@dataclass
+class SQSConsumerStats:
+    receive_calls: int = 0
+    received: int = 0
+    malformed: int = 0
+    handled: int = 0
+    failed: int = 0
+    deleted: int = 0
+    delete_calls: int = 0
+    visibility_extensions: int = 0
+
+
+@dataclass
+class _InFlightMessage:
+    message_id: str
+    receipt_handle: str
+
+
+class SQSBatchConsumer(Generic[T]):
+    """
+    Consumes queue_url with at most max_in_flight handlers running at once.
+
+    parse_body turns a message body into an item; messages it fails on are
+    deleted without being handled. A message is deleted once its handler
+    returns. When the handler raises, the message is left to become visible
+    again after the visibility timeout, so it is retried.
+    """
+
+    def __init__(
+        self,
+        # duck-typed: receive_message, delete_message_batch,
+        # change_message_visibility_batch
+        sqs_client,
+        queue_url: str,
+        parse_body: Callable[[str], T],
+        max_in_flight: int,
+        visibility_timeout: int = DEFAULT_VISIBILITY_TIMEOUT,
+        heartbeat_interval: float = DEFAULT_HEARTBEAT_INTERVAL,
+        wait_time_seconds: int = LONG_POLL_INTERVAL,
+        delete_flush_interval: float = DEFAULT_DELETE_FLUSH_INTERVAL,
+        name: str = "SQS",
+    ):
+        if heartbeat_interval >= visibility_timeout:
+            raise ValueError(
+                f"heartbeat_interval ({heartbeat_interval}s) must be shorter than "
+                f"visibility_timeout ({visibility_timeout}s)"
+            )
+        self.sqs_client = sqs_client
+        self.queue_url = queue_url
+        self.parse_body = parse_body
+        self.max_in_flight = max_in_flight
+        self.visibility_timeout = visibility_timeout
+        self.heartbeat_interval = heartbeat_interval
+        self.wait_time_seconds = wait_time_seconds
+        self.delete_flush_interval = delete_flush_interval
+        self.name = name
+        self.stats = SQSConsumerStats()
+
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._in_flight: dict[str, _InFlightMessage] = {}  # by receipt handle
+        self._handler_tasks: set[asyncio.Task] = set()
+        self._pending_deletes: list[_InFlightMessage] = []
+        self._delete_requested = asyncio.Event()
+        self._stopping = asyncio.Event()
+
+    # --- receiving ---------------------------------------------------------- #
+
+    async def _acquire_slots(self) -> int:
+        """Wait for one free slot, then take the others free right now, up to 10."""
+        await self._slots.acquire()
+        acquired = 1
+        while acquired < MAX_SQS_BATCH_SIZE and not self._slots.locked():
+            await self._slots.acquire()  # free, does not wait
+            acquired += 1
+        return acquired
+
+    async def _receive(self, max_messages: int) -> list[dict]:
+        response = await self.sqs_client.receive_message(
+            QueueUrl=self.queue_url,
+            MaxNumberOfMessages=max_messages,
+            WaitTimeSeconds=self.wait_time_seconds,
+            VisibilityTimeout=self.visibility_timeout,
+        )
+        self.stats.receive_calls += 1
+        messages = response.get("Messages", [])
+        self.stats.received += len(messages)
+        return messages
+
+    def _start_handler(
+        self, message: dict, handle: Callable[[T], Awaitable[None]]
+    ) -> bool:
+        """Start handling message, False when it is malformed and was dropped."""
+        in_flight = _InFlightMessage(
+            message_id=message.get("MessageId", ""),
+            receipt_handle=message.get("ReceiptHandle", ""),
+        )
+        if not in_flight.receipt_handle:
+            logger.error(f"{self.name}: message missing ReceiptHandle field")
+            self.stats.malformed += 1
+            return False
+        body = message.get("Body")
+        try:
+            if not body:
+                raise ValueError("message missing Body field")
+            item = self.parse_body(body.strip())
+        except Exception as e:
+            logger.error(
+                f"{self.name}: could not parse message {in_flight.message_id}, deleting it: {e}"
+            )
+            self.stats.malformed += 1
+            self._delete_later(in_flight)
+            return False
+
+        logger.info(f"{self.name}: received message body: {body.strip()}")
+        self._in_flight[in_flight.receipt_handle] = in_flight
+        task = asyncio.create_task(self._handle(item, in_flight, handle))
+        self._handler_tasks.add(task)
+        task.add_done_callback(self._handler_tasks.discard)
+        return True
+
+    async def _handle(
+        self,
+        item: T,
+        in_flight: _InFlightMessage,
+        handle: Callable[[T], Awaitable[None]],
+    ) -> None:
+        try:
+            await handle(item)
+        except Exception as e:
+            self.stats.failed += 1
+            logger.error(
+                f"{self.name}: handler failed for message {in_flight.message_id}, "
+                f"leaving it for redelivery: {e}",
+                exc_info=True,
+            )
+        else:
+            self.stats.handled += 1
+            self._delete_later(in_flight)
+        finally:
+            self._in_flight.pop(in_flight.receipt_handle, None)
+            self._slots.release()
+
+    # --- heartbeat ---------------------------------------------------------- #
+
+    async def _heartbeat(self) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            await self.extend_visibility()
+
+    async def extend_visibility(self) -> None:
+        """Push back the visibility timeout of every message being handled."""
+        in_flight = list(self._in_flight.values())
+        for start in range(0, len(in_flight), MAX_SQS_BATCH_SIZE):
+            batch = in_flight[start : start + MAX_SQS_BATCH_SIZE]
+            try:
+                response = await self.sqs_client.change_message_visibility_batch(
+                    QueueUrl=self.queue_url,
+                    Entries=[
+                        {
+                            "Id": str(i),
+                            "ReceiptHandle": message.receipt_handle,
+                            "VisibilityTimeout": self.visibility_timeout,
+                        }
+                        for i, message in enumerate(batch)
+                    ],
+                )
+            except Exception as e:
+                logger.error(f"{self.name}: visibility heartbeat failed: {e}")
+                continue
+            self.stats.visibility_extensions += len(response.get("Successful", []))
+            for failure in response.get("Failed", []):
+                message = batch[int(failure["Id"])]
+                logger.warning(
+                    f"{self.name}: could not extend visibility of message "
+                    f"{message.message_id}: {failure.get('Message', failure.get('Code'))}"
+                )
+
+    # --- deleting ----------------------------------------------------------- #
+
+    def _delete_later(self, message: _InFlightMessage) -> None:
+        self._pending_deletes.append(message)
+        if len(self._pending_deletes) >= MAX_SQS_BATCH_SIZE:
+            self._delete_requested.set()
+
+    async def _deleter(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(
+                    self._delete_requested.wait(), self.delete_flush_interval
+                )
+            except asyncio.TimeoutError:
+                pass
+            self._delete_requested.clear()
+            await self.flush_deletes()
+
+    async def flush_deletes(self) -> None:
+        while self._pending_deletes:
+            batch = self._pending_deletes[:MAX_SQS_BATCH_SIZE]
+            del self._pending_deletes[:MAX_SQS_BATCH_SIZE]
+            try:
+                response = await self.sqs_client.delete_message_batch(
+                    QueueUrl=self.queue_url,
+                    Entries=[
+                        {"Id": str(i), "ReceiptHandle": message.receipt_handle}
+                        for i, message in enumerate(batch)
+                    ],
+                )
+            except Exception as e:
+                # the messages come back after their visibility timeout
+                logger.error(
+                    f"{self.name}: could not delete {len(batch)} messages: {e}"
+                )
+                continue
+            self.stats.delete_calls += 1
+            self.stats.deleted += len(response.get("Successful", []))
+            for failure in response.get("Failed", []):
+                message = batch[int(failure["Id"])]
+                logger.error(
+                    f"{self.name}: could not delete message {message.message_id}: "
+                    f"{failure.get('Message', failure.get('Code'))}"
+                )
+
+    # --- running ------------------------------------------------------------ #
+
+    async def run(self, handle: Callable[[T], Awaitable[None]]) -> None:
+        """
+        Receive and handle messages until stop() is called or the task is
+        cancelled, then wait for running handlers and flush pending deletes.
+        """
+        heartbeat = asyncio.create_task(self._heartbeat())
+        deleter = asyncio.create_task(self._deleter())
+        try:
+            while not self._stopping.is_set():
+                slots = await self._acquire_slots()
+                started = 0
+                try:
+                    if not self._stopping.is_set():
+                        for message in await self._receive(slots):
+                            if self._start_handler(message, handle):
+                                started += 1
+                finally:
+                    for _ in range(slots - started):
+                        self._slots.release()
+        finally:
+            if self._handler_tasks:
+                logger.info(
+                    f"{self.name}: waiting for {len(self._handler_tasks)} handlers to finish"
+                )
+                await asyncio.gather(*self._handler_tasks, return_exceptions=True)
+            heartbeat.cancel()
+            deleter.cancel()
+            await asyncio.gather(heartbeat, deleter, return_exceptions=True)
+            await self.flush_deletes()
+            self.log_stats()
+
+    def stop(self) -> None:
+        """Stop receiving; run() returns once the handlers in flight are done."""
+        self._stopping.set()
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    def log_stats(self) -> None:
+        stats = self.stats
+        logger.info(
+            f"{self.name} consumer: {stats.received} received in {stats.receive_calls} calls, "
+            f"{stats.handled} handled, {stats.failed} failed, {stats.malformed} malformed, "
+            f"{stats.deleted} deleted in {stats.delete_calls} calls, "
+            f"{stats.visibility_extensions} visibility extensions"
+        )
@@ -0,0 +1,323 @@
+"""
+Local cache of scraped text file versions, keyed by (etld1, S3 version id).
+
+S3 version ids are immutable, so a cached version never goes stale and needs no
+invalidation: entries only leave the cache through size-based LRU eviction.
+Recently used entries are kept in memory; every entry is also written to disk,
+zlib-compressed, so other processes on the host (and restarts) reuse it.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+SCRAPED_TEXT_CACHE_DIR = os.getenv(
+    "SCRAPED_TEXT_CACHE_DIR",
+    os.path.join(tempfile.gettempdir(), "scraped_text_cache"),
+)
+SCRAPED_TEXT_CACHE_MAX_DISK_MB = int(
+    os.getenv("SCRAPED_TEXT_CACHE_MAX_DISK_MB", "2048")
+)
+SCRAPED_TEXT_CACHE_MAX_MEMORY_MB = int(
+    os.getenv("SCRAPED_TEXT_CACHE_MAX_MEMORY_MB", "256")
+)
+SCRAPED_TEXT_CACHE_ENABLED = os.getenv("SCRAPED_TEXT_CACHE_ENABLED", "true") == "true"
+
+_CACHE_FILE_SUFFIX = ".json.z"
+
+
+@dataclass(frozen=True)
+class CachedScrapedText:
+    """One scraped text file version with everything derived from it."""
+
+    etld1: str
+    version_id: str
+    text: str = field(repr=False)
+    tags: dict[str, str]
+    last_modified_on: datetime | None
+    num_tokens: int
+
+    @property
+    def memory_size(self) -> int:
+        # str payload dominates; 1 byte per char is close enough for ASCII-heavy text
+        return len(self.text) + 256
+
+    def to_bytes(self) -> bytes:
+        document = {
+            "etld1": self.etld1,
+            "version_id": self.version_id,
+            "tags": self.tags,
+            "last_modified_on": (
+                self.last_modified_on.isoformat() if self.last_modified_on else None
+            ),
+            "num_tokens": self.num_tokens,
+            "text": self.text,
+        }
+        return zlib.compress(json.dumps(document).encode("utf-8"), 6)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "CachedScrapedText":
+        document = json.loads(zlib.decompress(data))
+        last_modified_on = document["last_modified_on"]
+        return cls(
+            etld1=document["etld1"],
+            version_id=document["version_id"],
+            text=document["text"],
+            tags=document["tags"],
+            last_modified_on=(
+                datetime.fromisoformat(last_modified_on) if last_modified_on else None
+            ),
+            num_tokens=document["num_tokens"],
+        )
+
+
+@dataclass
+class ScrapedTextCacheStats:
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    memory_evictions: int = 0
+    disk_evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0
+
+
+class ScrapedTextCache:
+    """
+    Two-level LRU of CachedScrapedText: an in-memory tier bounded by text size
+    and an on-disk tier bounded by compressed file size. Thread-safe; the async
+    methods run disk I/O in a worker thread.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path = SCRAPED_TEXT_CACHE_DIR,
+        max_disk_bytes: int = SCRAPED_TEXT_CACHE_MAX_DISK_MB * 1024 * 1024,
+        max_memory_bytes: int = SCRAPED_TEXT_CACHE_MAX_MEMORY_MB * 1024 * 1024,
+    ):
+        self.directory = Path(directory)
+        self.max_disk_bytes = max_disk_bytes
+        self.max_memory_bytes = max_memory_bytes
+        self.stats = ScrapedTextCacheStats()
+
+        self._lock = threading.Lock()
+        self._memory: OrderedDict[str, CachedScrapedText] = OrderedDict()
+        self._memory_bytes = 0
+        # file name -> compressed size, least recently used first
+        self._disk: OrderedDict[str, int] = OrderedDict()
+        self._disk_bytes = 0
+        # single-flight: concurrent misses for the same version share one fetch
+        self._in_flight: dict[str, asyncio.Future[CachedScrapedText]] = {}
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._load_disk_index()
+
+    @staticmethod
+    def cache_key(etld1: str, version_id: str) -> str:
+        return hashlib.sha256(f"{etld1}\0{version_id}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}{_CACHE_FILE_SUFFIX}"
+
+    def _load_disk_index(self) -> None:
+        """Rebuild the disk LRU from what earlier processes left, oldest first."""
+        files = []
+        for path in self.directory.glob(f"*{_CACHE_FILE_SUFFIX}"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, path.name, stat.st_size))
+        for _mtime, name, size in sorted(files):
+            self._disk[name.removesuffix(_CACHE_FILE_SUFFIX)] = size
+            self._disk_bytes += size
+        self._evict_disk()
+
+    # --- memory tier -------------------------------------------------------- #
+
+    def _remember(self, key: str, entry: CachedScrapedText) -> None:
+        if entry.memory_size > self.max_memory_bytes:
+            return
+        with self._lock:
+            previous = self._memory.pop(key, None)
+            if previous is not None:
+                self._memory_bytes -= previous.memory_size
+            self._memory[key] = entry
+            self._memory_bytes += entry.memory_size
+            while self._memory_bytes > self.max_memory_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= evicted.memory_size
+                self.stats.memory_evictions += 1
+
+    # --- disk tier ---------------------------------------------------------- #
+
+    def _read_disk(self, key: str) -> CachedScrapedText | None:
+        # not only indexed files: another process on the host may have written it
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+            os.utime(path)  # keep the LRU order across restarts
+            entry = CachedScrapedText.from_bytes(data)
+        except FileNotFoundError:
+            self._forget_disk(key)
+        except Exception as e:
+            logger.warning(f"Dropping unreadable scraped text cache file {path}: {e}")
+            self._forget_disk(key)
+            path.unlink(missing_ok=True)
+        else:
+            with self._lock:
+                self._disk_bytes += len(data) - self._disk.pop(key, 0)
+                self._disk[key] = len(data)
+            return entry
+        return None
+
+    def _write_disk(self, key: str, entry: CachedScrapedText) -> None:
+        data = entry.to_bytes()
+        if len(data) > self.max_disk_bytes:
+            return
+        path = self._path(key)
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)  # atomic, readers never see a partial file
+        with self._lock:
+            self._disk_bytes -= self._disk.pop(key, 0)
+            self._disk[key] = len(data)
+            self._disk_bytes += len(data)
+        self._evict_disk()
+
+    def _forget_disk(self, key: str) -> None:
+        with self._lock:
+            self._disk_bytes -= self._disk.pop(key, 0)
+
+    def _evict_disk(self) -> None:
+        while True:
+            with self._lock:
+                if self._disk_bytes <= self.max_disk_bytes or not self._disk:
+                    return
+                key, size = self._disk.popitem(last=False)
+                self._disk_bytes -= size
+                self.stats.disk_evictions += 1
+            self._path(key).unlink(missing_ok=True)
+
+    # --- public API --------------------------------------------------------- #
+
+    def get(self, etld1: str, version_id: str) -> CachedScrapedText | None:
+        key = self.cache_key(etld1, version_id)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.stats.memory_hits += 1
+                return entry
+        entry = self._read_disk(key)
+        with self._lock:
+            if entry is None:
+                self.stats.misses += 1
+                return None
+            self.stats.disk_hits += 1
+        self._remember(key, entry)
+        return entry
+
+    def put(self, entry: CachedScrapedText) -> None:
+        key = self.cache_key(entry.etld1, entry.version_id)
+        self._remember(key, entry)
+        try:
+            self._write_disk(key, entry)
+        except OSError as e:
+            # a full or read-only disk only costs us the disk tier
+            logger.warning(f"Could not write scraped text cache file for {key}: {e}")
+
+    async def get_or_fetch(
+        self,
+        etld1: str,
+        version_id: str,
+        fetch: Callable[[], Awaitable[CachedScrapedText]],
+    ) -> CachedScrapedText:
+        """
+        Cached entry for (etld1, version_id), or the result of fetch() which is
+        then cached. Concurrent callers missing on the same version await a
+        single fetch.
+        """
+        key = self.cache_key(etld1, version_id)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.stats.memory_hits += 1
+                return entry
+
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            return await asyncio.shield(in_flight)
+
+        future: asyncio.Future[CachedScrapedText] = (
+            asyncio.get_running_loop().create_future()
+        )
+        self._in_flight[key] = future
+        try:
+            entry = await asyncio.to_thread(self.get, etld1, version_id)
+            if entry is None:
+                entry = await fetch()
+                await asyncio.to_thread(self.put, entry)
+            future.set_result(entry)
+            return entry
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # retrieved, so an unawaited future doesn't warn
+            raise
+        finally:
+            self._in_flight.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            keys = list(self._disk)
+            self._memory.clear()
+            self._memory_bytes = 0
+            self._disk.clear()
+            self._disk_bytes = 0
+        for key in keys:
+            self._path(key).unlink(missing_ok=True)
+
+    def log_stats(self) -> None:
+        stats = self.stats
+        logger.info(
+            f"Scraped text cache: hit rate {stats.hit_rate:.1%} "
+            f"(memory hits {stats.memory_hits}, disk hits {stats.disk_hits}, "
+            f"misses {stats.misses}); memory {len(self._memory)} entries / "
+            f"{self._memory_bytes / 1024 / 1024:.1f}MB, disk {len(self._disk)} "
+            f"files / {self._disk_bytes / 1024 / 1024:.1f}MB; evictions memory "
+            f"{stats.memory_evictions}, disk {stats.disk_evictions}"
+        )
+
+
+_scraped_text_cache: ScrapedTextCache | None = None
+_scraped_text_cache_lock = threading.Lock()
+
+
+def get_scraped_text_cache() -> ScrapedTextCache | None:
+    """Process-wide cache, or None when SCRAPED_TEXT_CACHE_ENABLED is not true."""
+    global _scraped_text_cache
+    if not SCRAPED_TEXT_CACHE_ENABLED:
+        return None
+    with _scraped_text_cache_lock:
+        if _scraped_text_cache is None:
+            _scraped_text_cache = ScrapedTextCache()
+        return _scraped_text_cache
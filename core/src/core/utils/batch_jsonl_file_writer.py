@@ -1,3 +1,4 @@
+from dataclasses import dataclass
 from datetime import datetime
 import asyncio
 import json
@@ -10,6 +11,10 @@ from core.models.jsonl_batch_file import (
     FileContentLimitReachedException,
     JSONLBatchFile,
 )
+from core.services.gpt_payload_blob_service import (
+    hydrate_request_blobs,
+    is_request_body_hydrated,
+)
 from core.utils.time_util import get_timestamp_str
 
 logger = logging.getLogger(__name__)
@@ -18,15 +23,39 @@ logging.basicConfig(
 )
 
 
+# files items are packed into at the same time, the fullest is closed first
+DEFAULT_MAX_OPEN_FILES = 4
+# with no new file allowed, stop looking for items that fit after this many misses
+DEFAULT_MAX_CONSECUTIVE_ITEMS_LEFT_OUT = 50
+
+
 class MaxFilesReachedException(Exception):
     """Raised when the maximum number of batch files has been reached."""
 
     pass
 
 
+@dataclass
+class PlannedItem:
+    """The requests of one item, serialized once, with their totals."""
+
+    item_id: str
+    request_blobs: list[GPTBatchRequestBlob]
+    json_lines: list[str]
+    request_count: int
+    total_tokens: int
+    size_in_bytes: int
+
+
 class BatchRequestJSONLFileWriter:
     """Handles writing batch requests to JSONL files with constraints.
 
+    Items are bin-packed across the request, token and size limits: an item
+    goes whole into the open file it fills the most (best fit), a new file is
+    only started when it fits in none of them. When no new file may be
+    started, items that fit nowhere are left out for a later run rather than
+    split; only items bigger than an empty file are split across files.
+
     Thread-safe for concurrent access using asyncio.Lock.
     """
 
@@ -39,6 +68,8 @@ class BatchRequestJSONLFileWriter:
         max_tokens_per_file: int,
         max_file_size_in_bytes: int,
         common_prefix: str = "batch_requests",
+        max_open_files: int = DEFAULT_MAX_OPEN_FILES,
+        max_consecutive_items_left_out: int = DEFAULT_MAX_CONSECUTIVE_ITEMS_LEFT_OUT,
     ):
         self.run_timestamp_str = get_timestamp_str(run_timestamp)
         self.output_dir = output_dir / self.run_timestamp_str
@@ -48,10 +79,15 @@ class BatchRequestJSONLFileWriter:
         self.max_tokens_per_file = max_tokens_per_file
         self.max_file_size_in_bytes = max_file_size_in_bytes
         self.common_prefix = common_prefix
+        self.max_open_files = max_open_files
+        self.max_consecutive_items_left_out = max_consecutive_items_left_out
 
-        self.files = []
+        self.files: list[JSONLBatchFile] = []
+        self.open_files: list[JSONLBatchFile] = []  # files items may still go to
         self.current_file_index = -1
         self.result_summary = {}
+        self.items_left_out = 0
+        self._consecutive_items_left_out = 0
         self._lock = asyncio.Lock()  # Thread-safe lock for concurrent writes
         self._add_new_file()
 
@@ -72,100 +108,197 @@ class BatchRequestJSONLFileWriter:
                 max_size_in_bytes=self.max_file_size_in_bytes,
             )
         )
+        self.open_files.append(self.current_file)
 
-    def _start_new_file(self):
-        if self.current_file:
-            self.current_file.close_pointer()
-            file_summary = self.current_file.get_summary()
-            self.result_summary[self.current_file.name] = file_summary
-            logger.info(
-                f"Closed {self.current_file.name}: "
-                f"{file_summary.request_count:,} requests, {file_summary.total_tokens:,} tokens, "
-                f"{file_summary.unique_items} unique items, {file_summary.unique_lines} unique lines"
-                f"{self.current_file.size_in_bytes / (1024 * 1024):.2f} MB"
-            )
+    def _close_file(self, batch_file: JSONLBatchFile):
+        self.open_files.remove(batch_file)
+        batch_file.close_pointer()
+        file_summary = batch_file.get_summary()
+        self.result_summary[batch_file.name] = file_summary
+        logger.info(
+            f"Closed {batch_file.name}: "
+            f"{file_summary.request_count:,} requests, {file_summary.total_tokens:,} tokens, "
+            f"{file_summary.unique_items} unique items, {file_summary.unique_lines} unique lines, "
+            f"{batch_file.size_in_bytes / (1024 * 1024):.2f} MB"
+        )
 
+    def _start_new_file(self):
         # Check if we've reached the max number of files
-        if self.max_files is not None and self.current_file_index + 1 >= self.max_files:
+        if not self._can_start_new_file():
             raise MaxFilesReachedException(
                 f"Reached maximum number of files: {self.max_files}"
             )
 
+        if len(self.open_files) >= self.max_open_files:
+            # the fullest file is the least likely to take another item
+            self._close_file(max(self.open_files, key=self._get_fill_ratio))
         self._add_new_file()
 
+    def _can_start_new_file(self) -> bool:
+        return self.max_files is None or self.current_file_index + 1 < self.max_files
+
+    def close_files(self):
+        """Close the files still open; their summaries join result_summary."""
+        for batch_file in list(self.open_files):
+            self._close_file(batch_file)
+
+    def _get_fill_ratio(
+        self,
+        batch_file: JSONLBatchFile,
+        planned_item: Optional[PlannedItem] = None,
+    ) -> float:
+        """How full the file is, or would be with the item, on its tightest limit."""
+        requests = batch_file.total_requests
+        tokens = batch_file.total_tokens
+        size_in_bytes = batch_file.size_in_bytes
+        if planned_item is not None:
+            requests += planned_item.request_count
+            tokens += planned_item.total_tokens
+            size_in_bytes += planned_item.size_in_bytes
+        return max(
+            requests / self.max_requests_per_file,
+            tokens / self.max_tokens_per_file,
+            size_in_bytes / self.max_file_size_in_bytes,
+        )
+
     def _serialize_request(self, request_blob: GPTBatchRequestBlob) -> str:
         """Serialize a request blob to JSON string (without input_tokens)."""
+        if not is_request_body_hydrated(request_blob.body):
+            raise ValueError(
+                f"Request {request_blob.custom_id} still refers to payload blobs; "
+                f"hydrate it with hydrate_request_blobs() before writing."
+            )
         request_dict = request_blob.model_dump()
         request_dict["body"].pop("input_tokens", None)
         # Use separators for consistent, compact JSON output
         return json.dumps(request_dict, separators=(",", ":"), sort_keys=False)
 
-    def _can_add_requests_of_single_item(
+    def plan_item(
         self, item_id: str, request_blobs: list[GPTBatchRequestBlob]
-    ) -> bool:
-        """Check if all requests in a list can be added to the current batch file."""
-        if not request_blobs:
-            logger.debug(
-                f"can_add_item_requests: No requests to add for {item_id}; returning True."
-            )
-            return True
-
-        # Calculate the total size and tokens for all requests
-
-        total_item_tokens = 0
-        total_size_in_bytes = 0
-        for req_blob in request_blobs:
-            total_item_tokens += req_blob.body.input_tokens
-            json_str = self._serialize_request(req_blob)
-            total_size_in_bytes += JSONLBatchFile.get_json_line_size_in_bytes(json_str)
-
-        # Check if adding all requests would exceed limits
-        can_fit = self.current_file.can_batch_file_fit_item(
-            item_tokens=total_item_tokens,
-            item_request_count=len(request_blobs),
-            item_size_in_bytes=total_size_in_bytes,
+    ) -> PlannedItem:
+        """Serialize the requests of an item and total what it takes in a file."""
+        json_lines = [self._serialize_request(req_blob) for req_blob in request_blobs]
+        return PlannedItem(
+            item_id=item_id,
+            request_blobs=request_blobs,
+            json_lines=json_lines,
+            request_count=len(request_blobs),
+            total_tokens=sum(req_blob.body.input_tokens for req_blob in request_blobs),
+            size_in_bytes=sum(
+                JSONLBatchFile.get_json_line_size_in_bytes(json_line)
+                for json_line in json_lines
+            ),
         )
 
-        if not can_fit:
-            logger.warning(
-                f"Cannot fit item {item_id} into current file. "
-                f"Item: {len(request_blobs)} requests, {total_item_tokens:,} tokens, {total_size_in_bytes:,} bytes. "
-                f"Current file: {self.current_file.total_requests} requests, {self.current_file.total_tokens:,} tokens, {self.current_file.size_in_bytes:,} bytes. "
-                f"Limits: {self.max_requests_per_file:,} requests, {self.max_tokens_per_file:,} tokens, {self.max_file_size_in_bytes:,} bytes."
+    def _find_best_fit_file(
+        self, planned_item: PlannedItem
+    ) -> Optional[JSONLBatchFile]:
+        """The open file the whole item fits in and leaves the fullest."""
+        fitting_files = [
+            batch_file
+            for batch_file in self.open_files
+            if batch_file.can_batch_file_fit_item(
+                item_tokens=planned_item.total_tokens,
+                item_request_count=planned_item.request_count,
+                item_size_in_bytes=planned_item.size_in_bytes,
             )
+        ]
+        if not fitting_files:
+            return None
+        return max(
+            fitting_files,
+            key=lambda batch_file: self._get_fill_ratio(batch_file, planned_item),
+        )
 
-        return can_fit
+    def _fits_in_empty_file(self, planned_item: PlannedItem) -> bool:
+        return (
+            planned_item.request_count <= self.max_requests_per_file
+            and planned_item.total_tokens <= self.max_tokens_per_file
+            and planned_item.size_in_bytes <= self.max_file_size_in_bytes
+        )
 
     def write_item_request_blobs(
         self, item_id: str, request_blobs: list[GPTBatchRequestBlob]
-    ):
-        """Write all requests for a single item to the current batch file.
+    ) -> bool:
+        """Write all requests for a single item to the batch files.
 
         Note: This is a synchronous wrapper that should be called with await
         in an async context for thread safety.
+
+        Returns:
+            False if the item was left out because no file can take it
         """
         # logger.info(f"Writing {len(request_blobs):,} requests for item {item_id}")
         if not request_blobs:
             logger.debug(
                 f"write_item_request_blobs: No requests to write for {item_id}; skipping."
             )
-            return
+            return True
+
+        return self.write_planned_item(self.plan_item(item_id, request_blobs))
+
+    def write_planned_item(self, planned_item: PlannedItem) -> bool:
+        """Write an item planned with plan_item, see write_item_request_blobs."""
+        item_id = planned_item.item_id
+        batch_file = self._find_best_fit_file(planned_item)
+        if batch_file is None and self._fits_in_empty_file(planned_item):
+            if not self._can_start_new_file():
+                return self._leave_out_item(planned_item)
+            self._start_new_file()
+            batch_file = self.current_file
+
+        self._consecutive_items_left_out = 0
+        if batch_file is None:
+            logger.warning(
+                f"Item {item_id} is larger than a whole file "
+                f"({planned_item.request_count:,} requests, {planned_item.total_tokens:,} tokens, "
+                f"{planned_item.size_in_bytes:,} bytes), splitting it across files."
+            )
+            self._write_lines_across_files(planned_item)
+            return True
+
+        n = planned_item.request_count
+        for i, (req_blob, json_line) in enumerate(
+            zip(planned_item.request_blobs, planned_item.json_lines, strict=True)
+        ):
+            batch_file.add_json_line(
+                item_id=item_id,
+                line_id=req_blob.custom_id,
+                json_line=json_line,
+                tokens=req_blob.body.input_tokens,
+                is_last_item_line=i == n - 1,
+            )
+        return True
 
-        # if not self._can_add_requests_of_single_item(item_id, request_blobs):
-        #     self._start_new_file()  # updates self.current_file to a new file
+    def _leave_out_item(self, planned_item: PlannedItem) -> bool:
+        self.items_left_out += 1
+        self._consecutive_items_left_out += 1
+        logger.info(
+            f"No room for item {planned_item.item_id} "
+            f"({planned_item.request_count:,} requests, {planned_item.total_tokens:,} tokens, "
+            f"{planned_item.size_in_bytes:,} bytes), leaving it for a later run."
+        )
+        if self._consecutive_items_left_out >= self.max_consecutive_items_left_out:
+            raise MaxFilesReachedException(
+                f"Reached maximum number of files: {self.max_files}, "
+                f"the last {self._consecutive_items_left_out} items did not fit"
+            )
+        return False
 
+    def _write_lines_across_files(self, planned_item: PlannedItem):
+        item_id = planned_item.item_id
+        batch_file = self.current_file
         i = 0
-        n = len(request_blobs)
+        n = planned_item.request_count
         while i < n:
             try:
-                req_blob = request_blobs[i]
-                is_last_item_line = i == n - 1
-                self.current_file.add_json_line(
+                req_blob = planned_item.request_blobs[i]
+                batch_file.add_json_line(
                     item_id=item_id,
                     line_id=req_blob.custom_id,
-                    json_line=self._serialize_request(req_blob),
+                    json_line=planned_item.json_lines[i],
                     tokens=req_blob.body.input_tokens,
-                    is_last_item_line=is_last_item_line,
+                    is_last_item_line=i == n - 1,
                 )
                 i += 1
             except FileContentLimitReachedException as e:
@@ -174,22 +307,34 @@ class BatchRequestJSONLFileWriter:
                     f"Starting new file and retrying."
                 )
                 self._start_new_file()
+                batch_file = self.current_file
             except Exception as e:
                 logger.error(
                     f"Error writing request {req_blob.custom_id} for item {item_id}: {e}"
                 )
                 raise e
 
+    async def hydrate_request_blobs(
+        self, request_blobs: list[GPTBatchRequestBlob]
+    ) -> list[GPTBatchRequestBlob]:
+        """Request blobs with their payload blob refs replaced by the contents."""
+        return await hydrate_request_blobs(request_blobs)
+
     async def write_item_request_blobs_async(
         self, item_id: str, request_blobs: list[GPTBatchRequestBlob]
-    ):
+    ) -> bool:
         """Thread-safe async version of write_item_request_blobs.
 
         Use this method when processing manufacturers in parallel to ensure
-        safe concurrent writes to batch files.
+        safe concurrent writes to batch files. Request blobs are hydrated and
+        serialized first, outside the lock.
         """
+        if not request_blobs:
+            return True
+        request_blobs = await self.hydrate_request_blobs(request_blobs)
+        planned_item = self.plan_item(item_id, request_blobs)
         async with self._lock:
-            self.write_item_request_blobs(item_id, request_blobs)
+            return self.write_planned_item(planned_item)
 
     def delete_files(self):
         """Delete all created batch files from disk."""
@@ -0,0 +1,329 @@
+"""
+Persistent cache of LLM chat-completion responses, keyed by a hash of everything
+that determines the request: the prompt (its S3 version id and text), the model,
+the model parameters and the input text.
+
+Re-running an extraction on an unchanged scrape version, or overlapping chunks
+repeating text, then costs nothing. Entries live in a SQLite file shared by all
+processes on the host, expire after LLM_RESPONSE_CACHE_TTL_DAYS, and can be
+dropped per prompt version when a prompt is found to be bad. Hits, misses and
+the dollars they saved or spent are counted per label (the field type asking)
+in the same file, see data_etl_app/scripts/report_llm_response_cache.py.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+LLM_RESPONSE_CACHE_PATH = os.getenv(
+    "LLM_RESPONSE_CACHE_PATH",
+    os.path.join(tempfile.gettempdir(), "llm_response_cache.sqlite3"),
+)
+LLM_RESPONSE_CACHE_TTL_DAYS = float(os.getenv("LLM_RESPONSE_CACHE_TTL_DAYS", "30"))
+LLM_RESPONSE_CACHE_ENABLED = os.getenv("LLM_RESPONSE_CACHE_ENABLED", "true") == "true"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_responses (
+    key TEXT PRIMARY KEY,
+    label TEXT NOT NULL,
+    prompt_version_id TEXT,
+    model TEXT NOT NULL,
+    content TEXT NOT NULL,
+    input_tokens INTEGER NOT NULL,
+    output_tokens INTEGER NOT NULL,
+    cost_usd REAL NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS llm_responses_prompt_version_idx
+    ON llm_responses (prompt_version_id);
+CREATE INDEX IF NOT EXISTS llm_responses_expires_at_idx
+    ON llm_responses (expires_at);
+CREATE TABLE IF NOT EXISTS llm_response_cache_stats (
+    label TEXT PRIMARY KEY,
+    hits INTEGER NOT NULL DEFAULT 0,
+    misses INTEGER NOT NULL DEFAULT 0,
+    saved_tokens INTEGER NOT NULL DEFAULT 0,
+    saved_usd REAL NOT NULL DEFAULT 0,
+    spent_usd REAL NOT NULL DEFAULT 0
+);
+"""
+
+
+@dataclass(frozen=True)
+class CachedLLMResponse:
+    """A chat-completion answer with what it cost to get."""
+
+    content: str
+    input_tokens: int
+    output_tokens: int
+    cost_usd: float
+
+
+@dataclass
+class LLMResponseCacheStats:
+    hits: int = 0
+    misses: int = 0
+    saved_tokens: int = 0
+    saved_usd: float = 0.0
+    spent_usd: float = 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+def llm_request_cache_key(
+    prompt_version_id: Optional[str],
+    prompt: str,
+    context: str,
+    gpt_model,  # duck-typed: needs .model_name, .safe_completion_tokens
+    # duck-typed: needs .temperature, .top_p, .presence_penalty, .frequency_penalty,
+    # .max_tokens
+    model_params,
+    variant: int = 0,
+) -> str:
+    """
+    Hash of a chat-completion request. variant tells apart requests that are
+    meant to be asked again, like the passes of a multi-pass search.
+    """
+    params = {
+        "temperature": model_params.temperature,
+        "top_p": model_params.top_p,
+        "presence_penalty": model_params.presence_penalty,
+        "frequency_penalty": model_params.frequency_penalty,
+        "max_tokens": model_params.max_tokens or gpt_model.safe_completion_tokens,
+    }
+    digest = hashlib.sha256()
+    for part in (
+        prompt_version_id or "",
+        prompt,
+        gpt_model.model_name,
+        json.dumps(params, sort_keys=True),
+        str(variant),
+        context,
+    ):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class LLMResponseCache:
+    """
+    SQLite-backed response cache. Thread-safe; the async method runs SQLite in
+    a worker thread. WAL mode lets processes on the host share the file.
+    """
+
+    def __init__(
+        self,
+        path: str | Path = LLM_RESPONSE_CACHE_PATH,
+        ttl_seconds: float = LLM_RESPONSE_CACHE_TTL_DAYS * 24 * 3600,
+    ):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        # this process' counters, the file keeps the totals of all processes
+        self.stats: dict[str, LLMResponseCacheStats] = {}
+
+        self._lock = threading.Lock()
+        # single-flight: concurrent misses for the same request share one call
+        self._in_flight: dict[str, asyncio.Future[Optional[str]]] = {}
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(
+            self.path, timeout=30, check_same_thread=False, isolation_level=None
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(_SCHEMA)
+        self.delete_expired()
+
+    # --- entries ------------------------------------------------------------ #
+
+    def get(self, key: str, label: str) -> CachedLLMResponse | None:
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT content, input_tokens, output_tokens, cost_usd "
+                "FROM llm_responses WHERE key = ? AND expires_at > ?",
+                (key, now),
+            ).fetchone()
+            if row is None:
+                return None
+            entry = CachedLLMResponse(*row)
+            self._record(label, hit=True, entry=entry)
+            return entry
+
+    def put(
+        self,
+        key: str,
+        entry: CachedLLMResponse,
+        label: str,
+        prompt_version_id: Optional[str],
+        model_name: str,
+    ) -> None:
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO llm_responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    label,
+                    prompt_version_id,
+                    model_name,
+                    entry.content,
+                    entry.input_tokens,
+                    entry.output_tokens,
+                    entry.cost_usd,
+                    now,
+                    now + self.ttl_seconds,
+                ),
+            )
+
+    def record_miss(self, label: str, entry: CachedLLMResponse | None) -> None:
+        with self._lock:
+            self._record(label, hit=False, entry=entry)
+
+    def _record(self, label: str, hit: bool, entry: CachedLLMResponse | None) -> None:
+        # caller holds self._lock
+        cost_usd = entry.cost_usd if entry else 0.0
+        stats = self.stats.setdefault(label, LLMResponseCacheStats())
+        self._connection.execute(
+            "INSERT OR IGNORE INTO llm_response_cache_stats (label) VALUES (?)",
+            (label,),
+        )
+        if hit:
+            tokens = entry.input_tokens + entry.output_tokens
+            stats.hits += 1
+            stats.saved_tokens += tokens
+            stats.saved_usd += cost_usd
+            self._connection.execute(
+                "UPDATE llm_response_cache_stats SET hits = hits + 1, "
+                "saved_tokens = saved_tokens + ?, saved_usd = saved_usd + ? "
+                "WHERE label = ?",
+                (tokens, cost_usd, label),
+            )
+        else:
+            stats.misses += 1
+            stats.spent_usd += cost_usd
+            self._connection.execute(
+                "UPDATE llm_response_cache_stats SET misses = misses + 1, "
+                "spent_usd = spent_usd + ? WHERE label = ?",
+                (cost_usd, label),
+            )
+
+    async def get_or_ask(
+        self,
+        key: str,
+        label: str,
+        prompt_version_id: Optional[str],
+        model_name: str,
+        ask: Callable[[], Awaitable[CachedLLMResponse | None]],
+    ) -> Optional[str]:
+        """
+        Cached content for key, or that of ask() which is then cached. Empty
+        answers are returned but not cached. Concurrent callers missing on the
+        same key await a single ask().
+        """
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            return await asyncio.shield(in_flight)
+
+        future: asyncio.Future[Optional[str]] = (
+            asyncio.get_running_loop().create_future()
+        )
+        self._in_flight[key] = future
+        try:
+            entry = await asyncio.to_thread(self.get, key, label)
+            if entry is None:
+                entry = await ask()
+                await asyncio.to_thread(self.record_miss, label, entry)
+                if entry is not None and entry.content:
+                    await asyncio.to_thread(
+                        self.put, key, entry, label, prompt_version_id, model_name
+                    )
+            content = entry.content if entry is not None else None
+            future.set_result(content)
+            return content
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # retrieved, so an unawaited future doesn't warn
+            raise
+        finally:
+            self._in_flight.pop(key, None)
+
+    # --- invalidation ------------------------------------------------------- #
+
+    def invalidate_prompt_version(self, prompt_version_id: str) -> int:
+        """Drop every response to the given prompt version, returns how many."""
+        with self._lock:
+            cursor = self._connection.execute(
+                "DELETE FROM llm_responses WHERE prompt_version_id = ?",
+                (prompt_version_id,),
+            )
+            return cursor.rowcount
+
+    def delete_expired(self) -> int:
+        with self._lock:
+            cursor = self._connection.execute(
+                "DELETE FROM llm_responses WHERE expires_at <= ?", (time.time(),)
+            )
+            return cursor.rowcount
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM llm_responses")
+            self._connection.execute("DELETE FROM llm_response_cache_stats")
+            self.stats.clear()
+
+    # --- reporting ---------------------------------------------------------- #
+
+    def get_total_stats(self) -> dict[str, LLMResponseCacheStats]:
+        """Counters of every process that used the file, per label."""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT label, hits, misses, saved_tokens, saved_usd, spent_usd "
+                "FROM llm_response_cache_stats ORDER BY label"
+            ).fetchall()
+        return {row[0]: LLMResponseCacheStats(*row[1:]) for row in rows}
+
+    def log_stats(self) -> None:
+        for label, stats in sorted(self.stats.items()):
+            logger.info(
+                f"LLM response cache [{label}]: hit rate {stats.hit_rate:.1%} "
+                f"(hits {stats.hits}, misses {stats.misses}); saved "
+                f"${stats.saved_usd:.4f} / {stats.saved_tokens} tokens, spent "
+                f"${stats.spent_usd:.4f}"
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+_llm_response_cache: LLMResponseCache | None = None
+_llm_response_cache_lock = threading.Lock()
+
+
+def get_llm_response_cache() -> LLMResponseCache | None:
+    """Process-wide cache, or None when LLM_RESPONSE_CACHE_ENABLED is not true."""
+    global _llm_response_cache
+    if not LLM_RESPONSE_CACHE_ENABLED:
+        return None
+    with _llm_response_cache_lock:
+        if _llm_response_cache is None:
+            _llm_response_cache = LLMResponseCache()
+        return _llm_response_cache
@@ -13,6 +13,7 @@ from core.models.db.user import User
 from core.models.db.deferred_manufacturer import DeferredManufacturer
 from core.models.db.gpt_batch_request import GPTBatchRequest
 from core.models.db.gpt_batch import GPTBatch
+from core.models.db.gpt_payload_blob import GPTPayloadBlob
 from core.models.db.api_key_bundle import APIKeyBundle
 
 from core.models.db.manufacturer_user_form import ManufacturerUserForm
@@ -87,6 +88,7 @@ async def init_db(
             DeferredManufacturer,
             GPTBatchRequest,
             GPTBatch,
+            GPTPayloadBlob,
             APIKeyBundle,
             User,
             Place,
@@ -0,0 +1,180 @@
+"""
+Write only the changed fields of a Beanie document.
+
+Document.save() replaces the whole document, which for a manufacturer means
+re-sending every per-chunk stats map each time one field changes (and as much
+oplog volume). PartialUpdateWriter sends a single $set of the fields a
+DirtyFieldsMixin document has assigned since its last write, and folds
+concurrent writes of the same document into one.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any
+
+import bson
+from beanie.odm.utils.encoder import Encoder
+
+from core.models.db.dirty_fields import DirtyFieldsMixin
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class PartialWriteReport:
+    fields: tuple[str, ...]
+    bytes_written: int  # BSON size of the update sent to Mongo
+    coalesced_updates: int  # write requests served by this one write
+    full_save: bool = False  # new document, inserted with save()
+
+
+@dataclass
+class PartialWriteStats:
+    updates_requested: int = 0
+    writes: int = 0
+    full_saves: int = 0
+    fields_written: int = 0
+    bytes_written: int = 0
+
+    @property
+    def coalescing_ratio(self) -> float:
+        return self.updates_requested / self.writes if self.writes else 0.0
+
+    def add(self, report: PartialWriteReport) -> None:
+        self.updates_requested += report.coalesced_updates
+        if report.fields or report.full_save:
+            self.writes += 1
+        self.full_saves += report.full_save
+        self.fields_written += len(report.fields)
+        self.bytes_written += report.bytes_written
+
+
+@dataclass
+class _PendingWrite:
+    document: Any
+    future: asyncio.Future[PartialWriteReport]
+    requests: int = 1
+
+
+class PartialUpdateWriter:
+    """
+    Group commit per document: a write request joins the write of the same
+    document object that has not started yet, if there is one. Writes of one
+    document are sent in order, each with the values current when it starts.
+    linger_seconds lets a write wait for more fields before it is sent.
+    """
+
+    def __init__(self, linger_seconds: float = 0.0):
+        self.linger_seconds = linger_seconds
+        self.stats = PartialWriteStats()
+        self._pending: dict[int, _PendingWrite] = {}
+        self._in_flight: dict[int, asyncio.Future[PartialWriteReport]] = {}
+
+    async def write(self, document: DirtyFieldsMixin) -> PartialWriteReport:
+        key = id(document)
+        pending = self._pending.get(key)
+        if pending is not None:
+            pending.requests += 1
+            return await asyncio.shield(pending.future)
+
+        pending = _PendingWrite(document, asyncio.get_running_loop().create_future())
+        self._pending[key] = pending
+        try:
+            try:
+                previous = self._in_flight.get(key)
+                if previous is not None:
+                    await asyncio.wait([previous])
+                # let writers that are ready to run join this write
+                await asyncio.sleep(self.linger_seconds)
+            finally:
+                self._pending.pop(key, None)
+
+            self._in_flight[key] = pending.future
+            report = await self._write_now(document, pending.requests)
+            pending.future.set_result(report)
+            return report
+        except asyncio.CancelledError:
+            pending.future.cancel()
+            raise
+        except Exception as e:
+            pending.future.set_exception(e)
+            pending.future.exception()  # retrieved, so an unawaited future doesn't warn
+            raise
+        finally:
+            if self._in_flight.get(key) is pending.future:
+                del self._in_flight[key]
+
+    async def _write_now(
+        self, document: DirtyFieldsMixin, requests: int
+    ) -> PartialWriteReport:
+        encoder = Encoder(
+            custom_encoders=document.get_settings().bson_encoders, to_db=True
+        )
+        fields = document.pop_dirty_fields()
+        try:
+            if document.id is None:
+                report = await self._save(document, encoder, requests)
+            else:
+                report = await self._set(document, encoder, sorted(fields), requests)
+        except BaseException:
+            document.mark_dirty(*fields)  # still unwritten
+            raise
+        self.stats.add(report)
+        return report
+
+    async def _set(
+        self,
+        document: DirtyFieldsMixin,
+        encoder: Encoder,
+        fields: list[str],
+        requests: int,
+    ) -> PartialWriteReport:
+        if not fields:
+            return PartialWriteReport((), 0, requests)
+        model_fields = type(document).model_fields
+        update = {
+            "$set": {
+                (model_fields[field].alias or field): encoder.encode(
+                    getattr(document, field)
+                )
+                for field in fields
+            }
+        }
+        result = (
+            await type(document)
+            .get_pymongo_collection()
+            .update_one({"_id": document.id}, update)
+        )
+        if result.matched_count == 0:
+            logger.warning(
+                f"{type(document).__name__} {document.id} is not in the database, "
+                f"saving the whole document."
+            )
+            return await self._save(document, encoder, requests)
+        return PartialWriteReport(tuple(fields), len(bson.encode(update)), requests)
+
+    async def _save(
+        self, document: DirtyFieldsMixin, encoder: Encoder, requests: int
+    ) -> PartialWriteReport:
+        await document.save()
+        document.pop_dirty_fields()
+        return PartialWriteReport(
+            tuple(
+                field
+                for field in type(document).model_fields
+                if field not in document._untracked_fields
+            ),
+            len(bson.encode(encoder.encode(document))),
+            requests,
+            full_save=True,
+        )
+
+    def log_stats(self, label: str = "Partial updates") -> None:
+        stats = self.stats
+        logger.info(
+            f"{label}: {stats.updates_requested} update(s) in {stats.writes} "
+            f"write(s) ({stats.coalescing_ratio:.2f} per write, {stats.full_saves} "
+            f"full saves), {stats.fields_written} field(s), "
+            f"{stats.bytes_written / 1024:.1f}KB written"
+        )
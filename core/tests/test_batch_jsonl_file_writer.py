@@ -0,0 +1,153 @@
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+
+from core.models.gpt_batch_request_blob import (
+    GPTBatchRequestBlob,
+    GPTBatchRequestBlobBody,
+)
+from core.utils.batch_jsonl_file_writer import (
+    BatchRequestJSONLFileWriter,
+    MaxFilesReachedException,
+)
+
+RUN_TIMESTAMP = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def make_writer(tmp_path: Path, **kwargs) -> BatchRequestJSONLFileWriter:
+    limits = {
+        "max_files": None,
+        "max_requests_per_file": 10,
+        "max_tokens_per_file": 1_000_000,
+        "max_file_size_in_bytes": 10_000_000,
+    }
+    limits.update(kwargs)
+    return BatchRequestJSONLFileWriter(
+        output_dir=tmp_path, run_timestamp=RUN_TIMESTAMP, **limits
+    )
+
+
+def make_item(item_id: str, request_count: int, tokens_per_request: int = 100):
+    return [
+        GPTBatchRequestBlob(
+            custom_id=f"{item_id}>products>{i}:{i + 1}",
+            body=GPTBatchRequestBlobBody(
+                model="gpt-4o-mini",
+                messages=[{"role": "user", "content": f"chunk {i}"}],
+                input_tokens=tokens_per_request,
+                max_tokens=1000,
+            ),
+        )
+        for i in range(request_count)
+    ]
+
+
+def get_item_ids_per_file(writer: BatchRequestJSONLFileWriter) -> list[set[str]]:
+    return [
+        batch_file.unique_item_ids | batch_file.unique_partial_item_ids
+        for batch_file in writer.files
+    ]
+
+
+def test_items_are_packed_whole_into_the_best_fitting_file(tmp_path):
+    writer = make_writer(tmp_path)
+
+    # in arrival order, b.com would be split over the first two files
+    for item_id, request_count in [("a.com", 6), ("b.com", 6), ("c.com", 4)]:
+        assert writer.write_item_request_blobs(
+            item_id, make_item(item_id, request_count)
+        )
+    assert writer.write_item_request_blobs("d.com", make_item("d.com", 4))
+    writer.close_files()
+
+    assert get_item_ids_per_file(writer) == [{"a.com", "c.com"}, {"b.com", "d.com"}]
+    assert all(s.unique_partial_items == 0 for s in writer.result_summary.values())
+    assert [s.request_count for s in writer.result_summary.values()] == [10, 10]
+    lines = writer.files[0].full_path.read_text().splitlines()
+    assert "input_tokens" not in json.loads(lines[0])["body"]
+
+
+def test_fullest_limit_decides_the_best_fit(tmp_path):
+    writer = make_writer(tmp_path, max_requests_per_file=100, max_tokens_per_file=1_000)
+
+    writer.write_item_request_blobs("requests.com", make_item("requests.com", 60, 6))
+    writer.write_item_request_blobs("tokens.com", make_item("tokens.com", 1, 700))
+    # first fit would put it in the first file, it leaves the second one fuller
+    writer.write_item_request_blobs("small.com", make_item("small.com", 1, 250))
+    writer.close_files()
+
+    assert get_item_ids_per_file(writer) == [
+        {"requests.com"},
+        {"tokens.com", "small.com"},
+    ]
+
+
+def test_item_without_room_is_left_out_when_no_file_can_be_started(tmp_path):
+    writer = make_writer(tmp_path, max_files=1)
+
+    assert writer.write_item_request_blobs("a.com", make_item("a.com", 7))
+    assert not writer.write_item_request_blobs("b.com", make_item("b.com", 5))
+    assert writer.write_item_request_blobs("c.com", make_item("c.com", 3))
+    writer.close_files()
+
+    assert len(writer.files) == 1
+    assert get_item_ids_per_file(writer) == [{"a.com", "c.com"}]
+    assert writer.items_left_out == 1
+    assert not any(
+        custom_id.startswith("b.com") for custom_id in writer.files[0].unique_line_ids
+    )
+
+
+def test_many_items_left_out_in_a_row_stop_the_run(tmp_path):
+    writer = make_writer(tmp_path, max_files=1, max_consecutive_items_left_out=3)
+    writer.write_item_request_blobs("a.com", make_item("a.com", 9))
+
+    assert not writer.write_item_request_blobs("b.com", make_item("b.com", 2))
+    assert not writer.write_item_request_blobs("c.com", make_item("c.com", 2))
+    with pytest.raises(MaxFilesReachedException):
+        writer.write_item_request_blobs("d.com", make_item("d.com", 2))
+    writer.delete_files()
+
+
+def test_item_larger_than_a_file_is_split(tmp_path):
+    writer = make_writer(tmp_path)
+
+    writer.write_item_request_blobs("small.com", make_item("small.com", 4))
+    writer.write_item_request_blobs("huge.com", make_item("huge.com", 15))
+    writer.close_files()
+
+    assert [s.request_count for s in writer.result_summary.values()] == [10, 9]
+    assert writer.files[0].unique_partial_item_ids == {"huge.com"}
+    assert writer.files[1].unique_item_ids == {"huge.com"}
+
+
+def test_open_files_are_bounded(tmp_path):
+    writer = make_writer(tmp_path, max_open_files=2)
+
+    for i in range(4):
+        writer.write_item_request_blobs(f"{i}.com", make_item(f"{i}.com", 7))
+    assert len(writer.open_files) == 2
+    assert len(writer.result_summary) == 2  # closed files are summarized
+    writer.close_files()
+    assert len(writer.result_summary) == 4
+
+
+@pytest.mark.asyncio
+async def test_each_request_is_serialized_once(tmp_path, monkeypatch):
+    writer = make_writer(tmp_path, max_files=1)
+    serialized = []
+    serialize_request = writer._serialize_request
+
+    def counting_serialize_request(request_blob):
+        serialized.append(request_blob.custom_id)
+        return serialize_request(request_blob)
+
+    monkeypatch.setattr(writer, "_serialize_request", counting_serialize_request)
+
+    await writer.write_item_request_blobs_async("a.com", make_item("a.com", 8))
+    await writer.write_item_request_blobs_async("b.com", make_item("b.com", 5))
+    writer.close_files()
+
+    assert len(serialized) == len(set(serialized)) == 13
@@ -0,0 +1,286 @@
+import pytest
+
+from core.models.db.deferred_manufacturer import DeferredManufacturer
+from core.models.deferred_basic_extraction import DeferredBasicExtraction
+from core.models.deferred_binary_classification import DeferredBinaryClassification
+from core.models.deferred_concept_extraction import DeferredConceptExtraction
+from core.models.deferred_keyword_extraction import DeferredKeywordExtraction
+from core.services.deferred_manufacturer_service import (
+    get_embedded_gpt_request_ids,
+    get_embedded_gpt_request_ids_expression,
+    iterate_deferred_manufacturer_pending_requests,
+)
+
+
+class FakeAggregationCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            yield doc
+
+
+class FakeDeferredManufacturerCollection:
+    def __init__(self, docs):
+        self.docs = docs
+        self.pipelines = []
+
+    async def aggregate(self, pipeline, allowDiskUse):
+        self.pipelines.append(pipeline)
+        return FakeAggregationCursor(self.docs)
+
+
+def request(custom_id):
+    return {
+        "custom_id": custom_id,
+        "body": {
+            "model": "gpt-4o-mini",
+            "messages": [{"role": "user", "content": "chunk"}],
+            "input_tokens": 10,
+            "max_tokens": 100,
+        },
+    }
+
+
+@pytest.mark.asyncio
+async def test_pending_requests_come_from_one_aggregation(monkeypatch):
+    collection = FakeDeferredManufacturerCollection(
+        [
+            {
+                "mfg_etld1": "acme.com",
+                "scraped_text_file_version_id": "v1",
+                "custom_ids": ["acme.com>addresses>0:1", "acme.com>products>0:1"],
+                "gpt_batch_requests": [
+                    {
+                        "custom_id": "acme.com>addresses>0:1",
+                        "request": request("acme.com>addresses>0:1"),
+                    },
+                    {"custom_id": "acme.com>products>0:1"},  # already in a batch
+                ],
+            },
+            {
+                "mfg_etld1": "orphan.com",
+                "scraped_text_file_version_id": "v2",
+                "custom_ids": ["orphan.com>addresses>0:1"],
+                "gpt_batch_requests": [],
+            },
+        ]
+    )
+    monkeypatch.setattr(
+        DeferredManufacturer, "get_pymongo_collection", lambda: collection
+    )
+
+    found = [
+        pending
+        async for pending in iterate_deferred_manufacturer_pending_requests(
+            query_filter={"scraped_text_file_num_tokens": {"$lt": 100}},
+            sort={"updated_at": -1},
+            limit=10,
+        )
+    ]
+
+    acme, orphan = found
+    assert [r.custom_id for r in acme.pending_request_blobs] == [
+        "acme.com>addresses>0:1"
+    ]
+    assert not acme.missing_custom_ids
+    assert orphan.missing_custom_ids == {"orphan.com>addresses>0:1"}
+    [pipeline] = collection.pipelines
+    assert pipeline[:3] == [
+        {"$match": {"scraped_text_file_num_tokens": {"$lt": 100}}},
+        {"$sort": {"updated_at": -1}},
+        {"$limit": 10},
+    ]
+    lookup = pipeline[-1]["$lookup"]
+    assert lookup["from"] == "gpt_batch_requests"
+    assert lookup["foreignField"] == "request.custom_id"  # the unique index
+
+
+def _resolve_path(value, path: str):
+    for part in path.split("."):
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+
+def evaluate(expression, document: dict, variables: dict | None = None):
+    """
+    Evaluate the aggregation operators get_embedded_gpt_request_ids_expression
+    uses, the way MongoDB would on document.
+    """
+    variables = variables or {}
+    if isinstance(expression, list):
+        return [evaluate(item, document, variables) for item in expression]
+    if isinstance(expression, str):
+        if expression.startswith("$$"):
+            name, _, path = expression[2:].partition(".")
+            value = variables[name]
+            return _resolve_path(value, path) if path else value
+        if expression.startswith("$"):
+            return _resolve_path(document, expression[1:])
+        return expression
+    if not isinstance(expression, dict) or not expression:
+        return expression
+
+    [(operator, args)] = expression.items()
+    if operator == "$ifNull":
+        value = evaluate(args[0], document, variables)
+        return evaluate(args[1], document, variables) if value is None else value
+    if operator == "$objectToArray":
+        return [
+            {"k": k, "v": v} for k, v in evaluate(args, document, variables).items()
+        ]
+    if operator == "$map":
+        return [
+            evaluate(args["in"], document, {**variables, args["as"]: item})
+            for item in evaluate(args["input"], document, variables)
+        ]
+    if operator == "$setUnion":
+        union = []
+        for array in evaluate(args, document, variables):
+            union += [item for item in array if item not in union]
+        return union
+    if operator == "$filter":
+        return [
+            item
+            for item in evaluate(args["input"], document, variables)
+            if evaluate(args["cond"], document, {**variables, "this": item})
+        ]
+    if operator == "$eq":
+        left, right = evaluate(args, document, variables)
+        return left == right
+    if operator == "$type":
+        value = evaluate(args, document, variables)
+        return {str: "string", type(None): "null"}.get(type(value), "object")
+    raise NotImplementedError(operator)
+
+
+def deferred_manufacturer_doc(**fields) -> dict:
+    return {
+        "mfg_etld1": "acme.com",
+        "scraped_text_file_num_tokens": 1000,
+        "scraped_text_file_version_id": "v1",
+        "is_manufacturer": None,
+        "is_contract_manufacturer": None,
+        "is_product_manufacturer": None,
+        "addresses": None,
+        "business_desc": None,
+        "products": None,
+        "certificates": None,
+        "industries": None,
+        "process_caps": None,
+        "material_caps": None,
+        **fields,
+    }
+
+
+FIELD_MODELS = {
+    "is_manufacturer": DeferredBinaryClassification,
+    "is_contract_manufacturer": DeferredBinaryClassification,
+    "is_product_manufacturer": DeferredBinaryClassification,
+    "addresses": DeferredBasicExtraction,
+    "business_desc": DeferredBasicExtraction,
+    "products": DeferredKeywordExtraction,
+    "certificates": DeferredConceptExtraction,
+    "industries": DeferredConceptExtraction,
+    "process_caps": DeferredConceptExtraction,
+    "material_caps": DeferredConceptExtraction,
+}
+
+
+def to_deferred_manufacturer(doc: dict) -> DeferredManufacturer:
+    # model_construct skips beanie's collection initialization, so validate the
+    # embedded fields through their own models
+    return DeferredManufacturer.model_construct(
+        **{
+            key: (
+                FIELD_MODELS[key].model_validate(value)
+                if key in FIELD_MODELS and value is not None
+                else value
+            )
+            for key, value in doc.items()
+        }
+    )
+
+
+def binary(prefix: str) -> dict:
+    return {
+        "prompt_version_id": "p1",
+        "final_chunk_key": "0:2",
+        "chunk_request_id_map": {"0:1": f"{prefix}>0:1", "1:2": f"{prefix}>1:2"},
+    }
+
+
+def concept(prefix: str, mapping: bool) -> dict:
+    return {
+        "extract_prompt_version_id": "p1",
+        "map_prompt_version_id": "p2",
+        "ontology_version_id": "o1",
+        "chunk_request_bundle_map": {
+            "0:1": {
+                "brute": ["steel"],
+                "llm_search_request_id": f"{prefix}>search>0:1",
+            },
+            "1:2": {"brute": [], "llm_search_request_id": f"{prefix}>search>1:2"},
+        },
+        "llm_mapping_request_id": f"{prefix}>map" if mapping else None,
+    }
+
+
+@pytest.mark.parametrize(
+    "fields",
+    [
+        {},
+        {
+            "is_manufacturer": binary("acme.com>is_manufacturer"),
+            "is_contract_manufacturer": binary("acme.com>is_contract_manufacturer"),
+            "is_product_manufacturer": binary("acme.com>is_product_manufacturer"),
+            "addresses": {"prompt_version_id": "p1", "gpt_request_id": "acme.com>addr"},
+            "business_desc": {
+                "prompt_version_id": "p1",
+                "gpt_request_id": "acme.com>desc",
+            },
+            "products": {
+                "extract_prompt_version_id": "p1",
+                "chunk_request_id_map": {"0:1": "acme.com>products>0:1"},
+            },
+            "certificates": concept("acme.com>certificates", mapping=True),
+            "industries": concept("acme.com>industries", mapping=False),
+            "process_caps": concept("acme.com>process_caps", mapping=True),
+            "material_caps": concept("acme.com>material_caps", mapping=False),
+        },
+        {
+            "business_desc": {
+                "prompt_version_id": "p1",
+                "gpt_request_id": "acme.com>desc",
+            },
+            "material_caps": concept("acme.com>material_caps", mapping=True),
+        },
+        {
+            # the same request embedded twice is reported once
+            "is_manufacturer": binary("acme.com>shared"),
+            "is_contract_manufacturer": binary("acme.com>shared"),
+        },
+    ],
+    ids=["empty", "all-fields", "some-fields", "duplicate-ids"],
+)
+def test_embedded_ids_expression_matches_python(fields):
+    doc = deferred_manufacturer_doc(**fields)
+    # documents written before a field existed don't have it at all
+    stored_doc = {key: value for key, value in doc.items() if value is not None}
+
+    from_expression = evaluate(get_embedded_gpt_request_ids_expression(), stored_doc)
+
+    assert len(from_expression) == len(set(from_expression))
+    assert set(from_expression) == get_embedded_gpt_request_ids(
+        to_deferred_manufacturer(doc)
+    )
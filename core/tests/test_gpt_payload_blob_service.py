@@ -0,0 +1,184 @@
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from core.models.db.gpt_payload_blob import GPTPayloadBlob
+from core.models.gpt_batch_request_blob import (
+    GPTBatchRequestBlob,
+    GPTBatchRequestBlobBody,
+)
+from core.services import gpt_payload_blob_service
+from core.services.gpt_payload_blob_service import (
+    CONTENT_REF_KEY,
+    dehydrate_request_body,
+    estimate_payload_dedup,
+    get_payload_hash,
+    hydrate_request_blobs,
+    store_payload_blobs,
+)
+from core.utils.batch_jsonl_file_writer import BatchRequestJSONLFileWriter
+
+SYSTEM_PROMPT = "Extract the products this manufacturer makes. " * 40
+STORED_AT = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            yield doc
+
+
+class FakeBlobCollection:
+    def __init__(self):
+        self.docs: dict[str, dict] = {}
+        self.finds = 0
+
+    async def bulk_write(self, operations, ordered):
+        upserted = 0
+        for operation in operations:
+            payload_hash = operation._filter["_id"]
+            if payload_hash not in self.docs:
+                self.docs[payload_hash] = dict(operation._doc["$setOnInsert"])
+                upserted += 1
+            self.docs[payload_hash].update(operation._doc["$set"])
+        return SimpleNamespace(upserted_count=upserted)
+
+    def find(self, query, projection):
+        self.finds += 1
+        return FakeCursor(
+            [
+                {"_id": payload_hash, "content": self.docs[payload_hash]["content"]}
+                for payload_hash in query["_id"]["$in"]
+                if payload_hash in self.docs
+            ]
+        )
+
+
+@pytest.fixture
+def blob_collection(monkeypatch):
+    collection = FakeBlobCollection()
+    monkeypatch.setattr(GPTPayloadBlob, "get_pymongo_collection", lambda: collection)
+    gpt_payload_blob_service._payload_blob_cache.clear()
+    return collection
+
+
+def make_request_blob(custom_id: str, chunk: str) -> GPTBatchRequestBlob:
+    return GPTBatchRequestBlob(
+        custom_id=custom_id,
+        body=GPTBatchRequestBlobBody(
+            model="gpt-4o-mini",
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": chunk},
+            ],
+            input_tokens=500,
+            max_tokens=1000,
+        ),
+    )
+
+
+def test_long_contents_are_replaced_by_refs():
+    payloads = {}
+    request_blob = make_request_blob("acme.com>products>0:1", "short chunk")
+
+    body = dehydrate_request_body(request_blob.body, payloads)
+
+    assert body.messages[0] == {
+        "role": "system",
+        CONTENT_REF_KEY: get_payload_hash(SYSTEM_PROMPT),
+    }
+    assert body.messages[1] == {"role": "user", "content": "short chunk"}
+    assert payloads == {get_payload_hash(SYSTEM_PROMPT): SYSTEM_PROMPT}
+    assert request_blob.body.messages[0]["content"] == SYSTEM_PROMPT  # unchanged
+
+
+@pytest.mark.asyncio
+async def test_dehydrated_requests_hydrate_back_to_the_original(blob_collection):
+    request_blobs = [
+        make_request_blob(f"acme.com>products>{i}:{i + 1}", f"chunk {i} " * 100)
+        for i in range(3)
+    ]
+    payloads = {}
+    dehydrated = [
+        request_blob.model_copy(
+            update={"body": dehydrate_request_body(request_blob.body, payloads)}
+        )
+        for request_blob in request_blobs
+    ]
+    assert await store_payload_blobs(payloads, STORED_AT) == 4  # 1 prompt, 3 chunks
+    assert await store_payload_blobs(payloads, STORED_AT) == 0
+
+    assert await hydrate_request_blobs(dehydrated) == request_blobs
+    await hydrate_request_blobs(dehydrated)
+    assert blob_collection.finds == 1  # the second time comes from the cache
+
+
+@pytest.mark.asyncio
+async def test_missing_blob_is_an_error(blob_collection):
+    payloads = {}
+    request_blob = make_request_blob("acme.com>products>0:1", "chunk")
+    dehydrated = request_blob.model_copy(
+        update={"body": dehydrate_request_body(request_blob.body, payloads)}
+    )
+
+    with pytest.raises(LookupError, match="missing"):
+        await hydrate_request_blobs([dehydrated])
+
+
+def test_writer_refuses_requests_that_are_not_hydrated(tmp_path: Path):
+    writer = BatchRequestJSONLFileWriter(
+        output_dir=tmp_path,
+        run_timestamp=STORED_AT,
+        max_files=None,
+        max_requests_per_file=100,
+        max_tokens_per_file=1_000_000,
+        max_file_size_in_bytes=10_000_000,
+    )
+    request_blob = make_request_blob("acme.com>products>0:1", "chunk")
+    dehydrated = request_blob.model_copy(
+        update={"body": dehydrate_request_body(request_blob.body, {})}
+    )
+
+    with pytest.raises(ValueError, match="hydrate"):
+        writer.write_item_request_blobs("acme.com", [dehydrated])
+    writer.delete_files()
+
+
+def test_estimate_counts_shared_contents_once():
+    # every chunk is asked about 5 fields, each field with its own prompt
+    prompts = [f"Extract field {field}. " * 100 for field in range(5)]
+    chunks = [f"Page {i} of the manufacturer site. " * 60 for i in range(20)]
+    docs = [
+        {
+            "_id": f"{i}-{field}",
+            "request": GPTBatchRequestBlob(
+                custom_id=f"acme.com>{field}>{i}",
+                body=GPTBatchRequestBlobBody(
+                    model="gpt-4o-mini",
+                    messages=[
+                        {"role": "system", "content": prompt},
+                        {"role": "user", "content": chunk},
+                    ],
+                    input_tokens=500,
+                    max_tokens=1000,
+                ),
+            ).model_dump(),
+        }
+        for field, prompt in enumerate(prompts)
+        for i, chunk in enumerate(chunks)
+    ]
+
+    report = estimate_payload_dedup(docs)
+
+    assert report.documents == 100
+    assert report.payload_refs == 200
+    assert report.unique_payloads == 25
+    assert report.saved_ratio > 0.7
@@ -0,0 +1,150 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from core.utils.llm_response_cache_util import (
+    CachedLLMResponse,
+    LLMResponseCache,
+    llm_request_cache_key,
+)
+
+GPT_MODEL = SimpleNamespace(model_name="gpt-4o-mini", safe_completion_tokens=7500)
+
+
+def make_params(**overrides):
+    params = {
+        "temperature": 1,
+        "top_p": 1,
+        "presence_penalty": 0,
+        "frequency_penalty": 0,
+        "max_tokens": None,
+    }
+    params.update(overrides)
+    return SimpleNamespace(**params)
+
+
+def make_key(prompt_version_id="p1", context="chunk text", variant=0, **params):
+    return llm_request_cache_key(
+        prompt_version_id,
+        "Extract the products.",
+        context,
+        GPT_MODEL,
+        make_params(**params),
+        variant,
+    )
+
+
+class FakeLLM:
+    def __init__(self, content='["bolts"]'):
+        self.content = content
+        self.calls = 0
+
+    async def ask(self):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        if self.content is None:
+            return None
+        return CachedLLMResponse(
+            content=self.content, input_tokens=1000, output_tokens=200, cost_usd=0.01
+        )
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = LLMResponseCache(tmp_path / "cache.sqlite3", ttl_seconds=3600)
+    yield cache
+    cache.close()
+
+
+def test_key_changes_with_everything_that_shapes_the_answer():
+    keys = {
+        make_key(),
+        make_key(prompt_version_id="p2"),
+        make_key(context="other chunk"),
+        make_key(variant=1),
+        make_key(temperature=0),
+        make_key(max_tokens=1000),
+    }
+    assert len(keys) == 6
+    # the effective completion budget is what counts
+    assert make_key(max_tokens=7500) == make_key()
+
+
+@pytest.mark.asyncio
+async def test_second_ask_is_a_hit_with_its_cost_saved(cache):
+    llm = FakeLLM()
+    for _ in range(2):
+        content = await cache.get_or_ask(
+            make_key(), "products", "p1", "gpt-4o-mini", llm.ask
+        )
+        assert content == '["bolts"]'
+
+    assert llm.calls == 1
+    stats = cache.stats["products"]
+    assert (stats.hits, stats.misses, stats.hit_rate) == (1, 1, 0.5)
+    assert stats.saved_tokens == 1200
+    assert stats.saved_usd == stats.spent_usd == pytest.approx(0.01)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_call(cache):
+    llm = FakeLLM()
+
+    contents = await asyncio.gather(
+        *(
+            cache.get_or_ask(make_key(), "products", "p1", "gpt-4o-mini", llm.ask)
+            for _ in range(5)
+        )
+    )
+
+    assert contents == ['["bolts"]'] * 5
+    assert llm.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_empty_answers_are_not_cached(cache):
+    llm = FakeLLM(content=None)
+    for _ in range(2):
+        assert (
+            await cache.get_or_ask(make_key(), "products", "p1", "gpt-4o-mini", llm.ask)
+            is None
+        )
+    assert llm.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_expired_and_invalidated_entries_are_asked_again(cache, tmp_path):
+    llm = FakeLLM()
+    await cache.get_or_ask(make_key(), "products", "p1", "gpt-4o-mini", llm.ask)
+    await cache.get_or_ask(
+        make_key(prompt_version_id="p2"), "products", "p2", "gpt-4o-mini", llm.ask
+    )
+
+    assert cache.invalidate_prompt_version("p1") == 1
+    assert cache.get(make_key(), "products") is None
+    assert cache.get(make_key(prompt_version_id="p2"), "products") is not None
+
+    expired = LLMResponseCache(tmp_path / "cache.sqlite3", ttl_seconds=-1)
+    await expired.get_or_ask(make_key(), "products", "p1", "gpt-4o-mini", llm.ask)
+    assert expired.get(make_key(), "products") is None
+    assert expired.delete_expired() == 1
+    expired.close()
+
+
+@pytest.mark.asyncio
+async def test_entries_and_totals_are_shared_through_the_file(cache, tmp_path):
+    llm = FakeLLM()
+    await cache.get_or_ask(make_key(), "products", "p1", "gpt-4o-mini", llm.ask)
+
+    # another process on the host
+    other = LLMResponseCache(tmp_path / "cache.sqlite3")
+    await other.get_or_ask(make_key(), "products", "p1", "gpt-4o-mini", llm.ask)
+    await other.get_or_ask(make_key(), "addresses", "p1", "gpt-4o-mini", llm.ask)
+    totals = other.get_total_stats()
+    other.close()
+
+    assert llm.calls == 1
+    assert list(totals) == ["addresses", "products"]
+    assert (totals["products"].hits, totals["products"].misses) == (1, 1)
+    assert totals["addresses"].saved_usd == pytest.approx(0.01)
@@ -0,0 +1,199 @@
+import asyncio
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import ClassVar, Optional
+
+import bson
+import pytest
+from pydantic import BaseModel
+
+from core.models.db.dirty_fields import DirtyFieldsMixin
+from core.utils.partial_update_util import PartialUpdateWriter
+
+
+class FakeCollection:
+    def __init__(self):
+        self.updates: list[tuple[dict, dict]] = []
+        self.stored_ids: set[int] = {1}
+        self.fail_next = False
+        self.started = asyncio.Event()
+        self.release = None  # set to an Event to hold writes until it is set
+
+    async def update_one(self, query, update):
+        self.started.set()
+        await asyncio.sleep(0)
+        if self.release is not None:
+            await self.release.wait()
+        if self.fail_next:
+            self.fail_next = False
+            raise ConnectionError("primary stepped down")
+        self.updates.append((query, update))
+        return SimpleNamespace(matched_count=int(query["_id"] in self.stored_ids))
+
+
+class Stats(BaseModel):
+    chunked_stats: dict[str, list[str]]
+
+
+class FakeDocument(DirtyFieldsMixin):
+    id: Optional[int] = None
+    etld1: str
+    updated_at: Optional[datetime] = None
+    name: Optional[str] = None
+    results: Optional[set[str]] = None
+    stats: Optional[Stats] = None
+
+    collection: ClassVar[FakeCollection] = FakeCollection()
+    saves: ClassVar[int] = 0
+
+    @classmethod
+    def get_pymongo_collection(cls):
+        return cls.collection
+
+    @classmethod
+    def get_settings(cls):
+        return SimpleNamespace(bson_encoders={})
+
+    async def save(self):
+        type(self).saves += 1
+        if self.id is None:
+            self.id = 2
+
+
+@pytest.fixture
+def document():
+    FakeDocument.collection = FakeCollection()
+    FakeDocument.saves = 0
+    return FakeDocument(
+        id=1,
+        etld1="acme.com",
+        stats=Stats(chunked_stats={f"{i}:{i + 1}": ["x" * 50] for i in range(100)}),
+    )
+
+
+def test_only_assigned_fields_are_dirty(document):
+    assert document.get_dirty_fields() == set()
+
+    document.name = "Acme"
+    document.results = {"bolts"}
+    document.id = 5  # the primary key is never $set
+
+    assert document.get_dirty_fields() == {"name", "results"}
+
+
+def test_mark_dirty_rejects_unknown_fields(document):
+    with pytest.raises(ValueError):
+        document.mark_dirty("nonexistent")
+
+
+@pytest.mark.asyncio
+async def test_write_sets_only_dirty_fields(document):
+    writer = PartialUpdateWriter()
+    document.name = "Acme"
+    document.results = {"bolts"}
+
+    report = await writer.write(document)
+
+    [(query, update)] = FakeDocument.collection.updates
+    assert query == {"_id": 1}
+    assert update == {"$set": {"name": "Acme", "results": ["bolts"]}}
+    assert report.fields == ("name", "results")
+    assert report.bytes_written == len(bson.encode(update))
+    assert document.get_dirty_fields() == set()
+
+
+@pytest.mark.asyncio
+async def test_write_is_much_smaller_than_the_document(document):
+    writer = PartialUpdateWriter()
+    document.updated_at = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+    report = await writer.write(document)
+
+    assert report.fields == ("updated_at",)
+    assert report.bytes_written * 50 < len(bson.encode(document.model_dump()))
+
+
+@pytest.mark.asyncio
+async def test_clean_document_is_not_written(document):
+    report = await PartialUpdateWriter().write(document)
+
+    assert FakeDocument.collection.updates == []
+    assert report.fields == ()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_updates_are_coalesced(document):
+    writer = PartialUpdateWriter()
+
+    async def update(field, value):
+        setattr(document, field, value)
+        return await writer.write(document)
+
+    reports = await asyncio.gather(
+        update("name", "Acme"),
+        update("results", {"bolts"}),
+        update("updated_at", datetime(2025, 1, 1, tzinfo=timezone.utc)),
+    )
+
+    assert len(FakeDocument.collection.updates) == 1
+    assert reports[0] == reports[1] == reports[2]
+    assert reports[0].coalesced_updates == 3
+    assert writer.stats.updates_requested == 3
+    assert writer.stats.writes == 1
+
+
+@pytest.mark.asyncio
+async def test_update_during_a_write_goes_out_next_with_the_new_value(document):
+    writer = PartialUpdateWriter()
+    collection = FakeDocument.collection
+    collection.release = asyncio.Event()
+    document.name = "Acme"
+    first = asyncio.create_task(writer.write(document))
+    await collection.started.wait()
+
+    document.name = "Acme Inc"
+    second = asyncio.create_task(writer.write(document))
+    await asyncio.sleep(0.01)
+    assert len(collection.updates) == 0  # second waits for the first to finish
+    collection.release.set()
+    await asyncio.gather(first, second)
+
+    sent = [update["$set"] for _, update in FakeDocument.collection.updates]
+    assert sent == [{"name": "Acme"}, {"name": "Acme Inc"}]
+
+
+@pytest.mark.asyncio
+async def test_failed_write_keeps_fields_dirty(document):
+    writer = PartialUpdateWriter()
+    document.name = "Acme"
+    FakeDocument.collection.fail_next = True
+
+    with pytest.raises(ConnectionError):
+        await writer.write(document)
+
+    assert document.get_dirty_fields() == {"name"}
+    await writer.write(document)
+    assert FakeDocument.collection.updates[0][1] == {"$set": {"name": "Acme"}}
+
+
+@pytest.mark.asyncio
+async def test_new_document_is_saved_whole(document):
+    new_document = FakeDocument(etld1="new.com", name="New")
+
+    report = await PartialUpdateWriter().write(new_document)
+
+    assert report.full_save
+    assert FakeDocument.saves == 1
+    assert FakeDocument.collection.updates == []
+    assert new_document.get_dirty_fields() == set()
+
+
+@pytest.mark.asyncio
+async def test_missing_document_falls_back_to_save(document):
+    document.id = 7
+    document.name = "Acme"
+
+    report = await PartialUpdateWriter().write(document)
+
+    assert report.full_save
+    assert FakeDocument.saves == 1
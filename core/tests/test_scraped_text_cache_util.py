@@ -0,0 +1,156 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+from core.utils.aws.s3.scraped_text_cache_util import (
+    CachedScrapedText,
+    ScrapedTextCache,
+)
+
+
+def make_entry(version_id: str = "v1", text: str = "hello world " * 100):
+    return CachedScrapedText(
+        etld1="example.com",
+        version_id=version_id,
+        text=text,
+        tags={"urls_scraped": "12", "urls_failed": "1"},
+        last_modified_on=datetime(2025, 3, 1, 12, 30, tzinfo=timezone.utc),
+        num_tokens=201,
+    )
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ScrapedTextCache(
+        tmp_path, max_disk_bytes=1024 * 1024, max_memory_bytes=1024 * 1024
+    )
+
+
+def test_miss_then_memory_hit(cache):
+    assert cache.get("example.com", "v1") is None
+
+    cache.put(make_entry())
+
+    assert cache.get("example.com", "v1") == make_entry()
+    assert (cache.stats.misses, cache.stats.memory_hits) == (1, 1)
+
+
+def test_entry_round_trips_through_disk(cache, tmp_path):
+    cache.put(make_entry())
+
+    # a new process sees what an earlier one wrote
+    reopened = ScrapedTextCache(tmp_path)
+    entry = reopened.get("example.com", "v1")
+
+    assert entry == make_entry()
+    assert reopened.stats.disk_hits == 1
+
+
+def test_disk_files_are_compressed(cache, tmp_path):
+    entry = make_entry(text="the same line again\n" * 5000)
+    cache.put(entry)
+
+    (path,) = tmp_path.glob("*.json.z")
+    assert path.stat().st_size < len(entry.text) / 10
+
+
+def test_file_written_by_another_process_is_found(cache, tmp_path):
+    other_process = ScrapedTextCache(tmp_path)
+    other_process.put(make_entry("v2"))
+
+    assert cache.get("example.com", "v2") == make_entry("v2")
+
+
+def test_versions_are_cached_separately(cache):
+    cache.put(make_entry("v1", text="first"))
+    cache.put(make_entry("v2", text="second"))
+
+    assert cache.get("example.com", "v1").text == "first"
+    assert cache.get("example.com", "v2").text == "second"
+    assert cache.get("other.com", "v1") is None
+
+
+def test_memory_tier_evicts_least_recently_used(tmp_path):
+    cache = ScrapedTextCache(tmp_path, max_memory_bytes=2 * (1000 + 256))
+    for version in ("v1", "v2"):
+        cache.put(make_entry(version, text="x" * 1000))
+    cache.get("example.com", "v1")  # v2 is now the least recently used
+
+    cache.put(make_entry("v3", text="x" * 1000))
+
+    assert cache.stats.memory_evictions == 1
+    assert cache.get("example.com", "v1") is not None
+    assert cache.stats.memory_hits == 2
+    # v2 left memory but is still on disk
+    assert cache.get("example.com", "v2") is not None
+    assert cache.stats.disk_hits == 1
+
+
+def test_disk_tier_evicts_least_recently_used(tmp_path):
+    probe = make_entry("probe", text="".join(chr(0x4E00 + i) for i in range(3000)))
+    file_size = len(probe.to_bytes())
+    cache = ScrapedTextCache(
+        tmp_path, max_disk_bytes=int(file_size * 2.5), max_memory_bytes=0
+    )
+
+    for version in ("v1", "v2", "v3"):
+        cache.put(make_entry(version, text=probe.text))
+
+    assert cache.stats.disk_evictions == 1
+    assert len(list(tmp_path.glob("*.json.z"))) == 2
+    assert cache.get("example.com", "v1") is None
+    assert cache.get("example.com", "v3") is not None
+
+
+def test_corrupt_file_is_dropped(cache, tmp_path):
+    cache.put(make_entry())
+    (path,) = tmp_path.glob("*.json.z")
+    path.write_bytes(b"not zlib")
+    fresh = ScrapedTextCache(tmp_path)
+
+    assert fresh.get("example.com", "v1") is None
+    assert not path.exists()
+
+
+@pytest.mark.asyncio
+async def test_get_or_fetch_fetches_once_for_concurrent_misses(cache):
+    fetches = 0
+
+    async def fetch():
+        nonlocal fetches
+        fetches += 1
+        await asyncio.sleep(0.01)
+        return make_entry()
+
+    entries = await asyncio.gather(
+        *(cache.get_or_fetch("example.com", "v1", fetch) for _ in range(5))
+    )
+
+    assert fetches == 1
+    assert all(entry == make_entry() for entry in entries)
+    # later calls are served from memory
+    await cache.get_or_fetch("example.com", "v1", fetch)
+    assert fetches == 1
+
+
+@pytest.mark.asyncio
+async def test_get_or_fetch_does_not_cache_failures(cache):
+    async def failing_fetch():
+        raise RuntimeError("S3 is down")
+
+    with pytest.raises(RuntimeError):
+        await cache.get_or_fetch("example.com", "v1", failing_fetch)
+
+    async def fetch():
+        return make_entry()
+
+    assert await cache.get_or_fetch("example.com", "v1", fetch) == make_entry()
+
+
+def test_hit_rate(cache):
+    cache.put(make_entry())
+    cache.get("example.com", "v1")
+    cache.get("example.com", "missing")
+
+    assert cache.stats.hit_rate == pytest.approx(0.5)
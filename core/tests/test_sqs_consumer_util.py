@@ -0,0 +1,236 @@
+import asyncio
+import itertools
+import json
+
+import pytest
+
+from core.utils.aws.queue.sqs_consumer_util import SQSBatchConsumer
+
+QUEUE_URL = "https://sqs.local/queue"
+
+
+class InMemorySQS:
+    """The slice of the SQS API the consumer uses, with visibility timeouts."""
+
+    def __init__(self):
+        self.messages: dict[str, dict] = {}
+        self.receive_sizes: list[int] = []
+        self.delete_batch_sizes: list[int] = []
+        self._ids = itertools.count()
+
+    def send(self, body: str) -> str:
+        message_id = f"m{next(self._ids)}"
+        self.messages[message_id] = {
+            "body": body,
+            "visible_at": 0.0,
+            "receipt_handle": None,
+            "receive_count": 0,
+        }
+        return message_id
+
+    def _now(self) -> float:
+        return asyncio.get_running_loop().time()
+
+    def _find(self, receipt_handle: str) -> dict | None:
+        for message in self.messages.values():
+            if message["receipt_handle"] == receipt_handle:
+                return message
+        return None
+
+    async def receive_message(
+        self, QueueUrl, MaxNumberOfMessages, WaitTimeSeconds, VisibilityTimeout
+    ):
+        assert 1 <= MaxNumberOfMessages <= 10
+        self.receive_sizes.append(MaxNumberOfMessages)
+        deadline = self._now() + WaitTimeSeconds
+        while True:
+            now = self._now()
+            visible = [
+                (message_id, message)
+                for message_id, message in self.messages.items()
+                if message["visible_at"] <= now
+            ][:MaxNumberOfMessages]
+            if visible or now >= deadline:
+                break
+            await asyncio.sleep(0.005)
+        received = []
+        for message_id, message in visible:
+            message["receive_count"] += 1
+            message["visible_at"] = now + VisibilityTimeout
+            message["receipt_handle"] = f"{message_id}-{message['receive_count']}"
+            received.append(
+                {
+                    "MessageId": message_id,
+                    "ReceiptHandle": message["receipt_handle"],
+                    "Body": message["body"],
+                }
+            )
+        return {"Messages": received} if received else {}
+
+    async def delete_message_batch(self, QueueUrl, Entries):
+        assert len(Entries) <= 10
+        self.delete_batch_sizes.append(len(Entries))
+        successful, failed = [], []
+        for entry in Entries:
+            message = self._find(entry["ReceiptHandle"])
+            if message is None:
+                failed.append({"Id": entry["Id"], "Code": "ReceiptHandleIsInvalid"})
+                continue
+            del self.messages[next(k for k, v in self.messages.items() if v is message)]
+            successful.append({"Id": entry["Id"]})
+        return {"Successful": successful, "Failed": failed}
+
+    async def change_message_visibility_batch(self, QueueUrl, Entries):
+        assert len(Entries) <= 10
+        successful = []
+        for entry in Entries:
+            message = self._find(entry["ReceiptHandle"])
+            if message is not None:
+                message["visible_at"] = self._now() + entry["VisibilityTimeout"]
+                successful.append({"Id": entry["Id"]})
+        return {"Successful": successful, "Failed": []}
+
+
+def make_consumer(sqs, max_in_flight, **kwargs):
+    options = {
+        "visibility_timeout": 5,
+        "heartbeat_interval": 1,
+        "wait_time_seconds": 0.02,
+        "delete_flush_interval": 0.01,
+    }
+    options.update(kwargs)
+    return SQSBatchConsumer(
+        sqs,
+        QUEUE_URL,
+        parse_body=lambda body: json.loads(body)["n"],
+        max_in_flight=max_in_flight,
+        **options,
+    )
+
+
+async def run_until(consumer, handle, done, timeout=5):
+    task = asyncio.create_task(consumer.run(handle))
+    await asyncio.wait_for(done(), timeout)
+    consumer.stop()
+    await asyncio.wait_for(task, timeout)
+
+
+async def wait_for(condition):
+    while not condition():
+        await asyncio.sleep(0.005)
+
+
+@pytest.mark.asyncio
+async def test_messages_are_received_and_deleted_in_batches():
+    sqs = InMemorySQS()
+    for n in range(25):
+        sqs.send(json.dumps({"n": n}))
+    consumer = make_consumer(sqs, max_in_flight=10)
+    handled = []
+
+    async def handle(n):
+        await asyncio.sleep(0.01)
+        handled.append(n)
+
+    await run_until(consumer, handle, lambda: wait_for(lambda: not sqs.messages))
+
+    assert sorted(handled) == list(range(25))
+    assert sqs.receive_sizes[0] == 10
+    assert consumer.stats.receive_calls < 25
+    assert consumer.stats.deleted == 25
+    assert consumer.stats.delete_calls < 25
+
+
+@pytest.mark.asyncio
+async def test_receives_only_as_many_messages_as_free_slots():
+    sqs = InMemorySQS()
+    for n in range(8):
+        sqs.send(json.dumps({"n": n}))
+    consumer = make_consumer(sqs, max_in_flight=3)
+    release = asyncio.Event()
+    running = 0
+    peak_running = 0
+
+    async def handle(n):
+        nonlocal running, peak_running
+        running += 1
+        peak_running = max(peak_running, running)
+        await release.wait()
+        running -= 1
+
+    task = asyncio.create_task(consumer.run(handle))
+    await wait_for(lambda: running == 3)
+    await asyncio.sleep(0.05)
+    # the loop waits on the semaphore, it does not keep receiving
+    assert sqs.receive_sizes == [3]
+    assert sum(m["receive_count"] for m in sqs.messages.values()) == 3
+
+    release.set()
+    await asyncio.wait_for(wait_for(lambda: not sqs.messages), 5)
+    consumer.stop()
+    await asyncio.wait_for(task, 5)
+    assert peak_running == 3
+    assert max(sqs.receive_sizes) <= 3
+
+
+@pytest.mark.asyncio
+async def test_heartbeat_keeps_long_handlers_from_being_redelivered():
+    sqs = InMemorySQS()
+    message_id = sqs.send(json.dumps({"n": 1}))
+    consumer = make_consumer(
+        sqs, max_in_flight=2, visibility_timeout=0.1, heartbeat_interval=0.03
+    )
+    calls = []
+
+    async def handle(n):
+        calls.append(n)
+        await asyncio.sleep(0.4)  # four visibility timeouts
+
+    await run_until(consumer, handle, lambda: wait_for(lambda: not sqs.messages))
+
+    assert calls == [1]
+    assert consumer.stats.visibility_extensions >= 3
+    assert message_id not in sqs.messages
+
+
+@pytest.mark.asyncio
+async def test_failed_messages_are_redelivered_and_malformed_ones_dropped():
+    sqs = InMemorySQS()
+    sqs.send("not json")
+    sqs.send(json.dumps({"n": 1}))
+    consumer = make_consumer(
+        sqs, max_in_flight=2, visibility_timeout=0.05, heartbeat_interval=0.02
+    )
+    calls = []
+
+    async def handle(n):
+        calls.append(n)
+        if len(calls) == 1:
+            raise RuntimeError("transient")
+
+    await run_until(consumer, handle, lambda: wait_for(lambda: not sqs.messages))
+
+    assert calls == [1, 1]
+    assert consumer.stats.malformed == 1
+    assert consumer.stats.failed == 1
+    assert consumer.stats.handled == 1
+
+
+@pytest.mark.asyncio
+async def test_stop_waits_for_running_handlers_and_flushes_deletes():
+    sqs = InMemorySQS()
+    sqs.send(json.dumps({"n": 1}))
+    consumer = make_consumer(sqs, max_in_flight=1, delete_flush_interval=60)
+    started = asyncio.Event()
+
+    async def handle(n):
+        started.set()
+        await asyncio.sleep(0.05)
+
+    task = asyncio.create_task(consumer.run(handle))
+    await asyncio.wait_for(started.wait(), 5)
+    consumer.stop()
+    await asyncio.wait_for(task, 5)
+
+    assert not sqs.messages
+    assert sqs.delete_batch_sizes == [1]
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Benchmark line-boundary chunking on real scraped text files.
+
+Compares the previous per-line path (one tiktoken.encoding_for_model + encode per
+line, chunk text re-joined from lines) against LineTokenIndex (one batched encode,
+prefix sums + binary search, chunk text sliced from the original string), and
+checks that both produce identical chunk maps.
+
+Usage:
+    python scripts/benchmark_chunking.py path/to/scrape1.txt path/to/scrape2.txt \
+        --soft-limit-tokens 5000 --overlap-ratio 0.25 --repeat 3
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import tiktoken
+
+# Add project to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from data_etl_app.utils.chunk_util import get_chunks_respecting_line_boundaries_sync
+from open_ai_key_app.models.gpt_model import GPT_4o_mini
+
+
+def legacy_num_tokens_from_string(string: str) -> int:
+    encoding = tiktoken.encoding_for_model(GPT_4o_mini.model_name)
+    return len(encoding.encode(string))
+
+
+def legacy_get_chunks_respecting_line_boundaries(
+    text: str,
+    soft_limit_tokens: int,
+    overlap_ratio: float,
+    max_chunks: int | None,
+) -> dict[str, str]:
+    """The per-line implementation that chunk_util used before LineTokenIndex."""
+    chunks_with_bounds: dict[str, str] = {}
+
+    line_info: list[tuple[str, int, int, int]] = []
+    char_offset = 0
+    for raw_line in text.splitlines(keepends=True):
+        line_tokens = legacy_num_tokens_from_string(raw_line)
+        end = char_offset + len(raw_line)
+        line_info.append((raw_line, line_tokens, char_offset, end))
+        char_offset = end
+
+    current_chunk: list[tuple[str, int, int, int]] = []
+    current_chunk_tokens = 0
+    current_chunk_start: int | None = None
+
+    for line_text, line_tokens, line_start, line_end in line_info:
+        if current_chunk_tokens + line_tokens > soft_limit_tokens and current_chunk:
+            target_overlap = int(current_chunk_tokens * overlap_ratio)
+            overlap_lines: list[tuple[str, int, int, int]] = []
+            overlap_tokens = 0
+            if target_overlap > 0:
+                for line in reversed(current_chunk):
+                    overlap_lines.insert(0, line)
+                    overlap_tokens += line[1]
+                    if overlap_tokens >= target_overlap:
+                        break
+
+            key = f"{current_chunk_start}:{current_chunk[-1][3]}"
+            chunks_with_bounds[key] = "".join(l[0] for l in current_chunk)
+            if max_chunks is not None and len(chunks_with_bounds) >= max_chunks:
+                return chunks_with_bounds
+
+            current_chunk_start = overlap_lines[0][2] if overlap_lines else line_start
+            current_chunk = overlap_lines + [
+                (line_text, line_tokens, line_start, line_end)
+            ]
+            current_chunk_tokens = overlap_tokens + line_tokens
+        else:
+            if not current_chunk:
+                current_chunk_start = line_start
+            current_chunk.append((line_text, line_tokens, line_start, line_end))
+            current_chunk_tokens += line_tokens
+
+    if current_chunk:
+        key = f"{current_chunk_start}:{current_chunk[-1][3]}"
+        chunks_with_bounds[key] = "".join(l[0] for l in current_chunk)
+
+    return chunks_with_bounds
+
+
+def time_call(fn, repeat: int) -> tuple[float, dict[str, str]]:
+    timings = []
+    result: dict[str, str] = {}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("files", nargs="+", type=Path, help="Scraped text files")
+    parser.add_argument("--soft-limit-tokens", type=int, default=5000)
+    parser.add_argument("--overlap-ratio", type=float, default=0.25)
+    parser.add_argument("--max-chunks", type=int, default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    # warm the encoder so neither side pays the one-off BPE load
+    legacy_num_tokens_from_string("warmup")
+
+    total_legacy_ms = 0.0
+    total_indexed_ms = 0.0
+    print(
+        f"{'file':40} {'KB':>9} {'lines':>8} {'chunks':>7} "
+        f"{'legacy ms':>10} {'indexed ms':>11} {'speedup':>8} match"
+    )
+    for file_path in args.files:
+        text = file_path.read_text(encoding="utf-8")
+
+        legacy_ms, legacy_result = time_call(
+            lambda text=text: legacy_get_chunks_respecting_line_boundaries(
+                text, args.soft_limit_tokens, args.overlap_ratio, args.max_chunks
+            ),
+            args.repeat,
+        )
+        indexed_ms, indexed_result = time_call(
+            lambda text=text: get_chunks_respecting_line_boundaries_sync(
+                text, args.soft_limit_tokens, args.overlap_ratio, args.max_chunks
+            ),
+            args.repeat,
+        )
+        total_legacy_ms += legacy_ms
+        total_indexed_ms += indexed_ms
+
+        print(
+            f"{file_path.name[:40]:40} {len(text) / 1024:9.1f} "
+            f"{text.count(chr(10)) + 1:8} {len(indexed_result):7} "
+            f"{legacy_ms:10.1f} {indexed_ms:11.1f} "
+            f"{legacy_ms / max(indexed_ms, 1e-9):7.1f}x "
+            f"{'yes' if legacy_result == indexed_result else 'NO'}"
+        )
+
+    print(
+        f"\nTotal: legacy {total_legacy_ms:.1f}ms, indexed {total_indexed_ms:.1f}ms "
+        f"({total_legacy_ms / max(total_indexed_ms, 1e-9):.1f}x)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Benchmark pending GPTBatchRequest discovery for batch file generation.
+
+Seeds a throwaway database on a local MongoDB with DeferredManufacturers and
+their GPTBatchRequests, then compares the previous per-manufacturer loop
+(get_embedded_gpt_request_ids + find_gpt_batch_requests_by_custom_ids, full
+documents, pending filter in Python) against the single aggregation of
+iterate_deferred_manufacturer_pending_requests, and checks that both find the
+same pending requests for every manufacturer.
+
+Usage:
+    python scripts/benchmark_pending_request_discovery.py \
+        --mongo-uri mongodb://localhost:27017 --manufacturers 2000 \
+        --requests-per-manufacturer 40 --pending-ratio 0.3 --repeat 3
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+from collections import Counter
+from datetime import timedelta
+from pathlib import Path
+
+from beanie import init_beanie
+from pymongo import AsyncMongoClient, monitoring
+
+# Add project to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from core.models.db.deferred_manufacturer import DeferredManufacturer
+from core.models.db.gpt_batch_request import GPTBatchRequest
+from core.models.deferred_basic_extraction import DeferredBasicExtraction
+from core.models.deferred_binary_classification import DeferredBinaryClassification
+from core.models.deferred_concept_extraction import (
+    ConceptExtractionBundle,
+    DeferredConceptExtraction,
+)
+from core.models.deferred_keyword_extraction import DeferredKeywordExtraction
+from core.models.gpt_batch_request_blob import (
+    GPTBatchRequestBlob,
+    GPTBatchRequestBlobBody,
+)
+from core.services.deferred_manufacturer_service import (
+    get_embedded_gpt_request_ids,
+    iterate_deferred_manufacturer_pending_requests,
+)
+from core.services.gpt_batch_request_service import (
+    find_gpt_batch_requests_by_custom_ids,
+)
+from core.utils.time_util import get_current_time
+
+SORT = {"updated_at": -1}  # the parallel generation order
+
+
+class CommandCounter(monitoring.CommandListener):
+    def __init__(self):
+        self.commands = Counter()
+
+    def started(self, event):
+        self.commands[event.command_name] += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def make_request(custom_id: str, pending: bool, chunk_chars: int) -> GPTBatchRequest:
+    now = get_current_time()
+    return GPTBatchRequest(
+        created_at=now,
+        updated_at=now,
+        num_batches_paired_with=0 if pending else 1,
+        batch_id=None if pending else "batch_seeded",
+        request=GPTBatchRequestBlob(
+            custom_id=custom_id,
+            body=GPTBatchRequestBlobBody(
+                model="gpt-4o-mini",
+                messages=[
+                    {"role": "system", "content": "Extract the products. " * 50},
+                    {"role": "user", "content": "x" * chunk_chars},
+                ],
+                input_tokens=chunk_chars // 4,
+                max_tokens=1000,
+            ),
+        ),
+    )
+
+
+def make_deferred_manufacturer(
+    index: int, requests_per_manufacturer: int
+) -> tuple[DeferredManufacturer, list[str]]:
+    etld1 = f"mfg{index:06d}.com"
+    chunks = max(1, (requests_per_manufacturer - 3) // 3)
+    product_ids = {
+        f"{i}:{i + 1}": f"{etld1}>products>{i}:{i + 1}" for i in range(chunks)
+    }
+    binary_ids = {
+        f"{i}:{i + 1}": f"{etld1}>is_manufacturer>{i}:{i + 1}" for i in range(chunks)
+    }
+    concept_bundles = {
+        f"{i}:{i + 1}": ConceptExtractionBundle(
+            brute=set(), llm_search_request_id=f"{etld1}>certificates>{i}:{i + 1}"
+        )
+        for i in range(chunks)
+    }
+    deferred_mfg = DeferredManufacturer(
+        mfg_etld1=etld1,
+        updated_at=get_current_time() - timedelta(seconds=index),
+        scraped_text_file_num_tokens=chunks * 5000,
+        scraped_text_file_version_id=f"v{index}",
+        is_manufacturer=DeferredBinaryClassification(
+            prompt_version_id="p1",
+            final_chunk_key="0:1",
+            chunk_request_id_map=binary_ids,
+        ),
+        is_contract_manufacturer=None,
+        is_product_manufacturer=None,
+        addresses=DeferredBasicExtraction(
+            prompt_version_id="p1", gpt_request_id=f"{etld1}>addresses>0:1"
+        ),
+        business_desc=DeferredBasicExtraction(
+            prompt_version_id="p1", gpt_request_id=f"{etld1}>business_desc>0:1"
+        ),
+        products=DeferredKeywordExtraction(
+            extract_prompt_version_id="p1", chunk_request_id_map=product_ids
+        ),
+        certificates=DeferredConceptExtraction(
+            extract_prompt_version_id="p1",
+            map_prompt_version_id="p1",
+            ontology_version_id="o1",
+            chunk_request_bundle_map=concept_bundles,
+            llm_mapping_request_id=f"{etld1}>certificates>map",
+        ),
+        industries=None,
+        process_caps=None,
+        material_caps=None,
+    )
+    return deferred_mfg, sorted(get_embedded_gpt_request_ids(deferred_mfg))
+
+
+async def seed(args) -> None:
+    await DeferredManufacturer.get_pymongo_collection().delete_many({})
+    await GPTBatchRequest.get_pymongo_collection().delete_many({})
+    await GPTBatchRequest.get_pymongo_collection().create_index(
+        "request.custom_id", unique=True, name="gpt_batch_requests_custom_id_idx"
+    )
+    rng = random.Random(0)
+    total_requests = 0
+    for start in range(0, args.manufacturers, 200):
+        deferred_mfgs = []
+        requests = []
+        for index in range(start, min(start + 200, args.manufacturers)):
+            deferred_mfg, custom_ids = make_deferred_manufacturer(
+                index, args.requests_per_manufacturer
+            )
+            deferred_mfgs.append(deferred_mfg)
+            requests += [
+                make_request(
+                    custom_id, rng.random() < args.pending_ratio, args.chunk_chars
+                )
+                for custom_id in custom_ids
+            ]
+        await DeferredManufacturer.insert_many(deferred_mfgs)
+        await GPTBatchRequest.insert_many(requests)
+        total_requests += len(requests)
+    print(
+        f"Seeded {args.manufacturers:,} DeferredManufacturers, {total_requests:,} GPTBatchRequests"
+    )
+
+
+async def discover_with_loop() -> dict[str, set[str]]:
+    """The previous per-manufacturer discovery."""
+    pending: dict[str, set[str]] = {}
+    async with (
+        DeferredManufacturer.get_pymongo_collection().find({}).sort("updated_at", -1)
+    ) as cursor:
+        async for df_mfg_doc in cursor:
+            deferred_mfg = DeferredManufacturer(**df_mfg_doc)
+            custom_ids = get_embedded_gpt_request_ids(deferred_mfg)
+            all_requests = await find_gpt_batch_requests_by_custom_ids(list(custom_ids))
+            pending[deferred_mfg.mfg_etld1] = {
+                req.request.custom_id
+                for req in all_requests.values()
+                if req.is_batch_request_pending()
+            }
+    return pending
+
+
+async def discover_with_aggregation() -> dict[str, set[str]]:
+    pending: dict[str, set[str]] = {}
+    async for mfg_pending in iterate_deferred_manufacturer_pending_requests(
+        query_filter={}, sort=SORT
+    ):
+        pending[mfg_pending.mfg_etld1] = {
+            request_blob.custom_id for request_blob in mfg_pending.pending_request_blobs
+        }
+    return pending
+
+
+async def run(args) -> None:
+    counter = CommandCounter()
+    client = AsyncMongoClient(args.mongo_uri, event_listeners=[counter])
+    await init_beanie(
+        database=client[args.db_name],
+        document_models=[DeferredManufacturer, GPTBatchRequest],
+    )
+    if not args.skip_seed:
+        await seed(args)
+
+    results = {}
+    for name, discover in [
+        ("per-manufacturer loop", discover_with_loop),
+        ("aggregation", discover_with_aggregation),
+    ]:
+        timings = []
+        for _ in range(args.repeat):
+            counter.commands.clear()
+            start = time.perf_counter()
+            results[name] = await discover()
+            timings.append(time.perf_counter() - start)
+        pending_requests = sum(len(ids) for ids in results[name].values())
+        print(
+            f"{name:>22}: median {statistics.median(timings):.2f}s over {args.repeat} runs, "
+            f"{pending_requests:,} pending requests, "
+            f"commands per run: {dict(counter.commands)}"
+        )
+
+    if results["per-manufacturer loop"] != results["aggregation"]:
+        print("MISMATCH: the two discoveries found different pending requests")
+        sys.exit(1)
+    print("Both discoveries found the same pending requests for every manufacturer.")
+
+    if not args.keep_db:
+        await client.drop_database(args.db_name)
+    await client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--mongo-uri", default="mongodb://localhost:27017")
+    parser.add_argument("--db-name", default="benchmark_pending_request_discovery")
+    parser.add_argument("--manufacturers", type=int, default=2000)
+    parser.add_argument("--requests-per-manufacturer", type=int, default=40)
+    parser.add_argument("--pending-ratio", type=float, default=0.3)
+    parser.add_argument("--chunk-chars", type=int, default=8000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skip-seed", action="store_true")
+    parser.add_argument("--keep-db", action="store_true")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
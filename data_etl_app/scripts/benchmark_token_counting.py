@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark token counting at the call sites that use token_util.
+
+For each call site, compares the previous pattern (tiktoken.encoding_for_model
+resolved on every call, one encode per string) against the cached encoder and,
+where the site opts in, the content-hash memo:
+
+  chunking       every line of a scrape (per-line encode vs one count_many batch)
+  scrape_result  ScrapingResult.num_tokens + is_scrape_valid, 5 log lines per scrape
+  scraped_file   ScrapedTextFile.download_from_s3_and_create (count + validity check)
+  ask_gpt        prompt + context for every chunk of a scrape, same prompt each time
+  batch_builder  get_gpt_request_blob for every chunk, same prompt each time
+
+Usage:
+    python scripts/benchmark_token_counting.py path/to/scrape1.txt path/to/scrape2.txt \
+        --prompt-file path/to/prompt.txt --repeat 5
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable
+
+import tiktoken
+
+# Add project to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from data_etl_app.utils.chunk_util import get_chunks_respecting_line_boundaries_sync
+from open_ai_key_app.models.gpt_model import GPT_4o_mini
+from open_ai_key_app.utils.token_util import (
+    count_many,
+    get_token_count_memo,
+    num_tokens_from_string,
+)
+
+LOG_LINES_PER_SCRAPE = 5
+DEFAULT_PROMPT = "Extract every product and service the manufacturer offers. " * 60
+
+
+def legacy_num_tokens_from_string(string: str) -> int:
+    encoding = tiktoken.encoding_for_model(GPT_4o_mini.model_name)
+    return len(encoding.encode(string))
+
+
+def call_sites(
+    text: str, prompt: str, chunks: list[str]
+) -> dict[str, dict[str, Callable[[], object]]]:
+    lines = text.splitlines(keepends=True)
+    return {
+        "chunking": {
+            "legacy": lambda: [legacy_num_tokens_from_string(l) for l in lines],
+            "cached": lambda: count_many(lines),
+        },
+        "scrape_result": {
+            "legacy": lambda: [
+                legacy_num_tokens_from_string(text)
+                for _ in range(LOG_LINES_PER_SCRAPE + 1)
+            ],
+            "cached": lambda: [
+                num_tokens_from_string(text) for _ in range(LOG_LINES_PER_SCRAPE + 1)
+            ],
+            "memo": lambda: [
+                num_tokens_from_string(text, memoize=True)
+                for _ in range(LOG_LINES_PER_SCRAPE + 1)
+            ],
+        },
+        "scraped_file": {
+            "legacy": lambda: [legacy_num_tokens_from_string(text) for _ in range(2)],
+            "cached": lambda: [num_tokens_from_string(text) for _ in range(2)],
+            "memo": lambda: [
+                num_tokens_from_string(text, memoize=True) for _ in range(2)
+            ],
+        },
+        "ask_gpt": {
+            "legacy": lambda: [
+                (
+                    legacy_num_tokens_from_string(prompt),
+                    legacy_num_tokens_from_string(c),
+                )
+                for c in chunks
+            ],
+            "cached": lambda: [count_many([prompt, c]) for c in chunks],
+            "memo": lambda: [count_many([prompt, c], memoize=True) for c in chunks],
+        },
+        "batch_builder": {
+            "legacy": lambda: [
+                (
+                    legacy_num_tokens_from_string(prompt),
+                    legacy_num_tokens_from_string(c),
+                )
+                for c in chunks
+            ],
+            "cached": lambda: [count_many([prompt, c]) for c in chunks],
+            "memo": lambda: [count_many([prompt, c], memoize=True) for c in chunks],
+        },
+    }
+
+
+def time_call(fn: Callable[[], object], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        # every repetition starts cold, the memo only helps within one scrape
+        get_token_count_memo().clear()
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("files", nargs="+", type=Path, help="Scraped text files")
+    parser.add_argument(
+        "--prompt-file", type=Path, default=None, help="System prompt to count"
+    )
+    parser.add_argument("--soft-limit-tokens", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    prompt = (
+        args.prompt_file.read_text(encoding="utf-8")
+        if args.prompt_file
+        else DEFAULT_PROMPT
+    )
+
+    # warm the encoder so neither side pays the one-off BPE load
+    legacy_num_tokens_from_string("warmup")
+    num_tokens_from_string("warmup")
+
+    totals: dict[str, dict[str, float]] = {}
+    print(
+        f"{'file':32} {'call site':14} {'legacy ms':>10} {'cached ms':>10} {'memo ms':>9}"
+    )
+    for file_path in args.files:
+        text = file_path.read_text(encoding="utf-8")
+        chunks = list(
+            get_chunks_respecting_line_boundaries_sync(
+                text, args.soft_limit_tokens, 0.25
+            ).values()
+        )
+        for site, variants in call_sites(text, prompt, chunks).items():
+            timings = {
+                name: time_call(fn, args.repeat) for name, fn in variants.items()
+            }
+            site_totals = totals.setdefault(site, {})
+            for name, ms in timings.items():
+                site_totals[name] = site_totals.get(name, 0.0) + ms
+            memo_ms = f"{timings['memo']:9.1f}" if "memo" in timings else f"{'-':>9}"
+            print(
+                f"{file_path.name[:32]:32} {site:14} "
+                f"{timings['legacy']:10.1f} {timings['cached']:10.1f} {memo_ms}"
+            )
+
+    print("\nTotals:")
+    for site, site_totals in totals.items():
+        best = min(site_totals.values())
+        print(
+            f"  {site:14} "
+            + ", ".join(f"{name} {ms:.1f}ms" for name, ms in site_totals.items())
+            + f" ({site_totals['legacy'] / max(best, 1e-9):.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
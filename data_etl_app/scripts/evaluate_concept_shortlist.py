@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Evaluate the concept candidate shortlist of the known-to-unknown mapping prompt
+on the ConceptGroundTruth collection.
+
+For every ground-truth chunk, the (unknown keyword, known concept) pairs are the
+mapping produced with the full list of knowns plus the mappings added by the last
+human correction. Recall is the share of pairs whose known concept is in the
+top-K shortlist of its keyword. Tokens are those of the mapping context with the
+full list of knowns and with the shortlist, for the chunk's unknowns.
+
+Pairs whose known concept is not in the current ontology are reported and left
+out of recall.
+
+Usage:
+    python scripts/evaluate_concept_shortlist.py --top-k 5 10 15 25 --limit 2000
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+# Add project to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from core.dependencies.load_core_env import load_core_env
+from data_etl_app.dependencies.load_data_etl_env import load_data_etl_env
+
+load_core_env()
+load_data_etl_env()
+
+from core.models.db.concept_ground_truth import ConceptGroundTruth
+from core.utils.mongo_client import init_db
+from data_etl_app.models.types_and_enums import ConceptTypeEnum
+from data_etl_app.services.knowledge.ontology_service import get_ontology_service
+from data_etl_app.services.llm_powered.map.concept_candidate_service import (
+    get_concept_candidate_index,
+    get_concept_mapping_context,
+    get_shortlist_recall,
+)
+from open_ai_key_app.utils.token_util import num_tokens_from_string
+
+
+def get_mapping_pairs(ground_truth: ConceptGroundTruth) -> set[tuple[str, str]]:
+    mappings = [ground_truth.chunk_search_stats.mapping]
+    if ground_truth.correction_logs:
+        mappings.append(ground_truth.correction_logs[-1].result_correction.add)
+    return {
+        (unknown, known_name)
+        for mapping in mappings
+        for known_name, unknowns in mapping.items()
+        for unknown in unknowns
+    }
+
+
+def get_unknowns(ground_truth: ConceptGroundTruth) -> set[str]:
+    stats = ground_truth.chunk_search_stats
+    return set().union(*stats.mapping.values()) | stats.unmapped_llm
+
+
+async def run(args) -> None:
+    await init_db()
+    ontology_service = await get_ontology_service()
+    known_concepts_by_type = {
+        ConceptTypeEnum.certificates: ontology_service.certificates[1],
+        ConceptTypeEnum.industries: ontology_service.industries[1],
+        ConceptTypeEnum.process_caps: ontology_service.process_caps[1],
+        ConceptTypeEnum.material_caps: ontology_service.material_caps[1],
+    }
+
+    pairs_by_type: dict[ConceptTypeEnum, list[tuple[str, str]]] = defaultdict(list)
+    unknown_sets_by_type: dict[ConceptTypeEnum, list[set[str]]] = defaultdict(list)
+    outdated_pairs = 0
+    query = ConceptGroundTruth.find({})
+    if args.limit:
+        query = query.limit(args.limit)
+    async for ground_truth in query:
+        known_concepts = known_concepts_by_type.get(ground_truth.concept_type)
+        if known_concepts is None:
+            continue
+        known_names = {c.name for c in known_concepts}
+        for unknown, known_name in get_mapping_pairs(ground_truth):
+            if known_name in known_names:
+                pairs_by_type[ground_truth.concept_type].append((unknown, known_name))
+            else:
+                outdated_pairs += 1
+        unknowns = get_unknowns(ground_truth)
+        if unknowns:
+            unknown_sets_by_type[ground_truth.concept_type].append(unknowns)
+
+    print(f"Pairs with a known concept missing from the ontology: {outdated_pairs:,}")
+    for concept_type, known_concepts in known_concepts_by_type.items():
+        index = get_concept_candidate_index(known_concepts)
+        pairs = pairs_by_type[concept_type]
+        unknown_sets = unknown_sets_by_type[concept_type]
+        print(
+            f"\n{concept_type.name}: {len(known_concepts):,} concepts, "
+            f"{len(pairs):,} mapped pairs, {len(unknown_sets):,} calls"
+        )
+        if not unknown_sets:
+            continue
+        full_tokens = [
+            num_tokens_from_string(
+                get_concept_mapping_context(known_concepts, unknowns, None)
+            )
+            for unknowns in unknown_sets
+        ]
+        for top_k in args.top_k:
+            recall = get_shortlist_recall(index, pairs, top_k)
+            shortlisted_tokens = [
+                num_tokens_from_string(
+                    get_concept_mapping_context(known_concepts, unknowns, top_k)
+                )
+                for unknowns in unknown_sets
+            ]
+            saved = [
+                f - s for f, s in zip(full_tokens, shortlisted_tokens, strict=True)
+            ]
+            print(
+                f"  top-{top_k:<3} recall {recall.recall:.3f} "
+                f"({recall.pairs_in_shortlist:,}/{recall.pairs:,}), "
+                f"tokens per call {statistics.mean(full_tokens):,.0f} -> "
+                f"{statistics.mean(shortlisted_tokens):,.0f} "
+                f"(saved median {statistics.median(saved):,.0f}, "
+                f"{sum(saved) / sum(full_tokens):.1%} overall)"
+            )
+            if args.show_missed:
+                for unknown, known_name in recall.missed[: args.show_missed]:
+                    print(f"      missed: {unknown!r} -> {known_name!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--top-k", type=int, nargs="+", default=[5, 10, 15, 25])
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument(
+        "--show-missed",
+        type=int,
+        default=0,
+        help="Print this many missed pairs per concept type and top-k",
+    )
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
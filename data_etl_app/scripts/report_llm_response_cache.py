@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Report the LLM response cache's hit rate and dollars saved per field type, and
+invalidate its entries.
+
+The counters are those of every process that used the cache file, since it was
+created or last cleared.
+
+Usage:
+    python scripts/report_llm_response_cache.py
+    python scripts/report_llm_response_cache.py --invalidate-prompt-version <s3 version id>
+    python scripts/report_llm_response_cache.py --delete-expired
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Add project to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from core.utils.llm_response_cache_util import (
+    LLM_RESPONSE_CACHE_PATH,
+    LLMResponseCache,
+    LLMResponseCacheStats,
+)
+
+
+def print_stats(stats_by_label: dict[str, LLMResponseCacheStats]) -> None:
+    if not stats_by_label:
+        print("No lookups recorded yet.")
+        return
+    print(
+        f"{'field':<24} {'hits':>9} {'misses':>9} {'hit rate':>9} "
+        f"{'saved $':>10} {'spent $':>10} {'saved tokens':>14}"
+    )
+    total = LLMResponseCacheStats()
+    for label, stats in stats_by_label.items():
+        print(
+            f"{label:<24} {stats.hits:>9,} {stats.misses:>9,} {stats.hit_rate:>9.1%} "
+            f"{stats.saved_usd:>10.2f} {stats.spent_usd:>10.2f} {stats.saved_tokens:>14,}"
+        )
+        total.hits += stats.hits
+        total.misses += stats.misses
+        total.saved_tokens += stats.saved_tokens
+        total.saved_usd += stats.saved_usd
+        total.spent_usd += stats.spent_usd
+    print(
+        f"{'total':<24} {total.hits:>9,} {total.misses:>9,} {total.hit_rate:>9.1%} "
+        f"{total.saved_usd:>10.2f} {total.spent_usd:>10.2f} {total.saved_tokens:>14,}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--path", default=LLM_RESPONSE_CACHE_PATH)
+    parser.add_argument(
+        "--invalidate-prompt-version",
+        nargs="+",
+        default=[],
+        help="Drop the cached responses to these prompt S3 version ids",
+    )
+    parser.add_argument("--delete-expired", action="store_true")
+    args = parser.parse_args()
+
+    cache = LLMResponseCache(args.path)
+    for prompt_version_id in args.invalidate_prompt_version:
+        deleted = cache.invalidate_prompt_version(prompt_version_id)
+        print(f"Dropped {deleted:,} responses to prompt version {prompt_version_id}")
+    if args.delete_expired:
+        print(f"Dropped {cache.delete_expired():,} expired responses")
+    print_stats(cache.get_total_stats())
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()
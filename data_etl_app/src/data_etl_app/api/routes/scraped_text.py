@@ -6,12 +6,7 @@ from fastapi.responses import JSONResponse, PlainTextResponse, Response
 
 from core.services.manufacturer_service import find_manufacturer_by_etld1
 from core.services.user_service import find_by_email
-from core.utils.aws.s3.scraped_text_util import (
-    download_scraped_text_from_s3_by_mfg_etld1,
-    get_file_name_from_mfg_etld,
-    get_scraped_text_file_exist_last_modified_on,
-)
-from open_ai_key_app.utils.token_util import num_tokens_from_string
+from scraper_app.models.scraped_text_file import get_scraped_text_version
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -71,19 +66,11 @@ async def get_scraped_text(
             ),
         )
 
-    scraped_text, resolved_version_id = (
-        await download_scraped_text_from_s3_by_mfg_etld1(
-            etld1=mfg_etld1,
-            version_id=version_id,
-        )
-    )
-
-    num_tokens = num_tokens_from_string(scraped_text)
-
-    file_name = get_file_name_from_mfg_etld(mfg_etld1)
-    last_modified = await get_scraped_text_file_exist_last_modified_on(
-        file_name=file_name, version_id=resolved_version_id
-    )
+    scraped_text_version = await get_scraped_text_version(mfg_etld1, version_id)
+    scraped_text = scraped_text_version.text
+    resolved_version_id = scraped_text_version.version_id
+    num_tokens = scraped_text_version.num_tokens
+    last_modified = scraped_text_version.last_modified_on
     file_created_on = last_modified.isoformat() if last_modified else None
 
     logger.debug(
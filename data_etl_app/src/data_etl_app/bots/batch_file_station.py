@@ -1,13 +1,11 @@
 import asyncio
 import httpx
-import json
 import logging
 from dataclasses import dataclass
-from pymongo import UpdateOne
 from datetime import datetime
 from pathlib import Path
 from typing import Optional
-from openai import OpenAI
+from openai import AsyncOpenAI
 
 from core.dependencies.load_core_env import load_core_env
 from scraper_app.dependencies.load_scraper_env import load_scraper_env
@@ -23,6 +21,7 @@ load_open_ai_app_env()
 
 from core.models.db.api_key_bundle import APIKeyBundle
 from core.models.db.gpt_batch import GPTBatch, GPTBatchStatus
+from core.models.jsonl_batch_file import JSONLBatchFile
 from core.services.gpt_batch_request_service import (
     bulk_update_gpt_batch_requests,
     get_custom_ids_for_batch,
@@ -39,9 +38,7 @@ from data_etl_app.services.batch_file_generator import (
     BatchFileGenerationResult,
     iterate_df_manufacturers_and_write_batch_files,
 )
-from data_etl_app.utils.gpt_batch_request_util import (
-    parse_individual_batch_req_response_raw,
-)
+from data_etl_app.services.batch_result_ingestor import BatchResultIngestor
 from data_etl_app.services.batch_file_satellite import (
     BatchFileSatellite,
     BatchDownloadOutput,
@@ -50,13 +47,14 @@ from data_etl_app.services.manufacturer_extraction_orchestrator import (
     ManufacturerExtractionOrchestrator,
 )
 
-
 logger = logging.getLogger(__name__)
 
 OUTPUT_DIR_DEFAULT = "../../../../batch_data"
 MAX_MANUFACTURER_TOKENS = 6_000_000
 MAX_REQUESTS_PER_FILE = 50_000
 MAX_FILE_SIZE_MB = 190  # 190MB in MB
+MAX_CONCURRENT_KEYS = 8
+MAX_CONCURRENT_MANUFACTURERS = 100  # process_manufacturer calls across all keys
 
 FINISHED_BATCHES_DIR_DEFAULT = Path(OUTPUT_DIR_DEFAULT + "/finished_batches")
 
@@ -79,18 +77,6 @@ class BatchFileStationStats:
     mfg_completed: int = 0
 
 
-@dataclass
-class SingleBatchStats:
-    total_output_lines: int = 0
-    failed_output_parses: int = 0
-    total_error_lines: int = 0
-    failed_error_parses: int = 0
-    upserted: int = 0  # must remain zero lol
-    updated: int = 0
-    output_errors: int = 0
-    error_file_errors: int = 0
-
-
 class BatchFileStation:
     _instance: "BatchFileStation | None" = None
     stats: BatchFileStationStats
@@ -107,6 +93,15 @@ class BatchFileStation:
             output_dir=Path(FINISHED_BATCHES_DIR_DEFAULT)
         )
         self.stats = BatchFileStationStats()
+        # keys are processed concurrently, these budgets are shared by all of them
+        self._key_semaphore = asyncio.Semaphore(MAX_CONCURRENT_KEYS)
+        self._mfg_semaphore = asyncio.Semaphore(MAX_CONCURRENT_MANUFACTURERS)
+        # batch files are generated from the requests not paired with a batch yet.
+        # Keys generate one at a time, and the custom_ids written for a key stay
+        # reserved (left out of other keys' files) until its batch is uploaded and
+        # paired, so uploads of different keys run concurrently
+        self._generation_lock = asyncio.Lock()
+        self._reserved_custom_ids: set[str] = set()
         BatchFileStation._instance = self
 
     @classmethod
@@ -126,7 +121,7 @@ class BatchFileStation:
     async def _finish_gpt_batch_processing(
         self,
         done_at: datetime,
-        client: OpenAI,
+        client: AsyncOpenAI,
         gpt_batch: GPTBatch,
         api_key_bundle: APIKeyBundle,
         batch_download_output: Optional[BatchDownloadOutput],
@@ -135,7 +130,7 @@ class BatchFileStation:
         await gpt_batch.mark_our_processing_complete(processing_completed_at=done_at)
 
         if batch_download_output:
-            batch_download_output.delete_batch_file_from_openai_and_move_output(
+            await batch_download_output.delete_batch_file_from_openai_and_move_output(
                 client=client,
                 input_file_id=gpt_batch.input_file_id,
                 finished_batches_dir=FINISHED_BATCHES_DIR_DEFAULT,
@@ -145,7 +140,7 @@ class BatchFileStation:
 
     async def handle_batch_failed(
         self,
-        client: OpenAI,
+        client: AsyncOpenAI,
         api_key_bundle: APIKeyBundle,
         timestamp: datetime,
         gpt_batch: GPTBatch,
@@ -165,7 +160,7 @@ class BatchFileStation:
 
     async def handle_batch_completed_or_expired(
         self,
-        client: OpenAI,
+        client: AsyncOpenAI,
         api_key_bundle: APIKeyBundle,
         downloaded_at: datetime,
         gpt_batch: GPTBatch,
@@ -181,76 +176,42 @@ class BatchFileStation:
 
         self.stats.batches_downloaded += 1
         log_id = f"{api_key_bundle.label}-{gpt_batch.external_batch_id}"
-        update_operations = []
-        batch_stats = SingleBatchStats()
-        missing_custom_ids: set[str] = await get_custom_ids_for_batch(gpt_batch)
+        expected_custom_ids: set[str] = await get_custom_ids_for_batch(gpt_batch)
         logger.info(
-            f"{log_id}: Expecting {len(missing_custom_ids):,} custom_ids in output/error files.\n"
-            #     f"all_custom_ids:{all_custom_ids}"
+            f"{log_id}: Expecting {len(expected_custom_ids):,} custom_ids in output/error files.\n"
         )
-        output_custom_ids: set[str] = set()
-        # error_custom_ids: set[str] = set()
-        unique_mfg_etld1s: set[str] = set()
 
-        with open(f"{batch_download_output.output_file_path}", "r") as f:
-            for line_num, line in enumerate(f):
-                try:
-                    batch_stats.total_output_lines += 1
-                    raw_result = json.loads(line.strip())
-                    custom_id: str = str(raw_result.get("custom_id"))
-                    if not custom_id:
-                        logger.warning(f"Line {line_num}: Missing custom_id, skipping")
-                        batch_stats.failed_output_parses += 1
-                        continue
-
-                    response_blob = parse_individual_batch_req_response_raw(
-                        raw_result, gpt_batch.external_batch_id
-                    )
+        mfg_results = []
 
-                    missing_custom_ids.discard(custom_id)
-                    output_custom_ids.add(custom_id)
-                    mfg_etld1 = custom_id.split(">")[0]
-                    unique_mfg_etld1s.add(mfg_etld1)
-
-                    operation = UpdateOne(
-                        {"request.custom_id": custom_id},  # Filter
-                        {
-                            "$set": {
-                                "batch_id": gpt_batch.external_batch_id,
-                                "response_blob": response_blob.model_dump(
-                                    exclude={"result"}
-                                ),
-                                "updated_at": downloaded_at,
-                            }
-                        },
-                        upsert=False,  # Doesn't create new documents if filter unmatched
-                    )
-                    update_operations.append(operation)
-
-                except json.JSONDecodeError as e:
-                    logger.error(f"Line {line_num}: JSON decode error - {e}")
-                    batch_stats.failed_output_parses += 1
-                except Exception as e:
-                    logger.error(
-                        f"Line {line_num}: Error processing result - {e}", exc_info=True
-                    )
-                    batch_stats.output_errors += 1
-
-        if missing_custom_ids:
-            logger.error(
-                f"{log_id}: Missing {len(missing_custom_ids)} expected custom_ids in output/error files: "
-                f"output[{len(output_custom_ids)}], Resetting their batch_id to None."
-            )
-            for custom_id in missing_custom_ids:
-                update_operations.append(
-                    UpdateOne(
-                        {"request.custom_id": custom_id},  # Filter
-                        {"$set": {"batch_id": None, "updated_at": downloaded_at}},
-                        upsert=False,  # Doesn't create new documents if filter unmatched
-                    )
+        async def bounded_process(mfg):
+            async with self._mfg_semaphore:
+                await self.mfg_intake_orchestrator.process_manufacturer(
+                    timestamp=downloaded_at,
+                    mfg=mfg,
                 )
 
-        if not update_operations:
+        async def process_manufacturers(mfg_etld1s: list[str]):
+            # called as soon as all requests of these manufacturers are written
+            tasks = [
+                bounded_process(mfg)
+                for mfg in await find_manufacturers_by_etld1s(mfg_etld1s)
+            ]
+            mfg_results.extend(await asyncio.gather(*tasks, return_exceptions=True))
+
+        ingestor = BatchResultIngestor(
+            batch_id=gpt_batch.external_batch_id,
+            expected_custom_ids=expected_custom_ids,
+            updated_at=downloaded_at,
+            write_window=lambda update_operations: bulk_update_gpt_batch_requests(  # this raises if any error occurs with any chunk in the bulk
+                update_one_operations=update_operations,
+                log_id=log_id,
+            ),
+            process_manufacturers=process_manufacturers,
+            log_id=log_id,
+        )
+        batch_stats = await ingestor.ingest(batch_download_output.output_file_path)
+
+        if not batch_stats.update_operations:
             logger.warning(
                 "No valid update operations found in batch results. "
                 f"Skipping to creating new batch and upload."
@@ -262,35 +223,15 @@ class BatchFileStation:
                 api_key_bundle=api_key_bundle,
                 batch_download_output=batch_download_output,
             )
+            return
 
-        batch_stats.upserted, batch_stats.updated = (
-            await bulk_update_gpt_batch_requests(  # this raises if any error occurs with any chunk in the bulk
-                update_one_operations=update_operations,
-                log_id=log_id,
-            )
+        exception_count = sum(
+            1 for result in mfg_results if isinstance(result, Exception)
         )
-
-        logger.info(f"{log_id}: Processed batch results, stats:\n" f"{batch_stats}")
-
-        semaphore = asyncio.Semaphore(100)
-
-        async def bounded_process(mfg):
-            async with semaphore:
-                await self.mfg_intake_orchestrator.process_manufacturer(
-                    timestamp=downloaded_at,
-                    mfg=mfg,
-                )
-
-        tasks = [
-            bounded_process(mfg)
-            for mfg in await find_manufacturers_by_etld1s(list(unique_mfg_etld1s))
-        ]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-
-        exception_count = sum(1 for result in results if isinstance(result, Exception))
-        self.stats.mfg_completed += len(results) - exception_count
+        self.stats.mfg_completed += len(mfg_results) - exception_count
         logger.info(
-            f"{log_id}: Processed {len(results)} manufacturers. "
+            f"{log_id}: Processed {len(mfg_results)} manufacturers "
+            f"({batch_stats.mfgs_released_early} while the results were being read). "
             f"Exceptions: {exception_count}, Completed: {self.stats.mfg_completed}"
         )
 
@@ -306,7 +247,7 @@ class BatchFileStation:
 
     async def process_batch(
         self,
-        client: OpenAI,
+        client: AsyncOpenAI,
         api_key_bundle: APIKeyBundle,
         gpt_batch: GPTBatch,
         timestamp: datetime,
@@ -330,8 +271,10 @@ class BatchFileStation:
                 f"process_batch: Batch {api_key_bundle.label}:{gpt_batch.external_batch_id} completed!"
             )
 
-            download_result: BatchDownloadOutput = self.satellite.download_batch_output(
-                client=client, gpt_batch=gpt_batch
+            download_result: BatchDownloadOutput = (
+                await self.satellite.download_batch_output(
+                    client=client, gpt_batch=gpt_batch
+                )
             )
             logger.info(
                 f"process_batch: Downloaded output:{download_result} for batch {api_key_bundle.label}:{gpt_batch.external_batch_id}"
@@ -367,154 +310,199 @@ class BatchFileStation:
                 now = get_current_time()
                 api_key_bundles: list[APIKeyBundle] = await get_all_api_key_bundles()
                 logger.info(f"fetched {len(api_key_bundles)} API key bundles.")
-                for api_key_bundle in api_key_bundles:
-                    # if api_key_bundle.label != "sudokn.tool7":
-                    #     continue
-                    logger.info(
-                        f"poll_sync_and_upload_new_batches: Iterating API key bundle: {api_key_bundle.label}"
-                    )
-                    client = OpenAI(
-                        api_key=api_key_bundle.key,
-                        timeout=httpx.Timeout(
-                            connect=60.0,  # time to establish TCP/TLS connection
-                            read=1800.0,  # 30 minutes - time waiting for server response after upload
-                            write=1800.0,  # 30 minutes - time allowed to upload request body (for 200MB files)
-                            pool=30.0,  # time to get connection from pool
-                        ),
-                    )
-
-                    if not api_key_bundle.is_available_now(now):
-                        time_left = api_key_bundle.available_at - now
-                        minutes, seconds = divmod(int(time_left.total_seconds()), 60)
-                        logger.warning(
-                            f"create_new_batches_and_upload: {api_key_bundle.label} is unavailable at the moment={now}, will be available in {minutes} mins {seconds} secs."
+                # one task per key, so a slow download or upload on one key
+                # never holds up the others
+                await asyncio.gather(
+                    *(
+                        self.sync_and_upload_api_key_bundle(
+                            now=now, api_key_bundle=api_key_bundle
                         )
-                        continue
+                        for api_key_bundle in api_key_bundles
+                    )
+                )
+                logger.info(
+                    f"poll_sync_and_upload_new_batches: Sleeping for {poll_interval_seconds} seconds..."
+                )
+                await asyncio.sleep(poll_interval_seconds)
+            except Exception as e:
+                logger.error(f"Error in polling loop: {e}", exc_info=True)
+                await asyncio.sleep(poll_interval_seconds)
 
-                    # status: "validating", "in_progress", "finalising", etc.
-                    synced_gpt_batches: list[GPTBatch] = (
-                        await self.satellite.get_synced_gpt_batches(
-                            client=client, api_key_bundle=api_key_bundle
-                        )
+    async def sync_and_upload_api_key_bundle(
+        self, now: datetime, api_key_bundle: APIKeyBundle
+    ):
+        async with self._key_semaphore:
+            logger.info(
+                f"poll_sync_and_upload_new_batches: Iterating API key bundle: {api_key_bundle.label}"
+            )
+            try:
+                async with AsyncOpenAI(
+                    api_key=api_key_bundle.key,
+                    timeout=httpx.Timeout(
+                        connect=60.0,  # time to establish TCP/TLS connection
+                        read=1800.0,  # 30 minutes - time waiting for server response after upload
+                        write=1800.0,  # 30 minutes - time allowed to upload request body (for 200MB files)
+                        pool=30.0,  # time to get connection from pool
+                    ),
+                ) as client:
+                    await self._sync_and_upload_api_key_bundle(
+                        client=client, now=now, api_key_bundle=api_key_bundle
                     )
+            except Exception as e:
+                logger.error(
+                    f"poll_sync_and_upload_new_batches: Error with API key bundle {api_key_bundle.label}: {e}",
+                    exc_info=True,
+                )
 
-                    api_key_bundle.tokens_in_use = 0  # reset before recounting
-                    at_least_one_incomplete = False
-                    for (
-                        gpt_batch
-                    ) in synced_gpt_batches:  # hopefully there is only one each time
-                        if not gpt_batch.is_our_processing_complete():
-                            try:
-                                logger.info(
-                                    f"poll_sync_and_upload_new_batches: Processing synced batch {api_key_bundle.label}:{gpt_batch.external_batch_id} with status {gpt_batch.status}"
-                                )
-                                api_key_bundle.tokens_in_use += (
-                                    gpt_batch.metadata.total_tokens
-                                )
-                                await self.process_batch(  # if completed/expired, process_batch will free up tokens_in_use
-                                    client=client,
-                                    api_key_bundle=api_key_bundle,
-                                    gpt_batch=gpt_batch,
-                                    timestamp=now,
-                                )
-                                at_least_one_incomplete = True
-                            except Exception as e:
-                                logger.info(
-                                    f"poll_sync_and_upload_new_batches: Error processing synced batch {api_key_bundle.label}:{gpt_batch.external_batch_id}: {e}",
-                                    exc_info=True,
-                                )
-
-                    await api_key_bundle.save()  # save the updated tokens_in_use
-                    if at_least_one_incomplete:
-                        logger.info(
-                            f"poll_sync_and_upload_new_batches: {api_key_bundle.label} had at least one incomplete batch that was processed, "
-                            f"some cooldown may have been applied. Will wait for next iteration to create new batches."
-                        )
-                        continue
+    async def _sync_and_upload_api_key_bundle(
+        self, client: AsyncOpenAI, now: datetime, api_key_bundle: APIKeyBundle
+    ):
+        if not api_key_bundle.is_available_now(now):
+            time_left = api_key_bundle.available_at - now
+            minutes, seconds = divmod(int(time_left.total_seconds()), 60)
+            logger.warning(
+                f"create_new_batches_and_upload: {api_key_bundle.label} is unavailable at the moment={now}, will be available in {minutes} mins {seconds} secs."
+            )
+            return
 
-                    # continue
-                    if api_key_bundle.tokens_in_use > 0:
-                        logger.info(
-                            f"create_new_batches_and_upload: {api_key_bundle.label} has {api_key_bundle.tokens_in_use} tokens in use, "
-                            f"will wait before creating new batches."
-                        )
-                        continue
-
-                    # proceed to generate batch files and try uploading
-                    batch_file_generation_result: BatchFileGenerationResult = (
-                        await iterate_df_manufacturers_and_write_batch_files(
-                            timestamp=now,
-                            query_filter=DF_MFG_BATCH_FILTER,
-                            output_dir=Path(OUTPUT_DIR_DEFAULT),
-                            max_requests_per_file=MAX_REQUESTS_PER_FILE,
-                            max_tokens_per_file=api_key_bundle.batch_queue_limit,
-                            max_file_size_in_bytes=MAX_FILE_SIZE_MB * 1024 * 1024,
-                            max_files=1,
-                            parallel_processing=True,  # Enable parallel processing
-                            max_concurrent_manufacturers=100,  # Process 100 manufacturers concurrently
-                        )
-                    )
-                    jsonl_batch_file = batch_file_generation_result.batch_request_jsonl_file_writer.files[
-                        0
-                    ]
-                    if not jsonl_batch_file.unique_line_ids:
-                        logger.error(
-                            f"poll_sync_and_upload_new_batches: Batch file generation created empty file"
-                        )
-                        batch_file_generation_result.batch_request_jsonl_file_writer.delete_files()
-                        continue
+        # status: "validating", "in_progress", "finalising", etc.
+        synced_gpt_batches: list[GPTBatch] = (
+            await self.satellite.get_synced_gpt_batches(
+                client=client, api_key_bundle=api_key_bundle
+            )
+        )
 
-                    self.stats.batches_created += 1
-                    new_gpt_batch = await self.satellite.try_uploading_new_batch_file(
+        api_key_bundle.tokens_in_use = 0  # reset before recounting
+        at_least_one_incomplete = False
+        for gpt_batch in synced_gpt_batches:  # hopefully there is only one each time
+            if not gpt_batch.is_our_processing_complete():
+                try:
+                    logger.info(
+                        f"poll_sync_and_upload_new_batches: Processing synced batch {api_key_bundle.label}:{gpt_batch.external_batch_id} with status {gpt_batch.status}"
+                    )
+                    api_key_bundle.tokens_in_use += gpt_batch.metadata.total_tokens
+                    await self.process_batch(  # if completed/expired, process_batch will free up tokens_in_use
                         client=client,
                         api_key_bundle=api_key_bundle,
-                        jsonl_batch_file=jsonl_batch_file,
+                        gpt_batch=gpt_batch,
+                        timestamp=now,
                     )
-                    batch_file_generation_result.batch_request_jsonl_file_writer.delete_files()
-                    if not new_gpt_batch:
-                        logger.info(
-                            f"create_new_batches_and_upload: Upload failed for {api_key_bundle.label}"
-                        )
-                        continue
-
-                    await api_key_bundle.add_tokens_in_use(
-                        new_gpt_batch.metadata.total_tokens
-                    )
-                    self.stats.batches_uploaded += 1
-                    # Try pairing custom_ids with batch, retry once if it fails
-                    for attempt in range(2):
-                        try:
-                            num_paired = await pair_batch_request_custom_ids_with_batch(
-                                timestamp=now,
-                                custom_ids=batch_file_generation_result.batch_request_jsonl_file_writer.files[
-                                    0
-                                ].unique_line_ids,
-                                gpt_batch=new_gpt_batch,
-                            )
-                            logger.info(
-                                f"poll_sync_and_upload_new_batches: Paired {num_paired} requests with batch {api_key_bundle.label}:{new_gpt_batch.external_batch_id} on attempt {attempt+1}"
-                            )
-                            break
-                        except Exception as e:
-                            logger.error(
-                                f"OMGG: pair_batch_request_custom_ids_with_batch failed (attempt {attempt+1}): {e}"
-                            )
-                            if attempt == 1:
-                                raise
-                    # If the above call fails, we might send the same custom ids in the next batch
-                    # pray it succeeds
-
+                    at_least_one_incomplete = True
+                except Exception as e:
                     logger.info(
-                        f"poll_sync_and_upload_new_batches: Completed batch upload for {api_key_bundle.label}, with new batch:\n{new_gpt_batch}"
+                        f"poll_sync_and_upload_new_batches: Error processing synced batch {api_key_bundle.label}:{gpt_batch.external_batch_id}: {e}",
+                        exc_info=True,
                     )
-                # for loop ends
+
+        await api_key_bundle.save()  # save the updated tokens_in_use
+        if at_least_one_incomplete:
+            logger.info(
+                f"poll_sync_and_upload_new_batches: {api_key_bundle.label} had at least one incomplete batch that was processed, "
+                f"some cooldown may have been applied. Will wait for next iteration to create new batches."
+            )
+            return
+
+        if api_key_bundle.tokens_in_use > 0:
+            logger.info(
+                f"create_new_batches_and_upload: {api_key_bundle.label} has {api_key_bundle.tokens_in_use} tokens in use, "
+                f"will wait before creating new batches."
+            )
+            return
+
+        await self._generate_and_upload_new_batch(
+            client=client, now=now, api_key_bundle=api_key_bundle
+        )
+
+    async def _generate_and_upload_new_batch(
+        self, client: AsyncOpenAI, now: datetime, api_key_bundle: APIKeyBundle
+    ):
+        async with self._generation_lock:
+            batch_file_generation_result: BatchFileGenerationResult = (
+                await iterate_df_manufacturers_and_write_batch_files(
+                    timestamp=now,
+                    query_filter=DF_MFG_BATCH_FILTER,
+                    # per key, so a file still uploading is never overwritten by
+                    # the file of another key generated with the same timestamp
+                    output_dir=Path(OUTPUT_DIR_DEFAULT) / api_key_bundle.label,
+                    max_requests_per_file=MAX_REQUESTS_PER_FILE,
+                    max_tokens_per_file=api_key_bundle.batch_queue_limit,
+                    max_file_size_in_bytes=MAX_FILE_SIZE_MB * 1024 * 1024,
+                    max_files=1,
+                    parallel_processing=True,  # Enable parallel processing
+                    max_concurrent_manufacturers=100,  # Process 100 manufacturers concurrently
+                    excluded_custom_ids=frozenset(self._reserved_custom_ids),
+                )
+            )
+            jsonl_batch_file = (
+                batch_file_generation_result.batch_request_jsonl_file_writer.files[0]
+            )
+            if not jsonl_batch_file.unique_line_ids:
+                logger.error(
+                    f"poll_sync_and_upload_new_batches: Batch file generation created empty file"
+                )
+                batch_file_generation_result.batch_request_jsonl_file_writer.delete_files()
+                return
+            reserved_custom_ids = set(jsonl_batch_file.unique_line_ids)
+            self._reserved_custom_ids |= reserved_custom_ids
+
+        # upload and pair outside the lock; the reservation keeps these requests
+        # out of the files other keys generate meanwhile
+        try:
+            await self._upload_and_pair_batch_file(
+                client=client,
+                now=now,
+                api_key_bundle=api_key_bundle,
+                jsonl_batch_file=jsonl_batch_file,
+            )
+        finally:
+            self._reserved_custom_ids -= reserved_custom_ids
+            batch_file_generation_result.batch_request_jsonl_file_writer.delete_files()
+
+    async def _upload_and_pair_batch_file(
+        self,
+        client: AsyncOpenAI,
+        now: datetime,
+        api_key_bundle: APIKeyBundle,
+        jsonl_batch_file: JSONLBatchFile,
+    ):
+        self.stats.batches_created += 1
+        new_gpt_batch = await self.satellite.try_uploading_new_batch_file(
+            client=client,
+            api_key_bundle=api_key_bundle,
+            jsonl_batch_file=jsonl_batch_file,
+        )
+        if not new_gpt_batch:
+            logger.info(
+                f"create_new_batches_and_upload: Upload failed for {api_key_bundle.label}"
+            )
+            return
+
+        await api_key_bundle.add_tokens_in_use(new_gpt_batch.metadata.total_tokens)
+        self.stats.batches_uploaded += 1
+        # Try pairing custom_ids with batch, retry once if it fails
+        for attempt in range(2):
+            try:
+                num_paired = await pair_batch_request_custom_ids_with_batch(
+                    timestamp=now,
+                    custom_ids=jsonl_batch_file.unique_line_ids,
+                    gpt_batch=new_gpt_batch,
+                )
                 logger.info(
-                    f"poll_sync_and_upload_new_batches: Sleeping for {poll_interval_seconds} seconds..."
+                    f"poll_sync_and_upload_new_batches: Paired {num_paired} requests with batch {api_key_bundle.label}:{new_gpt_batch.external_batch_id} on attempt {attempt+1}"
                 )
-                await asyncio.sleep(poll_interval_seconds)
+                break
             except Exception as e:
-                logger.error(f"Error in polling loop: {e}", exc_info=True)
-                await asyncio.sleep(poll_interval_seconds)
+                logger.error(
+                    f"OMGG: pair_batch_request_custom_ids_with_batch failed (attempt {attempt+1}): {e}"
+                )
+                if attempt == 1:
+                    raise
+        # If the above call fails, we might send the same custom ids in the next batch
+        # pray it succeeds
+
+        logger.info(
+            f"poll_sync_and_upload_new_batches: Completed batch upload for {api_key_bundle.label}, with new batch:\n{new_gpt_batch}"
+        )
 
 
 async def async_main():
@@ -2,7 +2,7 @@ import argparse
 import asyncio
 import logging
 from datetime import datetime
-from typing import Callable, Awaitable
+from typing import Callable
 
 from core.dependencies.load_core_env import load_core_env
 from scraper_app.dependencies.load_scraper_env import load_scraper_env
@@ -20,6 +20,7 @@ load_litellm_env()
 from core.dependencies.aws_clients import (
     initialize_core_aws_clients,
     cleanup_core_aws_clients,
+    get_extract_queue_client,
 )
 from data_etl_app.dependencies.aws_clients import (
     initialize_data_etl_aws_clients,
@@ -34,10 +35,17 @@ from core.services.user_service import is_user_MEP
 from core.utils.time_util import get_current_time
 from core.services.manufacturer_service import (
     find_manufacturer_by_etld1,
+    log_manufacturer_write_stats,
     update_manufacturer,
 )
 
 from scraper_app.models.scraped_text_file import ScrapedTextFile
+from core.utils.aws.s3.scraped_text_cache_util import get_scraped_text_cache
+from core.utils.llm_response_cache_util import get_llm_response_cache
+from core.utils.aws.queue.sqs_consumer_util import (
+    DEFAULT_VISIBILITY_TIMEOUT,
+    SQSBatchConsumer,
+)
 
 from core.models.db.binary_ground_truth import HumanBinaryDecision
 from core.models.binary_classification_result import BinaryClassificationResult
@@ -65,6 +73,22 @@ from data_etl_app.services.llm_powered.classification.binary_classifier_service
     is_product_manufacturer,
     is_contract_manufacturer,
 )
+from data_etl_app.services.chunk_plan_cache import get_chunk_plan_cache
+from data_etl_app.services.field_extraction_scheduler import (
+    DEFAULT_MAX_CONCURRENT_LLM_STEPS,
+    DEFAULT_MAX_CONCURRENT_STEPS_PER_MANUFACTURER,
+    ExtractionContext,
+    ExtractionStep,
+    FieldExtractionScheduler,
+    get_llm_step_semaphore,
+    set_max_concurrent_llm_steps,
+)
+from data_etl_app.utils.chunk_util import (
+    CHUNKING_BACKENDS,
+    set_chunking_backend,
+    shutdown_chunk_process_pool,
+    shutdown_chunk_thread_pool,
+)
 from data_etl_app.utils.find_email_addresses import get_validated_emails_from_text_async
 
 logger = logging.getLogger(__name__)
@@ -84,7 +108,6 @@ TOO_LONG_THRESHOLD = 125000  # Maximum number of tokens for scraped text
 # Configuration constants
 DEFAULT_SLEEP_AFTER_RETRIES = 12 * 60 * 60  # 12 hours in seconds
 RETRY_SLEEP_INTERVAL = 5  # seconds
-CONCURRENCY_CHECK_INTERVAL = 0.1  # second
 
 
 class ExtractionStats:
@@ -130,67 +153,68 @@ def parse_args():
         default=25,
         help="Queue would not be polled if there are more than this many manufacturers are being processed concurrently.",
     )
+    parser.add_argument(
+        "--visibility_timeout",
+        type=int,
+        default=DEFAULT_VISIBILITY_TIMEOUT,
+        help="Seconds a received message stays hidden from other consumers, extended by a heartbeat while it is processed.",
+    )
+    parser.add_argument(
+        "--chunking_backend",
+        type=str,
+        choices=CHUNKING_BACKENDS,
+        default="thread",
+        help="Where large texts are tokenized for chunking: 'thread' pool or 'process' pool (one worker per core).",
+    )
+    parser.add_argument(
+        "--max_concurrent_fields_per_manufacturer",
+        type=int,
+        default=DEFAULT_MAX_CONCURRENT_STEPS_PER_MANUFACTURER,
+        help="How many fields of one manufacturer are extracted at the same time.",
+    )
+    parser.add_argument(
+        "--max_concurrent_llm_fields",
+        type=int,
+        default=DEFAULT_MAX_CONCURRENT_LLM_STEPS,
+        help="How many LLM field extractions run at the same time across all manufacturers.",
+    )
     return parser.parse_args()
 
 
 async def process_queue(
-    poll_item_from_queue: Callable[
-        [],
-        Awaitable[tuple[ToExtractItem, str] | tuple[None, None]],
-    ],
-    delete_item_from_queue: Callable[[str], Awaitable[None]],
-    max_concurrent_manufacturers: int = 25,
+    consumer: SQSBatchConsumer[ToExtractItem],
+    max_concurrent_fields_per_manufacturer: int = DEFAULT_MAX_CONCURRENT_STEPS_PER_MANUFACTURER,
 ):
-
-    concurrent_manufacturers = set()
     extraction_stats = ExtractionStats()  # Initialize timing stats
-    try:
-        while True:
-            # Check if we are at the concurrency threshold
-            if len(concurrent_manufacturers) >= max_concurrent_manufacturers:
-                await asyncio.sleep(CONCURRENCY_CHECK_INTERVAL)  # lets other tasks run
-                continue
-
-            item, receipt_handle = (
-                await poll_item_from_queue()
-            )  # 10 second long poll, doesn't block, yields control back to event loop
-
-            if item is None:
-                continue
-            elif not receipt_handle:
-                logger.warning("No receipt handle found, skipping this message.")
-                continue
-
-            polled_at = get_current_time()
-
-            # Validate manufacturer before processing
-            manufacturer, scraped_text_file, should_continue = (
-                await validate_manufacturer_for_extraction(polled_at, item)
-            )
 
-            if not should_continue:
-                # Delete invalid item from queue and continue
-                await delete_item_from_queue(receipt_handle)
-                continue
-
-            # Help Pylance know we are now certain manufacturer is not None
-            assert manufacturer is not None
-            assert scraped_text_file is not None
-
-            task = asyncio.create_task(
-                extract_and_cleanup(
-                    item,
-                    polled_at,
-                    scraped_text_file,
-                    manufacturer,
-                    receipt_handle,
-                    delete_item_from_queue,
-                    concurrent_manufacturers,
-                    extraction_stats,
-                )
-            )
-            concurrent_manufacturers.add(task)
+    async def handle_item(item: ToExtractItem) -> None:
+        polled_at = get_current_time()
+
+        # Validate manufacturer before processing
+        manufacturer, scraped_text_file, should_continue = (
+            await validate_manufacturer_for_extraction(polled_at, item)
+        )
 
+        if not should_continue:
+            return  # the consumer deletes the invalid item from the queue
+
+        # Help Pylance know we are now certain manufacturer is not None
+        assert manufacturer is not None
+        assert scraped_text_file is not None
+
+        await extract_and_cleanup(
+            item,
+            polled_at,
+            scraped_text_file,
+            manufacturer,
+            extraction_stats,
+            max_concurrent_fields_per_manufacturer,
+        )
+
+    try:
+        # receives as many items as there are free manufacturer slots, keeps the
+        # ones being extracted invisible to other bots and deletes them when done
+        await consumer.run(handle_item)
     except Exception as e:
         logger.error(f"Error processing Extract Queue message: {e}")
         await ExtractionError.insert_one(
@@ -285,157 +309,18 @@ async def validate_manufacturer_for_extraction(
     return manufacturer, existing_scraped_file, True
 
 
-async def process_manufacturer(
-    polled_at: datetime,
-    mfg_txt: str,
-    manufacturer: Manufacturer,
-):
-    logger.info(f"Processing manufacturer: {manufacturer}")
-    if not manufacturer.is_manufacturer:
-        try:
-            logger.info(
-                f"Finding out if company {manufacturer.etld1} is a manufacturer."
-            )
-            manufacturer.is_manufacturer = await is_company_a_manufacturer(
-                polled_at,
-                manufacturer.etld1,
-                mfg_txt,
-            )
-
-            await update_manufacturer(
-                updated_at=polled_at,
-                manufacturer=manufacturer,
-            )
-        except Exception as e:
-            logger.error(f"{manufacturer.etld1}.is_manufacturer errored:{e}")
-            await ExtractionError.insert_one(
-                ExtractionError(
-                    created_at=polled_at,
-                    error=str(e),
-                    field="is_manufacturer",
-                    mfg_etld1=manufacturer.etld1,
-                )
-            )
-            return  # if is_manufacturer check fails, skip further processing
-
-    if not manufacturer.email_addresses:
-        try:
-            logger.info(f"Extracting email addresses for {manufacturer.etld1}")
-            manufacturer.email_addresses = await get_validated_emails_from_text_async(
-                manufacturer.etld1, mfg_txt
-            )
-            await update_manufacturer(
-                updated_at=polled_at,
-                manufacturer=manufacturer,
-            )
-        except Exception as e:
-            logger.error(f"{manufacturer.name}.email_addresses errored:{e}")
-            await ExtractionError.insert_one(
-                ExtractionError(
-                    created_at=polled_at,
-                    error=str(e),
-                    field="email_addresses",
-                    mfg_etld1=manufacturer.etld1,
-                )
-            )
-
-    if not manufacturer.business_desc:
-        try:
-            logger.info(
-                f"Finding business description for company {manufacturer.etld1}"
-            )
-            manufacturer.business_desc = (
-                await find_business_desc_using_only_first_chunk(
-                    manufacturer.etld1,
-                    mfg_txt,
-                )
-            )
-
-            await update_manufacturer(
-                updated_at=polled_at,
-                manufacturer=manufacturer,
-            )
-        except Exception as e:
-            logger.error(f"{manufacturer.etld1}.business_desc errored:{e}")
-            await ExtractionError.insert_one(
-                ExtractionError(
-                    created_at=polled_at,
-                    error=str(e),
-                    field="business_desc",
-                    mfg_etld1=manufacturer.etld1,
-                )
-            )
-    """
-    if not manufacturer.is_product_manufacturer:
-        try:
-            logger.info(
-                f"Finding out if company is a product manufacturer: {manufacturer.etld1}"
-            )
-            manufacturer.is_product_manufacturer = await is_product_manufacturer(
-                polled_at, manufacturer.etld1, mfg_txt
-            )
-            await update_manufacturer(
-                updated_at=polled_at,
-                manufacturer=manufacturer,
-            )
-        except Exception as e:
-            logger.error(f"{manufacturer.etld1}.is_product_manufacturer errored:{e}")
-            await ExtractionError.insert_one(
-                ExtractionError(
-                    created_at=polled_at,
-                    error=str(e),
-                    field="is_product_manufacturer",
-                    mfg_etld1=manufacturer.etld1,
-                )
-            )
-
-    if not manufacturer.is_contract_manufacturer:
-        try:
-            logger.info(
-                f"Finding out if company is a contract manufacturer: {manufacturer.etld1}"
-            )
-            manufacturer.is_contract_manufacturer = await is_contract_manufacturer(
-                polled_at, manufacturer.etld1, mfg_txt
-            )
-            await update_manufacturer(
-                updated_at=polled_at,
-                manufacturer=manufacturer,
-            )
-        except Exception as e:
-            logger.error(f"{manufacturer.etld1}.is_contract_manufacturer errored:{e}")
-            await ExtractionError.insert_one(
-                ExtractionError(
-                    created_at=polled_at,
-                    error=str(e),
-                    field="is_contract_manufacturer",
-                    mfg_etld1=manufacturer.etld1,
-                )
-            )
-            return
-    """
+def _needs_results(field: str) -> Callable[[Manufacturer], bool]:
+    def is_missing(manufacturer: Manufacturer) -> bool:
+        value = getattr(manufacturer, field)
+        return not value or value.results is None
 
-    if not manufacturer.addresses:
-        try:
-            logger.info(f"Extracting addresses for {manufacturer.etld1}")
+    return is_missing
 
-            manufacturer.addresses = await extract_address_from_n_chunks(
-                polled_at, manufacturer.etld1, mfg_txt
-            )
-            await update_manufacturer(
-                updated_at=polled_at,
-                manufacturer=manufacturer,
-            )
-        except Exception as e:
-            logger.error(f"{manufacturer.etld1}.addresses errored:{e}")
-            await ExtractionError.insert_one(
-                ExtractionError(
-                    created_at=polled_at,
-                    error=str(e),
-                    field="addresses",
-                    mfg_etld1=manufacturer.etld1,
-                )
-            )
 
+async def is_confirmed_manufacturer(ctx: ExtractionContext) -> bool:
+    """Human ground truth if there is one, otherwise the LLM's is_manufacturer."""
+    manufacturer = ctx.manufacturer
+    assert manufacturer.is_manufacturer is not None
     is_manufacturer_gt = await get_binary_ground_truth(
         manufacturer,
         manufacturer.is_manufacturer.stats.prompt_version_id,
@@ -447,122 +332,132 @@ async def process_manufacturer(
         if is_manufacturer_gt and is_manufacturer_gt.final_decision
         else manufacturer.is_manufacturer
     )
+    return bool(final_decision.answer)
+
+
+# Only the manufacturer gate orders the steps; everything else runs concurrently.
+REALTIME_EXTRACTION_STEPS = [
+    ExtractionStep(
+        "is_manufacturer",
+        run=lambda ctx: is_company_a_manufacturer(
+            ctx.polled_at, ctx.etld1, ctx.mfg_txt
+        ),
+        field="is_manufacturer",
+        is_missing=lambda manufacturer: not manufacturer.is_manufacturer,
+    ),
+    ExtractionStep(
+        "email_addresses",
+        run=lambda ctx: get_validated_emails_from_text_async(ctx.etld1, ctx.mfg_txt),
+        field="email_addresses",
+        is_missing=lambda manufacturer: not manufacturer.email_addresses,
+        uses_llm=False,
+    ),
+    ExtractionStep(
+        "business_desc",
+        run=lambda ctx: find_business_desc_using_only_first_chunk(
+            ctx.etld1, ctx.mfg_txt
+        ),
+        field="business_desc",
+        is_missing=lambda manufacturer: not manufacturer.business_desc,
+    ),
+    ExtractionStep(
+        "addresses",
+        run=lambda ctx: extract_address_from_n_chunks(
+            ctx.polled_at, ctx.etld1, ctx.mfg_txt
+        ),
+        field="addresses",
+        is_missing=lambda manufacturer: not manufacturer.addresses,
+    ),
+    # is_product_manufacturer and is_contract_manufacturer are not extracted in
+    # realtime; they would be more steps like the ones above.
+    ExtractionStep(
+        "confirmed_manufacturer",
+        run=is_confirmed_manufacturer,
+        requires=("is_manufacturer",),
+        uses_llm=False,
+        checkpoint=True,
+    ),
+    ExtractionStep(
+        "products",
+        run=lambda ctx: extract_products(
+            ctx.polled_at, ctx.etld1, ctx.mfg_txt, ctx.s3_version_id
+        ),
+        field="products",
+        is_missing=_needs_results("products"),
+        requires=("confirmed_manufacturer",),
+    ),
+    ExtractionStep(
+        "certificates",
+        run=lambda ctx: extract_certificates(
+            ctx.polled_at, ctx.etld1, ctx.mfg_txt, ctx.s3_version_id
+        ),
+        field="certificates",
+        is_missing=_needs_results("certificates"),
+        requires=("confirmed_manufacturer",),
+    ),
+    ExtractionStep(
+        "industries",
+        run=lambda ctx: extract_industries(
+            ctx.polled_at, ctx.etld1, ctx.mfg_txt, ctx.s3_version_id
+        ),
+        field="industries",
+        is_missing=_needs_results("industries"),
+        requires=("confirmed_manufacturer",),
+    ),
+    ExtractionStep(
+        "material_caps",
+        run=lambda ctx: extract_materials(
+            ctx.polled_at, ctx.etld1, ctx.mfg_txt, ctx.s3_version_id
+        ),
+        field="material_caps",
+        is_missing=_needs_results("material_caps"),
+        requires=("confirmed_manufacturer",),
+    ),
+    ExtractionStep(
+        "process_caps",
+        run=lambda ctx: extract_processes(
+            ctx.polled_at, ctx.etld1, ctx.mfg_txt, ctx.s3_version_id
+        ),
+        field="process_caps",
+        is_missing=_needs_results("process_caps"),
+        requires=("confirmed_manufacturer",),
+    ),
+]
 
-    if not final_decision.answer:
-        logger.info(
-            f"Skipping further extraction for {manufacturer.etld1} as it is not a manufacturer."
-        )
-        return
-
-    if not manufacturer.products or manufacturer.products.results is None:
-        try:
-            logger.info(f"Extracting products for {manufacturer.etld1}")
-            manufacturer.products = await extract_products(
-                polled_at, manufacturer.etld1, mfg_txt
-            )
-            await update_manufacturer(
-                updated_at=polled_at,
-                manufacturer=manufacturer,
-            )
-
-        except Exception as e:
-            logger.error(f"{manufacturer.name}.products errored:{e}")
-            await ExtractionError.insert_one(
-                ExtractionError(
-                    created_at=polled_at,
-                    error=str(e),
-                    field="products",
-                    mfg_etld1=manufacturer.etld1,
-                )
-            )
-
-    if not manufacturer.certificates or manufacturer.certificates.results is None:
-        try:
-            logger.info(f"Extracting certificates for {manufacturer.etld1}")
-            manufacturer.certificates = await extract_certificates(
-                polled_at, manufacturer.etld1, mfg_txt
-            )
-            await update_manufacturer(
-                updated_at=polled_at,
-                manufacturer=manufacturer,
-            )
-
-        except Exception as e:
-            logger.error(f"{manufacturer.name}.certificates errored:{e}")
-            await ExtractionError.insert_one(
-                ExtractionError(
-                    created_at=polled_at,
-                    error=str(e),
-                    field="certificates",
-                    mfg_etld1=manufacturer.etld1,
-                )
-            )
-
-    if not manufacturer.industries or manufacturer.industries.results is None:
-        try:
-            logger.info(f"Extracting industries for {manufacturer.etld1}")
-            manufacturer.industries = await extract_industries(
-                polled_at, manufacturer.etld1, mfg_txt
-            )
-            await update_manufacturer(
-                updated_at=polled_at,
-                manufacturer=manufacturer,
-            )
 
-        except Exception as e:
-            logger.error(f"{manufacturer.name}.industries errored:{e}")
-            await ExtractionError.insert_one(
-                ExtractionError(
-                    created_at=polled_at,
-                    error=str(e),
-                    field="industries",
-                    mfg_etld1=manufacturer.etld1,
-                )
-            )
-
-    if not manufacturer.material_caps or manufacturer.material_caps.results is None:
-        try:
-            logger.info(f"Extracting materials for {manufacturer.etld1}")
-            manufacturer.material_caps = await extract_materials(
-                polled_at, manufacturer.etld1, mfg_txt
-            )
-            await update_manufacturer(
-                updated_at=polled_at,
-                manufacturer=manufacturer,
-            )
+async def process_manufacturer(
+    polled_at: datetime,
+    mfg_txt: str,
+    manufacturer: Manufacturer,
+    s3_version_id: str | None = None,
+    max_concurrent_fields: int = DEFAULT_MAX_CONCURRENT_STEPS_PER_MANUFACTURER,
+):
+    logger.info(f"Processing manufacturer: {manufacturer}")
 
-        except Exception as e:
-            logger.error(f"{manufacturer.name}.material_caps errored:{e}")
-            await ExtractionError.insert_one(
-                ExtractionError(
-                    created_at=polled_at,
-                    error=str(e),
-                    field="material_caps",
-                    mfg_etld1=manufacturer.etld1,
-                )
-            )
+    async def persist(fields: list[str]):
+        # writes every field assigned since the last write, these included
+        await update_manufacturer(updated_at=polled_at, manufacturer=manufacturer)
 
-    if not manufacturer.process_caps or manufacturer.process_caps.results is None:
-        try:
-            logger.info(f"Extracting processes for {manufacturer.etld1}")
-            manufacturer.process_caps = await extract_processes(
-                polled_at, manufacturer.etld1, mfg_txt
-            )
-            await update_manufacturer(
-                updated_at=polled_at,
-                manufacturer=manufacturer,
+    async def record_error(field: str, error: Exception):
+        await ExtractionError.insert_one(
+            ExtractionError(
+                created_at=polled_at,
+                error=str(error),
+                field=field,
+                mfg_etld1=manufacturer.etld1,
             )
+        )
 
-        except Exception as e:
-            logger.error(f"{manufacturer.name}.process_caps errored:{e}")
-            await ExtractionError.insert_one(
-                ExtractionError(
-                    created_at=polled_at,
-                    error=str(e),
-                    field="process_caps",
-                    mfg_etld1=manufacturer.etld1,
-                )
-            )
+    scheduler = FieldExtractionScheduler(
+        REALTIME_EXTRACTION_STEPS,
+        max_concurrent_steps=max_concurrent_fields,
+        llm_semaphore=get_llm_step_semaphore(),
+    )
+    return await scheduler.run(
+        ExtractionContext(polled_at, mfg_txt, manufacturer, s3_version_id),
+        persist=persist,
+        on_error=record_error,
+    )
 
 
 async def extract_and_cleanup(
@@ -570,15 +465,19 @@ async def extract_and_cleanup(
     polled_at: datetime,
     scraped_text_file: ScrapedTextFile,
     manufacturer: Manufacturer,
-    receipt_handle: str,
-    delete_item_from_queue,
-    concurrent_manufacturers: set,
     extraction_stats: ExtractionStats,
+    max_concurrent_fields: int = DEFAULT_MAX_CONCURRENT_STEPS_PER_MANUFACTURER,
 ):
     """Extract manufacturer data and handle cleanup tasks."""
     start_time = get_current_time()
     try:
-        await process_manufacturer(polled_at, scraped_text_file.text, manufacturer)
+        await process_manufacturer(
+            polled_at,
+            scraped_text_file.text,
+            manufacturer,
+            scraped_text_file.s3_version_id,
+            max_concurrent_fields,
+        )
         logger.info(f"Manufacturer processed at {polled_at}:\n {manufacturer}\n\n")
 
         logger.info(
@@ -645,18 +544,13 @@ async def extract_and_cleanup(
         )
     finally:
         # Always clean up
-        concurrent_manufacturers.discard(asyncio.current_task())
-        await delete_item_from_queue(receipt_handle)
+        get_chunk_plan_cache().evict(scraped_text_file.s3_version_id)
 
 
 async def async_main():
-    from core.utils.aws.queue.extract_queue_util import (
-        poll_item_from_extract_queue,
-        delete_item_from_extract_queue,
-    )
+    from core.utils.aws.queue.extract_queue_util import EXTRACT_QUEUE_URL
     from core.utils.aws.queue.priority_extract_queue_util import (
-        poll_item_from_priority_extract_queue,
-        delete_item_from_priority_extract_queue,
+        PRIORITY_EXTRACT_QUEUE_URL,
     )
 
     await init_db()
@@ -683,20 +577,36 @@ async def async_main():
 
     if args.priority:
         logger.info("Running extraction in priority mode")
-        poll_item_from_queue = poll_item_from_priority_extract_queue
-        delete_item_from_queue = delete_item_from_priority_extract_queue
+        queue_name, queue_url = "Priority Extract queue", PRIORITY_EXTRACT_QUEUE_URL
     else:
         logger.info("Running extraction in normal mode")
-        poll_item_from_queue = poll_item_from_extract_queue
-        delete_item_from_queue = delete_item_from_extract_queue
+        queue_name, queue_url = "Extract queue", EXTRACT_QUEUE_URL
+    assert queue_url, f"{queue_name} URL is not set"
+
+    consumer = SQSBatchConsumer(
+        get_extract_queue_client(),
+        queue_url,
+        parse_body=ToExtractItem.model_validate_json,
+        max_in_flight=args.max_concurrent_manufacturers,
+        visibility_timeout=args.visibility_timeout,
+        name=queue_name,
+    )
+
+    set_chunking_backend(args.chunking_backend)
+    set_max_concurrent_llm_steps(args.max_concurrent_llm_fields)
 
     try:
-        await process_queue(
-            poll_item_from_queue,
-            delete_item_from_queue,
-            args.max_concurrent_manufacturers,
-        )
+        await process_queue(consumer, args.max_concurrent_fields_per_manufacturer)
     finally:
+        scraped_text_cache = get_scraped_text_cache()
+        if scraped_text_cache is not None:
+            scraped_text_cache.log_stats()
+        llm_response_cache = get_llm_response_cache()
+        if llm_response_cache is not None:
+            llm_response_cache.log_stats()
+        log_manufacturer_write_stats()
+        shutdown_chunk_process_pool(wait=True)
+        shutdown_chunk_thread_pool(wait=True)
         # Clean up AWS clients
         await cleanup_data_etl_aws_clients()
         await cleanup_core_aws_clients()
@@ -1,5 +1,6 @@
 import asyncio
 import logging
+from contextlib import aclosing
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
@@ -8,6 +9,7 @@ from typing import Optional
 
 from core.models.base_files import CSVFile
 from core.models.db.deferred_manufacturer import DeferredManufacturer
+from core.models.gpt_batch_request_blob import GPTBatchRequestBlob
 from core.services.manufacturer_service import (
     find_manufacturer_by_etld1,
 )
@@ -15,8 +17,10 @@ from core.services.gpt_batch_request_service import (
     find_gpt_batch_requests_by_custom_ids,
 )
 from core.services.deferred_manufacturer_service import (
+    DeferredManufacturerPendingRequests,
     get_deferred_manufacturer_by_etld1_scraped_file_version,
     get_embedded_gpt_request_ids,
+    iterate_deferred_manufacturer_pending_requests,
 )
 from core.utils.batch_jsonl_file_writer import (
     BatchRequestJSONLFileWriter,
@@ -37,12 +41,13 @@ async def _process_single_deferred_manufacturer(
     batch_request_jsonl_file_writer: BatchRequestJSONLFileWriter,
     df_mfgs_with_orphan_custom_ids_file: CSVFile,
     use_async_write: bool = False,
+    excluded_custom_ids: frozenset[str] = frozenset(),
 ) -> int:
     """
     Process a single deferred manufacturer and write its batch requests.
 
     Returns:
-        Number of pending requests written (0 or 1 to indicate if manufacturer had pending requests)
+        Number of pending requests written (0 or 1 to indicate if manufacturer had pending requests written)
     """
     logger.debug(f"Processing DeferredManufacturer {df_mfg_doc['mfg_etld1']}")
     deferred_mfg = DeferredManufacturer(**df_mfg_doc)
@@ -141,21 +146,105 @@ async def _process_single_deferred_manufacturer(
         )
         return 0
 
+    return await _write_pending_request_blobs(
+        mfg_etld1=deferred_mfg.mfg_etld1,
+        pending_request_blobs=pending_request_blobs,
+        batch_request_jsonl_file_writer=batch_request_jsonl_file_writer,
+        use_async_write=use_async_write,
+        excluded_custom_ids=excluded_custom_ids,
+    )
+
+
+async def _process_deferred_manufacturer_pending_requests(
+    pending: DeferredManufacturerPendingRequests,
+    timestamp: datetime,
+    mfg_orchestrator: ManufacturerExtractionOrchestrator,
+    batch_request_jsonl_file_writer: BatchRequestJSONLFileWriter,
+    df_mfgs_with_orphan_custom_ids_file: CSVFile,
+    use_async_write: bool = False,
+    excluded_custom_ids: frozenset[str] = frozenset(),
+) -> int:
+    """
+    Write the pending batch requests found by the aggregation for a deferred
+    manufacturer. Manufacturers without embedded requests or with orphan ones
+    go through _process_single_deferred_manufacturer, which reprocesses them.
+
+    Returns:
+        Number of pending requests written (0 or 1 to indicate if manufacturer had pending requests written)
+    """
+    if not pending.embedded_custom_ids or pending.missing_custom_ids:
+        df_mfg_doc = await DeferredManufacturer.get_pymongo_collection().find_one(
+            {
+                "mfg_etld1": pending.mfg_etld1,
+                "scraped_text_file_version_id": pending.scraped_text_file_version_id,
+            }
+        )
+        if df_mfg_doc is None:
+            logger.info(f"DeferredManufacturer {pending.mfg_etld1} is gone; skipping.")
+            return 0
+        return await _process_single_deferred_manufacturer(
+            df_mfg_doc=df_mfg_doc,
+            timestamp=timestamp,
+            mfg_orchestrator=mfg_orchestrator,
+            batch_request_jsonl_file_writer=batch_request_jsonl_file_writer,
+            df_mfgs_with_orphan_custom_ids_file=df_mfgs_with_orphan_custom_ids_file,
+            use_async_write=use_async_write,
+            excluded_custom_ids=excluded_custom_ids,
+        )
+
+    if not pending.pending_request_blobs:
+        logger.debug(
+            f"No pending GPTBatchRequests for DeferredManufacturer {pending.mfg_etld1}; skipping."
+        )
+        return 0
+
+    return await _write_pending_request_blobs(
+        mfg_etld1=pending.mfg_etld1,
+        pending_request_blobs=pending.pending_request_blobs,
+        batch_request_jsonl_file_writer=batch_request_jsonl_file_writer,
+        use_async_write=use_async_write,
+        excluded_custom_ids=excluded_custom_ids,
+    )
+
+
+async def _write_pending_request_blobs(
+    mfg_etld1: str,
+    pending_request_blobs: list[GPTBatchRequestBlob],
+    batch_request_jsonl_file_writer: BatchRequestJSONLFileWriter,
+    use_async_write: bool,
+    excluded_custom_ids: frozenset[str] = frozenset(),
+) -> int:
+    if excluded_custom_ids:
+        # already written to a batch file that is still being uploaded
+        pending_request_blobs = [
+            request_blob
+            for request_blob in pending_request_blobs
+            if request_blob.custom_id not in excluded_custom_ids
+        ]
+        if not pending_request_blobs:
+            return 0
+
     logger.debug(
-        f"DeferredManufacturer {deferred_mfg.mfg_etld1}: "
+        f"DeferredManufacturer {mfg_etld1}: "
         f"{len(pending_request_blobs):,} pending GPTBatchRequests to write"
     )
 
     if use_async_write:
-        await batch_request_jsonl_file_writer.write_item_request_blobs_async(
-            item_id=deferred_mfg.mfg_etld1, request_blobs=pending_request_blobs
+        written = await batch_request_jsonl_file_writer.write_item_request_blobs_async(
+            item_id=mfg_etld1, request_blobs=pending_request_blobs
         )
     else:
-        batch_request_jsonl_file_writer.write_item_request_blobs(
-            item_id=deferred_mfg.mfg_etld1, request_blobs=pending_request_blobs
+        pending_request_blobs = (
+            await batch_request_jsonl_file_writer.hydrate_request_blobs(
+                pending_request_blobs
+            )
+        )
+        written = batch_request_jsonl_file_writer.write_item_request_blobs(
+            item_id=mfg_etld1, request_blobs=pending_request_blobs
         )
 
-    return 1
+    # a manufacturer left out for lack of room is picked up by a later run
+    return 1 if written else 0
 
 
 @dataclass
@@ -186,7 +275,14 @@ async def iterate_df_manufacturers_and_write_batch_files(
     max_manufacturers: Optional[int] = None,
     parallel_processing: bool = False,
     max_concurrent_manufacturers: int = 50,
+    excluded_custom_ids: frozenset[str] = frozenset(),
 ) -> BatchFileGenerationResult:
+    """
+    Write the pending requests of deferred manufacturers into batch files.
+
+    excluded_custom_ids are left out even though they are still pending, e.g.
+    requests already written to a file that is uploading but not paired yet.
+    """
     # result = BatchFileGenerationResult(
     #     files=[], df_mfgs_with_orphan_custom_ids=CSVFile(output_dir=output_dir, )
     # )
@@ -222,25 +318,28 @@ async def iterate_df_manufacturers_and_write_batch_files(
             total_processed = 0
             max_files_reached = False
 
-            async def process_with_semaphore(df_mfg_doc: dict):
+            async def process_with_semaphore(
+                pending: DeferredManufacturerPendingRequests,
+            ):
                 async with semaphore:
-                    return await _process_single_deferred_manufacturer(
-                        df_mfg_doc=df_mfg_doc,
+                    return await _process_deferred_manufacturer_pending_requests(
+                        pending=pending,
                         timestamp=timestamp,
                         mfg_orchestrator=mfg_orchestrator,
                         batch_request_jsonl_file_writer=batch_request_jsonl_file_writer,
                         df_mfgs_with_orphan_custom_ids_file=df_mfgs_with_orphan_custom_ids_file,
                         use_async_write=True,  # Use async write for thread safety
+                        excluded_custom_ids=excluded_custom_ids,
                     )
 
-            async with (
-                DeferredManufacturer.get_pymongo_collection()
-                .find(query_filter)
-                .sort("scraped_text_file_num_tokens", 1)  # 1 = ascending
-                .sort("updated_at", -1)  # -1 = newest first
-            ) as cursor:
-                async for df_mfg_doc in cursor:
-                    task = asyncio.create_task(process_with_semaphore(df_mfg_doc))
+            async with aclosing(
+                iterate_deferred_manufacturer_pending_requests(
+                    query_filter=query_filter,
+                    sort={"updated_at": -1},  # -1 = newest first
+                )
+            ) as pending_requests:
+                async for pending in pending_requests:
+                    task = asyncio.create_task(process_with_semaphore(pending))
                     current_batch.append(task)
 
                     # When batch is full, process it and check for MaxFilesReachedException
@@ -319,21 +418,22 @@ async def iterate_df_manufacturers_and_write_batch_files(
 
         else:
             # Sequential processing mode (original implementation)
-            async with (
-                DeferredManufacturer.get_pymongo_collection()
-                .find(query_filter)
-                .sort("scraped_text_file_num_tokens", 1)  # 1 = ascending
-                .sort("updated_at", 1)  # 1 = oldest first
-            ) as cursor:
-                async for df_mfg_doc in cursor:
+            async with aclosing(
+                iterate_deferred_manufacturer_pending_requests(
+                    query_filter=query_filter,
+                    sort={"updated_at": 1},  # 1 = oldest first
+                )
+            ) as pending_requests:
+                async for pending in pending_requests:
                     try:
-                        result = await _process_single_deferred_manufacturer(
-                            df_mfg_doc=df_mfg_doc,
+                        result = await _process_deferred_manufacturer_pending_requests(
+                            pending=pending,
                             timestamp=timestamp,
                             mfg_orchestrator=mfg_orchestrator,
                             batch_request_jsonl_file_writer=batch_request_jsonl_file_writer,
                             df_mfgs_with_orphan_custom_ids_file=df_mfgs_with_orphan_custom_ids_file,
                             use_async_write=False,  # Sync write is fine for sequential
+                            excluded_custom_ids=excluded_custom_ids,
                         )
                         count += result
 
@@ -356,7 +456,7 @@ async def iterate_df_manufacturers_and_write_batch_files(
         logger.error(f"Error during batch file generation: {e}")
         raise e
     finally:
-        batch_request_jsonl_file_writer.current_file.close_pointer()  # all other prev files closed by writer
+        batch_request_jsonl_file_writer.close_files()
         df_mfgs_with_orphan_custom_ids_file.close_pointer()
         return BatchFileGenerationResult(
             batch_request_jsonl_file_writer=batch_request_jsonl_file_writer,
@@ -3,13 +3,15 @@ import logging
 from datetime import datetime
 from dataclasses import dataclass
 from pathlib import Path
-from openai import OpenAI, OpenAIError, APIConnectionError
+from openai import AsyncOpenAI, OpenAIError, APIConnectionError
 from openai.types import Batch
 from typing import Optional, Callable, Awaitable
 
 from core.utils.batch_jsonl_file_writer import JSONLBatchFile
 from core.models.db.gpt_batch import GPTBatch, GPTBatchMetadata
 from core.services.gpt_batch_service import (
+    find_unprocessed_gpt_batches,
+    update_gpt_batch_from_response,
     insert_gpt_batch_from_response,
     upsert_latest_gpt_batch_by_external_batch,
 )
@@ -23,25 +25,29 @@ from open_ai_key_app.utils.openai_file_util import (
     delete_uploaded_batch_file_from_openai,
     upload_file_to_openai_using_parts,
 )
-from open_ai_key_app.utils.openai_batch_util import fetch_all_batches
-
+from open_ai_key_app.utils.openai_batch_util import (
+    fetch_all_batches,
+    fetch_batches_created_since,
+)
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_MAX_CONCURRENT_TRANSFERS = 2  # batch file uploads/downloads across all keys
+
 
 @dataclass
 class BatchDownloadOutput:
     output_file_path: Path
     error_file_path: Path | None
 
-    def delete_batch_file_from_openai_and_move_output(
-        self, client: OpenAI, input_file_id: str, finished_batches_dir: Path
+    async def delete_batch_file_from_openai_and_move_output(
+        self, client: AsyncOpenAI, input_file_id: str, finished_batches_dir: Path
     ):
         try:
             logger.warning(
                 f"[{client.api_key}]: Deleting {input_file_id} from openai, moving {self.output_file_path} and {self.error_file_path} to {finished_batches_dir}"
             )
-            delete_uploaded_batch_file_from_openai(
+            await delete_uploaded_batch_file_from_openai(
                 client=client, input_file_id=input_file_id
             )
             output_dest = finished_batches_dir / self.output_file_path.name
@@ -62,13 +68,16 @@ class BatchFileSatellite:
     def __init__(
         self,
         output_dir: Path,
+        max_concurrent_transfers: int = DEFAULT_MAX_CONCURRENT_TRANSFERS,
     ) -> None:
         self.download_dir = output_dir
         self.download_dir.mkdir(parents=True, exist_ok=True)
+        # batch files are up to 190MB, this caps the bandwidth all keys share
+        self._transfer_semaphore = asyncio.Semaphore(max_concurrent_transfers)
 
     async def try_uploading_new_batch_file(
         self,
-        client: OpenAI,
+        client: AsyncOpenAI,
         api_key_bundle: APIKeyBundle,
         jsonl_batch_file: JSONLBatchFile,
     ) -> Optional[GPTBatch]:
@@ -83,9 +92,10 @@ class BatchFileSatellite:
                     f"(key: {api_key_bundle.label}, "
                     f"attempt {attempt + 1}/{per_key_retries})"
                 )
-                batch_input_file_id = await upload_file_to_openai_using_parts(
-                    client=client, jsonl_batch_file=jsonl_batch_file
-                )
+                async with self._transfer_semaphore:
+                    batch_input_file_id = await upload_file_to_openai_using_parts(
+                        client=client, jsonl_batch_file=jsonl_batch_file
+                    )
                 if not batch_input_file_id:
                     raise ValueError("upload_file_to_openai_using_parts returned None")
                     # will catch below and retry
@@ -107,7 +117,7 @@ class BatchFileSatellite:
                     total_tokens=summary.total_tokens,
                     api_key_label=api_key_bundle.label,
                 )
-                batch_response = client.batches.create(
+                batch_response = await client.batches.create(
                     input_file_id=batch_input_file_id,
                     endpoint="/v1/chat/completions",
                     completion_window="24h",
@@ -168,8 +178,8 @@ class BatchFileSatellite:
                 )  # 5 minutes cooldown
                 break
 
-    def download_batch_output(
-        self, client: OpenAI, gpt_batch: GPTBatch
+    async def download_batch_output(
+        self, client: AsyncOpenAI, gpt_batch: GPTBatch
     ) -> BatchDownloadOutput:
         # download the output file
         if not gpt_batch.output_file_id:
@@ -179,41 +189,87 @@ class BatchFileSatellite:
 
         output_filename = f"{gpt_batch.external_batch_id}_output.jsonl"
         output_file_path = self.download_dir / output_filename
-        download_openai_file(
-            client=client,
-            output_type="output",
-            output_path=output_file_path,
-            openai_file_id=gpt_batch.output_file_id,
-        )
-
-        error_file_path = None
-        if gpt_batch.error_file_id:
-            error_filename = f"{gpt_batch.external_batch_id}_error.jsonl"
-            error_file_path = self.download_dir / error_filename
-            download_openai_file(
+        async with self._transfer_semaphore:
+            await download_openai_file(
                 client=client,
-                output_type="error",
-                output_path=error_file_path,
-                openai_file_id=gpt_batch.error_file_id,
+                output_type="output",
+                output_path=output_file_path,
+                openai_file_id=gpt_batch.output_file_id,
             )
 
+            error_file_path = None
+            if gpt_batch.error_file_id:
+                error_filename = f"{gpt_batch.external_batch_id}_error.jsonl"
+                error_file_path = self.download_dir / error_filename
+                await download_openai_file(
+                    client=client,
+                    output_type="error",
+                    output_path=error_file_path,
+                    openai_file_id=gpt_batch.error_file_id,
+                )
+
         return BatchDownloadOutput(
             output_file_path=output_file_path, error_file_path=error_file_path
         )
 
     async def get_synced_gpt_batches(
-        self, client: OpenAI, api_key_bundle: APIKeyBundle
+        self, client: AsyncOpenAI, api_key_bundle: APIKeyBundle
     ) -> list[GPTBatch]:
-        all_batches: list[Batch] = fetch_all_batches(client=client)
+        """
+        The key's batches we have not finished processing, with their latest
+        OpenAI status. Only batches that OpenAI may still change are retrieved,
+        plus the batches created since api_key_bundle.batch_sync_cursor; the
+        whole history is listed only when there is no cursor yet.
+        """
+        unprocessed = await find_unprocessed_gpt_batches(api_key_bundle.label)
+        open_batches = [
+            gpt_batch for gpt_batch in unprocessed if not gpt_batch.is_status_final()
+        ]
 
-        synced_gpt_batches = await asyncio.gather(
+        if api_key_bundle.batch_sync_cursor is None:
+            new_batches: list[Batch] = await fetch_all_batches(client=client)
+        else:
+            new_batches = await fetch_batches_created_since(
+                client=client, created_since=api_key_bundle.batch_sync_cursor
+            )
+        new_batch_ids = {batch.id for batch in new_batches}
+
+        async def refresh(gpt_batch: GPTBatch) -> bool:
+            batch = await client.batches.retrieve(gpt_batch.external_batch_id)
+            return await update_gpt_batch_from_response(
+                batch_response=batch, gpt_batch=gpt_batch
+            )
+
+        # batches in new_batches are synced below, from the listing
+        refreshed = await asyncio.gather(
+            *[
+                refresh(gpt_batch)
+                for gpt_batch in open_batches
+                if gpt_batch.external_batch_id not in new_batch_ids
+            ]
+        )
+        synced_new_batches = await asyncio.gather(
             *[
                 upsert_latest_gpt_batch_by_external_batch(
                     external_batch=batch,
                     api_key_bundle=api_key_bundle,
                 )
-                for batch in all_batches
+                for batch in new_batches
             ]
         )
+        if new_batches:
+            await api_key_bundle.advance_batch_sync_cursor(
+                max(batch.created_at for batch in new_batches)
+            )
+
+        logger.info(
+            f"get_synced_gpt_batches[{api_key_bundle.label}]: retrieved {len(refreshed)} open batches "
+            f"({sum(refreshed)} changed), listed {len(new_batches)} new batches"
+        )
 
-        return synced_gpt_batches
+        synced_by_id = {
+            gpt_batch.external_batch_id: gpt_batch for gpt_batch in unprocessed
+        }
+        for gpt_batch in synced_new_batches:  # the freshest copies
+            synced_by_id[gpt_batch.external_batch_id] = gpt_batch
+        return list(synced_by_id.values())
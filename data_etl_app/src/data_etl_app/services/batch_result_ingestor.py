@@ -0,0 +1,240 @@
+"""
+Streaming ingestion of a finished OpenAI batch output file.
+
+The output of a batch of up to 50k requests used to be turned into one list
+of UpdateOne operations before anything was written, and manufacturers were
+processed only after the whole file was in Mongo. BatchResultIngestor reads
+the file line by line and hands the updates to a writer task in windows of
+flush_window_size operations. At most max_pending_windows windows wait for
+the writer, so memory stays flat whatever the batch size, and parsing goes
+on while the previous window is being written.
+
+Windows are written one after the other, in order. Once the window holding
+the last expected request of a manufacturer is written, the manufacturer is
+handed to process_manufacturers while later lines are still being parsed.
+"""
+
+import asyncio
+import json
+import logging
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Awaitable, Callable
+
+from pymongo import UpdateOne
+
+from data_etl_app.utils.gpt_batch_request_util import (
+    parse_individual_batch_req_response_raw,
+)
+
+try:
+    import orjson
+except ImportError:  # the standard json module is used without orjson
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FLUSH_WINDOW_SIZE = 5_000
+DEFAULT_MAX_PENDING_WINDOWS = 2
+
+# writes one window of updates, returns (upserted, updated)
+WriteWindow = Callable[[list[UpdateOne]], Awaitable[tuple[int, int]]]
+# processes manufacturers whose batch requests are all written
+ProcessManufacturers = Callable[[list[str]], Awaitable[None]]
+
+
+def loads_json_line(line: bytes) -> dict:
+    if orjson is not None:
+        return orjson.loads(line)  # orjson.JSONDecodeError is a json.JSONDecodeError
+    return json.loads(line)
+
+
+def get_mfg_etld1(custom_id: str) -> str:
+    return custom_id.split(">")[0]
+
+
+@dataclass
+class SingleBatchStats:
+    total_output_lines: int = 0
+    failed_output_parses: int = 0
+    total_error_lines: int = 0
+    failed_error_parses: int = 0
+    upserted: int = 0  # must remain zero lol
+    updated: int = 0
+    output_errors: int = 0
+    error_file_errors: int = 0
+    missing_custom_ids: int = 0
+    update_operations: int = 0
+    windows_written: int = 0
+    mfgs_released_early: int = 0  # processed while the file was still being read
+    mfgs_released: int = 0
+
+
+class BatchResultIngestor:
+    def __init__(
+        self,
+        batch_id: str,
+        expected_custom_ids: set[str],
+        updated_at: datetime,
+        write_window: WriteWindow,
+        process_manufacturers: ProcessManufacturers,
+        flush_window_size: int = DEFAULT_FLUSH_WINDOW_SIZE,
+        max_pending_windows: int = DEFAULT_MAX_PENDING_WINDOWS,
+        log_id: str = "",
+    ):
+        if flush_window_size < 1 or max_pending_windows < 1:
+            raise ValueError(
+                "flush_window_size and max_pending_windows must be at least 1"
+            )
+        self.batch_id = batch_id
+        self.updated_at = updated_at
+        self.write_window = write_window
+        self.process_manufacturers = process_manufacturers
+        self.flush_window_size = flush_window_size
+        self.max_pending_windows = max_pending_windows
+        self.log_id = log_id or batch_id
+        self.stats = SingleBatchStats()
+
+        self._missing_custom_ids = set(expected_custom_ids)
+        self._remaining_by_mfg = Counter(
+            get_mfg_etld1(custom_id) for custom_id in expected_custom_ids
+        )
+        self._mfgs_with_output: set[str] = set()
+        self._released_mfgs: set[str] = set()
+        self._window: list[UpdateOne] = []
+        self._window_mfgs: list[str] = []  # complete once this window is written
+        self._processing: list[asyncio.Task] = []
+
+    async def ingest(self, output_file_path: Path) -> SingleBatchStats:
+        """
+        Write the results in output_file_path, reset the batch_id of expected
+        requests that have none, and process every manufacturer that had a
+        result. Raises the first error of write_window, after the manufacturers
+        already handed over are done.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_pending_windows)
+        writer = asyncio.create_task(self._write_windows(queue))
+        try:
+            with open(output_file_path, "rb") as f:
+                for line_num, line in enumerate(f):
+                    self._add_output_line(line_num, line)
+                    if len(self._window) >= self.flush_window_size:
+                        await self._hand_over_window(queue, writer)
+
+            self._add_missing_custom_id_resets()
+            # manufacturers with missing results are processed with what they have
+            self._window_mfgs.extend(
+                sorted(self._mfgs_with_output - self._released_mfgs)
+            )
+            self._released_mfgs.update(self._window_mfgs)
+            await self._hand_over_window(queue, writer, last=True)
+            await self._put(queue, writer, None)
+            await writer
+        finally:
+            if not writer.done():
+                writer.cancel()
+            await asyncio.gather(*self._processing, return_exceptions=True)
+
+        logger.info(f"{self.log_id}: Ingested batch results, stats:\n{self.stats}")
+        return self.stats
+
+    def _add_output_line(self, line_num: int, line: bytes) -> None:
+        self.stats.total_output_lines += 1
+        try:
+            raw_result = loads_json_line(line)
+            custom_id = raw_result.get("custom_id")
+            if not custom_id:
+                logger.warning(f"Line {line_num}: Missing custom_id, skipping")
+                self.stats.failed_output_parses += 1
+                return
+
+            response_blob = parse_individual_batch_req_response_raw(
+                raw_result, self.batch_id
+            )
+        except json.JSONDecodeError as e:
+            logger.error(f"Line {line_num}: JSON decode error - {e}")
+            self.stats.failed_output_parses += 1
+            return
+        except Exception as e:
+            logger.error(
+                f"Line {line_num}: Error processing result - {e}", exc_info=True
+            )
+            self.stats.output_errors += 1
+            return
+
+        self._window.append(
+            UpdateOne(
+                {"request.custom_id": custom_id},  # Filter
+                {
+                    "$set": {
+                        "batch_id": self.batch_id,
+                        "response_blob": response_blob.model_dump(exclude={"result"}),
+                        "updated_at": self.updated_at,
+                    }
+                },
+                upsert=False,  # Doesn't create new documents if filter unmatched
+            )
+        )
+
+        mfg_etld1 = get_mfg_etld1(custom_id)
+        self._mfgs_with_output.add(mfg_etld1)
+        if custom_id in self._missing_custom_ids:
+            self._missing_custom_ids.discard(custom_id)
+            self._remaining_by_mfg[mfg_etld1] -= 1
+            if self._remaining_by_mfg[mfg_etld1] == 0:
+                del self._remaining_by_mfg[mfg_etld1]
+                self._released_mfgs.add(mfg_etld1)
+                self._window_mfgs.append(mfg_etld1)
+
+    def _add_missing_custom_id_resets(self) -> None:
+        if not self._missing_custom_ids:
+            return
+        self.stats.missing_custom_ids = len(self._missing_custom_ids)
+        logger.error(
+            f"{self.log_id}: Missing {len(self._missing_custom_ids)} expected custom_ids in output/error files, "
+            f"Resetting their batch_id to None."
+        )
+        for custom_id in sorted(self._missing_custom_ids):
+            self._window.append(
+                UpdateOne(
+                    {"request.custom_id": custom_id},  # Filter
+                    {"$set": {"batch_id": None, "updated_at": self.updated_at}},
+                    upsert=False,  # Doesn't create new documents if filter unmatched
+                )
+            )
+
+    async def _hand_over_window(
+        self, queue: asyncio.Queue, writer: asyncio.Task, last: bool = False
+    ) -> None:
+        if not self._window and not self._window_mfgs:
+            return
+        window, mfgs = self._window, self._window_mfgs
+        self._window, self._window_mfgs = [], []
+        if not last:
+            self.stats.mfgs_released_early += len(mfgs)
+        await self._put(queue, writer, (window, mfgs))
+        await asyncio.sleep(0)  # let the writer and the manufacturers run
+
+    async def _put(self, queue: asyncio.Queue, writer: asyncio.Task, item) -> None:
+        put = asyncio.ensure_future(queue.put(item))
+        await asyncio.wait({put, writer}, return_when=asyncio.FIRST_COMPLETED)
+        if not put.done():  # the writer failed and will take no more windows
+            put.cancel()
+            writer.result()
+
+    async def _write_windows(self, queue: asyncio.Queue) -> None:
+        while (item := await queue.get()) is not None:
+            window, mfgs = item
+            if window:
+                upserted, updated = await self.write_window(window)
+                self.stats.upserted += upserted
+                self.stats.updated += updated
+                self.stats.update_operations += len(window)
+                self.stats.windows_written += 1
+            if mfgs:
+                self.stats.mfgs_released += len(mfgs)
+                self._processing.append(
+                    asyncio.create_task(self.process_manufacturers(mfgs))
+                )
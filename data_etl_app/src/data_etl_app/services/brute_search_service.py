@@ -1,5 +1,8 @@
 import re
 import logging
+from bisect import bisect_left, bisect_right
+from collections import deque
+from collections.abc import Iterable
 
 from data_etl_app.models.skos_concept import Concept
 
@@ -12,18 +15,216 @@ def word_regex(keyword: str):
     return r"(?<!\w)" + re.escape(keyword) + r"(?=\W|$)"
 
 
+# Characters that re.IGNORECASE treats as equal although their lowercase forms differ
+# (mirrors the equivalence table in CPython's re compiler).
+_CASE_EQUIVALENCES = str.maketrans(
+    {
+        "\u0131": "i",  # dotless i
+        "\u017f": "s",  # long s
+        "\u00b5": "\u03bc",  # micro sign -> mu
+        "\u0345": "\u03b9",  # combining ypogegrammeni -> iota
+        "\u1fbe": "\u03b9",  # prosgegrammeni -> iota
+        "\u1fd3": "\u0390",
+        "\u1fe3": "\u03b0",
+        "\u03d0": "\u03b2",  # beta symbol
+        "\u03f5": "\u03b5",  # lunate epsilon
+        "\u03d1": "\u03b8",  # theta symbol
+        "\u03f0": "\u03ba",  # kappa symbol
+        "\u03d6": "\u03c0",  # pi symbol
+        "\u03f1": "\u03c1",  # rho symbol
+        "\u03c2": "\u03c3",  # final sigma
+        "\u03d5": "\u03c6",  # phi symbol
+        "\u1e9b": "\u1e61",  # long s with dot above
+        "\ufb05": "\ufb06",  # long s t ligature
+    }
+)
+
+
+def _casefold_same_length(text: str) -> str:
+    """
+    Fold text the way re.IGNORECASE compares characters (simple per-character
+    lowercase), keeping every character at its original offset.
+    """
+    folded = text.lower()
+    if len(folded) != len(text):
+        # a few characters (e.g. "İ") lowercase to more than one code point
+        folded = "".join(c.lower()[0] for c in text)
+    return folded.translate(_CASE_EQUIVALENCES)
+
+
+def _is_word_char(c: str) -> bool:
+    # same definition as \w for str patterns
+    return c.isalnum() or c == "_"
+
+
+class ConceptMatcher:
+    """
+    Aho-Corasick automaton over the matchLabels of a set of concepts.
+
+    Finds every case-insensitive occurrence of every label in one pass over the text,
+    with the same word-boundary rules as word_regex: no word character directly
+    before the match, and a non-word character or end of text directly after it.
+    """
+
+    def __init__(self, concepts: Iterable[Concept]):
+        self.concepts: list[Concept] = list(concepts)
+
+        # trie
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        # for each state, the (label_length, concept_ids) of every label ending there,
+        # including labels that are proper suffixes (merged in from failure links)
+        self._out: list[list[tuple[int, tuple[int, ...]]]] = [[]]
+
+        concept_ids_by_label: dict[str, list[int]] = {}
+        for concept_id, concept in enumerate(self.concepts):
+            for label in concept.matchLabels:
+                if not label:
+                    continue
+                concept_ids_by_label.setdefault(
+                    _casefold_same_length(label), []
+                ).append(concept_id)
+
+        for label, concept_ids in concept_ids_by_label.items():
+            state = 0
+            for ch in label:
+                next_state = self._goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][ch] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = next_state
+            self._out[state].append((len(label), tuple(dict.fromkeys(concept_ids))))
+
+        self._build_failure_links()
+
+    @property
+    def num_states(self) -> int:
+        return len(self._goto)
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[next_state] = target
+                self._out[next_state] = self._out[next_state] + self._out[target]
+
+    def find_matches(self, text: str) -> list[tuple[int, int, Concept]]:
+        """
+        Every (start, end, concept) label occurrence in text, ordered by end offset.
+        """
+        folded = _casefold_same_length(text)
+        goto = self._goto
+        fail = self._fail
+        out = self._out
+        concepts = self.concepts
+        text_len = len(text)
+
+        matches: list[tuple[int, int, Concept]] = []
+        state = 0
+        for i, ch in enumerate(folded):
+            next_state = goto[state].get(ch)
+            while next_state is None and state:
+                state = fail[state]
+                next_state = goto[state].get(ch)
+            state = next_state or 0
+
+            if not out[state]:
+                continue
+
+            end = i + 1
+            if end < text_len and _is_word_char(text[end]):
+                continue
+            for label_len, concept_ids in out[state]:
+                start = end - label_len
+                if start and _is_word_char(text[start - 1]):
+                    continue
+                for concept_id in concept_ids:
+                    matches.append((start, end, concepts[concept_id]))
+
+        return matches
+
+    def search(self, text: str) -> set[Concept]:
+        return {concept for _, _, concept in self.find_matches(text)}
+
+    def search_chunks(
+        self, text: str, chunk_bounds: Iterable[str]
+    ) -> dict[str, set[Concept]]:
+        """
+        Concepts found in each "start:end" chunk of text, from a single scan.
+
+        A match is attributed to every chunk that fully contains it. Chunk bounds are
+        expected on line boundaries (as produced by chunk_util), where the text around
+        a chunk edge is a line break and word boundaries match searching the chunk alone.
+        """
+        keys = list(chunk_bounds)
+        bounds = [tuple(map(int, key.split(":"))) for key in keys]
+        results: dict[str, set[Concept]] = {key: set() for key in keys}
+        if not bounds:
+            return results
+
+        scan_start = min(start for start, _ in bounds)
+        scan_end = max(end for _, end in bounds)
+        matches = self.find_matches(text[scan_start:scan_end])
+        match_starts = [start + scan_start for start, _, _ in matches]
+        match_ends = [end + scan_start for _, end, _ in matches]
+
+        # matches are ordered by end offset
+        for key, (chunk_start, chunk_end) in zip(keys, bounds):
+            found = results[key]
+            for i in range(
+                bisect_left(match_ends, chunk_start),
+                bisect_right(match_ends, chunk_end),
+            ):
+                if match_starts[i] >= chunk_start:
+                    found.add(matches[i][2])
+
+        return results
+
+
+# concept sets are cached per ontology version by OntologyService, so keying matchers by
+# the set's identity builds each automaton once per ontology version
+_MAX_CACHED_MATCHERS = 16
+_matcher_cache: dict[int, tuple[set[Concept], ConceptMatcher]] = {}
+
+
+def get_concept_matcher(concepts: set[Concept]) -> ConceptMatcher:
+    cached = _matcher_cache.get(id(concepts))
+    if cached is not None and cached[0] is concepts:
+        return cached[1]
+
+    matcher = ConceptMatcher(concepts)
+    if len(_matcher_cache) >= _MAX_CACHED_MATCHERS:
+        _matcher_cache.pop(next(iter(_matcher_cache)))
+    # keep a reference to the set so its id cannot be reused while cached
+    _matcher_cache[id(concepts)] = (concepts, matcher)
+    logger.info(
+        f"Built concept matcher for {len(concepts)} concepts ({matcher.num_states} states)"
+    )
+    return matcher
+
+
 # only considers concept and altLabels, ignores ancestors
 def brute_search(text: str, concepts: set[Concept]) -> set[Concept]:
-    found_brute_search_concepts: set[Concept] = set()
-
-    for c in concepts:
-        if any(
-            re.search(word_regex(label), text, re.IGNORECASE) for label in c.matchLabels
-        ):
-            found_brute_search_concepts.add(c)
+    found_brute_search_concepts = get_concept_matcher(concepts).search(text)
 
     logger.debug(
         f"Brute search found {len(found_brute_search_concepts)}:{found_brute_search_concepts} concepts in text."
     )
 
     return found_brute_search_concepts
+
+
+def brute_search_chunks(
+    text: str, concepts: set[Concept], chunk_bounds: Iterable[str]
+) -> dict[str, set[Concept]]:
+    """brute_search for every "start:end" chunk of text with a single scan."""
+    return get_concept_matcher(concepts).search_chunks(text, chunk_bounds)
@@ -0,0 +1,195 @@
+import asyncio
+import logging
+import sys
+from collections import OrderedDict
+from collections.abc import Iterator, Mapping
+
+from data_etl_app.services.chunking_strat import ChunkingStrat
+from data_etl_app.utils.chunk_util import (
+    LineTokenIndex,
+    build_line_token_index_async,
+    get_chunks_respecting_line_boundaries,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_PLAN_CACHE_MAX_BYTES = 512 * 1024 * 1024  # 512MB
+OFFLOAD_THRESHOLD_KB = 100  # tokenize texts larger than this in the chunking pool
+
+
+class ChunkMap(Mapping[str, str]):
+    """
+    Read-only {"start:end": chunk_text} view over a text.
+
+    Only the (start, end) character offsets are stored; chunk text is sliced from
+    the original string when a value is accessed, so handing the same plan to
+    several extractors does not copy the text per strategy.
+    """
+
+    __slots__ = ("_text", "_bounds")
+
+    def __init__(self, text: str, bounds: list[tuple[int, int]]):
+        self._text = text
+        self._bounds = {f"{start}:{end}": (start, end) for start, end in bounds}
+
+    def __getitem__(self, key: str) -> str:
+        start, end = self._bounds[key]
+        return self._text[start:end]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._bounds)
+
+    def __len__(self) -> int:
+        return len(self._bounds)
+
+    def bounds(self) -> list[tuple[int, int]]:
+        return list(self._bounds.values())
+
+
+class _TokenizedText:
+    __slots__ = ("text", "index", "plans", "nbytes")
+
+    def __init__(self, text: str, index: LineTokenIndex):
+        self.text = text
+        self.index = index
+        self.plans: dict[ChunkingStrat, list[tuple[int, int]]] = {}
+        self.nbytes = (
+            sys.getsizeof(text)
+            + index.char_offsets.itemsize * len(index.char_offsets)
+            + index.token_prefix.itemsize * len(index.token_prefix)
+        )
+
+
+class ChunkPlanCache:
+    """
+    Per-scrape-version cache of tokenized text and per-ChunkingStrat chunk plans.
+
+    The text of an S3 version is tokenized once (LineTokenIndex) no matter how many
+    extractors chunk it; each ChunkingStrat then only costs a binary search over the
+    index. Entries are evicted least-recently-used once their combined size exceeds
+    max_bytes.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_CHUNK_PLAN_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, _TokenizedText] = OrderedDict()
+        self._pending: dict[str, asyncio.Future[_TokenizedText]] = {}
+        self._nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def nbytes(self) -> int:
+        return self._nbytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, s3_version_id: str) -> bool:
+        return s3_version_id in self._entries
+
+    async def get_chunk_map(
+        self, s3_version_id: str, text: str, chunk_strategy: ChunkingStrat
+    ) -> ChunkMap:
+        entry = await self._get_tokenized_text(s3_version_id, text)
+        bounds = entry.plans.get(chunk_strategy)
+        if bounds is None:
+            bounds = entry.index.soft_limit_bounds(
+                chunk_strategy.max_tokens,
+                chunk_strategy.overlap,
+                chunk_strategy.max_chunks,
+            )
+            entry.plans[chunk_strategy] = bounds
+        return ChunkMap(entry.text, bounds)
+
+    def evict(self, s3_version_id: str) -> None:
+        entry = self._entries.pop(s3_version_id, None)
+        if entry is not None:
+            self._nbytes -= entry.nbytes
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._nbytes = 0
+
+    async def _get_tokenized_text(
+        self, s3_version_id: str, text: str
+    ) -> _TokenizedText:
+        entry = self._entries.get(s3_version_id)
+        if entry is not None and len(entry.text) == len(text):
+            self._entries.move_to_end(s3_version_id)
+            self.hits += 1
+            return entry
+
+        # another extractor is already tokenizing this version, share its result
+        pending = self._pending.get(s3_version_id)
+        if pending is not None:
+            self.hits += 1
+            return await pending
+
+        self.misses += 1
+        future: asyncio.Future[_TokenizedText] = (
+            asyncio.get_running_loop().create_future()
+        )
+        self._pending[s3_version_id] = future
+        try:
+            index = await self._build_index(text)
+            entry = _TokenizedText(text, index)
+            self._insert(s3_version_id, entry)
+            future.set_result(entry)
+            return entry
+        except BaseException as e:
+            future.set_exception(e)
+            # consume the exception so an unawaited future doesn't log it
+            future.exception()
+            raise
+        finally:
+            del self._pending[s3_version_id]
+
+    async def _build_index(self, text: str) -> LineTokenIndex:
+        if len(text) / 1024 < OFFLOAD_THRESHOLD_KB:
+            return LineTokenIndex(text)
+        return await build_line_token_index_async(text)
+
+    def _insert(self, s3_version_id: str, entry: _TokenizedText) -> None:
+        self.evict(s3_version_id)
+        self._entries[s3_version_id] = entry
+        self._nbytes += entry.nbytes
+        # always keep the newest entry, even if it alone is over budget
+        while self._nbytes > self.max_bytes and len(self._entries) > 1:
+            evicted_version_id, evicted = self._entries.popitem(last=False)
+            self._nbytes -= evicted.nbytes
+            logger.debug(
+                f"ChunkPlanCache: evicted {evicted_version_id} ({evicted.nbytes} bytes)"
+            )
+
+
+_chunk_plan_cache: ChunkPlanCache | None = None
+
+
+def get_chunk_plan_cache() -> ChunkPlanCache:
+    """Get or create the process-wide chunk plan cache."""
+    global _chunk_plan_cache
+    if _chunk_plan_cache is None:
+        _chunk_plan_cache = ChunkPlanCache()
+    return _chunk_plan_cache
+
+
+async def get_chunk_map_for_strat(
+    text: str, chunk_strategy: ChunkingStrat, s3_version_id: str | None = None
+) -> Mapping[str, str]:
+    """
+    Chunk text according to chunk_strategy.
+
+    When the S3 version of the text is known, the tokenized text is shared through
+    the process-wide ChunkPlanCache; otherwise the text is chunked from scratch.
+    """
+    if s3_version_id is None:
+        return await get_chunks_respecting_line_boundaries(
+            text=text,
+            soft_limit_tokens=chunk_strategy.max_tokens,
+            overlap_ratio=chunk_strategy.overlap,
+            max_chunks=chunk_strategy.max_chunks,
+        )
+    return await get_chunk_plan_cache().get_chunk_map(
+        s3_version_id, text, chunk_strategy
+    )
@@ -1,7 +1,7 @@
 from dataclasses import dataclass
 
 
-@dataclass
+@dataclass(frozen=True)  # hashable, used as a ChunkPlanCache key
 class ChunkingStrat:
     overlap: float  # must be between [0, 1)
     max_chunks: int
@@ -0,0 +1,262 @@
+"""
+Concurrent, dependency-aware scheduling of a manufacturer's field extractions.
+
+The extractions are declared as a graph of ExtractionSteps. A step only waits
+for the steps it `requires`; everything else runs at once, so a manufacturer
+takes about as long as its slowest chain of steps instead of the sum of all of
+them. Concurrency is bounded twice: per manufacturer (max_concurrent_steps) and
+across all manufacturers of the process for steps that call an LLM.
+
+Extracted values are set on the manufacturer as they arrive but written to the
+database in batches: at checkpoint steps and once at the end.
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import AsyncExitStack
+from dataclasses import dataclass, field
+from datetime import datetime
+from enum import Enum
+from typing import Any, Awaitable, Callable, Iterable
+
+from core.models.db.manufacturer import Manufacturer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENT_STEPS_PER_MANUFACTURER = 5
+DEFAULT_MAX_CONCURRENT_LLM_STEPS = 50
+
+
+@dataclass(frozen=True)
+class ExtractionContext:
+    polled_at: datetime
+    mfg_txt: str
+    manufacturer: Manufacturer
+    s3_version_id: str | None = None
+
+    @property
+    def etld1(self) -> str:
+        return self.manufacturer.etld1
+
+
+class StepOutcome(str, Enum):
+    EXTRACTED = "extracted"
+    ALREADY_PRESENT = "already_present"
+    GATE_PASSED = "gate_passed"
+    GATE_CLOSED = "gate_closed"
+    FAILED = "failed"
+    BLOCKED = "blocked"  # a required step did not pass
+
+
+_PASSING_OUTCOMES = frozenset(
+    {StepOutcome.EXTRACTED, StepOutcome.ALREADY_PRESENT, StepOutcome.GATE_PASSED}
+)
+
+
+@dataclass(frozen=True)
+class ExtractionStep:
+    """
+    One node of the extraction graph.
+
+    With `field` set, the value returned by `run` is stored on that manufacturer
+    attribute, and the step is skipped when `is_missing` says the manufacturer
+    already has it. Without `field` the step is a gate: dependents only run if
+    it returns a truthy value.
+    """
+
+    name: str
+    run: Callable[[ExtractionContext], Awaitable[Any]]
+    field: str | None = None
+    is_missing: Callable[[Manufacturer], bool] | None = None
+    requires: tuple[str, ...] = ()
+    uses_llm: bool = True
+    checkpoint: bool = False  # persist everything extracted so far once done
+
+
+@dataclass
+class ExtractionRunReport:
+    outcomes: dict[str, StepOutcome] = field(default_factory=dict)
+    durations: dict[str, float] = field(default_factory=dict)
+    persisted_fields: list[str] = field(default_factory=list)
+    writes: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def extracted(self) -> list[str]:
+        return [
+            name
+            for name, outcome in self.outcomes.items()
+            if outcome == StepOutcome.EXTRACTED
+        ]
+
+    @property
+    def failed(self) -> list[str]:
+        return [
+            name
+            for name, outcome in self.outcomes.items()
+            if outcome == StepOutcome.FAILED
+        ]
+
+
+def _check_graph(steps: list[ExtractionStep]) -> None:
+    by_name = {}
+    for step in steps:
+        if step.name in by_name:
+            raise ValueError(f"Duplicate extraction step {step.name!r}")
+        by_name[step.name] = step
+    for step in steps:
+        for required in step.requires:
+            if required not in by_name:
+                raise ValueError(
+                    f"Extraction step {step.name!r} requires unknown step {required!r}"
+                )
+
+    visiting: set[str] = set()
+    done: set[str] = set()
+
+    def visit(name: str, path: list[str]) -> None:
+        if name in done:
+            return
+        if name in visiting:
+            raise ValueError(f"Extraction steps form a cycle: {' -> '.join(path)}")
+        visiting.add(name)
+        for required in by_name[name].requires:
+            visit(required, path + [required])
+        visiting.discard(name)
+        done.add(name)
+
+    for step in steps:
+        visit(step.name, [step.name])
+
+
+class FieldExtractionScheduler:
+    def __init__(
+        self,
+        steps: Iterable[ExtractionStep],
+        max_concurrent_steps: int = DEFAULT_MAX_CONCURRENT_STEPS_PER_MANUFACTURER,
+        llm_semaphore: asyncio.Semaphore | None = None,
+    ):
+        self.steps = list(steps)
+        _check_graph(self.steps)
+        self.max_concurrent_steps = max_concurrent_steps
+        self.llm_semaphore = llm_semaphore
+
+    async def run(
+        self,
+        ctx: ExtractionContext,
+        persist: Callable[[list[str]], Awaitable[None]],
+        on_error: Callable[[str, Exception], Awaitable[None]] | None = None,
+    ) -> ExtractionRunReport:
+        """
+        Run every step for ctx.manufacturer, persisting extracted fields through
+        persist(field_names) at checkpoints and at the end. A step that raises is
+        reported to on_error(step_name, error) and blocks its dependents only.
+        """
+        manufacturer = ctx.manufacturer
+        report = ExtractionRunReport()
+        step_semaphore = asyncio.Semaphore(self.max_concurrent_steps)
+        outcomes: dict[str, asyncio.Future[StepOutcome]] = {
+            step.name: asyncio.get_running_loop().create_future() for step in self.steps
+        }
+        unpersisted: list[str] = []
+        persist_lock = asyncio.Lock()
+
+        async def flush() -> None:
+            async with persist_lock:
+                if not unpersisted:
+                    return
+                fields = list(unpersisted)
+                unpersisted.clear()
+                try:
+                    await persist(fields)
+                except BaseException:
+                    unpersisted.extend(fields)  # retried by the next flush
+                    raise
+                report.persisted_fields.extend(fields)
+                report.writes += 1
+
+        async def execute(step: ExtractionStep) -> StepOutcome:
+            for required in step.requires:
+                if await outcomes[required] not in _PASSING_OUTCOMES:
+                    return StepOutcome.BLOCKED
+            if step.field and step.is_missing and not step.is_missing(manufacturer):
+                return StepOutcome.ALREADY_PRESENT
+
+            started = time.perf_counter()
+            try:
+                async with AsyncExitStack() as budgets:
+                    await budgets.enter_async_context(step_semaphore)
+                    if step.uses_llm and self.llm_semaphore is not None:
+                        await budgets.enter_async_context(self.llm_semaphore)
+                    logger.info(f"Running {step.name} for {ctx.etld1}")
+                    value = await step.run(ctx)
+            except Exception as e:
+                logger.error(f"{ctx.etld1}.{step.name} errored:{e}")
+                if on_error is not None:
+                    try:
+                        await on_error(step.name, e)
+                    except Exception as report_error:
+                        logger.error(
+                            f"Could not record {step.name} error for {ctx.etld1}: {report_error}"
+                        )
+                return StepOutcome.FAILED
+            finally:
+                report.durations[step.name] = time.perf_counter() - started
+
+            if step.field is None:
+                if not value:
+                    logger.info(
+                        f"Gate {step.name} closed for {ctx.etld1}, skipping the steps behind it."
+                    )
+                    return StepOutcome.GATE_CLOSED
+                return StepOutcome.GATE_PASSED
+            setattr(manufacturer, step.field, value)
+            unpersisted.append(step.field)
+            return StepOutcome.EXTRACTED
+
+        async def run_step(step: ExtractionStep) -> None:
+            try:
+                outcome = await execute(step)
+            except BaseException:
+                outcomes[step.name].cancel()
+                raise
+            report.outcomes[step.name] = outcome
+            outcomes[step.name].set_result(outcome)
+            if step.checkpoint:
+                try:
+                    await flush()
+                except Exception as e:
+                    logger.warning(
+                        f"Checkpoint after {step.name} for {ctx.etld1} failed, retrying at the end: {e}"
+                    )
+
+        started = time.perf_counter()
+        await asyncio.gather(*(run_step(step) for step in self.steps))
+        await flush()
+        report.elapsed = time.perf_counter() - started
+
+        slowest = max(report.durations.items(), key=lambda item: item[1], default=None)
+        logger.info(
+            f"Extraction for {ctx.etld1} took {report.elapsed:.2f}s"
+            + (f" (slowest step {slowest[0]}: {slowest[1]:.2f}s)" if slowest else "")
+            + f"; extracted {report.extracted}, failed {report.failed}, "
+            f"{report.writes} database write(s)"
+        )
+        return report
+
+
+_llm_step_semaphore: asyncio.Semaphore | None = None
+
+
+def set_max_concurrent_llm_steps(max_concurrent_llm_steps: int) -> None:
+    """Size the process-wide budget shared by the LLM steps of all manufacturers."""
+    global _llm_step_semaphore
+    _llm_step_semaphore = asyncio.Semaphore(max_concurrent_llm_steps)
+
+
+def get_llm_step_semaphore() -> asyncio.Semaphore:
+    global _llm_step_semaphore
+    if _llm_step_semaphore is None:
+        _llm_step_semaphore = asyncio.Semaphore(DEFAULT_MAX_CONCURRENT_LLM_STEPS)
+    return _llm_step_semaphore
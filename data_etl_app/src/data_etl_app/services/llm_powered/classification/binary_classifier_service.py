@@ -117,6 +117,7 @@ async def _binary_classify_using_only_first_chunk(
         binary_prompt.text,
         gpt_model,
         model_params,
+        prompt_version_id=binary_prompt.s3_version_id,
     )
     chunk_result_map = {first_chunk_key: chunk_result}
 
@@ -140,6 +141,7 @@ async def _get_binary_classification_result_for_chunk(
     binary_prompt: str,
     gpt_model: GPTModel = GPT_4o_mini,
     model_params: ModelParameters = DefaultModelParameters,
+    prompt_version_id: Optional[str] = None,
 ) -> ChunkBinaryClassificationResult:
     chunk_tokens = num_tokens_from_string(chunk_txt)
     logger.info(
@@ -147,7 +149,12 @@ async def _get_binary_classification_result_for_chunk(
     )
 
     gpt_response = await ask_llm_async(
-        chunk_txt, binary_prompt, gpt_model, model_params
+        chunk_txt,
+        binary_prompt,
+        gpt_model,
+        model_params,
+        cache_label=keyword_label,
+        prompt_version_id=prompt_version_id,
     )
 
     return parse_chunk_binary_classification_result_from_gpt_response(
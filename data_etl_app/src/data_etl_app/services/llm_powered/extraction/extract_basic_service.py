@@ -88,7 +88,12 @@ async def _extract_address_from_chunk(
     )
 
     gpt_response = await ask_llm_async(
-        chunk_text, extract_prompt.text, gpt_model, model_params
+        chunk_text,
+        extract_prompt.text,
+        gpt_model,
+        model_params,
+        cache_label="addresses",
+        prompt_version_id=extract_prompt.s3_version_id,
     )
 
     parsed_addresses = parse_address_list_from_gpt_response(gpt_response)
@@ -182,7 +187,12 @@ async def find_business_desc_using_only_first_chunk(
     first_chunk_key = min(chunks_map.keys(), key=lambda k: int(k.split(":")[0]))
     first_chunk_text = chunks_map[first_chunk_key]
     gpt_response = await ask_llm_async(
-        first_chunk_text, prompt.text, gpt_model, model_params
+        first_chunk_text,
+        prompt.text,
+        gpt_model,
+        model_params,
+        cache_label="business_desc",
+        prompt_version_id=prompt.s3_version_id,
     )
 
     return parse_business_desc_result_from_gpt_response(gpt_response)
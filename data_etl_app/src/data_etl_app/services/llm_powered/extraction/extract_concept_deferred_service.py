@@ -40,7 +40,7 @@ from core.models.deferred_concept_extraction import (
     ConceptExtractionBundle,
 )
 from data_etl_app.models.skos_concept import Concept
-from data_etl_app.services.brute_search_service import brute_search
+from data_etl_app.services.brute_search_service import brute_search_chunks
 from data_etl_app.services.llm_powered.extraction.extract_concept_service import (
     get_matched_concepts_and_unmatched_keywords_by_concept_type,
 )
@@ -569,6 +569,11 @@ async def _get_missing_concept_search_requests(
                 end = chunk_bounds.split(":")[1]
                 chunk_items.append((chunk_bounds, mfg_text[int(start) : int(end)]))
 
+    # single brute search pass over the text, attributed back to each chunk
+    brute_by_chunk = brute_search_chunks(
+        mfg_text, known_concepts, (chunk_bounds for chunk_bounds, _ in chunk_items)
+    )
+
     # Process chunks in batches to yield control periodically
     BATCH_SIZE = 100  # Process 100 chunks at a time
 
@@ -589,7 +594,7 @@ async def _get_missing_concept_search_requests(
             batch_requests.append(llm_batch_request)
             deferred_concept_extraction.chunk_request_bundle_map[chunk_bounds] = (
                 ConceptExtractionBundle(
-                    brute={b.name for b in brute_search(chunk_text, known_concepts)},
+                    brute={b.name for b in brute_by_chunk[chunk_bounds]},
                     llm_search_request_id=llm_batch_request.request.custom_id,
                 )
             )
@@ -26,14 +26,12 @@ from data_etl_app.services.chunking_strat import (
 from data_etl_app.services.llm_powered.map.map_known_to_unknown_service import (
     map_known_concepts_with_found_keywords,
 )
-from data_etl_app.services.brute_search_service import brute_search
+from data_etl_app.services.brute_search_service import brute_search_chunks
 from data_etl_app.services.llm_powered.search.llm_search_service import llm_search
 from data_etl_app.services.knowledge.ontology_service import get_ontology_service
 from data_etl_app.services.knowledge.prompt_service import get_prompt_service
 from data_etl_app.services.chunking_strat import ChunkingStrat
-from data_etl_app.utils.chunk_util import (
-    get_chunks_respecting_line_boundaries,
-)
+from data_etl_app.services.chunk_plan_cache import get_chunk_map_for_strat
 
 logger = logging.getLogger(__name__)
 
@@ -49,6 +47,7 @@ async def extract_certificates(
     extraction_timestamp: datetime,
     mfg_etld1: str,
     text: str,
+    s3_version_id: str | None = None,
 ) -> ConceptExtractionResults:
     """
     Extract certificates for a manufacturer text.
@@ -66,6 +65,7 @@ async def extract_certificates(
         prompt_service.extract_any_certificate_prompt,
         prompt_service.unknown_to_known_certificate_prompt,
         CERTIFICATE_CHUNKING_STRAT,
+        s3_version_id=s3_version_id,
         gpt_model=GPT_4o_mini,
         model_params=DefaultModelParameters,
     )
@@ -75,6 +75,7 @@ async def extract_industries(
     extraction_timestamp: datetime,
     mfg_etld1: str,
     text: str,
+    s3_version_id: str | None = None,
 ) -> ConceptExtractionResults:
     """
     Extract industries for a manufacturer text.
@@ -92,6 +93,7 @@ async def extract_industries(
         prompt_service.extract_any_industry_prompt,
         prompt_service.unknown_to_known_industry_prompt,
         INDUSTRY_CHUNKING_STRAT,
+        s3_version_id=s3_version_id,
         gpt_model=GPT_4o_mini,
         model_params=DefaultModelParameters,
     )
@@ -101,6 +103,7 @@ async def extract_processes(
     extraction_timestamp: datetime,
     mfg_etld1: str,
     text: str,
+    s3_version_id: str | None = None,
 ) -> ConceptExtractionResults:
     """
     Extract process capabilities for a manufacturer text.
@@ -118,6 +121,7 @@ async def extract_processes(
         prompt_service.extract_any_process_cap_prompt,
         prompt_service.unknown_to_known_process_cap_prompt,
         PROCESS_CAP_CHUNKING_STRAT,
+        s3_version_id=s3_version_id,
         gpt_model=GPT_4o_mini,
         model_params=DefaultModelParameters,
     )
@@ -127,6 +131,7 @@ async def extract_materials(
     extraction_timestamp: datetime,
     mfg_etld1: str,
     text: str,
+    s3_version_id: str | None = None,
 ) -> ConceptExtractionResults:
     """
     Extract material capabilities for a manufacturer text.
@@ -144,6 +149,7 @@ async def extract_materials(
         prompt_service.extract_any_material_cap_prompt,
         prompt_service.unknown_to_known_material_cap_prompt,
         MATERIAL_CAP_CHUNKING_STRAT,
+        s3_version_id=s3_version_id,
         gpt_model=GPT_4o_mini,
         model_params=DefaultModelParameters,
     )
@@ -159,6 +165,7 @@ async def _extract_concept_data(
     search_prompt: Prompt,
     map_prompt: Prompt,
     chunk_strategy: ChunkingStrat,
+    s3_version_id: str | None = None,
     gpt_model: GPTModel = GPT_4o_mini,
     model_params: ModelParameters = DefaultModelParameters,
 ) -> ConceptExtractionResults:
@@ -196,24 +203,25 @@ async def _extract_concept_data(
         2. multiple passes may be required to get everything (soln: increase num_passes)
     """
 
-    chunk_map = await get_chunks_respecting_line_boundaries(
-        text=text,
-        soft_limit_tokens=chunk_strategy.max_tokens,
-        overlap_ratio=chunk_strategy.overlap,
-        max_chunks=chunk_strategy.max_chunks,
-    )
+    chunk_map = await get_chunk_map_for_strat(text, chunk_strategy, s3_version_id)
+
+    # single brute search pass over the text, attributed back to each chunk
+    brute_by_chunk = brute_search_chunks(text, known_concepts, chunk_map.keys())
 
-    # Run brute_search and llm_search for each chunk concurrently
+    # Run llm_search for each chunk concurrently
     async def _process_chunk(
         bounds: str, text_chunk: str
     ) -> tuple[str, set[Concept], set[str]]:
-        # NOTE: doing brute search individually for each chunk is more expensive than all at once
-        # and is computationally expensive in general, but we need chunk level results
-        brute_set = brute_search(text_chunk, known_concepts)
         llm_set = await llm_search(
-            text_chunk, search_prompt.text, gpt_model, model_params, True
+            text_chunk,
+            search_prompt.text,
+            gpt_model,
+            model_params,
+            True,
+            cache_label=concept_type.name,
+            prompt_version_id=search_prompt.s3_version_id,
         )
-        return bounds, brute_set, llm_set
+        return bounds, brute_by_chunk[bounds], llm_set
 
     tasks = [asyncio.create_task(_process_chunk(b, t)) for b, t in chunk_map.items()]
     chunk_results = await asyncio.gather(*tasks)
@@ -273,6 +281,7 @@ async def _extract_concept_data(
         known_concepts=known_concepts,
         unmatched_keywords=unmatched_keywords,
         prompt_text=map_prompt.text,
+        prompt_version_id=map_prompt.s3_version_id,
     )
 
     # UPDATE unmapped_llm and mapping in chunk_stats
@@ -15,9 +15,7 @@ from core.models.keyword_extraction_results import (
 from data_etl_app.services.llm_powered.search.llm_search_service import llm_search
 from data_etl_app.services.knowledge.prompt_service import get_prompt_service
 from data_etl_app.services.chunking_strat import PRODUCT_CHUNKING_STRAT, ChunkingStrat
-from data_etl_app.utils.chunk_util import (
-    get_chunks_respecting_line_boundaries,
-)
+from data_etl_app.services.chunk_plan_cache import get_chunk_map_for_strat
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +31,7 @@ async def extract_products(
     extraction_timestamp: datetime,
     mfg_etld1: str,
     text: str,
+    s3_version_id: str | None = None,
 ) -> KeywordExtractionResults:
     """
     Extract products for a manufacturer's text.
@@ -45,6 +44,7 @@ async def extract_products(
         text,
         prompt_service.extract_any_product_prompt,
         PRODUCT_CHUNKING_STRAT,
+        s3_version_id=s3_version_id,
         gpt_model=GPT_4o_mini,
         model_params=DefaultModelParameters,
     )
@@ -57,6 +57,7 @@ async def _extract_keyword_data(
     text: str,
     search_prompt: Prompt,
     chunk_strategy: ChunkingStrat,
+    s3_version_id: str | None = None,
     gpt_model: GPTModel = GPT_4o_mini,
     model_params: ModelParameters = DefaultModelParameters,
 ) -> KeywordExtractionResults:
@@ -65,12 +66,7 @@ async def _extract_keyword_data(
     )
 
     # 1) Chunk
-    chunk_map = await get_chunks_respecting_line_boundaries(
-        text=text,
-        soft_limit_tokens=chunk_strategy.max_tokens,
-        overlap_ratio=chunk_strategy.overlap,
-        max_chunks=chunk_strategy.max_chunks,
-    )
+    chunk_map = await get_chunk_map_for_strat(text, chunk_strategy, s3_version_id)
 
     # 2) LLM search per chunk (no brute)
     async def _process_chunk(bounds: str, text_chunk: str):
@@ -80,6 +76,8 @@ async def _extract_keyword_data(
             gpt_model,
             model_params,
             True,  # dedupe/normalize
+            cache_label=keyword_type,
+            prompt_version_id=search_prompt.s3_version_id,
         )
         return bounds, chunk_result
 
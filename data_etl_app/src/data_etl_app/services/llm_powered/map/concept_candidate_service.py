@@ -0,0 +1,219 @@
+import json
+import logging
+import re
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+
+from data_etl_app.models.skos_concept import Concept, ConceptJSONEncoder
+
+logger = logging.getLogger(__name__)
+
+# known concepts sent to the mapping LLM for each unknown keyword
+DEFAULT_CANDIDATES_PER_KEYWORD = 15
+# an ancestor label matching the keyword counts for less than the concept's own labels
+ANCESTOR_LABEL_WEIGHT = 0.5
+
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def normalize_label(label: str) -> str:
+    return _NON_WORD.sub(" ", label.casefold()).strip()
+
+
+def get_label_trigrams(normalized_label: str) -> set[str]:
+    """Character trigrams of each word, padded so short words still get some."""
+    trigrams: set[str] = set()
+    for word in normalized_label.split():
+        padded = f" {word} "
+        trigrams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return trigrams
+
+
+def get_label_tokens(normalized_label: str) -> set[str]:
+    # plural and singular share a token
+    return {
+        token[:-1] if len(token) > 3 and token.endswith("s") else token
+        for token in normalized_label.split()
+    }
+
+
+class ConceptCandidateIndex:
+    """
+    Inverted index over the matchLabels and ancestors of a set of concepts, to
+    shortlist the concepts an unknown keyword may plausibly map to.
+
+    A keyword scores each label by the Dice coefficient of their character
+    trigrams or of their word tokens, whichever is higher. A concept scores
+    the best of its own labels, and of its ancestors at ANCESTOR_LABEL_WEIGHT.
+    """
+
+    def __init__(self, concepts: Iterable[Concept]):
+        # sorted so equal scores rank the same way in every process
+        self.concepts: list[Concept] = sorted(concepts, key=lambda c: c.name)
+
+        self._label_concept_ids: list[int] = []
+        self._label_weights: list[float] = []
+        self._label_trigram_counts: list[int] = []
+        self._label_token_counts: list[int] = []
+        self._trigram_postings: dict[str, list[int]] = {}
+        self._token_postings: dict[str, list[int]] = {}
+
+        for concept_id, concept in enumerate(self.concepts):
+            labels = {
+                normalize_label(label): ANCESTOR_LABEL_WEIGHT
+                for label in concept.ancestors
+            }
+            labels.update(
+                {normalize_label(label): 1.0 for label in concept.matchLabels}
+            )
+            for label, weight in labels.items():
+                if label:
+                    self._add_label(concept_id, label, weight)
+
+    @property
+    def num_labels(self) -> int:
+        return len(self._label_concept_ids)
+
+    def _add_label(self, concept_id: int, label: str, weight: float) -> None:
+        label_id = len(self._label_concept_ids)
+        trigrams = get_label_trigrams(label)
+        tokens = get_label_tokens(label)
+        self._label_concept_ids.append(concept_id)
+        self._label_weights.append(weight)
+        self._label_trigram_counts.append(len(trigrams))
+        self._label_token_counts.append(len(tokens))
+        for trigram in trigrams:
+            self._trigram_postings.setdefault(trigram, []).append(label_id)
+        for token in tokens:
+            self._token_postings.setdefault(token, []).append(label_id)
+
+    def score(self, keyword: str) -> dict[Concept, float]:
+        """Score of every concept sharing a trigram or a token with keyword."""
+        normalized = normalize_label(keyword)
+        trigrams = get_label_trigrams(normalized)
+        tokens = get_label_tokens(normalized)
+
+        shared_trigrams: dict[int, int] = {}
+        for trigram in trigrams:
+            for label_id in self._trigram_postings.get(trigram, ()):
+                shared_trigrams[label_id] = shared_trigrams.get(label_id, 0) + 1
+        shared_tokens: dict[int, int] = {}
+        for token in tokens:
+            for label_id in self._token_postings.get(token, ()):
+                shared_tokens[label_id] = shared_tokens.get(label_id, 0) + 1
+
+        scores: dict[int, float] = {}
+        for label_id in shared_trigrams.keys() | shared_tokens.keys():
+            trigram_dice = (
+                2
+                * shared_trigrams.get(label_id, 0)
+                / (len(trigrams) + self._label_trigram_counts[label_id])
+            )
+            token_dice = (
+                2
+                * shared_tokens.get(label_id, 0)
+                / (len(tokens) + self._label_token_counts[label_id])
+            )
+            label_score = self._label_weights[label_id] * max(trigram_dice, token_dice)
+            concept_id = self._label_concept_ids[label_id]
+            if label_score > scores.get(concept_id, 0.0):
+                scores[concept_id] = label_score
+
+        return {self.concepts[concept_id]: s for concept_id, s in scores.items()}
+
+    def shortlist(self, keyword: str, top_k: int) -> list[Concept]:
+        """The top_k best scoring concepts for keyword, best first."""
+        scores = self.score(keyword)
+        ranked = sorted(scores, key=lambda c: (-scores[c], c.name))
+        return ranked[:top_k]
+
+    def shortlist_many(self, keywords: Iterable[str], top_k: int) -> set[Concept]:
+        """The concepts shortlisted for any of keywords."""
+        candidates: set[Concept] = set()
+        for keyword in keywords:
+            candidates.update(self.shortlist(keyword, top_k))
+        return candidates
+
+
+# concept sets are cached per ontology version by OntologyService, so keying indexes by
+# the set's identity builds each index once per ontology version
+_MAX_CACHED_INDEXES = 16
+_index_cache: dict[int, tuple[set[Concept], ConceptCandidateIndex]] = {}
+
+
+def get_concept_candidate_index(concepts: set[Concept]) -> ConceptCandidateIndex:
+    cached = _index_cache.get(id(concepts))
+    if cached is not None and cached[0] is concepts:
+        return cached[1]
+
+    index = ConceptCandidateIndex(concepts)
+    if len(_index_cache) >= _MAX_CACHED_INDEXES:
+        _index_cache.pop(next(iter(_index_cache)))
+    # keep a reference to the set so its id cannot be reused while cached
+    _index_cache[id(concepts)] = (concepts, index)
+    logger.info(
+        f"Built concept candidate index for {len(concepts)} concepts ({index.num_labels} labels)"
+    )
+    return index
+
+
+def get_concept_mapping_context(
+    known_concepts: set[Concept],
+    unmatched_keywords: set[str],
+    candidates_per_keyword: int | None = DEFAULT_CANDIDATES_PER_KEYWORD,
+) -> str:
+    """
+    The context of a known-to-unknown mapping prompt. Only the concepts
+    shortlisted for some unknown keyword are listed as knowns, unless
+    candidates_per_keyword is None.
+    """
+    if candidates_per_keyword is not None:
+        candidates = get_concept_candidate_index(known_concepts).shortlist_many(
+            unmatched_keywords, candidates_per_keyword
+        )
+        logger.debug(
+            f"Shortlisted {len(candidates)}/{len(known_concepts)} known concepts "
+            f"for {len(unmatched_keywords)} unknowns"
+        )
+        known_concepts = candidates
+
+    return json.dumps(
+        {
+            "unknowns": sorted(unmatched_keywords),
+            "knowns": sorted(known_concepts, key=lambda c: c.name),
+        },
+        cls=ConceptJSONEncoder,
+    )
+
+
+@dataclass
+class ShortlistRecall:
+    """How many known mappings survive shortlisting, see get_shortlist_recall."""
+
+    top_k: int
+    pairs: int = 0
+    pairs_in_shortlist: int = 0
+    missed: list[tuple[str, str]] = field(default_factory=list)  # (unknown, known)
+
+    @property
+    def recall(self) -> float:
+        return self.pairs_in_shortlist / self.pairs if self.pairs else 1.0
+
+
+def get_shortlist_recall(
+    index: ConceptCandidateIndex,
+    mapping_pairs: Iterable[tuple[str, str]],
+    top_k: int,
+) -> ShortlistRecall:
+    """
+    Share of (unknown keyword, known concept name) pairs, as mapped with the
+    full list of knowns, whose known concept is shortlisted for the keyword.
+    """
+    result = ShortlistRecall(top_k=top_k)
+    for unknown, known_name in mapping_pairs:
+        result.pairs += 1
+        if any(c.name == known_name for c in index.shortlist(unknown, top_k)):
+            result.pairs_in_shortlist += 1
+        else:
+            result.missed.append((unknown, known_name))
+    return result
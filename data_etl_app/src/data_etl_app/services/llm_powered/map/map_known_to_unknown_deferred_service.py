@@ -1,11 +1,15 @@
-import json
 import logging
 from datetime import datetime
+from typing import Optional
 from typing_extensions import TypedDict
 
 from core.models.prompt import Prompt
 
-from data_etl_app.models.skos_concept import Concept, ConceptJSONEncoder
+from data_etl_app.models.skos_concept import Concept
+from data_etl_app.services.llm_powered.map.concept_candidate_service import (
+    DEFAULT_CANDIDATES_PER_KEYWORD,
+    get_concept_mapping_context,
+)
 
 from core.models.db.gpt_batch_request import GPTBatchRequest
 from core.services.gpt_batch_request_service import create_base_gpt_batch_request
@@ -27,13 +31,15 @@ def map_known_to_unknown_deferred(
     mapping_prompt: Prompt,
     gpt_model: GPTModel = GPT_4o_mini,
     model_params: ModelParameters = DefaultModelParameters,
+    candidates_per_keyword: Optional[int] = DEFAULT_CANDIDATES_PER_KEYWORD,
 ) -> GPTBatchRequest:
     logger.info(
         f"map_known_to_unknown_deferred: Generating GPTBatchRequest for {llm_mapping_req_id}"
     )
-    context = json.dumps(
-        {"unknowns": list(unmatched_keywords), "knowns": list(known_concepts)},
-        cls=ConceptJSONEncoder,
+    context = get_concept_mapping_context(
+        known_concepts=known_concepts,
+        unmatched_keywords=unmatched_keywords,
+        candidates_per_keyword=candidates_per_keyword,
     )
     gpt_batch_request = create_base_gpt_batch_request(
         deferred_at=deferred_at,
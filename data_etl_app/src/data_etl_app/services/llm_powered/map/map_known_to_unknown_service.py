@@ -6,8 +6,12 @@ from typing import Optional
 
 from core.models.field_types import MfgETLDType
 
-from data_etl_app.models.skos_concept import Concept, ConceptJSONEncoder
+from data_etl_app.models.skos_concept import Concept
 from data_etl_app.models.types_and_enums import ConceptTypeEnum
+from data_etl_app.services.llm_powered.map.concept_candidate_service import (
+    DEFAULT_CANDIDATES_PER_KEYWORD,
+    get_concept_mapping_context,
+)
 
 from open_ai_key_app.utils.token_util import num_tokens_from_string
 from litellm_proxy_app.utils.ask_llm_util import ask_llm_async
@@ -32,18 +36,26 @@ async def map_known_concepts_with_found_keywords(
     prompt_text: str,
     # gpt_model: GPTModel,
     # model_params: ModelParameters,
+    candidates_per_keyword: Optional[int] = DEFAULT_CANDIDATES_PER_KEYWORD,
+    prompt_version_id: Optional[str] = None,
 ) -> LLMMappingResult:
 
-    context = json.dumps(
-        {"unknowns": list(unmatched_keywords), "knowns": list(known_concepts)},
-        cls=ConceptJSONEncoder,
+    context = get_concept_mapping_context(
+        known_concepts=known_concepts,
+        unmatched_keywords=unmatched_keywords,
+        candidates_per_keyword=candidates_per_keyword,
     )
 
     logger.debug(f"\nmapping unknown_to_known")
     logger.debug(f"context {num_tokens_from_string(context)}:{context}")
 
     gpt_response = await ask_llm_async(
-        context, prompt_text, GPT_4o_mini, DefaultModelParameters
+        context,
+        prompt_text,
+        GPT_4o_mini,
+        DefaultModelParameters,
+        cache_label=f"{concept_type.name}_map",
+        prompt_version_id=prompt_version_id,
     )
 
     raw_gpt_mapping = parse_llm_concept_mapping_result(gpt_response=gpt_response)
@@ -24,11 +24,22 @@ async def llm_search(
     gpt_model: GPTModel,
     model_params: ModelParameters,
     num_passes: int = 1,
+    cache_label: Optional[str] = None,
+    prompt_version_id: Optional[str] = None,
 ) -> set[str]:
 
     llm_results: set[str] = set()
-    for _ in range(num_passes):
-        gpt_response = await ask_llm_async(text, prompt, gpt_model, model_params)
+    for pass_index in range(num_passes):
+        # each pass is cached on its own, a repeated pass must ask again
+        gpt_response = await ask_llm_async(
+            text,
+            prompt,
+            gpt_model,
+            model_params,
+            cache_label=cache_label,
+            prompt_version_id=prompt_version_id,
+            cache_variant=pass_index,
+        )
 
         if not gpt_response:
             logger.error(f"Invalid gpt_response:{gpt_response}")
@@ -1,10 +1,21 @@
+import mmap
 import multiprocessing
 import logging
 import time
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
-
-from open_ai_key_app.utils.token_util import num_tokens_from_string
+from array import array
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import accumulate
+from multiprocessing.shared_memory import SharedMemory
+from typing import Literal
+
+from open_ai_key_app.models.gpt_model import GPT_4o_mini
+from open_ai_key_app.utils.token_util import (
+    count_many,
+    get_encoding_for_model,
+    num_tokens_from_string,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -33,15 +44,32 @@ def split_bytes_on_line_boundaries(
         >>> chunks = split_bytes_on_line_boundaries(data, max_chunk_size=10)
         >>> # Each chunk will end at a newline, preserving JSON object integrity
     """
-    if not data:
+    return [
+        data[start:end]
+        for start, end in get_line_boundary_offsets(
+            data, max_chunk_size, newline_search_window
+        )
+    ]
+
+
+def get_line_boundary_offsets(
+    data: bytes | mmap.mmap,
+    max_chunk_size: int,
+    newline_search_window: int = 10000,
+) -> list[tuple[int, int]]:
+    """
+    The (start, end) offsets split_bytes_on_line_boundaries cuts data at,
+    without copying anything. data can be an mmap of a file.
+    """
+    data_size = len(data)
+    if data_size == 0:
         return []
 
-    if len(data) <= max_chunk_size:
-        return [data]
+    if data_size <= max_chunk_size:
+        return [(0, data_size)]
 
-    chunks = []
+    offsets = []
     offset = 0
-    data_size = len(data)
 
     while offset < data_size:
         # Calculate the target chunk size
@@ -62,11 +90,10 @@ def split_bytes_on_line_boundaries(
             # If no newline found, keep the original chunk_size
             # (rare for line-based formats like JSONL, but handles edge cases)
 
-        chunk = data[offset : offset + chunk_size]
-        chunks.append(chunk)
+        offsets.append((offset, offset + chunk_size))
         offset += chunk_size
 
-    return chunks
+    return offsets
 
 
 # Module-level thread pool for chunking operations
@@ -103,6 +130,256 @@ def shutdown_chunk_thread_pool(wait: bool = True):
         _chunk_thread_pool = None
 
 
+ChunkingBackend = Literal["thread", "process"]
+CHUNKING_BACKENDS: tuple[ChunkingBackend, ...] = ("thread", "process")
+
+# "thread": tokenization runs on _chunk_thread_pool (simple, but serialized by the GIL)
+# "process": tokenization runs on _chunk_process_pool, text is passed via shared memory
+_chunking_backend: ChunkingBackend = "thread"
+
+# Module-level process pool for chunking operations
+_chunk_process_pool: ProcessPoolExecutor | None = None
+
+
+def set_chunking_backend(backend: ChunkingBackend) -> None:
+    """Select where large texts are tokenized for chunking (see CHUNKING_BACKENDS)."""
+    global _chunking_backend
+    if backend not in CHUNKING_BACKENDS:
+        raise ValueError(
+            f"Unknown chunking backend {backend!r}, expected one of {CHUNKING_BACKENDS}"
+        )
+    _chunking_backend = backend
+    logger.info(f"Chunking backend set to {backend}")
+
+
+def get_chunking_backend() -> ChunkingBackend:
+    return _chunking_backend
+
+
+def _warm_up_chunking_worker() -> None:
+    """Process pool initializer: load the tiktoken BPE once per worker, up front."""
+    try:
+        get_encoding_for_model(GPT_4o_mini.model_name).encode_ordinary("warm up")
+    except Exception as e:
+        # the first task will surface the real error
+        logger.warning(f"Chunking worker failed to warm up tiktoken encoder: {e}")
+
+
+def get_chunk_process_pool() -> ProcessPoolExecutor:
+    """Get or create process pool for chunking operations
+
+    Uses one worker per CPU core: unlike the thread pool, workers tokenize in
+    parallel since each has its own GIL. Workers are spawned (not forked) because
+    the parent runs an event loop and other thread pools.
+    """
+    global _chunk_process_pool
+    if _chunk_process_pool is None:
+        max_workers = multiprocessing.cpu_count()
+        _chunk_process_pool = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm_up_chunking_worker,
+        )
+        logger.info(f"Initialized chunking process pool with {max_workers} workers")
+    return _chunk_process_pool
+
+
+def shutdown_chunk_process_pool(wait: bool = True):
+    """Shutdown the chunking process pool"""
+    global _chunk_process_pool
+    if _chunk_process_pool is not None:
+        logger.info("Shutting down chunking process pool")
+        _chunk_process_pool.shutdown(wait=wait)
+        _chunk_process_pool = None
+
+
+def _build_line_token_index_from_shared_memory(
+    shm_name: str, num_bytes: int
+) -> "LineTokenIndex":
+    """Process pool task: build a LineTokenIndex for UTF-8 text held in shared memory."""
+    shm = SharedMemory(name=shm_name)
+    try:
+        buffer = shm.buf[:num_bytes]
+        try:
+            text = str(buffer, "utf-8")
+        finally:
+            buffer.release()
+    finally:
+        shm.close()
+    return LineTokenIndex(text)
+
+
+async def build_line_token_index_in_process_pool(text: str) -> "LineTokenIndex":
+    """
+    Build a LineTokenIndex on the chunking process pool.
+
+    The text is copied once into a shared memory block that the worker reads directly,
+    instead of being pickled through the pool's call queue. Only the index (two compact
+    arrays) travels back.
+    """
+    data = text.encode("utf-8")
+    if not data:
+        return LineTokenIndex(text)
+
+    num_bytes = len(data)
+    # shm.size may be rounded up to a page, so the worker is told the exact length
+    shm = SharedMemory(create=True, size=num_bytes)
+    try:
+        shm.buf[:num_bytes] = data
+        del data
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            get_chunk_process_pool(),
+            _build_line_token_index_from_shared_memory,
+            shm.name,
+            num_bytes,
+        )
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+async def build_line_token_index_async(text: str) -> "LineTokenIndex":
+    """Build a LineTokenIndex off the event loop using the selected chunking backend."""
+    if _chunking_backend == "process":
+        return await build_line_token_index_in_process_pool(text)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_chunk_thread_pool(), LineTokenIndex, text)
+
+
+class LineTokenIndex:
+    """
+    Token-offset index over the lines of a text.
+
+    All lines are tokenized with a single batched call, and the result is kept as two
+    compact prefix-sum arrays with num_lines + 1 entries each:
+        char_offsets[i]  -> character offset where line i starts
+        token_prefix[i]  -> number of tokens in lines [0, i)
+
+    A line range [s, e) therefore spans text[char_offsets[s]:char_offsets[e]] and
+    holds token_prefix[e] - token_prefix[s] tokens, so chunk boundaries and overlaps
+    can be found by binary search instead of re-walking lines.
+    """
+
+    __slots__ = ("char_offsets", "token_prefix")
+
+    def __init__(self, text: str):
+        lines = text.splitlines(keepends=True)
+        self.char_offsets = array("q", [0])
+        self.char_offsets.extend(accumulate(len(line) for line in lines))
+        self.token_prefix = array("q", [0])
+        self.token_prefix.extend(accumulate(count_many(lines)))
+
+    @property
+    def num_lines(self) -> int:
+        return len(self.token_prefix) - 1
+
+    @property
+    def total_tokens(self) -> int:
+        return self.token_prefix[-1]
+
+    def _char_bounds(self, start_line: int, end_line: int) -> tuple[int, int]:
+        return self.char_offsets[start_line], self.char_offsets[end_line]
+
+    def soft_limit_bounds(
+        self,
+        soft_limit_tokens: int,
+        overlap_ratio: float,
+        max_chunks: int | None = None,
+    ) -> list[tuple[int, int]]:
+        """
+        (start, end) character bounds of the chunks produced by
+        get_chunks_respecting_line_boundaries_sync.
+
+        A chunk keeps taking lines until the next one would push it over
+        soft_limit_tokens; the next chunk starts with the fewest trailing lines of
+        the previous chunk that reach overlap_ratio of its tokens, and always takes
+        the line that overflowed (even when that line alone exceeds the limit).
+        """
+        prefix = self.token_prefix
+        num_lines = self.num_lines
+        bounds: list[tuple[int, int]] = []
+        if num_lines == 0:
+            return bounds
+
+        # current chunk is lines [start, end); the first line always goes in
+        start, end = 0, 1
+        while True:
+            # first line at or after `end` that would push the chunk over the limit
+            overflow_line = (
+                bisect_right(prefix, prefix[start] + soft_limit_tokens, end + 1) - 1
+            )
+            if overflow_line >= num_lines:
+                bounds.append(self._char_bounds(start, num_lines))
+                return bounds
+
+            bounds.append(self._char_bounds(start, overflow_line))
+            if max_chunks is not None and len(bounds) >= max_chunks:
+                return bounds
+
+            target_overlap = int(
+                (prefix[overflow_line] - prefix[start]) * overlap_ratio
+            )
+            if target_overlap > 0:
+                # last line whose suffix of the chunk reaches target_overlap tokens
+                # (falls back to the whole chunk if it never does)
+                start = max(
+                    start,
+                    bisect_right(
+                        prefix,
+                        prefix[overflow_line] - target_overlap,
+                        start,
+                        overflow_line,
+                    )
+                    - 1,
+                )
+            else:
+                start = overflow_line
+            end = overflow_line + 1
+
+    def hard_limit_bounds(
+        self, hard_limit_tokens: int, overlap_ratio: float, max_chunks: int
+    ) -> list[tuple[int, int]]:
+        """
+        (start, end) character bounds of chunks that never exceed hard_limit_tokens.
+        """
+        prefix = self.token_prefix
+        num_lines = self.num_lines
+        overlap_tokens_required = int(hard_limit_tokens * overlap_ratio)
+        bounds: list[tuple[int, int]] = []
+
+        start = 0
+        while start < num_lines:
+            # largest end such that lines [start, end) fit in the hard limit
+            end = bisect_right(prefix, prefix[start] + hard_limit_tokens, start + 1) - 1
+            if end == start:
+                raise ValueError(
+                    f"line {start} has {prefix[start + 1] - prefix[start]} tokens, "
+                    f"more than hard_limit_tokens={hard_limit_tokens}"
+                )
+
+            bounds.append(self._char_bounds(start, end))
+            if end >= num_lines or len(bounds) >= max_chunks:
+                break
+
+            # latest start that still overlaps the previous chunk by the required
+            # tokens, but always move forward by at least one line
+            next_start = (
+                bisect_right(
+                    prefix, prefix[end] - overlap_tokens_required, start + 1, end + 1
+                )
+                - 1
+            )
+            start = max(start + 1, next_start)
+
+        return bounds
+
+
+def chunk_map_from_bounds(text: str, bounds: list[tuple[int, int]]) -> dict[str, str]:
+    """Materialize (start, end) character bounds into a {"start:end": chunk_text} map."""
+    return {f"{start}:{end}": text[start:end] for start, end in bounds}
+
+
 def get_roughly_even_chunks(
     text: str,
     max_tokens_allowed_per_chunk: int = 120000,
@@ -119,6 +396,9 @@ def get_roughly_even_chunks(
         overlap_ratio: Fraction of tokens to overlap
         max_chunks: Maximum number of chunks to generate. If None, generates all chunks.
     """
+    if not text:
+        return {}
+
     num_divisions = 1
     total_tokens = num_tokens_from_string(text)
 
@@ -155,82 +435,10 @@ def get_chunks_respecting_line_boundaries_sync(
     Returns:
         dict[str, str]: A mapping from "start:end" character offsets to chunk text.
     """
-    chunks_with_bounds: dict[str, str] = {}
-
-    # Split into lines, preserving newline characters so we can track exact offsets.
-    lines_with_ends = text.splitlines(keepends=True)
-
-    # Build a list of (line_text, token_count, start_offset, end_offset) tuples.
-    line_info: list[tuple[str, int, int, int]] = []
-    char_offset = 0
-    for raw_line in lines_with_ends:
-        line_tokens = num_tokens_from_string(raw_line)
-        start = char_offset
-        length = len(raw_line)
-        end = char_offset + length
-        line_info.append((raw_line, line_tokens, start, end))
-        char_offset = end
-
-    # State for the current chunk:
-    current_chunk: list[tuple[str, int, int, int]] = []
-    current_chunk_tokens = 0
-    current_chunk_start: int | None = None
-
-    for line_text, line_tokens, line_start, line_end in line_info:
-        # If adding this line would exceed token limit, finalize current chunk first.
-        if current_chunk_tokens + line_tokens > soft_limit_tokens and current_chunk:
-            # Compute how many tokens to carry as overlap
-            target_overlap = int(current_chunk_tokens * overlap_ratio)
-            overlap_lines: list[tuple[str, int, int, int]] = []
-            overlap_tokens = 0
-
-            if target_overlap > 0:
-                # Grab full lines from the end until we reach target_overlap
-                for l_text, l_tok, l_start, l_end in reversed(current_chunk):
-                    overlap_lines.insert(0, (l_text, l_tok, l_start, l_end))
-                    overlap_tokens += l_tok
-                    if overlap_tokens >= target_overlap:
-                        break
-
-            # Finalize the chunk we're closing:
-            #   - start = current_chunk_start
-            #   - end = end offset of the last line in current_chunk
-            last_line_end = current_chunk[-1][3]
-            chunk_text = "".join(l[0] for l in current_chunk)
-            key = f"{current_chunk_start}:{last_line_end}"
-            chunks_with_bounds[key] = chunk_text
-
-            # Early stop if we've reached max_chunks
-            if max_chunks is not None and len(chunks_with_bounds) >= max_chunks:
-                return chunks_with_bounds
-
-            # Build the next chunk, starting from the overlap (if any), plus this line
-            if overlap_lines:
-                new_start = overlap_lines[0][2]
-            else:
-                new_start = line_start
-
-            current_chunk = overlap_lines + [
-                (line_text, line_tokens, line_start, line_end)
-            ]
-            current_chunk_tokens = overlap_tokens + line_tokens
-            current_chunk_start = new_start
-
-        else:
-            # Just append this line into the current chunk
-            if not current_chunk:
-                current_chunk_start = line_start
-            current_chunk.append((line_text, line_tokens, line_start, line_end))
-            current_chunk_tokens += line_tokens
-
-    # Finalize the last chunk (if any)
-    if current_chunk:
-        last_line_end = current_chunk[-1][3]
-        chunk_text = "".join(l[0] for l in current_chunk)
-        key = f"{current_chunk_start}:{last_line_end}"
-        chunks_with_bounds[key] = chunk_text
-
-    return chunks_with_bounds
+    index = LineTokenIndex(text)
+    return chunk_map_from_bounds(
+        text, index.soft_limit_bounds(soft_limit_tokens, overlap_ratio, max_chunks)
+    )
 
 
 async def get_chunks_respecting_line_boundaries(
@@ -248,8 +456,9 @@ async def get_chunks_respecting_line_boundaries(
         text: The input text to be chunked
         soft_limit_tokens: Target token count per chunk
         overlap_ratio: Fraction of tokens to overlap
-        use_multiprocessing: Whether to use thread pool for large texts
-        size_threshold_kb: Minimum text size (in KB) to use thread pool
+        use_multiprocessing: Whether to offload large texts to the chunking pool
+            (thread or process pool, see set_chunking_backend)
+        size_threshold_kb: Minimum text size (in KB) to offload
         max_chunks: Maximum number of chunks to generate. If None, generates all chunks.
 
     Returns:
@@ -285,6 +494,17 @@ async def get_chunks_respecting_line_boundaries(
         result = get_chunks_respecting_line_boundaries_sync(
             text, soft_limit_tokens, overlap_ratio, max_chunks
         )
+    elif _chunking_backend == "process":
+        # Tokenize in a worker process; the cheap bisect planning runs here
+        logger.debug(
+            f"Chunking {text_size_kb:.1f}KB text in process pool "
+            f"(text size: {text_size_kb:.1f}KB, chunks: {max_chunks or 'all'})"
+        )
+
+        index = await build_line_token_index_in_process_pool(text)
+        result = chunk_map_from_bounds(
+            text, index.soft_limit_bounds(soft_limit_tokens, overlap_ratio, max_chunks)
+        )
     else:
         # Run in thread pool to avoid blocking event loop
         logger.debug(
@@ -305,7 +525,7 @@ async def get_chunks_respecting_line_boundaries(
         )
 
     elapsed_ms = (time.perf_counter() - start_time) * 1000
-    method = "thread_pool" if should_use_threading else "sync"
+    method = f"{_chunking_backend}_pool" if should_use_threading else "sync"
 
     logger.info(
         f"Chunking [{method}]: {text_size_kb:.1f}KB → {len(result)} chunks "
@@ -318,60 +538,20 @@ async def get_chunks_respecting_line_boundaries(
 def get_chunks_respecting_line_boundaries_with_hard_limit(
     text: str, hard_limit_tokens: int, overlap_ratio: float, max_chunks: int
 ) -> dict[str, str]:
+    """
+    Splits text into chunks that never exceed hard_limit_tokens, respecting line
+    boundaries. Each chunk after the first starts far enough back to share at least
+    hard_limit_tokens * overlap_ratio tokens with the previous one.
+
+    Raises:
+        ValueError: if overlap_ratio >= 0.9 or a single line exceeds hard_limit_tokens.
+    """
     if overlap_ratio >= 0.9:
         raise ValueError(
             f"overlap_ratio={overlap_ratio} is greater than or equal to 0.9"
         )
 
-    overlap_tokens_required: int = int(hard_limit_tokens * overlap_ratio)
-    chunk_text_with_bounds: dict[str, str] = {}
-    lines_with_ends = text.splitlines(keepends=True)
-
-    # Build a list of (line_text, token_count, start_offset, end_offset) tuples.
-    line_info: list[tuple[str, int, int, int]] = []
-    char_offset = 0
-    for raw_line in lines_with_ends:
-        line_tokens = num_tokens_from_string(raw_line)
-        start = char_offset
-        length = len(raw_line)
-        end = char_offset + length
-        line_info.append((raw_line, line_tokens, start, end))
-        char_offset = end
-    num_lines = len(line_info)
-
-    # State for the current chunk:
-    current_chunk_of_lines: list[tuple[str, int, int, int]] = []
-    current_chunk_tokens: int = 0
-
-    line_index = 0
-
-    while line_index < num_lines:
-        line_text, line_tokens, line_start, line_end = line_info[line_index]
-
-        if current_chunk_tokens + line_tokens <= hard_limit_tokens:
-            current_chunk_of_lines.append(
-                (line_text, line_tokens, line_start, line_end)
-            )
-            current_chunk_tokens += line_tokens
-            line_index += 1
-        else:
-            # save this chunk and start a new chunk
-            chunk_bounds = (
-                f"{current_chunk_of_lines[0][2]}:{current_chunk_of_lines[-1][3]}"
-            )
-            chunk_text = "".join([l[0] for l in current_chunk_of_lines])
-            chunk_text_with_bounds[chunk_bounds] = chunk_text
-
-            if len(chunk_text_with_bounds) >= max_chunks:
-                break
-
-            # backtrack line_index
-            _, prev_line_tokens, _, _ = line_info[line_index]
-            current_overlap_tokens: int = prev_line_tokens
-            line_index -= 1
-            while current_overlap_tokens < overlap_tokens_required:
-                _, prev_line_tokens, _, _ = line_info[line_index]
-                current_overlap_tokens += prev_line_tokens
-                line_index -= 1
-
-    return chunk_text_with_bounds
+    index = LineTokenIndex(text)
+    return chunk_map_from_bounds(
+        text, index.hard_limit_bounds(hard_limit_tokens, overlap_ratio, max_chunks)
+    )
@@ -30,7 +30,7 @@ def parse_individual_batch_req_response_raw(
     try:
         if raw_result.get("error"):
             logger.error(
-                f"parse_individual_batch_req_response_raw: error in raw result\n:{raw_result.get("error")}"
+                f"parse_individual_batch_req_response_raw: error in raw result\n:{raw_result.get('error')}"
             )
             raise ValueError(raw_result.get("error"))
 
@@ -0,0 +1,380 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from openai import RateLimitError
+
+from data_etl_app.services.batch_file_satellite import BatchFileSatellite
+from open_ai_key_app.utils import openai_file_util
+from open_ai_key_app.utils.openai_file_util import (
+    INITIAL_CONCURRENT_PART_UPLOADS,
+    AdaptiveConcurrencyLimit,
+    UploadResumeState,
+    upload_file_to_openai_using_parts,
+)
+
+
+class FakeFiles:
+    def __init__(self, contents: dict[str, bytes]):
+        self.contents = contents
+        self.streaming = 0
+        self.peak_streaming = 0
+        self.with_streaming_response = SimpleNamespace(content=self._content)
+
+    @asynccontextmanager
+    async def _content(self, file_id):
+        self.streaming += 1
+        self.peak_streaming = max(self.peak_streaming, self.streaming)
+        try:
+            yield SimpleNamespace(iter_bytes=lambda size: self._iter(file_id, size))
+        finally:
+            self.streaming -= 1
+
+    async def _iter(self, file_id, size):
+        data = self.contents[file_id]
+        for i in range(0, len(data), 4):
+            await asyncio.sleep(0.01)
+            yield data[i : i + 4]
+
+
+def make_batch(batch_id, output_file_id):
+    return SimpleNamespace(
+        external_batch_id=batch_id, output_file_id=output_file_id, error_file_id=None
+    )
+
+
+@pytest.mark.asyncio
+async def test_downloads_share_the_transfer_budget(tmp_path):
+    files = FakeFiles({f"file-{i}": b'{"line": %d}\n' % i for i in range(4)})
+    client = SimpleNamespace(files=files)
+    satellite = BatchFileSatellite(output_dir=tmp_path, max_concurrent_transfers=2)
+
+    outputs = await asyncio.gather(
+        *(
+            satellite.download_batch_output(
+                client=client, gpt_batch=make_batch(f"batch_{i}", f"file-{i}")
+            )
+            for i in range(4)
+        )
+    )
+
+    assert files.peak_streaming == 2
+    for i, output in enumerate(outputs):
+        assert output.output_file_path.read_bytes() == b'{"line": %d}\n' % i
+    assert not list(tmp_path.glob("*.part"))
+
+
+class FakeUploads:
+    def __init__(self, fail_part: int | None = None, throttle_part: int | None = None):
+        self.fail_part = fail_part
+        self.throttle_part = throttle_part
+        self.parts_sent: list[bytes] = []
+        self.created = 0
+        self.cancelled = False
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.parts = SimpleNamespace(create=self._create_part)
+
+    async def create(self, purpose, filename, bytes, mime_type):
+        self.created += 1
+        self.size = bytes
+        return SimpleNamespace(
+            id=f"upload_{self.created}", expires_at=int(time.time()) + 3600
+        )
+
+    async def _create_part(self, upload_id, data):
+        data = data.read()  # parts are streamed, not passed as bytes
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+        finally:
+            self.in_flight -= 1
+        if self.fail_part is not None and data.startswith(b"%d" % self.fail_part):
+            raise ValueError("upload_not_pending")  # not retried
+        if self.throttle_part is not None and data.startswith(
+            b"%d" % self.throttle_part
+        ):
+            self.throttle_part = None  # throttled once
+            raise RateLimitError(
+                "slow down",
+                response=httpx.Response(
+                    429, request=httpx.Request("POST", "https://api.openai.com")
+                ),
+                body=None,
+            )
+        self.parts_sent.append(data)
+        return SimpleNamespace(id=f"part_{data[:1].decode()}")
+
+    async def complete(self, upload_id, part_ids):
+        self.completed_upload_id = upload_id
+        self.part_ids = part_ids
+        return SimpleNamespace(file=SimpleNamespace(id="file_1"))
+
+    async def cancel(self, upload_id):
+        self.cancelled = True
+
+
+def make_jsonl_file(tmp_path, lines):
+    path = tmp_path / "batch.jsonl"
+    path.write_bytes(b"".join(lines))
+    return SimpleNamespace(full_path=path, name=path.name)
+
+
+@pytest.fixture
+def one_line_parts(monkeypatch):
+    # every 2 byte line is a part of its own
+    monkeypatch.setattr(f"{openai_file_util.__name__}.PART_SIZE", 2)
+
+
+@pytest.mark.asyncio
+async def test_upload_sends_parts_in_order(tmp_path, one_line_parts):
+    uploads = FakeUploads()
+    lines = [b"%d\n" % i for i in range(5)]
+    jsonl_batch_file = make_jsonl_file(tmp_path, lines)
+
+    file_id = await upload_file_to_openai_using_parts(
+        client=SimpleNamespace(uploads=uploads), jsonl_batch_file=jsonl_batch_file
+    )
+
+    assert file_id == "file_1"
+    assert uploads.size == sum(len(line) for line in lines)
+    assert sorted(uploads.parts_sent) == lines
+    assert uploads.part_ids == [f"part_{i}" for i in range(5)]
+    assert not UploadResumeState.get_path(jsonl_batch_file.full_path).exists()
+
+
+@pytest.mark.asyncio
+async def test_failed_part_cancels_the_upload(tmp_path, one_line_parts):
+    uploads = FakeUploads(fail_part=1)
+    jsonl_batch_file = make_jsonl_file(tmp_path, [b"%d\n" % i for i in range(6)])
+
+    file_id = await upload_file_to_openai_using_parts(
+        client=SimpleNamespace(uploads=uploads), jsonl_batch_file=jsonl_batch_file
+    )
+
+    assert file_id is None
+    assert uploads.cancelled
+    assert len(uploads.parts_sent) < 5  # the parts after the failure were not sent
+    assert not UploadResumeState.get_path(jsonl_batch_file.full_path).exists()
+
+
+@pytest.mark.asyncio
+async def test_interrupted_upload_resumes_with_the_missing_parts(
+    tmp_path, one_line_parts
+):
+    lines = [b"%d\n" % i for i in range(6)]
+    jsonl_batch_file = make_jsonl_file(tmp_path, lines)
+    file_stat = jsonl_batch_file.full_path.stat()
+    # the process died after parts 0, 2 and 3 of upload_0 went through
+    UploadResumeState(
+        upload_id="upload_0",
+        expires_at=int(time.time()) + 1800,
+        file_size=file_stat.st_size,
+        file_mtime_ns=file_stat.st_mtime_ns,
+        part_size=2,
+        part_count=6,
+        part_ids={0: "part_0", 2: "part_2", 3: "part_3"},
+    ).save(jsonl_batch_file.full_path)
+    uploads = FakeUploads()
+
+    file_id = await upload_file_to_openai_using_parts(
+        client=SimpleNamespace(uploads=uploads), jsonl_batch_file=jsonl_batch_file
+    )
+
+    assert file_id == "file_1"
+    assert uploads.created == 0
+    assert sorted(uploads.parts_sent) == [b"1\n", b"4\n", b"5\n"]
+    assert uploads.completed_upload_id == "upload_0"
+    assert uploads.part_ids == [f"part_{i}" for i in range(6)]
+    assert not UploadResumeState.get_path(jsonl_batch_file.full_path).exists()
+
+
+@pytest.mark.asyncio
+async def test_resume_state_of_a_changed_file_is_ignored(tmp_path, one_line_parts):
+    jsonl_batch_file = make_jsonl_file(tmp_path, [b"%d\n" % i for i in range(4)])
+    UploadResumeState(
+        upload_id="upload_0",
+        expires_at=int(time.time()) + 1800,
+        file_size=6,  # the file was rewritten since
+        file_mtime_ns=0,
+        part_size=2,
+        part_count=3,
+        part_ids={0: "part_0"},
+    ).save(jsonl_batch_file.full_path)
+    uploads = FakeUploads()
+
+    await upload_file_to_openai_using_parts(
+        client=SimpleNamespace(uploads=uploads), jsonl_batch_file=jsonl_batch_file
+    )
+
+    assert uploads.created == 1
+    assert len(uploads.parts_sent) == 4
+    assert uploads.completed_upload_id == "upload_1"
+
+
+@pytest.mark.asyncio
+async def test_concurrency_grows_on_success_and_halves_on_throttling(
+    tmp_path, one_line_parts, monkeypatch
+):
+    monkeypatch.setattr(f"{openai_file_util.__name__}.asyncio.sleep", fast_sleep)
+    uploads = FakeUploads(throttle_part=9)
+    limits = []
+    monkeypatch.setattr(
+        AdaptiveConcurrencyLimit,
+        "on_throttled",
+        record_limit(AdaptiveConcurrencyLimit.on_throttled, limits),
+    )
+
+    file_id = await upload_file_to_openai_using_parts(
+        client=SimpleNamespace(uploads=uploads),
+        jsonl_batch_file=make_jsonl_file(tmp_path, [b"%d\n" % i for i in range(10)]),
+    )
+
+    assert file_id == "file_1"
+    assert len(uploads.parts_sent) == 10
+    assert uploads.peak_in_flight > INITIAL_CONCURRENT_PART_UPLOADS
+    [(before, after)] = limits
+    assert after == before // 2
+
+
+def test_adaptive_limit_stays_within_bounds():
+    limit = AdaptiveConcurrencyLimit(initial=2, maximum=3, increase_after=1)
+    for _ in range(5):
+        limit.on_success()
+    assert limit.limit == 3
+    for _ in range(5):
+        limit.on_throttled()
+    assert limit.limit == 1
+
+
+_real_sleep = asyncio.sleep
+
+
+async def fast_sleep(delay):
+    await _real_sleep(min(delay, 0.01))
+
+
+def record_limit(on_throttled, limits):
+    def wrapper(self):
+        before = self.limit
+        on_throttled(self)
+        limits.append((before, self.limit))
+
+    return wrapper
+
+
+class FakeGPTBatch:
+    def __init__(self, external_batch_id, status):
+        self.external_batch_id = external_batch_id
+        self.status = status
+
+    def is_status_final(self):
+        return self.status in ("completed", "failed", "expired", "cancelled")
+
+
+class FakeBatches:
+    def __init__(self, listed):
+        self.listed = listed  # newest first
+        self.pages = 0
+        self.retrieved = []
+
+    async def list(self, limit, after=None):
+        self.pages += 1
+        start = 0 if after is None else [b.id for b in self.listed].index(after) + 1
+        data = self.listed[start : start + limit]
+        return SimpleNamespace(data=data, has_more=start + limit < len(self.listed))
+
+    async def retrieve(self, batch_id):
+        self.retrieved.append(batch_id)
+        return SimpleNamespace(id=batch_id, status="completed")
+
+
+class FakeAPIKeyBundle:
+    label = "key"
+
+    def __init__(self, batch_sync_cursor):
+        self.batch_sync_cursor = batch_sync_cursor
+
+    async def advance_batch_sync_cursor(self, created_at):
+        self.batch_sync_cursor = max(created_at, self.batch_sync_cursor or 0)
+
+
+@pytest.fixture
+def synced(monkeypatch):
+    unprocessed = [
+        FakeGPTBatch("batch_running", "in_progress"),
+        FakeGPTBatch("batch_done", "completed"),  # results not ingested yet
+    ]
+    upserted = []
+
+    async def find_unprocessed_gpt_batches(label):
+        return unprocessed
+
+    async def update_gpt_batch_from_response(batch_response, gpt_batch):
+        changed = gpt_batch.status != batch_response.status
+        gpt_batch.status = batch_response.status
+        return changed
+
+    async def upsert_latest_gpt_batch_by_external_batch(external_batch, api_key_bundle):
+        upserted.append(external_batch.id)
+        return FakeGPTBatch(external_batch.id, external_batch.status)
+
+    module = "data_etl_app.services.batch_file_satellite"
+    monkeypatch.setattr(
+        f"{module}.find_unprocessed_gpt_batches", find_unprocessed_gpt_batches
+    )
+    monkeypatch.setattr(
+        f"{module}.update_gpt_batch_from_response", update_gpt_batch_from_response
+    )
+    monkeypatch.setattr(
+        f"{module}.upsert_latest_gpt_batch_by_external_batch",
+        upsert_latest_gpt_batch_by_external_batch,
+    )
+    return upserted
+
+
+def listed_batches(n):
+    # newest first, one a minute
+    return [
+        SimpleNamespace(id=f"batch_{i}", created_at=1_000 + 60 * i, status="completed")
+        for i in reversed(range(n))
+    ]
+
+
+@pytest.mark.asyncio
+async def test_sync_retrieves_open_batches_and_lists_only_new_ones(tmp_path, synced):
+    batches = FakeBatches(listed_batches(100))
+    api_key_bundle = FakeAPIKeyBundle(batch_sync_cursor=1_000 + 60 * 97)
+    satellite = BatchFileSatellite(output_dir=tmp_path)
+
+    gpt_batches = await satellite.get_synced_gpt_batches(
+        client=SimpleNamespace(batches=batches), api_key_bundle=api_key_bundle
+    )
+
+    assert batches.retrieved == ["batch_running"]
+    assert synced == ["batch_99", "batch_98", "batch_97"]
+    assert batches.pages == 1
+    assert api_key_bundle.batch_sync_cursor == 1_000 + 60 * 99
+    statuses = {b.external_batch_id: b.status for b in gpt_batches}
+    assert statuses["batch_running"] == "completed"
+    assert statuses["batch_done"] == "completed"
+    assert len(gpt_batches) == 5
+
+
+@pytest.mark.asyncio
+async def test_first_sync_lists_the_whole_history(tmp_path, synced):
+    batches = FakeBatches(listed_batches(250))
+    api_key_bundle = FakeAPIKeyBundle(batch_sync_cursor=None)
+    satellite = BatchFileSatellite(output_dir=tmp_path)
+
+    await satellite.get_synced_gpt_batches(
+        client=SimpleNamespace(batches=batches), api_key_bundle=api_key_bundle
+    )
+
+    assert len(synced) == 250
+    assert batches.pages == 3
+    assert api_key_bundle.batch_sync_cursor == 1_000 + 60 * 249
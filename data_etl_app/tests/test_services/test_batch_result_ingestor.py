@@ -0,0 +1,183 @@
+import asyncio
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+
+from data_etl_app.services.batch_result_ingestor import BatchResultIngestor
+
+UPDATED_AT = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def output_line(custom_id: str) -> str:
+    return json.dumps(
+        {
+            "custom_id": custom_id,
+            "response": {
+                "status_code": 200,
+                "body": {
+                    "created": 1735689600,
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {"role": "assistant", "content": "[]"},
+                        }
+                    ],
+                    "usage": {
+                        "prompt_tokens": 10,
+                        "completion_tokens": 2,
+                        "total_tokens": 12,
+                    },
+                },
+            },
+        }
+    )
+
+
+def write_output(path: Path, lines: list[str]) -> Path:
+    path.write_text("".join(line + "\n" for line in lines))
+    return path
+
+
+class Recorder:
+    def __init__(self, write_delay: float = 0.0, fail_on_window: int | None = None):
+        self.write_delay = write_delay
+        self.fail_on_window = fail_on_window
+        self.events: list[tuple] = []
+        self.windows: list[list] = []
+
+    async def write_window(self, operations):
+        if self.fail_on_window == len(self.windows):
+            raise ConnectionError("mongo unavailable")
+        await asyncio.sleep(self.write_delay)
+        self.windows.append(operations)
+        self.events.append(
+            ("write", [op._filter["request.custom_id"] for op in operations])
+        )
+        return 0, len(operations)
+
+    async def process_manufacturers(self, mfg_etld1s):
+        self.events.append(("process", sorted(mfg_etld1s)))
+
+
+def make_ingestor(recorder, expected, **kwargs):
+    return BatchResultIngestor(
+        batch_id="batch_1",
+        expected_custom_ids=set(expected),
+        updated_at=UPDATED_AT,
+        write_window=recorder.write_window,
+        process_manufacturers=recorder.process_manufacturers,
+        **kwargs,
+    )
+
+
+@pytest.mark.asyncio
+async def test_results_are_written_in_bounded_windows(tmp_path):
+    custom_ids = [f"acme.com>products>{i}:{i + 1}" for i in range(7)]
+    path = write_output(tmp_path / "out.jsonl", [output_line(c) for c in custom_ids])
+    recorder = Recorder()
+
+    stats = await make_ingestor(recorder, custom_ids, flush_window_size=3).ingest(path)
+
+    assert [len(window) for window in recorder.windows] == [3, 3, 1]
+    assert stats.updated == stats.update_operations == 7
+    assert stats.windows_written == 3
+    update = recorder.windows[0][0]._doc["$set"]
+    assert update["batch_id"] == "batch_1"
+    assert update["updated_at"] == UPDATED_AT
+    assert update["response_blob"]["response"]["body"]["usage"]["total_tokens"] == 12
+
+
+@pytest.mark.asyncio
+async def test_manufacturer_is_processed_once_its_requests_are_written(tmp_path):
+    first = [f"first.com>products>{i}:{i + 1}" for i in range(2)]
+    second = [f"second.com>products>{i}:{i + 1}" for i in range(4)]
+    path = write_output(
+        tmp_path / "out.jsonl", [output_line(c) for c in first + second]
+    )
+    recorder = Recorder()
+
+    stats = await make_ingestor(recorder, first + second, flush_window_size=2).ingest(
+        path
+    )
+
+    assert recorder.events == [
+        ("write", first),
+        ("process", ["first.com"]),  # before the rest of the file is written
+        ("write", second[:2]),
+        ("write", second[2:]),
+        ("process", ["second.com"]),
+    ]
+    assert stats.mfgs_released_early == 2
+    assert stats.mfgs_released == 2
+
+
+@pytest.mark.asyncio
+async def test_missing_results_are_reset_and_their_manufacturer_still_processed(
+    tmp_path,
+):
+    expected = [
+        "acme.com>products>0:1",
+        "acme.com>products>1:2",
+        "gone.com>products>0:1",
+    ]
+    path = write_output(
+        tmp_path / "out.jsonl",
+        [output_line(expected[0]), "{not json", json.dumps({"response": {}})],
+    )
+    recorder = Recorder()
+
+    stats = await make_ingestor(recorder, expected).ingest(path)
+
+    [window] = recorder.windows
+    resets = [op._filter["request.custom_id"] for op in window[1:]]
+    assert resets == expected[1:]
+    assert window[1]._doc == {"$set": {"batch_id": None, "updated_at": UPDATED_AT}}
+    assert stats.missing_custom_ids == 2
+    assert stats.failed_output_parses == 2
+    # gone.com had no result at all, so there is nothing to process for it
+    assert recorder.events[-1] == ("process", ["acme.com"])
+
+
+@pytest.mark.asyncio
+async def test_parsing_waits_for_the_writer_when_windows_pile_up(tmp_path):
+    custom_ids = [f"acme.com>products>{i}:{i + 1}" for i in range(20)]
+    path = write_output(tmp_path / "out.jsonl", [output_line(c) for c in custom_ids])
+    recorder = Recorder(write_delay=0.01)
+    ingestor = make_ingestor(
+        recorder, custom_ids, flush_window_size=2, max_pending_windows=1
+    )
+    peak = 0
+
+    async def watch():
+        nonlocal peak
+        while True:
+            # updates held in memory: the window being parsed and the ones waiting
+            unwritten = (
+                ingestor.stats.total_output_lines - ingestor.stats.update_operations
+            )
+            peak = max(peak, unwritten)
+            await asyncio.sleep(0)
+
+    watcher = asyncio.create_task(watch())
+    await ingestor.ingest(path)
+    watcher.cancel()
+
+    assert len(recorder.windows) == 10
+    assert peak <= 2 * 3  # one window parsed, one waiting, one being written
+
+
+@pytest.mark.asyncio
+async def test_write_error_stops_ingestion(tmp_path):
+    custom_ids = [f"acme.com>products>{i}:{i + 1}" for i in range(10)]
+    path = write_output(tmp_path / "out.jsonl", [output_line(c) for c in custom_ids])
+    recorder = Recorder(fail_on_window=1)
+
+    with pytest.raises(ConnectionError):
+        await make_ingestor(
+            recorder, custom_ids, flush_window_size=2, max_pending_windows=1
+        ).ingest(path)
+
+    assert len(recorder.windows) == 1
+    assert ("process", ["acme.com"]) not in recorder.events
@@ -0,0 +1,193 @@
+import random
+import re
+
+import pytest
+from rdflib import URIRef
+
+from data_etl_app.models.skos_concept import Concept
+from data_etl_app.services.brute_search_service import (
+    ConceptMatcher,
+    brute_search,
+    brute_search_chunks,
+    get_concept_matcher,
+    word_regex,
+)
+from data_etl_app.utils.chunk_util import get_chunks_respecting_line_boundaries_sync
+
+
+def regex_brute_search(text: str, concepts: set[Concept]) -> set[Concept]:
+    """The per-label regex implementation brute_search replaced."""
+    return {
+        c
+        for c in concepts
+        if any(
+            re.search(word_regex(label), text, re.IGNORECASE) for label in c.matchLabels
+        )
+    }
+
+
+def make_concept(name: str, *alt_labels: str) -> Concept:
+    return Concept(
+        name=name,
+        uri=URIRef(f"http://example.com/{abs(hash(name))}"),
+        altLabels=list(alt_labels),
+        ancestors=[],
+    )
+
+
+CONCEPTS = {
+    make_concept("CNC Machining", "CNC machined", "Computer Numerical Control"),
+    make_concept("Machining"),
+    make_concept("ISO 9001", "ISO 9001:2015", "ISO-9001"),
+    make_concept("AS9100", "AS 9100D"),
+    make_concept("C++"),
+    make_concept(".NET"),
+    make_concept("Aluminum", "Aluminium", "Al"),
+    make_concept("Stainless Steel", "SS"),
+    make_concept("Steel"),
+    make_concept("Laser Cutting", "laser-cutting"),
+    make_concept("Tin"),
+    make_concept("Tin Plating", "Tin-Plating"),
+    make_concept("Größe", "GRÖSSE"),
+    make_concept("Σίδηρος", "σίδηρος"),
+    make_concept("3D Printing", "3-D printing", "additive_manufacturing"),
+}
+
+WORDS = [
+    "cnc",
+    "CNC",
+    "machining",
+    "Machined",
+    "iso",
+    "9001",
+    "9001:2015",
+    "ISO-9001",
+    "as9100",
+    "AS",
+    "9100D",
+    "c++",
+    "C++11",
+    ".net",
+    "dotnet",
+    "aluminum",
+    "ALUMINIUM",
+    "al",
+    "Ally",
+    "stainless",
+    "steel",
+    "Steels",
+    "ss",
+    "laser",
+    "cutting",
+    "laser-cutting",
+    "tin",
+    "testing",
+    "tin-plating",
+    "plating",
+    "größe",
+    "σίδηρος",
+    "ΣΊΔΗΡΟΣ",
+    "3d",
+    "3-D",
+    "printing",
+    "additive_manufacturing",
+    "_al",
+    "al_",
+    "computer",
+    "numerical",
+    "control",
+]
+SEPARATORS = [" ", " ", " ", "\n", ", ", ". ", "-", "_", "/", "(", ")", ":", "\t"]
+
+
+def random_text(rng: random.Random, num_words: int) -> str:
+    parts = []
+    for _ in range(num_words):
+        parts.append(rng.choice(WORDS))
+        parts.append(rng.choice(SEPARATORS))
+    return "".join(parts)
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_brute_search_matches_regex_on_random_text(seed):
+    rng = random.Random(seed)
+    text = random_text(rng, rng.randint(0, 60))
+
+    assert brute_search(text, CONCEPTS) == regex_brute_search(text, CONCEPTS)
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "",
+        "CNC Machining",
+        "We do cnc machining.",
+        "cncmachining",
+        "Certified ISO 9001:2015 shop",
+        "ISO 9001:20155",
+        "AS9100D",
+        "AS 9100D certified",
+        "C++ and C++11",
+        "xC++",
+        "Visit .NET and a.NET",
+        "Aluminium_alloys and Al-6061",
+        "al",
+        "_al_",
+        "Stainless Steel.",
+        "stainless steels",
+        "laser-cutting",
+        "Laser Cutting\nservices",
+        "testing tin-plating",
+        "GRÖSSE größe",
+        "ΣΊΔΗΡΟΣ",
+        "3-D printing & additive_manufacturing",
+        "İSO 9001",
+    ],
+)
+def test_brute_search_matches_regex_on_edge_cases(text):
+    assert brute_search(text, CONCEPTS) == regex_brute_search(text, CONCEPTS)
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_brute_search_chunks_matches_regex_per_chunk(seed, monkeypatch):
+    monkeypatch.setattr(
+        "data_etl_app.utils.chunk_util.count_many",
+        lambda strings: [len(s.split()) for s in strings],
+    )
+    rng = random.Random(seed)
+    text = random_text(rng, rng.randint(20, 200))
+    chunk_map = get_chunks_respecting_line_boundaries_sync(
+        text, soft_limit_tokens=rng.randint(3, 30), overlap_ratio=0.25
+    )
+
+    by_chunk = brute_search_chunks(text, CONCEPTS, chunk_map.keys())
+
+    assert set(by_chunk) == set(chunk_map)
+    for bounds, chunk_text in chunk_map.items():
+        assert by_chunk[bounds] == regex_brute_search(chunk_text, CONCEPTS), bounds
+
+
+def test_find_matches_reports_offsets():
+    steel = next(c for c in CONCEPTS if c.name == "Steel")
+    stainless = next(c for c in CONCEPTS if c.name == "Stainless Steel")
+    text = "Stainless steel and steel"
+
+    matches = ConceptMatcher(CONCEPTS).find_matches(text)
+
+    assert (0, 15, stainless) in matches
+    assert (10, 15, steel) in matches
+    assert (20, 25, steel) in matches
+
+
+def test_search_chunks_attributes_overlapping_chunks():
+    tin = next(c for c in CONCEPTS if c.name == "Tin")
+    text = "tin\nplating\ntin\n"
+
+    by_chunk = ConceptMatcher(CONCEPTS).search_chunks(text, ["0:12", "4:12", "12:16"])
+
+    assert by_chunk == {"0:12": {tin}, "4:12": set(), "12:16": {tin}}
+
+
+def test_matcher_is_built_once_per_concept_set():
+    assert get_concept_matcher(CONCEPTS) is get_concept_matcher(CONCEPTS)
+    assert get_concept_matcher(set(CONCEPTS)) is not get_concept_matcher(CONCEPTS)
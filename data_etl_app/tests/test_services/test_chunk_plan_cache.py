@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+
+from data_etl_app.services.chunk_plan_cache import ChunkMap, ChunkPlanCache
+from data_etl_app.services.chunking_strat import ChunkingStrat
+from data_etl_app.utils.chunk_util import get_chunks_respecting_line_boundaries_sync
+
+
+@pytest.fixture
+def count_many_calls(monkeypatch):
+    """One token per line; records every batched tokenizer call."""
+    calls: list[list[str]] = []
+
+    def mock_count_many(strings):
+        calls.append(list(strings))
+        return [1 for _ in strings]
+
+    monkeypatch.setattr("data_etl_app.utils.chunk_util.count_many", mock_count_many)
+    return calls
+
+
+TEXT = "".join(f"L{i}\n" for i in range(10))
+STRAT_A = ChunkingStrat(overlap=0.0, max_tokens=3, max_chunks=10)
+STRAT_B = ChunkingStrat(overlap=0.5, max_tokens=4, max_chunks=2)
+
+
+@pytest.mark.asyncio
+async def test_chunk_map_matches_uncached_chunking(count_many_calls):
+    cache = ChunkPlanCache()
+
+    for strat in (STRAT_A, STRAT_B):
+        chunk_map = await cache.get_chunk_map("v1", TEXT, strat)
+        expected = get_chunks_respecting_line_boundaries_sync(
+            TEXT, strat.max_tokens, strat.overlap, strat.max_chunks
+        )
+        assert dict(chunk_map.items()) == expected
+
+
+@pytest.mark.asyncio
+async def test_text_is_tokenized_once_per_version(count_many_calls):
+    cache = ChunkPlanCache()
+
+    await cache.get_chunk_map("v1", TEXT, STRAT_A)
+    await cache.get_chunk_map("v1", TEXT, STRAT_B)
+    await cache.get_chunk_map("v1", TEXT, STRAT_A)
+
+    assert len(count_many_calls) == 1
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_one_tokenization(count_many_calls):
+    cache = ChunkPlanCache()
+
+    maps = await asyncio.gather(
+        *(cache.get_chunk_map("v1", TEXT, s) for s in (STRAT_A, STRAT_B, STRAT_A))
+    )
+
+    assert len(count_many_calls) == 1
+    assert dict(maps[0]) == dict(maps[2])
+
+
+@pytest.mark.asyncio
+async def test_lru_eviction_by_bytes(count_many_calls):
+    cache = ChunkPlanCache()
+    await cache.get_chunk_map("v1", TEXT, STRAT_A)
+    entry_bytes = cache.nbytes
+    cache.max_bytes = entry_bytes * 2
+
+    await cache.get_chunk_map("v2", TEXT, STRAT_A)
+    await cache.get_chunk_map("v1", TEXT, STRAT_A)  # v1 becomes most recent
+    await cache.get_chunk_map("v3", TEXT, STRAT_A)
+
+    assert "v1" in cache and "v3" in cache
+    assert "v2" not in cache
+    assert cache.nbytes <= cache.max_bytes
+
+
+@pytest.mark.asyncio
+async def test_evict_releases_bytes(count_many_calls):
+    cache = ChunkPlanCache()
+    await cache.get_chunk_map("v1", TEXT, STRAT_A)
+
+    cache.evict("v1")
+
+    assert len(cache) == 0
+    assert cache.nbytes == 0
+
+
+def test_chunk_map_slices_text_lazily():
+    text = "abc\ndef\n"
+    chunk_map = ChunkMap(text, [(0, 4), (4, 8)])
+
+    assert list(chunk_map) == ["0:4", "4:8"]
+    assert chunk_map["4:8"] == "def\n"
+    assert chunk_map.bounds() == [(0, 4), (4, 8)]
@@ -0,0 +1,95 @@
+import json
+
+from rdflib import URIRef
+
+from data_etl_app.models.skos_concept import Concept
+from data_etl_app.services.llm_powered.map.concept_candidate_service import (
+    ConceptCandidateIndex,
+    get_concept_candidate_index,
+    get_concept_mapping_context,
+    get_shortlist_recall,
+)
+
+
+def make_concept(name: str, *alt_labels: str, ancestors=()) -> Concept:
+    return Concept(
+        name=name,
+        uri=URIRef(f"http://example.com/{abs(hash(name))}"),
+        altLabels=list(alt_labels),
+        ancestors=list(ancestors),
+    )
+
+
+CONCEPTS = {
+    make_concept("CNC Machining", "CNC machined", ancestors=["Machining"]),
+    make_concept("Machining", ancestors=["Manufacturing Processes"]),
+    make_concept("Laser Cutting", ancestors=["Cutting"]),
+    make_concept("Waterjet Cutting", "Water Jet Cutting", ancestors=["Cutting"]),
+    make_concept("Powder Coating", ancestors=["Finishing"]),
+    make_concept("Anodizing", "Anodising", ancestors=["Finishing"]),
+    make_concept("Injection Molding", "Injection Moulding", ancestors=["Molding"]),
+    make_concept("Aerospace", "Aviation"),
+    make_concept("Medical Devices", ancestors=["Healthcare"]),
+    make_concept("ISO 9001", "ISO 9001:2015"),
+    make_concept("AS9100", "AS 9100D"),
+    make_concept("Stainless Steel", ancestors=["Steel", "Metals"]),
+    make_concept("Aluminum", "Aluminium", ancestors=["Metals"]),
+}
+
+
+def top_names(index, keyword, top_k=3):
+    return [c.name for c in index.shortlist(keyword, top_k)]
+
+
+def test_spelling_variants_and_word_order_rank_first():
+    index = ConceptCandidateIndex(CONCEPTS)
+
+    assert top_names(index, "anodized aluminium parts")[0] == "Aluminum"
+    assert top_names(index, "water-jet cutting services")[0] == "Waterjet Cutting"
+    assert top_names(index, "plastic injection moulded parts")[0] == (
+        "Injection Molding"
+    )
+    assert top_names(index, "ISO9001 certified")[0] == "ISO 9001"
+    assert "Anodizing" in top_names(index, "anodised")
+
+
+def test_ancestors_shortlist_specific_concepts():
+    index = ConceptCandidateIndex(CONCEPTS)
+
+    metals = top_names(index, "metals", top_k=5)
+    assert {"Stainless Steel", "Aluminum"} <= set(metals)
+    assert (
+        index.score("finishing")[
+            next(c for c in CONCEPTS if c.name == "Powder Coating")
+        ]
+        < 1
+    )  # an ancestor match counts for less than an own label
+
+
+def test_context_lists_only_shortlisted_knowns():
+    unknowns = {"laser cut sheet metal", "aviation components"}
+
+    full = json.loads(get_concept_mapping_context(CONCEPTS, unknowns, None))
+    shortlisted = json.loads(get_concept_mapping_context(CONCEPTS, unknowns, 2))
+
+    assert len(full["knowns"]) == len(CONCEPTS)
+    assert {k["name"] for k in shortlisted["knowns"]} >= {"Laser Cutting", "Aerospace"}
+    assert len(shortlisted["knowns"]) <= 4
+    assert shortlisted["unknowns"] == sorted(unknowns)
+    assert get_concept_candidate_index(CONCEPTS) is get_concept_candidate_index(
+        CONCEPTS
+    )
+
+
+def test_recall_counts_pairs_kept_by_the_shortlist():
+    index = ConceptCandidateIndex(CONCEPTS)
+    pairs = [
+        ("cnc machined parts", "CNC Machining"),
+        ("powder coated finishes", "Powder Coating"),
+        ("FAA part 145", "Aerospace"),  # nothing in common to go by
+    ]
+
+    recall = get_shortlist_recall(index, pairs, top_k=1)
+
+    assert (recall.pairs, recall.pairs_in_shortlist) == (3, 2)
+    assert recall.missed == [("FAA part 145", "Aerospace")]
@@ -0,0 +1,242 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from data_etl_app.services.field_extraction_scheduler import (
+    ExtractionContext,
+    ExtractionStep,
+    FieldExtractionScheduler,
+    StepOutcome,
+)
+
+
+def make_manufacturer(**fields):
+    defaults = dict(
+        etld1="acme.com",
+        is_manufacturer=None,
+        addresses=None,
+        products=None,
+        industries=None,
+    )
+    return SimpleNamespace(**(defaults | fields))
+
+
+def make_ctx(manufacturer):
+    return ExtractionContext(
+        polled_at=datetime(2025, 1, 1, tzinfo=timezone.utc),
+        mfg_txt="text",
+        manufacturer=manufacturer,
+    )
+
+
+def returns(value, delay=0.05, calls=None):
+    async def run(ctx):
+        if calls is not None:
+            calls.append(time.perf_counter())
+        await asyncio.sleep(delay)
+        return value
+
+    return run
+
+
+def steps(is_manufacturer=True, gate_open=True, calls=None, delay=0.05):
+    def field_step(name, value, slowdown=1, **kwargs):
+        return ExtractionStep(
+            name,
+            run=returns(value, delay * slowdown, calls),
+            field=name,
+            is_missing=lambda m, name=name: getattr(m, name) is None,
+            **kwargs,
+        )
+
+    return [
+        field_step("is_manufacturer", is_manufacturer),
+        field_step("addresses", ["1 Main St"], slowdown=3),
+        ExtractionStep(
+            "gate",
+            run=returns(gate_open, 0),
+            requires=("is_manufacturer",),
+            uses_llm=False,
+            checkpoint=True,
+        ),
+        field_step("products", ["widgets"], requires=("gate",)),
+        field_step("industries", ["aerospace"], requires=("gate",)),
+    ]
+
+
+class Recorder:
+    def __init__(self):
+        self.writes: list[list[str]] = []
+        self.errors: list[tuple[str, str]] = []
+
+    async def persist(self, fields):
+        self.writes.append(sorted(fields))
+
+    async def on_error(self, field, error):
+        self.errors.append((field, str(error)))
+
+
+@pytest.mark.asyncio
+async def test_independent_steps_run_concurrently():
+    manufacturer = make_manufacturer()
+    recorder = Recorder()
+    scheduler = FieldExtractionScheduler(steps(delay=0.1))
+
+    started = time.perf_counter()
+    report = await scheduler.run(make_ctx(manufacturer), recorder.persist)
+    elapsed = time.perf_counter() - started
+
+    # about the slowest step (addresses, 0.3s), not the 0.6s of running them in turn
+    assert elapsed < 0.45
+    assert manufacturer.products == ["widgets"]
+    assert manufacturer.addresses == ["1 Main St"]
+    assert sorted(report.extracted) == [
+        "addresses",
+        "industries",
+        "is_manufacturer",
+        "products",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_fields_are_written_in_batches_at_checkpoint_and_end():
+    recorder = Recorder()
+    scheduler = FieldExtractionScheduler(steps())
+
+    report = await scheduler.run(make_ctx(make_manufacturer()), recorder.persist)
+
+    assert recorder.writes == [
+        ["is_manufacturer"],  # the gate checkpoint; addresses is still running
+        ["addresses", "industries", "products"],
+    ]
+    assert report.writes == 2
+
+
+@pytest.mark.asyncio
+async def test_closed_gate_blocks_dependents_only():
+    manufacturer = make_manufacturer()
+    recorder = Recorder()
+    scheduler = FieldExtractionScheduler(steps(gate_open=False))
+
+    report = await scheduler.run(make_ctx(manufacturer), recorder.persist)
+
+    assert report.outcomes["gate"] == StepOutcome.GATE_CLOSED
+    assert report.outcomes["products"] == StepOutcome.BLOCKED
+    assert report.outcomes["addresses"] == StepOutcome.EXTRACTED
+    assert manufacturer.products is None
+
+
+@pytest.mark.asyncio
+async def test_failed_step_is_reported_and_blocks_its_dependents():
+    async def fail(ctx):
+        raise RuntimeError("LLM timed out")
+
+    graph = steps()
+    graph[0] = ExtractionStep(
+        "is_manufacturer",
+        run=fail,
+        field="is_manufacturer",
+        is_missing=lambda m: m.is_manufacturer is None,
+    )
+    recorder = Recorder()
+    scheduler = FieldExtractionScheduler(graph)
+
+    report = await scheduler.run(
+        make_ctx(make_manufacturer()), recorder.persist, recorder.on_error
+    )
+
+    assert recorder.errors == [("is_manufacturer", "LLM timed out")]
+    assert report.failed == ["is_manufacturer"]
+    assert report.outcomes["gate"] == StepOutcome.BLOCKED
+    assert report.outcomes["products"] == StepOutcome.BLOCKED
+    assert recorder.writes == [["addresses"]]
+
+
+@pytest.mark.asyncio
+async def test_present_fields_are_not_extracted_again():
+    calls = []
+    manufacturer = make_manufacturer(is_manufacturer=True, products=["bolts"])
+    recorder = Recorder()
+    scheduler = FieldExtractionScheduler(steps(calls=calls))
+
+    report = await scheduler.run(make_ctx(manufacturer), recorder.persist)
+
+    assert report.outcomes["is_manufacturer"] == StepOutcome.ALREADY_PRESENT
+    assert report.outcomes["products"] == StepOutcome.ALREADY_PRESENT
+    assert manufacturer.products == ["bolts"]
+    assert len(calls) == 2  # addresses and industries
+    assert recorder.writes == [["addresses", "industries"]]
+
+
+@pytest.mark.asyncio
+async def test_concurrency_budgets_are_respected():
+    running = 0
+    peak = 0
+
+    async def track(ctx):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.02)
+        running -= 1
+        return ["x"]
+
+    graph = [
+        ExtractionStep(f"field_{i}", run=track, field=f"field_{i}") for i in range(6)
+    ]
+    llm_semaphore = asyncio.Semaphore(3)
+    scheduler = FieldExtractionScheduler(
+        graph, max_concurrent_steps=4, llm_semaphore=llm_semaphore
+    )
+    manufacturers = [
+        make_manufacturer(**{f"field_{i}": None for i in range(6)}) for _ in range(3)
+    ]
+
+    await asyncio.gather(
+        *(scheduler.run(make_ctx(m), Recorder().persist) for m in manufacturers)
+    )
+
+    # the global LLM budget caps all three manufacturers together
+    assert peak == 3
+
+
+@pytest.mark.asyncio
+async def test_failed_checkpoint_is_retried_at_the_end():
+    writes = []
+
+    async def flaky_persist(fields):
+        if not writes:
+            writes.append(None)
+            raise ConnectionError("mongo unavailable")
+        writes.append(sorted(fields))
+
+    scheduler = FieldExtractionScheduler(steps())
+    report = await scheduler.run(make_ctx(make_manufacturer()), flaky_persist)
+
+    assert writes[1] == ["addresses", "industries", "is_manufacturer", "products"]
+    assert report.writes == 1
+
+
+@pytest.mark.parametrize(
+    "graph, message",
+    [
+        (
+            [ExtractionStep("a", run=returns(1)), ExtractionStep("a", run=returns(1))],
+            "Duplicate",
+        ),
+        ([ExtractionStep("a", run=returns(1), requires=("b",))], "unknown"),
+        (
+            [
+                ExtractionStep("a", run=returns(1), requires=("b",)),
+                ExtractionStep("b", run=returns(1), requires=("a",)),
+            ],
+            "cycle",
+        ),
+    ],
+)
+def test_invalid_graphs_are_rejected(graph, message):
+    with pytest.raises(ValueError, match=message):
+        FieldExtractionScheduler(graph)
@@ -1,11 +1,31 @@
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
 import pytest
 
+from data_etl_app.utils import chunk_util
 from data_etl_app.utils.chunk_util import (
+    LineTokenIndex,
+    _build_line_token_index_from_shared_memory,
+    build_line_token_index_in_process_pool,
     get_chunks_respecting_line_boundaries,
+    get_chunks_respecting_line_boundaries_sync,
+    get_chunks_respecting_line_boundaries_with_hard_limit,
     get_roughly_even_chunks,
 )
 
 
+def _patch_token_count(monkeypatch, token_count):
+    """Patch both the single-string and the batched token counters used by chunk_util."""
+    monkeypatch.setattr(
+        "data_etl_app.utils.chunk_util.num_tokens_from_string", token_count
+    )
+    monkeypatch.setattr(
+        "data_etl_app.utils.chunk_util.count_many",
+        lambda strings: [token_count(s) for s in strings],
+    )
+
+
 @pytest.mark.asyncio
 async def test_empty_text_returns_empty_dict():
     result = await get_chunks_respecting_line_boundaries(
@@ -18,9 +38,7 @@ async def test_empty_text_returns_empty_dict():
 @pytest.mark.asyncio
 async def test_chunks_with_overlap_and_correct_boundaries(monkeypatch):
     # Monkeypatch token-count function so each line counts as 1 token
-    monkeypatch.setattr(
-        "data_etl_app.utils.chunk_util.num_tokens_from_string", lambda line: 1
-    )
+    _patch_token_count(monkeypatch, lambda line: 1)
     # Prepare text with 5 lines
     text = """\
 L1
@@ -49,9 +67,8 @@ L5"""  # note: only first 4 lines end with newline when splitlines(keepends=True
 
 @pytest.mark.asyncio
 async def test_full_text_as_single_chunk_when_under_limit(monkeypatch):
-    monkeypatch.setattr(
-        "data_etl_app.utils.chunk_util.num_tokens_from_string",
-        lambda line: len(line),  # small count to ensure under limit
+    _patch_token_count(
+        monkeypatch, lambda line: len(line)  # small count to ensure under limit
     )
     text = "Hello world!"  # single line
     result = await get_chunks_respecting_line_boundaries(
@@ -69,9 +86,7 @@ async def test_full_text_as_single_chunk_when_under_limit(monkeypatch):
 @pytest.mark.asyncio
 async def test_chunks_with_zero_overlap(monkeypatch):
     # Monkeypatch token-count to 1 token per line
-    monkeypatch.setattr(
-        "data_etl_app.utils.chunk_util.num_tokens_from_string", lambda line: 1
-    )
+    _patch_token_count(monkeypatch, lambda line: 1)
     # Prepare text with 5 lines
     text = "L1\nL2\nL3\nL4\nL5"
     # Use max_tokens=3 and zero overlap
@@ -98,9 +113,7 @@ def test_get_roughly_even_chunks_empty_text():
 
 def test_get_roughly_even_chunks_text_under_target(monkeypatch):
     """Test when total tokens is under target_chunk_tokens"""
-    monkeypatch.setattr(
-        "data_etl_app.utils.chunk_util.num_tokens_from_string", lambda line: 10
-    )
+    _patch_token_count(monkeypatch, lambda line: 10)
     text = "Short text"
     result = get_roughly_even_chunks(
         text, max_tokens_allowed_per_chunk=100, overlap_ratio=0.25
@@ -121,9 +134,7 @@ def test_get_roughly_even_chunks_calculates_divisions_correctly(monkeypatch):
         else:
             return 1000  # Each line is 1000 tokens to force chunking
 
-    monkeypatch.setattr(
-        "data_etl_app.utils.chunk_util.num_tokens_from_string", mock_token_count
-    )
+    _patch_token_count(monkeypatch, mock_token_count)
 
     text = "Line1\nLine2\nLine3\nLine4\nLine5\nLine6"
     # target_chunk_tokens=2500, using integer division:
@@ -141,9 +152,7 @@ def test_get_roughly_even_chunks_calculates_divisions_correctly(monkeypatch):
 
 def test_get_roughly_even_chunks_with_large_target(monkeypatch):
     """Test when target is much larger than text"""
-    monkeypatch.setattr(
-        "data_etl_app.utils.chunk_util.num_tokens_from_string", lambda line: 50
-    )
+    _patch_token_count(monkeypatch, lambda line: 50)
     text = "Small text content"
     result = get_roughly_even_chunks(
         text, max_tokens_allowed_per_chunk=10000, overlap_ratio=0.25
@@ -164,9 +173,7 @@ def test_get_roughly_even_chunks_division_calculation(monkeypatch):
         else:
             return 100  # Each line/chunk
 
-    monkeypatch.setattr(
-        "data_etl_app.utils.chunk_util.num_tokens_from_string", mock_token_count
-    )
+    _patch_token_count(monkeypatch, mock_token_count)
 
     text = "full_text_content_here"
     # target_chunk_tokens=4000, using integer division:
@@ -201,9 +208,7 @@ def test_get_roughly_even_chunks_passes_correct_parameters(monkeypatch):
     def mock_token_count(text):
         return 8000  # Total tokens
 
-    monkeypatch.setattr(
-        "data_etl_app.utils.chunk_util.num_tokens_from_string", mock_token_count
-    )
+    _patch_token_count(monkeypatch, mock_token_count)
     monkeypatch.setattr(
         "data_etl_app.utils.chunk_util.get_chunks_respecting_line_boundaries_sync",
         mock_get_chunks_respecting_boundaries,
@@ -244,9 +249,7 @@ def test_get_roughly_even_chunks_realistic_scenario(monkeypatch):
         # Simulate realistic token counting: ~10 tokens per line
         return len(text.split("\n")) * 10
 
-    monkeypatch.setattr(
-        "data_etl_app.utils.chunk_util.num_tokens_from_string", mock_token_count
-    )
+    _patch_token_count(monkeypatch, mock_token_count)
 
     # Target 100 tokens per chunk, with 20% overlap
     result = get_roughly_even_chunks(
@@ -287,9 +290,7 @@ def test_get_roughly_even_chunks_integer_division_behavior(monkeypatch):
         captured_divisions.append(soft_limit_tokens)
         return {"0:10": text[:10]}
 
-    monkeypatch.setattr(
-        "data_etl_app.utils.chunk_util.num_tokens_from_string", mock_token_count
-    )
+    _patch_token_count(monkeypatch, mock_token_count)
     monkeypatch.setattr(
         "data_etl_app.utils.chunk_util.get_chunks_respecting_line_boundaries_sync",
         mock_get_chunks_respecting_boundaries,
@@ -325,9 +326,7 @@ def test_get_roughly_even_chunks_validates_chunk_count_and_sizes(monkeypatch):
         else:
             return 100  # Individual lines have 100 tokens each
 
-    monkeypatch.setattr(
-        "data_etl_app.utils.chunk_util.num_tokens_from_string", mock_token_count
-    )
+    _patch_token_count(monkeypatch, mock_token_count)
 
     # Create text with 10 lines = 1000 total tokens
     text = "\n".join([f"Line {i} with content" for i in range(1, 11)])
@@ -405,9 +404,7 @@ def test_get_roughly_even_chunks_specific_division_scenarios(monkeypatch):
             num_chunks = max(1, case["total_tokens"] // soft_limit_tokens)
             return {f"{i*100}:{(i+1)*100}": f"chunk_{i}" for i in range(num_chunks)}
 
-        monkeypatch.setattr(
-            "data_etl_app.utils.chunk_util.num_tokens_from_string", mock_token_count
-        )
+        _patch_token_count(monkeypatch, mock_token_count)
         monkeypatch.setattr(
             "data_etl_app.utils.chunk_util.get_chunks_respecting_line_boundaries_sync",
             mock_get_chunks_respecting_boundaries,
@@ -422,3 +419,144 @@ def test_get_roughly_even_chunks_specific_division_scenarios(monkeypatch):
             f"For total_tokens={case['total_tokens']}, target={case['target_tokens']}: "
             f"expected chunk size {case['expected_chunk_size']}, got {captured_params['soft_limit_tokens']}"
         )
+
+
+# Tests for LineTokenIndex
+def test_line_token_index_prefix_sums(monkeypatch):
+    _patch_token_count(monkeypatch, lambda line: len(line.strip()))
+    text = "a\nbbb\ncc"
+    index = LineTokenIndex(text)
+
+    assert index.num_lines == 3
+    assert index.total_tokens == 6
+    assert list(index.char_offsets) == [0, 2, 6, 8]
+    assert list(index.token_prefix) == [0, 1, 4, 6]
+
+
+def test_line_token_index_tokenizes_all_lines_in_one_call(monkeypatch):
+    calls = []
+
+    def mock_count_many(strings):
+        calls.append(list(strings))
+        return [1 for _ in strings]
+
+    monkeypatch.setattr("data_etl_app.utils.chunk_util.count_many", mock_count_many)
+    LineTokenIndex("L1\nL2\nL3\nL4")
+
+    assert calls == [["L1\n", "L2\n", "L3\n", "L4"]]
+
+
+def test_soft_limit_chunk_exceeding_line_gets_own_chunk(monkeypatch):
+    _patch_token_count(monkeypatch, lambda line: 10 if "BIG" in line else 1)
+    text = "L1\nBIG\nL3\n"
+
+    bounds = LineTokenIndex(text).soft_limit_bounds(
+        soft_limit_tokens=3, overlap_ratio=0
+    )
+
+    assert bounds == [(0, 3), (3, 7), (7, 10)]
+
+
+# Tests for get_chunks_respecting_line_boundaries_with_hard_limit
+def test_hard_limit_chunks_never_exceed_limit_and_overlap(monkeypatch):
+    _patch_token_count(monkeypatch, lambda line: 1)
+    text = "L1\nL2\nL3\nL4\nL5\n"
+
+    chunks = get_chunks_respecting_line_boundaries_with_hard_limit(
+        text, hard_limit_tokens=2, overlap_ratio=0.5, max_chunks=10
+    )
+
+    assert chunks == {
+        "0:6": "L1\nL2\n",
+        "3:9": "L2\nL3\n",
+        "6:12": "L3\nL4\n",
+        "9:15": "L4\nL5\n",
+    }
+
+
+def test_hard_limit_respects_max_chunks(monkeypatch):
+    _patch_token_count(monkeypatch, lambda line: 1)
+    text = "L1\nL2\nL3\nL4\nL5\n"
+
+    chunks = get_chunks_respecting_line_boundaries_with_hard_limit(
+        text, hard_limit_tokens=2, overlap_ratio=0, max_chunks=2
+    )
+
+    assert list(chunks) == ["0:6", "6:12"]
+
+
+def test_hard_limit_raises_for_line_over_limit(monkeypatch):
+    _patch_token_count(monkeypatch, lambda line: 5)
+
+    with pytest.raises(ValueError):
+        get_chunks_respecting_line_boundaries_with_hard_limit(
+            "L1\n", hard_limit_tokens=2, overlap_ratio=0, max_chunks=10
+        )
+
+
+def test_set_chunking_backend_rejects_unknown_backend():
+    with pytest.raises(ValueError):
+        chunk_util.set_chunking_backend("gpu")
+
+
+def test_shared_memory_worker_reads_exact_text(monkeypatch):
+    _patch_token_count(monkeypatch, lambda line: len(line))
+    text = "héllo\nwörld\n"
+    data = text.encode("utf-8")
+    shm = SharedMemory(create=True, size=len(data))
+    try:
+        shm.buf[: len(data)] = data
+        index = _build_line_token_index_from_shared_memory(shm.name, len(data))
+    finally:
+        shm.close()
+        shm.unlink()
+
+    assert list(index.char_offsets) == list(LineTokenIndex(text).char_offsets)
+    assert index.total_tokens == len(text)
+
+
+@pytest.fixture
+def in_process_chunk_pool(monkeypatch):
+    """Run the process backend's tasks on a thread so mocked token counts apply."""
+    pool = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(chunk_util, "get_chunk_process_pool", lambda: pool)
+    monkeypatch.setattr(chunk_util, "_chunking_backend", "process")
+    yield pool
+    pool.shutdown(wait=True)
+
+
+@pytest.mark.asyncio
+async def test_process_backend_matches_sync_chunking(
+    monkeypatch, in_process_chunk_pool
+):
+    _patch_token_count(monkeypatch, lambda line: 1)
+    text = "".join(f"line {i} ünïcode\n" for i in range(6000))  # > 100KB
+
+    result = await get_chunks_respecting_line_boundaries(
+        text, max_chunks=None, soft_limit_tokens=100, overlap_ratio=0.25
+    )
+
+    assert result == get_chunks_respecting_line_boundaries_sync(text, 100, 0.25)
+
+
+@pytest.mark.asyncio
+async def test_process_backend_releases_shared_memory(
+    monkeypatch, in_process_chunk_pool
+):
+    _patch_token_count(monkeypatch, lambda line: 1)
+    created: list[str] = []
+    real_shared_memory = chunk_util.SharedMemory
+
+    def tracking_shared_memory(*args, **kwargs):
+        shm = real_shared_memory(*args, **kwargs)
+        if kwargs.get("create"):
+            created.append(shm.name)
+        return shm
+
+    monkeypatch.setattr(chunk_util, "SharedMemory", tracking_shared_memory)
+
+    await build_line_token_index_in_process_pool("a\nb\n")
+
+    assert len(created) == 1
+    with pytest.raises(FileNotFoundError):
+        real_shared_memory(name=created[0])
@@ -7,6 +7,12 @@ from typing import Optional
 import litellm
 from openai import AsyncOpenAI
 
+from core.utils.llm_response_cache_util import (
+    CachedLLMResponse,
+    get_llm_response_cache,
+    llm_request_cache_key,
+)
+
 logger = logging.getLogger(__name__)
 
 # Module-level singleton AsyncOpenAI client pointed at the LiteLLM proxy.
@@ -31,6 +37,9 @@ async def ask_llm_async(
     prompt: str,
     gpt_model,  # duck-typed: needs .model_name, .max_context_tokens, .safe_completion_tokens
     model_params,  # duck-typed: needs .temperature, .top_p, .presence_penalty, .frequency_penalty, .max_tokens
+    cache_label: Optional[str] = None,
+    prompt_version_id: Optional[str] = None,
+    cache_variant: int = 0,
 ) -> Optional[str]:
     """
     Drop-in replacement for open_ai_key_app.utils.ask_gpt_util.ask_gpt_async.
@@ -38,9 +47,50 @@ async def ask_llm_async(
     Sends a chat-completion request through the LiteLLM proxy.  No keypool
     borrow/return cycle — rate-limit management is handled by the proxy.
 
+    When cache_label (the field type asking) is given, the response is looked
+    up in and stored to the LLM response cache, keyed by prompt_version_id, the
+    prompt, the model, its parameters, cache_variant and the context.
+
     Returns the assistant message content string, or None if the model returns
     an empty response.
     """
+    cache = get_llm_response_cache() if cache_label else None
+    if cache is None:
+        response = await _ask_llm_uncached(context, prompt, gpt_model, model_params)
+        return response.content if response else None
+
+    key = llm_request_cache_key(
+        prompt_version_id, prompt, context, gpt_model, model_params, cache_variant
+    )
+    return await cache.get_or_ask(
+        key=key,
+        label=cache_label,
+        prompt_version_id=prompt_version_id,
+        model_name=gpt_model.model_name,
+        ask=lambda: _ask_llm_uncached(context, prompt, gpt_model, model_params),
+    )
+
+
+def _get_cost_usd(model_name: str, input_tokens: int, output_tokens: int) -> float:
+    try:
+        input_cost, output_cost = litellm.cost_per_token(
+            model=model_name,
+            prompt_tokens=input_tokens,
+            completion_tokens=output_tokens,
+        )
+    except Exception as e:
+        # models missing from litellm's price map only lose the $ figures
+        logger.debug(f"No price for {model_name}: {e}")
+        return 0.0
+    return input_cost + output_cost
+
+
+async def _ask_llm_uncached(
+    context: str,
+    prompt: str,
+    gpt_model,
+    model_params,
+) -> Optional[CachedLLMResponse]:
     request_id = str(uuid.uuid4())[:8]
     start_time = time.time()
 
@@ -98,4 +148,14 @@ async def ask_llm_async(
         f"Received {len(response.choices)} choices."
     )
 
-    return response.choices[0].message.content
+    content = response.choices[0].message.content
+    if content is None:
+        return None
+    input_tokens = response.usage.prompt_tokens if response.usage else 0
+    output_tokens = response.usage.completion_tokens if response.usage else 0
+    return CachedLLMResponse(
+        content=content,
+        input_tokens=input_tokens,
+        output_tokens=output_tokens,
+        cost_usd=_get_cost_usd(gpt_model.model_name, input_tokens, output_tokens),
+    )
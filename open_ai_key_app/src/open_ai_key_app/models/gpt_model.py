@@ -10,12 +10,22 @@ class GPTModel:
         max_context_tokens: int,
         token_limit_per_minute: int,
         safe_completion_tokens: int,
+        usd_per_million_input_tokens: float = 0.0,
+        usd_per_million_output_tokens: float = 0.0,
     ):
         self.model_name = model_name
         self.rate_limit_window = rate_limit_window
         self.max_context_tokens = max_context_tokens
         self.token_limit_per_minute = token_limit_per_minute
         self.safe_completion_tokens = safe_completion_tokens
+        self.usd_per_million_input_tokens = usd_per_million_input_tokens
+        self.usd_per_million_output_tokens = usd_per_million_output_tokens
+
+    def get_cost_usd(self, input_tokens: int, output_tokens: int) -> float:
+        return (
+            input_tokens * self.usd_per_million_input_tokens
+            + output_tokens * self.usd_per_million_output_tokens
+        ) / 1_000_000
 
 
 class ModelParameters:
@@ -42,4 +52,6 @@ GPT_4o_mini = GPTModel(
     max_context_tokens=128000,
     token_limit_per_minute=200000,
     safe_completion_tokens=7500,
+    usd_per_million_input_tokens=0.15,
+    usd_per_million_output_tokens=0.60,
 )
@@ -7,21 +7,115 @@ import asyncio
 
 import time
 import uuid
+from dataclasses import dataclass
 
 from open_ai_key_app.utils.redis_client_util import redis
 from open_ai_key_app.utils.openai_key_labels_util import (
     get_usage_key_label,
+    get_request_usage_key_label,
     get_cooldown_key_label,
     get_lock_key_label,
     get_exhausted_msg_key_label,
 )
 
+# Token and request usage are sliding windows over per-second buckets, each kept in
+# one Redis hash (field = epoch second, value = tokens or requests), so reading
+# them costs O(window) in Redis and a single round trip, however many requests
+# were recorded.
+USAGE_WINDOW_SECONDS = 60
+
+# Shared prelude. ARGV[1] = now (epoch seconds), ARGV[2] = window seconds
+_WINDOW_LUA = """
+local now = math.floor(tonumber(ARGV[1]))
+local window = tonumber(ARGV[2])
+local oldest = now - window + 1
+
+-- drop buckets that left the window and sum the rest
+local function window_sum(key)
+    local buckets = redis.call('HGETALL', key)
+    local used = 0
+    for i = 1, #buckets, 2 do
+        if tonumber(buckets[i]) < oldest then
+            redis.call('HDEL', key, buckets[i])
+        else
+            used = used + tonumber(buckets[i + 1])
+        end
+    end
+    return used
+end
+
+local function add_to_bucket(key, amount)
+    redis.call('HINCRBY', key, now, amount)
+    redis.call('EXPIRE', key, window + 1)
+end
+"""
+
+# KEYS[1] = usage hash
+_window_usage_script = redis.register_script(_WINDOW_LUA + "return window_sum(KEYS[1])")
+
+# KEYS[1] = usage hash, ARGV[3] = tokens used
+_record_usage_script = redis.register_script(
+    _WINDOW_LUA + "add_to_bucket(KEYS[1], ARGV[3])\nreturn 1"
+)
+
+# KEYS[1] = token usage hash, KEYS[2] = request usage hash, KEYS[3] = cooldown key
+# ARGV[3] = token limit, ARGV[4] = request limit, ARGV[5] = tokens needed
+# Returns the bucket (epoch second) holding the reservation, 0 if over the token
+# limit, -1 if cooling down, -2 if over the request limit.
+_reserve_script = redis.register_script(_WINDOW_LUA + """
+local cooldown_until = redis.call('GET', KEYS[3])
+if cooldown_until and tonumber(ARGV[1]) < tonumber(cooldown_until) then
+    return -1
+end
+if window_sum(KEYS[2]) + 1 > tonumber(ARGV[4]) then
+    return -2
+end
+if window_sum(KEYS[1]) + tonumber(ARGV[5]) > tonumber(ARGV[3]) then
+    return 0
+end
+add_to_bucket(KEYS[1], ARGV[5])
+add_to_bucket(KEYS[2], 1)
+return now
+""")
+
+# KEYS[1] = token usage hash, ARGV[3] = bucket of the reservation,
+# ARGV[4] = actual tokens minus reserved tokens
+# Buckets that already left the window no longer count, so they are left alone.
+_reconcile_script = redis.register_script(_WINDOW_LUA + """
+local bucket = ARGV[3]
+if tonumber(bucket) < oldest or redis.call('HEXISTS', KEYS[1], bucket) == 0 then
+    return 0
+end
+if redis.call('HINCRBY', KEYS[1], bucket, ARGV[4]) < 0 then
+    redis.call('HSET', KEYS[1], bucket, 0)
+end
+return 1
+""")
+
+
+@dataclass
+class KeyLease:
+    """Tokens and one request reserved on a key for a single API call."""
+
+    key_name: str
+    api_key: str
+    lease_token: str
+    tokens_reserved: int
+    bucket: int  # epoch second of the usage bucket holding the reservation
+
 
 class KeySlot:
-    def __init__(self, name: str, api_key: str, token_limit_per_min: int = 200000):
+    def __init__(
+        self,
+        name: str,
+        api_key: str,
+        token_limit_per_min: int = 200000,
+        request_limit_per_min: int = 5000,
+    ):
         self.name = name
         self.api_key = api_key
         self.token_limit = token_limit_per_min
+        self.request_limit = request_limit_per_min
         self._set_key_labels()
 
     def _set_key_labels(self):
@@ -30,6 +124,7 @@ class KeySlot:
         This is called in the constructor to initialize the keys.
         """
         self.usage_key = get_usage_key_label(self.name)
+        self.request_usage_key = get_request_usage_key_label(self.name)
         self.cooldown_key = get_cooldown_key_label(self.name)
         self.lock_key = get_lock_key_label(self.name)
         self.exhausted_msg_key = get_exhausted_msg_key_label(self.name)
@@ -37,29 +132,83 @@ class KeySlot:
     @property
     def token_usage(self) -> int:
         """
-        Sum up all unexpired usage records—each record is its own key
-        with a 60 s TTL.
+        Tokens used by this key in the last USAGE_WINDOW_SECONDS, summed by Redis
+        over the per-second buckets of the usage hash (one round trip).
         """
-        pattern = f"{self.usage_key}:*"
-        # SCAN is preferable in prod, but KEYS is easiest to show here:
-        keys = redis.keys(pattern)
-        if not keys:
-            return 0
-        # Fetch all values in parallel
-        vals = [redis.get(k) for k in keys]
-        return sum(int(v) for v in vals if v is not None)
+        return int(
+            _window_usage_script(
+                keys=[self.usage_key],
+                args=[time.time(), USAGE_WINDOW_SECONDS],
+                client=redis,
+            )
+        )
+
+    @property
+    def request_usage(self) -> int:
+        """Requests leased on this key in the last USAGE_WINDOW_SECONDS."""
+        return int(
+            _window_usage_script(
+                keys=[self.request_usage_key],
+                args=[time.time(), USAGE_WINDOW_SECONDS],
+                client=redis,
+            )
+        )
 
     def record_usage(self, tokens_used: int) -> None:
         """
-        Create a unique key for this usage-report, set it with a 60 s TTL,
-        and let Redis auto-expire it.
+        Add tokens_used to the current one-second bucket of the usage hash.
+        Buckets older than the window are pruned by every script that reads them.
+        """
+        _record_usage_script(
+            keys=[self.usage_key],
+            args=[time.time(), USAGE_WINDOW_SECONDS, tokens_used],
+            client=redis,
+        )
+
+    def try_lease(self, tokens_needed: int) -> KeyLease | None:
+        """
+        Atomically check this key and reserve tokens_needed and one request on it.
+        The key must not be cooling down, and both the token and request windows
+        must have room. One round trip, so concurrent borrowers in other processes
+        can never both pass the check and overshoot the limits. Any number of leases
+        can be held on a key at once; they only share its per-minute budget.
+        """
+        bucket = int(
+            _reserve_script(
+                keys=[self.usage_key, self.request_usage_key, self.cooldown_key],
+                args=[
+                    time.time(),
+                    USAGE_WINDOW_SECONDS,
+                    self.token_limit,
+                    self.request_limit,
+                    tokens_needed,
+                ],
+                client=redis,
+            )
+        )
+        if bucket <= 0:
+            return None
+        return KeyLease(
+            key_name=self.name,
+            api_key=self.api_key,
+            lease_token=str(uuid.uuid4()),
+            tokens_reserved=tokens_needed,
+            bucket=bucket,
+        )
+
+    def reconcile(self, lease: KeyLease, tokens_used: int) -> None:
+        """
+        Correct a lease's reservation to the tokens the call actually used, in the
+        bucket it was reserved in, so the window frees up (or fills) accordingly.
         """
-        # e.g. "prefix:sudokn.tool:usage:1617975307123:550e8400-e29b-41d4-a716-446655440000"
-        usage_recorded_at = int(time.time() * 1_000)
-        unique_id = str(uuid.uuid4())
-        key = f"{self.usage_key}:{usage_recorded_at}:{unique_id}"
-        # SET with an expiration of 60 seconds
-        redis.set(key, tokens_used, ex=60)
+        delta = tokens_used - lease.tokens_reserved
+        if delta == 0:
+            return
+        _reconcile_script(
+            keys=[self.usage_key],
+            args=[time.time(), USAGE_WINDOW_SECONDS, lease.bucket, delta],
+            client=redis,
+        )
 
     async def acquire_lock(self, lock_expiry: float, timeout: float = 2.0) -> str:
         """
@@ -0,0 +1,155 @@
+"""
+Benchmark realtime throughput of OpenAIKeyPool leasing against a Redis stand-in.
+
+Fires a burst of simulated chat completions (asyncio.sleep for the API latency)
+through keypool.borrow_key / return_key and compares:
+
+  exclusive  at most one request in flight per key, as with the per-key lock
+  leases     concurrent leases per key, bounded only by its TPM/RPM budget
+
+Reports requests/s, key wait time and the largest wait any single request saw
+(fairness), plus the tokens charged per key against its per-minute limit.
+
+By default runs against fakeredis (pip install fakeredis lupa); pass --redis-url
+to use a real local Redis instead (its keypool prefix is flushed).
+
+Usage:
+    python benchmark_keypool_leasing.py --keys 10 --requests 400 --concurrency 200
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+from collections import Counter
+
+# the keypool modules read these at import; the Redis client is swapped below
+os.environ.setdefault("REDIS_HOST", "localhost")
+os.environ.setdefault("REDIS_PORT", "6379")
+os.environ.setdefault("KEYPOOL_PREFIX", "benchmark")
+os.environ.setdefault("LOCK_EXPIRY", "30")
+
+from open_ai_key_app.utils import redis_client_util
+
+
+def use_redis(redis_url: str | None) -> None:
+    """Point the keypool modules (imported after this) at the benchmark Redis."""
+    if redis_url:
+        from redis import Redis
+
+        redis_client_util.redis = Redis.from_url(redis_url, decode_responses=True)
+    else:
+        import fakeredis
+
+        redis_client_util.redis = fakeredis.FakeRedis(decode_responses=True)
+
+
+async def run(
+    pool,
+    num_requests: int,
+    concurrency: int,
+    latency: float,
+    exclusive: bool,
+) -> dict:
+    in_flight: Counter[str] = Counter()
+    original_try_lease = pool._try_lease
+
+    def exclusive_try_lease(tokens_needed):
+        # one request per key: skip keys that already have a lease out
+        free = [slot for slot in pool.slots if not in_flight[slot.api_key]]
+        all_slots, pool.slots = pool.slots, free
+        try:
+            return original_try_lease(tokens_needed)
+        finally:
+            pool.slots = all_slots
+
+    if exclusive:
+        pool._try_lease = exclusive_try_lease
+
+    semaphore = asyncio.Semaphore(concurrency)
+    waits: list[float] = []
+    charged: Counter[str] = Counter()
+    rng = random.Random(0)
+
+    async def request():
+        async with semaphore:
+            tokens_needed = rng.randint(2_000, 6_000)
+            started = time.perf_counter()
+            key_name, api_key, lease_token = await pool.borrow_key(tokens_needed)
+            waits.append(time.perf_counter() - started)
+            in_flight[api_key] += 1
+            try:
+                await asyncio.sleep(latency * rng.uniform(0.5, 1.5))
+                tokens_used = int(tokens_needed * rng.uniform(0.4, 1.0))
+            finally:
+                in_flight[api_key] -= 1
+                pool.return_key(api_key, lease_token, tokens_used)
+            charged[key_name] += tokens_used
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(request() for _ in range(num_requests)))
+    finally:
+        pool._try_lease = original_try_lease
+    elapsed = time.perf_counter() - started
+
+    return {
+        "seconds": elapsed,
+        "requests_per_s": num_requests / elapsed,
+        "p50_wait_ms": statistics.median(waits) * 1000,
+        "max_wait_ms": max(waits) * 1000,
+        "max_charged": max(charged.values()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--keys", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=1.0, help="Seconds per call")
+    parser.add_argument("--redis-url", default=None, help="Use a real Redis")
+    args = parser.parse_args()
+
+    use_redis(args.redis_url)
+    from open_ai_key_app.models.keyslot import KeySlot
+    from open_ai_key_app.utils.redis_key_manager_util import (
+        add_openai_key,
+        remove_all_openai_keys,
+    )
+
+    remove_all_openai_keys()
+    for i in range(args.keys):
+        add_openai_key(f"sk-benchmark-{i}", f"benchmark-key-{i}")
+    from open_ai_key_app.services.openai_keypool_service import keypool
+
+    print(
+        f"{'mode':10} {'seconds':>8} {'req/s':>7} {'p50 wait ms':>12} "
+        f"{'max wait ms':>12} {'max charged/key':>16}"
+    )
+    for mode in ("exclusive", "leases"):
+        for key in redis_client_util.redis.scan_iter("benchmark:*usage*"):
+            redis_client_util.redis.delete(key)
+        result = asyncio.run(
+            run(
+                keypool,
+                args.requests,
+                args.concurrency,
+                args.latency,
+                exclusive=mode == "exclusive",
+            )
+        )
+        print(
+            f"{mode:10} {result['seconds']:8.2f} {result['requests_per_s']:7.1f} "
+            f"{result['p50_wait_ms']:12.1f} {result['max_wait_ms']:12.1f} "
+            f"{result['max_charged']:16d}"
+        )
+    print(f"(limit per key: {KeySlot('', '').token_limit} tokens/min)")
+
+    remove_all_openai_keys()
+
+
+if __name__ == "__main__":
+    main()
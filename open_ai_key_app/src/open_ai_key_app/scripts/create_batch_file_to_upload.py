@@ -36,6 +36,10 @@ from core.models.db.manufacturer import Manufacturer
 from core.models.db.deferred_manufacturer import DeferredManufacturer
 from core.models.db.gpt_batch_request import GPTBatchRequest
 from core.models.gpt_batch_request_blob import GPTBatchRequestBlob
+from core.services.gpt_payload_blob_service import (
+    hydrate_request_blobs,
+    is_request_body_hydrated,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -122,6 +126,11 @@ class BatchFileWriter:
 
     def _serialize_request(self, request_blob: GPTBatchRequestBlob) -> str:
         """Serialize a request blob to JSON string (without input_tokens)."""
+        if not is_request_body_hydrated(request_blob.body):
+            raise ValueError(
+                f"Request {request_blob.custom_id} still refers to payload blobs; "
+                f"hydrate it with hydrate_request_blobs() before writing."
+            )
         request_dict = request_blob.model_dump()
         request_dict["body"].pop("input_tokens", None)
         # Use separators for consistent, compact JSON output
@@ -260,7 +269,7 @@ async def collect_incomplete_batch_requests_for_deferred_mfg(
 
     Returns:
         Tuple of:
-        - List of GPTBatchRequestBlob objects that don't have response_blob
+        - List of GPTBatchRequestBlob objects that don't have response_blob, hydrated
         - List of custom IDs that have no corresponding GPTBatchRequest
         - List of validation errors (fields missing in both Manufacturer and DeferredManufacturer)
     """
@@ -387,8 +396,11 @@ async def collect_incomplete_batch_requests_for_deferred_mfg(
         if (req.response_blob is None and req.batch_id is None)
     ]
 
-    # Extract the request blobs
-    request_blobs = [req.request for req in incomplete_requests]
+    # Extract the request blobs, with message contents loaded from gpt_payload_blobs
+    # so the size checks and the written lines see the bodies OpenAI will receive
+    request_blobs = await hydrate_request_blobs(
+        [req.request for req in incomplete_requests]
+    )
 
     return request_blobs, missing_custom_ids, validation_errors
 
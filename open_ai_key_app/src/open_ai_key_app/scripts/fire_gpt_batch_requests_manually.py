@@ -29,6 +29,7 @@ from core.utils.mongo_client import init_db
 from core.utils.time_util import get_current_time
 from core.models.db.manufacturer import Manufacturer
 from core.models.db.gpt_batch_request import GPTBatchRequest
+from core.services.gpt_payload_blob_service import hydrate_request_blobs
 from core.models.gpt_batch_response_blob import (
     GPTBatchResponseBlob,
     GPTBatchResponseBody,
@@ -88,7 +89,8 @@ async def process_manufacturer_requests(
 
         try:
             # Send the request
-            response = await send_gpt_batch_request_sync(batch_req.request)
+            [request_blob] = await hydrate_request_blobs([batch_req.request])
+            response = await send_gpt_batch_request_sync(request_blob)
 
             # Parse the response and create GPTBatchResponseBlob
             response_blob = GPTBatchResponseBlob(
@@ -0,0 +1,221 @@
+"""
+Load test KeySlot token accounting against a Redis stand-in.
+
+Many worker threads (standing in for concurrent bots) borrow keys the way
+OpenAIKeyPool.borrow_key does, hold them for a simulated request, and return
+them. Two implementations are compared:
+
+  legacy          one Redis key per usage record, KEYS scan + GET per record in
+                  can_accept, then is_locked and SET NX as separate calls
+  sliding-window  per-second token and request buckets, checked and reserved
+                  by a single Lua script (KeySlot.try_lease), many leases per
+                  key, reconciled to the actual usage when the call returns
+
+For each it reports borrows/s, borrow latency, Redis commands per borrow and
+whether any key was charged more tokens than its per-minute limit.
+
+By default runs against fakeredis (pip install fakeredis lupa); pass --redis-url
+to use a real local Redis instead.
+
+Usage:
+    python load_test_keyslot_usage.py --keys 4 --workers 32 --duration 10
+"""
+
+import argparse
+import os
+import random
+import statistics
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+# keyslot reads these at import; the client it creates is replaced below
+os.environ.setdefault("REDIS_HOST", "localhost")
+os.environ.setdefault("REDIS_PORT", "6379")
+os.environ.setdefault("KEYPOOL_PREFIX", "loadtest")
+
+from redis import Redis
+
+from open_ai_key_app.models import keyslot as keyslot_module
+from open_ai_key_app.models.keyslot import KeySlot
+
+
+def make_counting_client(redis_url: str | None) -> Redis:
+    """A Redis client (real or fakeredis) that counts the commands it sends."""
+    if redis_url:
+        base_cls = Redis
+        kwargs = Redis.from_url(redis_url).connection_pool.connection_kwargs
+    else:
+        import fakeredis
+
+        base_cls = fakeredis.FakeRedis
+        kwargs = {}
+
+    class CountingRedis(base_cls):
+        commands = 0
+        _count_lock = threading.Lock()
+
+        def execute_command(self, *args, **options):
+            with CountingRedis._count_lock:
+                CountingRedis.commands += 1
+            return super().execute_command(*args, **options)
+
+    kwargs["decode_responses"] = True
+    return CountingRedis(**kwargs)
+
+
+class LegacyKeySlot(KeySlot):
+    """KeySlot accounting as it was before the sliding-window buckets."""
+
+    @property
+    def token_usage(self) -> int:
+        redis = keyslot_module.redis
+        keys = redis.keys(f"{self.usage_key}:*")
+        if not keys:
+            return 0
+        vals = [redis.get(k) for k in keys]
+        return sum(int(v) for v in vals if v is not None)
+
+    def record_usage(self, tokens_used: int) -> None:
+        key = f"{self.usage_key}:{int(time.time() * 1_000)}:{uuid.uuid4()}"
+        keyslot_module.redis.set(key, tokens_used, ex=60)
+
+    def try_lease(self, tokens_needed: int) -> str | None:
+        if not self.can_accept(tokens_needed) or self.is_locked():
+            return None
+        lock_token = str(uuid.uuid4())
+        redis = keyslot_module.redis
+        if not redis.set(self.lock_key, lock_token, nx=True, ex=30):
+            return None
+        return lock_token
+
+    def end_lease(self, lock_token: str, tokens_needed: int, tokens_used: int) -> int:
+        # usage was only recorded once the call succeeded, at the reserved size
+        self.record_usage(tokens_needed)
+        self.release_lock(lock_token)
+        return tokens_needed
+
+
+class LeasingKeySlot(KeySlot):
+    def end_lease(self, lease, tokens_needed: int, tokens_used: int) -> int:
+        self.reconcile(lease, tokens_used)
+        return tokens_used
+
+
+def run(
+    mode: str,
+    num_keys: int,
+    num_workers: int,
+    duration: float,
+    token_limit: int,
+    hold_seconds: float,
+    poll_interval: float,
+) -> dict:
+    redis = keyslot_module.redis
+    redis.flushdb()
+    type(redis).commands = 0
+
+    slot_cls = LegacyKeySlot if mode == "legacy" else LeasingKeySlot
+    slots = [
+        slot_cls(f"{mode}-key-{i}", f"sk-{i}", token_limit) for i in range(num_keys)
+    ]
+    charged_tokens: dict[str, int] = defaultdict(int)
+    latencies: list[float] = []
+    stats_lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def worker():
+        rng = random.Random()
+        while time.monotonic() < stop_at:
+            tokens_needed = rng.randint(2_000, 8_000)
+            started = time.perf_counter()
+            borrowed = None
+            while borrowed is None and time.monotonic() < stop_at:
+                for slot in rng.sample(slots, len(slots)):
+                    lease = slot.try_lease(tokens_needed)
+                    if lease:
+                        borrowed = slot, lease
+                        break
+                else:
+                    time.sleep(poll_interval)
+            if borrowed is None:
+                return
+            slot, lease = borrowed
+            with stats_lock:
+                latencies.append(time.perf_counter() - started)
+            time.sleep(hold_seconds)  # the OpenAI call
+            tokens_used = int(tokens_needed * rng.uniform(0.5, 1.0))
+            charged = slot.end_lease(lease, tokens_needed, tokens_used)
+            with stats_lock:
+                charged_tokens[slot.name] += charged
+
+    threads = [threading.Thread(target=worker) for _ in range(num_workers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    borrows = len(latencies)
+    return {
+        "borrows": borrows,
+        "borrows_per_s": borrows / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else 0.0,
+        "p99_ms": (
+            statistics.quantiles(latencies, n=100)[98] * 1000
+            if len(latencies) >= 2
+            else 0.0
+        ),
+        "commands": type(redis).commands,
+        "commands_per_borrow": type(redis).commands / max(borrows, 1),
+        "max_charged": max(charged_tokens.values(), default=0),
+        "over_limit": any(tokens > token_limit for tokens in charged_tokens.values()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--keys", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds")
+    parser.add_argument(
+        "--token-limit",
+        type=int,
+        default=200_000,
+        help="Per key per minute; runs shorter than a minute should hit it",
+    )
+    parser.add_argument("--hold-ms", type=float, default=20.0)
+    parser.add_argument("--poll-ms", type=float, default=25.0)
+    parser.add_argument("--redis-url", default=None, help="Use a real Redis")
+    parser.add_argument("--modes", nargs="+", default=["legacy", "sliding-window"])
+    args = parser.parse_args()
+
+    keyslot_module.redis = make_counting_client(args.redis_url)
+
+    print(
+        f"{'mode':15} {'borrows':>8} {'borrow/s':>9} {'p50 ms':>8} {'p99 ms':>8} "
+        f"{'cmds':>9} {'cmds/borrow':>11} {'max charged/key':>15}"
+    )
+    for mode in args.modes:
+        result = run(
+            mode,
+            args.keys,
+            args.workers,
+            args.duration,
+            args.token_limit,
+            args.hold_ms / 1000,
+            args.poll_ms / 1000,
+        )
+        over = " OVER LIMIT" if result["over_limit"] else ""
+        print(
+            f"{mode:15} {result['borrows']:8d} {result['borrows_per_s']:9.1f} "
+            f"{result['p50_ms']:8.2f} {result['p99_ms']:8.2f} "
+            f"{result['commands']:9d} {result['commands_per_borrow']:11.1f} "
+            f"{result['max_charged']:15d}{over}"
+        )
+
+
+if __name__ == "__main__":
+    main()
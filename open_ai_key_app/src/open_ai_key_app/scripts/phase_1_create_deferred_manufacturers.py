@@ -24,7 +24,12 @@ from data_etl_app.dependencies.aws_clients import (
     initialize_data_etl_aws_clients,
     cleanup_data_etl_aws_clients,
 )
-from data_etl_app.utils.chunk_util import shutdown_chunk_thread_pool
+from data_etl_app.utils.chunk_util import (
+    CHUNKING_BACKENDS,
+    set_chunking_backend,
+    shutdown_chunk_process_pool,
+    shutdown_chunk_thread_pool,
+)
 
 from core.utils.mongo_client import init_db
 from core.models.db.manufacturer import Manufacturer
@@ -804,8 +809,16 @@ async def async_main():
         action="store_true",
         help="Skip confirmation prompt and proceed automatically",
     )
+    parser.add_argument(
+        "--chunking-backend",
+        type=str,
+        choices=CHUNKING_BACKENDS,
+        default="thread",
+        help="Where large texts are tokenized for chunking: 'thread' or 'process' pool (default: thread)",
+    )
 
     args = parser.parse_args()
+    set_chunking_backend(args.chunking_backend)
 
     # Auto-detect mode based on --etld1 flag
     if args.mode is None:
@@ -971,7 +984,8 @@ async def async_main():
     finally:
         # Clean up chunking thread pool
         shutdown_chunk_thread_pool(wait=True)
-        logger.info("Chunking thread pool shut down")
+        shutdown_chunk_process_pool(wait=True)
+        logger.info("Chunking pools shut down")
 
         # Clean up AWS clients
         await cleanup_data_etl_aws_clients()
@@ -5,21 +5,16 @@ they are one the same server as the parent wrapper redis app.
 """
 
 import asyncio
-import os
 import logging
-import random
 
-from open_ai_key_app.models.keyslot import KeySlot
+from open_ai_key_app.models.keyslot import KeyLease, KeySlot
 from open_ai_key_app.utils.redis_key_manager_util import get_all_openai_keys
 
-
 logger = logging.getLogger(__name__)
 
-LOCK_EXPIRY = os.getenv("LOCK_EXPIRY")
-if not LOCK_EXPIRY:
-    raise ValueError(
-        "LOCK_EXPIRY environment variable is not set. Please set it in your .env file."
-    )
+# How often the waiter at the head of the queue re-checks the keys when no lease
+# was returned in the meantime (usage also frees up as the window slides).
+BORROW_POLL_INTERVAL = 0.25
 
 
 class OpenAIKeyPool:
@@ -35,6 +30,15 @@ class OpenAIKeyPool:
         if getattr(self, "_initialized", False):
             return
         self._initialized = True
+        # leases handed out by this process, by lease token
+        self._leases: dict[str, KeyLease] = {}
+        # waiters take turns in arrival order (asyncio.Lock is FIFO), so a large
+        # request is not starved by a stream of small ones and only the waiter at
+        # the head of the queue polls Redis; see _bind_to_running_loop
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._turnstile: asyncio.Lock | None = None
+        self._lease_returned: asyncio.Event | None = None
+        self._next_slot = 0
         self.initialize_slots()
 
     def initialize_slots(self):
@@ -46,49 +50,117 @@ class OpenAIKeyPool:
     def refresh(self):
         self.initialize_slots()
 
+    def _bind_to_running_loop(self) -> tuple[asyncio.Lock, asyncio.Event]:
+        """
+        The pool is a module-level singleton, created before any event loop runs
+        and possibly used by several asyncio.run calls, so the waiter queue is
+        (re)created for whichever loop is borrowing.
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._turnstile = asyncio.Lock()
+            self._lease_returned = asyncio.Event()
+        return self._turnstile, self._lease_returned  # type: ignore[return-value]
+
     async def borrow_key(
         self,
         tokens_needed: int,
-        lock_expiry: int = int(LOCK_EXPIRY),  # when accessing using REDIS
         timeout_in_seconds: int = 0,  # when accessing using HTTP API
     ) -> tuple[str, str, str]:
-        expiry = (
-            asyncio.get_event_loop().time() + (timeout_in_seconds * 1000)
-            if timeout_in_seconds > 0
-            else None
-        )
-        while True:
-            random.shuffle(self.slots)
-            for slot in self.slots:
-                # for keys that are exhausted, can_accept will always return False
-                if slot.can_accept(tokens_needed) and not slot.is_locked():
-                    # await slot.wait_until_available(tokens_needed)
-                    try:
-                        lock_token = await slot.acquire_lock(lock_expiry)
-                    except Exception as e:
-                        logger.error(f"Error acquiring lock for slot {slot.name}: {e}")
-                        continue
-                    return slot.name, slot.api_key, lock_token
-            await asyncio.sleep(0.25)
-            if expiry and asyncio.get_event_loop().time() > expiry:
-                raise TimeoutError("No available slot found within the timeout period.")
-
-    def return_key(self, api_key: str, lock_token: str) -> None:
-        for slot in self.slots:
-            if slot.api_key == api_key:
+        """
+        Lease a key with room for tokens_needed more tokens and one more request
+        this minute. Many leases can be held on the same key at once, up to its
+        TPM/RPM budget.
+
+        The tokens count against the key as soon as it is leased; pass the tokens
+        the call actually used to return_key to reconcile the reservation.
+        Returns (key name, api key, lease token).
+        """
+        turnstile, lease_returned = self._bind_to_running_loop()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout_in_seconds if timeout_in_seconds > 0 else None
+
+        def remaining() -> float | None:
+            return None if deadline is None else max(0.0, deadline - loop.time())
+
+        try:
+            await asyncio.wait_for(turnstile.acquire(), remaining())
+        except asyncio.TimeoutError:
+            raise TimeoutError("No available slot found within the timeout period.")
+        try:
+            while True:
+                lease = self._try_lease(tokens_needed)
+                if lease:
+                    self._leases[lease.lease_token] = lease
+                    return lease.key_name, lease.api_key, lease.lease_token
+
+                wait = BORROW_POLL_INTERVAL
+                if deadline is not None:
+                    if remaining() <= 0:
+                        raise TimeoutError(
+                            "No available slot found within the timeout period."
+                        )
+                    wait = min(wait, remaining())
+                lease_returned.clear()
                 try:
-                    slot.release_lock(lock_token)
-                except Exception as e:
-                    raise ValueError(
-                        f"Failed to release lock for slot {slot.name}: {e}"
-                    ) from e
-                return
+                    await asyncio.wait_for(lease_returned.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            turnstile.release()
 
-        raise ValueError(f"No slot found for API key: {api_key}")
+    def _try_lease(self, tokens_needed: int) -> KeyLease | None:
+        """
+        One pass over the keys, starting after the key that was leased last so
+        consecutive leases are spread round-robin instead of piling on one key.
+        """
+        num_slots = len(self.slots)
+        for i in range(num_slots):
+            slot = self.slots[(self._next_slot + i) % num_slots]
+            try:
+                # cooldown and both windows are checked and the reservation made
+                # in one atomic Redis call; exhausted keys are always rejected
+                lease = slot.try_lease(tokens_needed)
+            except Exception as e:
+                logger.error(f"Error leasing slot {slot.name}: {e}")
+                continue
+            if lease:
+                self._next_slot = (self._next_slot + i + 1) % num_slots
+                return lease
+        return None
+
+    def return_key(
+        self, api_key: str, lock_token: str, tokens_used: int | None = None
+    ) -> None:
+        """
+        End a lease. With tokens_used, the tokens reserved by borrow_key are
+        corrected to the actual usage; without it the reservation stands.
+        """
+        lease = self._leases.pop(lock_token, None)
+        if lease is None or lease.api_key != api_key:
+            raise ValueError(f"No lease found for API key: {api_key}")
+
+        # wake the head waiter: the key may have room again after reconciliation
+        if self._lease_returned is not None:
+            self._lease_returned.set()
+        if tokens_used is None:
+            return
+        # the key may have been removed from the pool (exhausted) meanwhile
+        slot = next((s for s in self.slots if s.api_key == api_key), None)
+        if slot is None:
+            return
+        try:
+            slot.reconcile(lease, tokens_used)
+        except Exception as e:
+            raise ValueError(
+                f"Failed to reconcile lease for slot {slot.name}: {e}"
+            ) from e
 
     def record_key_usage(self, api_key: str, tokens_used: int) -> None:
         """
         Records the usage of the API key by updating its token usage in REDIS.
+        Only for usage that was not already reserved by borrow_key.
         CAUTION: This effect will be global, affecting all users of the key pool in any app/module.
         """
         for slot in self.slots:
@@ -115,8 +187,10 @@ class OpenAIKeyPool:
         Marks the API key as exhausted in REDIS and removes it from the pool memory (local to user of this file).
         CAUTION: This effect will be global, affecting all users of the key pool in any app/module.
 
-        While other apps/modules may still have the key in their memory, the use of can_accept ensures they
-        the key is skipped each time during acquire_key_slot.
+        While other apps/modules may still have the key in their memory, their borrow_key calls skip it:
+        marking a key exhausted puts it on cooldown, and KeySlot.try_lease checks the cooldown in the
+        same atomic Redis call that reserves the tokens. Leases already held on the key can still be
+        returned; return_key only reconciles usage for keys that are still in this pool.
         """
         for slot in self.slots:
             if slot.api_key == api_key:
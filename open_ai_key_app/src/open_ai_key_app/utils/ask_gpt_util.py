@@ -6,9 +6,14 @@ import httpx
 import time
 import uuid
 
-from open_ai_key_app.utils.token_util import num_tokens_from_string
+from open_ai_key_app.utils.token_util import count_many
 from open_ai_key_app.models.gpt_model import GPTModel, GPT_4o_mini, ModelParameters
 from core.models.gpt_batch_request_blob import GPTBatchRequestBlob
+from core.utils.llm_response_cache_util import (
+    CachedLLMResponse,
+    get_llm_response_cache,
+    llm_request_cache_key,
+)
 from open_ai_key_app.services.openai_keypool_service import keypool
 
 logger = logging.getLogger(__name__)
@@ -21,15 +26,42 @@ async def ask_gpt_async(
     prompt: str,
     gpt_model: GPTModel,
     model_params: ModelParameters,
+    cache_label: str | None = None,
+    prompt_version_id: str | None = None,
+    cache_variant: int = 0,
 ):
+    # with a cache_label, identical requests are answered from the LLM response cache
+    cache = get_llm_response_cache() if cache_label else None
+    if cache is None:
+        response = await _ask_gpt_uncached(context, prompt, gpt_model, model_params)
+        return response.content if response else None
+
+    key = llm_request_cache_key(
+        prompt_version_id, prompt, context, gpt_model, model_params, cache_variant
+    )
+    return await cache.get_or_ask(
+        key=key,
+        label=cache_label,
+        prompt_version_id=prompt_version_id,
+        model_name=gpt_model.model_name,
+        ask=lambda: _ask_gpt_uncached(context, prompt, gpt_model, model_params),
+    )
+
+
+async def _ask_gpt_uncached(
+    context: str,
+    prompt: str,
+    gpt_model: GPTModel,
+    model_params: ModelParameters,
+) -> CachedLLMResponse | None:
     # Generate unique request ID for tracking
     request_id = str(uuid.uuid4())[:8]
     start_time = time.time()
 
     logger.info(f"[Request {request_id}] Starting ask_gpt_async request")
 
-    tokens_prompt = num_tokens_from_string(prompt)
-    tokens_context = num_tokens_from_string(context)
+    # prompts repeat across requests, so their counts come from the memo
+    tokens_prompt, tokens_context = count_many([prompt, context], memoize=True)
     max_response_tokens = (
         model_params.max_tokens
         if model_params.max_tokens
@@ -56,6 +88,8 @@ async def ask_gpt_async(
     key_borrow_time = time.time()
     key_name, api_key, lock_token = await keypool.borrow_key(tokens_needed)
     key_borrow_duration = time.time() - key_borrow_time
+    # None keeps the full reservation, for failures we know nothing about
+    tokens_used: int | None = None
 
     try:
         logger.info(
@@ -87,8 +121,19 @@ async def ask_gpt_async(
             f"total request time: {total_duration:.2f}s. "
             f"Received {len(response.choices)} choices from key '{key_name}'."
         )
-        keypool.record_key_usage(api_key, tokens_needed)
-        return response.choices[0].message.content
+        content = response.choices[0].message.content
+        if response.usage:
+            tokens_used = response.usage.total_tokens
+        if content is None:
+            return None
+        input_tokens = response.usage.prompt_tokens if response.usage else 0
+        output_tokens = response.usage.completion_tokens if response.usage else 0
+        return CachedLLMResponse(
+            content=content,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            cost_usd=gpt_model.get_cost_usd(input_tokens, output_tokens),
+        )
     except Exception as e:
         # some errors look like
         # Error code: 429 - {'error': {'message': 'Rate limit reached for gpt-4o-mini in organization org-M5dkpWKwz4bw95SV04FgKdYV on tokens per min (TPM): Limit 200000, Used 130491, Requested 75418. Please try again in 1.772s. Visit https://platform.openai.com/account/rate-limits to learn more.', 'type': 'tokens', 'param': None, 'code': 'rate_limit_exceeded'}}
@@ -108,6 +153,7 @@ async def ask_gpt_async(
 
         # Handle rate limiting with suggested retry delay
         elif "rate limit reached" in error_msg or "Rate limit" in error_msg:
+            tokens_used = 0  # rejected requests do not count against the limit
             match = re.search(r"Please try again in ([\d.]+)s", error_msg)
             if match:
                 delay = float(match.group(1))
@@ -129,7 +175,7 @@ async def ask_gpt_async(
             raise e
     finally:
         logger.debug(f"[Request {request_id}] Returning key '{key_name}' to keypool.")
-        keypool.return_key(api_key, lock_token)
+        keypool.return_key(api_key, lock_token, tokens_used)
 
 
 # --- send_gpt_batch_request_sync Function ---
@@ -163,6 +209,8 @@ async def send_gpt_batch_request_sync(
     key_borrow_time = time.time()
     key_name, api_key, lock_token = await keypool.borrow_key(tokens_needed)
     key_borrow_duration = time.time() - key_borrow_time
+    # None keeps the full reservation, for failures we know nothing about
+    tokens_used: int | None = None
 
     try:
         logger.info(
@@ -203,7 +251,7 @@ async def send_gpt_batch_request_sync(
                 f"[Request {request_id}] Success! HTTP call took {http_call_duration:.2f}s, "
                 f"total request time: {total_duration:.2f}s."
             )
-            keypool.record_key_usage(api_key, tokens_needed)
+            tokens_used = result.get("usage", {}).get("total_tokens")
             return result
 
     except httpx.HTTPStatusError as e:
@@ -238,6 +286,7 @@ async def send_gpt_batch_request_sync(
                     "rate limit" in error_message.lower()
                     or error_code == "rate_limit_exceeded"
                 ):
+                    tokens_used = 0  # rejected requests do not count
                     match = re.search(r"Please try again in ([\d.]+)s", error_message)
                     if match:
                         delay = float(match.group(1))
@@ -269,4 +318,4 @@ async def send_gpt_batch_request_sync(
         raise
     finally:
         logger.debug(f"[Request {request_id}] Returning key '{key_name}' to keypool.")
-        keypool.return_key(api_key, lock_token)
+        keypool.return_key(api_key, lock_token, tokens_used)
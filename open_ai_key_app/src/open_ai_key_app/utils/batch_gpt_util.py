@@ -1,7 +1,7 @@
 import asyncio
 import logging
 
-from open_ai_key_app.utils.token_util import num_tokens_from_string
+from open_ai_key_app.utils.token_util import count_many
 from open_ai_key_app.models.gpt_model import GPTModel, GPT_4o_mini, ModelParameters
 from core.models.gpt_batch_request_blob import (
     GPTBatchRequestBlob,
@@ -53,8 +53,8 @@ def get_gpt_request_blob(
 
     Creates a GPT batch request blob with token counting and validation.
     """
-    tokens_prompt = num_tokens_from_string(prompt)
-    tokens_context = num_tokens_from_string(context)
+    # prompts repeat across requests, so their counts come from the memo
+    tokens_prompt, tokens_context = count_many([prompt, context], memoize=True)
     max_response_tokens = (
         model_params.max_tokens
         if model_params.max_tokens
@@ -1,17 +1,16 @@
 import logging
-from openai import OpenAI
+from openai import AsyncOpenAI
 from openai.types import Batch
 
-
 logger = logging.getLogger(__name__)
 
 
-def fetch_all_batches(client: OpenAI, limit: int = 100) -> list[Batch]:
+async def fetch_all_batches(client: AsyncOpenAI, limit: int = 100) -> list[Batch]:
     """
     Fetch all batches by iterating through the cursor-based pagination.
 
     Args:
-        client: OpenAI client instance
+        client: AsyncOpenAI client instance
         limit: Number of batches per page (max 100)
 
     Returns:
@@ -22,9 +21,9 @@ def fetch_all_batches(client: OpenAI, limit: int = 100) -> list[Batch]:
 
     while True:
         if after is None:
-            page = client.batches.list(limit=limit)
+            page = await client.batches.list(limit=limit)
         else:
-            page = client.batches.list(limit=limit, after=after)
+            page = await client.batches.list(limit=limit, after=after)
 
         batches = page.data or []
         all_batches.extend(batches)
@@ -36,3 +35,44 @@ def fetch_all_batches(client: OpenAI, limit: int = 100) -> list[Batch]:
 
     logger.info(f"Fetched {len(all_batches)} batches total")
     return all_batches
+
+
+async def fetch_batches_created_since(
+    client: AsyncOpenAI, created_since: int, limit: int = 20
+) -> list[Batch]:
+    """
+    Fetch the batches created at or after created_since (unix seconds).
+
+    Batches are listed newest first, so paging stops at the first older one.
+
+    Args:
+        client: AsyncOpenAI client instance
+        created_since: Oldest created_at to include
+        limit: Number of batches per page (max 100)
+
+    Returns:
+        List of the new batch objects, newest first
+    """
+    new_batches: list[Batch] = []
+    after: str | None = None
+
+    while True:
+        if after is None:
+            page = await client.batches.list(limit=limit)
+        else:
+            page = await client.batches.list(limit=limit, after=after)
+
+        batches = page.data or []
+        for batch in batches:
+            if batch.created_at < created_since:
+                logger.info(f"Fetched {len(new_batches)} new batches")
+                return new_batches
+            new_batches.append(batch)
+
+        if not page.has_more or not batches:
+            break
+
+        after = batches[-1].id
+
+    logger.info(f"Fetched {len(new_batches)} new batches")
+    return new_batches
@@ -1,25 +1,36 @@
 from dataclasses import dataclass
 from pathlib import Path
+import io
 import logging
 import asyncio
-import threading
+import mmap
+import random
+import time
+from contextlib import asynccontextmanager, nullcontext
 from typing import Optional
-from concurrent.futures import ThreadPoolExecutor
+
+from pydantic import BaseModel
 
 from core.models.db.gpt_batch import GPTBatch
 from core.models.db.api_key_bundle import APIKeyBundle
 from core.utils.batch_jsonl_file_writer import JSONLBatchFile
-from data_etl_app.utils.chunk_util import split_bytes_on_line_boundaries
+from data_etl_app.utils.chunk_util import get_line_boundary_offsets
 
-from openai import OpenAI, OpenAIError, APIConnectionError, RateLimitError
+from openai import AsyncOpenAI, OpenAIError, APIConnectionError, RateLimitError
 from openai.types import Batch, Upload
 
-
 logger = logging.getLogger(__name__)
 
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB
+PART_SIZE = 20 * 1024 * 1024  # 20 MB per part (safe under 64MB limit)
+# OpenAI may throttle concurrent part uploads from the same client, so the
+# concurrency starts low and only grows while parts go through
+INITIAL_CONCURRENT_PART_UPLOADS = 2
+MAX_CONCURRENT_PART_UPLOADS = 8
+
 
-def download_openai_file(
-    client: OpenAI, output_type: str, output_path: Path, openai_file_id: str
+async def download_openai_file(
+    client: AsyncOpenAI, output_type: str, output_path: Path, openai_file_id: str
 ) -> bool:
     """
     The output .jsonl file will have one response line for every successful request line in the input file.
@@ -37,13 +48,21 @@ def download_openai_file(
         else:
             # Create parent directory if it doesn't exist
             # output_path.parent.mkdir(parents=True, exist_ok=True)
-            # Download file content
-            file_response = client.files.content(openai_file_id)
-            with open(output_path, "w", encoding="utf-8") as f:
-                f.write(file_response.text)
+            # Stream the content to disk, so memory stays flat whatever the file size.
+            # It lands under a temporary name first: a partial file must not be
+            # mistaken for a finished download by the exists() check above.
+            part_path = output_path.with_name(output_path.name + ".part")
+            file_size = 0
+            async with client.files.with_streaming_response.content(
+                openai_file_id
+            ) as file_response:
+                with open(part_path, "wb") as f:
+                    async for chunk in file_response.iter_bytes(DOWNLOAD_CHUNK_SIZE):
+                        f.write(chunk)
+                        file_size += len(chunk)
+            part_path.replace(output_path)
             logger.info(
-                f"✅ Downloaded output file to {output_path} "
-                f"({len(file_response.text):,} bytes)"
+                f"✅ Downloaded output file to {output_path} ({file_size:,} bytes)"
             )
             return True
     except OpenAIError as e:
@@ -57,14 +76,16 @@ def download_openai_file(
         return False
 
 
-def delete_uploaded_batch_file_from_openai(client: OpenAI, input_file_id: str) -> bool:
+async def delete_uploaded_batch_file_from_openai(
+    client: AsyncOpenAI, input_file_id: str
+) -> bool:
     if not input_file_id:
         logger.warning(f"No input_file_id passed")
         return False
 
     try:
         logger.info(f"Deleting uploaded input file {input_file_id}")
-        resp = client.files.delete(input_file_id)
+        resp = await client.files.delete(input_file_id)
         # resp is expected to be a dict-like with 'deleted': True
         deleted = bool(
             getattr(
@@ -89,12 +110,14 @@ def delete_uploaded_batch_file_from_openai(client: OpenAI, input_file_id: str) -
         return False
 
 
-def create_upload_object(client: OpenAI, filename: str, file_size: int) -> Upload:
+async def create_upload_object(
+    client: AsyncOpenAI, filename: str, file_size: int
+) -> Upload:
     """
     Create an Upload object for multipart upload.
 
     Args:
-        client: OpenAI client instance
+        client: AsyncOpenAI client instance
         filename: Name of the file to upload
         file_size: Size of the file in bytes
 
@@ -102,7 +125,7 @@ def create_upload_object(client: OpenAI, filename: str, file_size: int) -> Uploa
         Upload object
     """
     logger.info(f"Creating upload object for {filename} ({file_size:,} bytes)")
-    upload = client.uploads.create(
+    upload = await client.uploads.create(
         purpose="batch",
         filename=filename,
         bytes=file_size,
@@ -112,12 +135,14 @@ def create_upload_object(client: OpenAI, filename: str, file_size: int) -> Uploa
     return upload
 
 
-def complete_upload_object(client: OpenAI, upload_id: str, part_ids: list[str]) -> str:
+async def complete_upload_object(
+    client: AsyncOpenAI, upload_id: str, part_ids: list[str]
+) -> str:
     """
     Complete a multipart upload and get the final file ID.
 
     Args:
-        client: OpenAI client instance
+        client: AsyncOpenAI client instance
         upload_id: The Upload object ID
         part_ids: List of part IDs in the order they were uploaded
 
@@ -125,7 +150,7 @@ def complete_upload_object(client: OpenAI, upload_id: str, part_ids: list[str])
         file_id: The ID of the completed file
     """
     logger.info(f"Completing upload {upload_id} with {len(part_ids)} parts...")
-    upload = client.uploads.complete(upload_id=upload_id, part_ids=part_ids)
+    upload = await client.uploads.complete(upload_id=upload_id, part_ids=part_ids)
 
     file_id = upload.file.id if upload.file else None
     if not file_id:
@@ -135,220 +160,348 @@ def complete_upload_object(client: OpenAI, upload_id: str, part_ids: list[str])
     return file_id
 
 
+class MemoryViewReader(io.RawIOBase):
+    """Read-only file object over a memoryview, so a part is sent without a copy."""
+
+    def __init__(self, view: memoryview):
+        self._view = view
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self._view[self._position : self._position + len(buffer)]
+        buffer[: len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        self._position = max(0, offset)
+        return self._position
+
+    def tell(self) -> int:
+        return self._position
+
+
+class AdaptiveConcurrencyLimit:
+    """
+    Additive increase, multiplicative decrease: one more slot after
+    increase_after successes in a row, half the slots on throttling.
+    """
+
+    def __init__(
+        self,
+        initial: int = INITIAL_CONCURRENT_PART_UPLOADS,
+        maximum: int = MAX_CONCURRENT_PART_UPLOADS,
+        increase_after: int = 2,
+    ):
+        self.limit = min(initial, maximum)
+        self.maximum = maximum
+        self.increase_after = increase_after
+        self.in_flight = 0
+        self.peak = 0
+        self._successes = 0
+        self._condition = asyncio.Condition()
+
+    @asynccontextmanager
+    async def slot(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self.in_flight -= 1
+                self._condition.notify_all()
+
+    def on_success(self) -> None:
+        self._successes += 1
+        if self._successes >= self.increase_after and self.limit < self.maximum:
+            self.limit += 1
+            self._successes = 0
+
+    def on_throttled(self) -> None:
+        self._successes = 0
+        self.limit = max(1, self.limit // 2)
+
+
+class UploadResumeState(BaseModel):
+    """
+    Progress of a multipart upload, kept next to the file being uploaded so
+    that an upload interrupted by a crash can be finished instead of redone.
+    """
+
+    upload_id: str
+    expires_at: int  # unix seconds, OpenAI drops pending uploads after an hour
+    file_size: int
+    file_mtime_ns: int
+    part_size: int
+    part_count: int
+    part_ids: dict[int, str] = {}  # part number -> part id
+
+    @staticmethod
+    def get_path(file_path: Path) -> Path:
+        return file_path.with_name(file_path.name + ".upload.json")
+
+    @classmethod
+    def load(
+        cls, file_path: Path, part_size: int, part_count: int
+    ) -> Optional["UploadResumeState"]:
+        """The saved state, if it is for this very file and still usable."""
+        path = cls.get_path(file_path)
+        if not path.exists():
+            return None
+        try:
+            state = cls.model_validate_json(path.read_text())
+        except ValueError as e:
+            logger.warning(f"Ignoring unreadable upload state {path}: {e}")
+            return None
+        file_stat = file_path.stat()
+        if (
+            state.file_size != file_stat.st_size
+            or state.file_mtime_ns != file_stat.st_mtime_ns
+            or state.part_size != part_size
+            or state.part_count != part_count
+            or state.expires_at <= time.time() + 60
+        ):
+            logger.info(f"Upload state {path} is stale, starting a new upload")
+            path.unlink(missing_ok=True)
+            return None
+        return state
+
+    def save(self, file_path: Path) -> None:
+        path = self.get_path(file_path)
+        tmp_path = path.with_name(path.name + ".tmp")
+        tmp_path.write_text(self.model_dump_json())
+        tmp_path.replace(path)
+
+    @classmethod
+    def delete(cls, file_path: Path) -> None:
+        cls.get_path(file_path).unlink(missing_ok=True)
+
+
+class UploadNotPendingError(Exception):
+    """The Upload object was completed, cancelled or has expired."""
+
+
 async def upload_file_to_openai_using_parts(
-    client: OpenAI,
+    client: AsyncOpenAI,
     jsonl_batch_file: JSONLBatchFile,
 ) -> Optional[str]:
     """
     Upload a file to OpenAI using the multipart upload API.
 
-    This creates an Upload object, splits the file into parts (up to 64MB each),
-    uploads parts in parallel, then completes the upload to get a File ID.
+    The file is memory-mapped and cut into parts (up to 64MB each) at line
+    boundaries. Parts are streamed from the mapping, never copied, at a
+    concurrency that adapts to throttling. Progress is saved next to the
+    file, so an upload interrupted by a crash resumes where it stopped.
 
     Args:
-        client: OpenAI client instance
+        client: AsyncOpenAI client instance
         jsonl_batch_file: The JSONL batch file to upload
 
     Returns:
         The file ID of the completed upload, or None if upload failed
     """
-    PART_SIZE = 20 * 1024 * 1024  # 20 MB per part (safe under 64MB limit)
-
-    # Get file path
     file_path = jsonl_batch_file.full_path
 
     try:
-        # Step 1: Read file and split into parts first
-        with open(file_path, "rb") as f:
-            file_content = f.read()
-
-        # Split the file content into chunks respecting line boundaries
-        byte_chunks = split_bytes_on_line_boundaries(
-            data=file_content,
-            max_chunk_size=PART_SIZE,
-            newline_search_window=10000,  # Search last 10KB for newline
+        if file_path.stat().st_size == 0:
+            logger.error(f"Not uploading empty file {jsonl_batch_file.name}")
+            return None
+
+        with (
+            open(file_path, "rb") as f,
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped,
+        ):
+            part_offsets = await asyncio.to_thread(
+                get_line_boundary_offsets,
+                mapped,
+                PART_SIZE,
+                10000,  # Search last 10KB for newline
+            )
+            with memoryview(mapped) as view:
+                state = UploadResumeState.load(file_path, PART_SIZE, len(part_offsets))
+                if state is not None:
+                    try:
+                        return await _upload_parts(
+                            client, jsonl_batch_file, view, part_offsets, state
+                        )
+                    except UploadNotPendingError as e:
+                        logger.warning(
+                            f"Could not resume upload {state.upload_id}: {e}. Starting a new upload."
+                        )
+                        UploadResumeState.delete(file_path)
+                return await _upload_parts(
+                    client, jsonl_batch_file, view, part_offsets, None
+                )
+
+    except Exception as e:
+        logger.error(
+            f"Error uploading file {jsonl_batch_file.name}: {e}",
+            exc_info=True,
         )
+        return None
 
-        # Calculate ACTUAL total size after splitting (may differ from original file size
-        # due to line boundary adjustments)
-        total_upload_size = sum(len(chunk) for chunk in byte_chunks)
-        original_size = len(file_content)
 
-        if total_upload_size != original_size:
-            logger.warning(
-                f"Split size mismatch: original={original_size:,} bytes, "
-                f"total chunks={total_upload_size:,} bytes "
-                f"(diff={total_upload_size - original_size:+,})"
-            )
+async def _upload_parts(
+    client: AsyncOpenAI,
+    jsonl_batch_file: JSONLBatchFile,
+    view: memoryview,
+    part_offsets: list[tuple[int, int]],
+    state: Optional[UploadResumeState],
+) -> Optional[str]:
+    file_path = jsonl_batch_file.full_path
+    total_upload_size = len(view)
+    resuming = state is not None
 
-        # Step 2: Create Upload object with the actual total size
-        loop = asyncio.get_event_loop()
-        upload = create_upload_object(
+    if state is None:
+        upload = await create_upload_object(
             client=client,
             filename=jsonl_batch_file.name,
-            file_size=total_upload_size,  # Use actual chunk total, not file size
+            file_size=total_upload_size,
         )
-
-        # Step 3: Prepare parts for upload
-        parts = [
-            {"data": chunk, "part_number": i} for i, chunk in enumerate(byte_chunks)
-        ]
-
-        # Limit concurrent uploads to avoid overwhelming OpenAI's API
-        # OpenAI may throttle concurrent part uploads from the same client
-        MAX_CONCURRENT_UPLOADS = 2
-
+        file_stat = file_path.stat()
+        state = UploadResumeState(
+            upload_id=upload.id,
+            expires_at=upload.expires_at,
+            file_size=file_stat.st_size,
+            file_mtime_ns=file_stat.st_mtime_ns,
+            part_size=PART_SIZE,
+            part_count=len(part_offsets),
+        )
+        state.save(file_path)
+    else:
         logger.info(
-            f"Uploading {len(parts)} parts with max {MAX_CONCURRENT_UPLOADS} concurrent "
-            f"(total size: {total_upload_size:,} bytes)..."
+            f"Resuming upload {state.upload_id}: {len(state.part_ids)}/{state.part_count} parts already uploaded"
         )
 
-        # Shared cancellation flag to stop all upload threads immediately
-        cancel_event = threading.Event()
+    missing_parts = [
+        part_number
+        for part_number in range(len(part_offsets))
+        if part_number not in state.part_ids
+    ]
+    limit = AdaptiveConcurrencyLimit()
+    logger.info(
+        f"Uploading {len(missing_parts)} parts, starting at {limit.limit} concurrent "
+        f"(total size: {total_upload_size:,} bytes)..."
+    )
 
-        def upload_part_wrapper(part_dict: dict) -> str:
-            return add_upload_part_to_upload_object(
+    async def upload_part(part_number: int) -> None:
+        start, end = part_offsets[part_number]
+        part = view[start:end]
+        try:
+            state.part_ids[part_number] = await add_upload_part_to_upload_object(
                 client=client,
-                upload_id=upload.id,
-                data_part=part_dict["data"],
-                part_number=part_dict["part_number"],
-                cancel_event=cancel_event,
+                upload_id=state.upload_id,
+                data_part=part,
+                part_number=part_number,
+                limit=limit,
             )
+        finally:
+            part.release()  # the mapping can only be closed once no view is left
+        state.save(file_path)
+
+    upload_tasks = [
+        asyncio.create_task(upload_part(part_number)) for part_number in missing_parts
+    ]
+    if upload_tasks:
+        # Use asyncio.FIRST_EXCEPTION to detect first failure
+        done, pending = await asyncio.wait(
+            upload_tasks, return_when=asyncio.FIRST_EXCEPTION
+        )
+        first_exception = next(
+            (task.exception() for task in done if task.exception() is not None),
+            None,
+        )
 
-        with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_UPLOADS) as executor:
-            upload_tasks = [
-                loop.run_in_executor(executor, upload_part_wrapper, part)
-                for part in parts
-            ]
-
-            # Use asyncio.FIRST_EXCEPTION to detect first failure
-            done, pending = await asyncio.wait(
-                upload_tasks, return_when=asyncio.FIRST_EXCEPTION
+        # If any part failed, stop the others and abort
+        if first_exception is not None:
+            logger.error(
+                f"Upload failure detected: {first_exception}. "
+                f"Cancelling the other parts (pending={len(pending)}, done={len(done)})..."
             )
-
-            # Check if any completed task failed
-            failed = False
-            first_exception = None
-            for task in done:
-                try:
-                    task.result()  # This will raise if the task failed
-                except Exception as e:
-                    failed = True
-                    if first_exception is None:
-                        first_exception = e
-                    break
-
-            # If any task failed, signal all threads to stop and abort
-            if failed:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+            if resuming and isinstance(first_exception, UploadNotPendingError):
+                raise first_exception  # a new upload is started instead
+
+            # Cancel the upload on OpenAI side so it is not left pending
+            try:
+                await client.uploads.cancel(state.upload_id)
+                logger.info(f"Cancelled upload {state.upload_id}")
+            except Exception as cancel_error:
                 logger.error(
-                    f"Upload failure detected: {first_exception}. "
-                    f"Signaling all parts to stop (pending={len(pending)}, done={len(done)})..."
+                    f"Error cancelling upload {state.upload_id}: {cancel_error}"
                 )
+            UploadResumeState.delete(file_path)
+            return None
 
-                # Signal all threads to stop immediately
-                cancel_event.set()
-
-                # Cancel the upload on OpenAI side ASAP to prevent further API calls
-                try:
-                    client.uploads.cancel(upload.id)
-                    logger.info(f"Cancelled upload {upload.id}")
-                except Exception as cancel_error:
-                    logger.error(f"Error cancelling upload {upload.id}: {cancel_error}")
-
-                # Cancel all asyncio tasks
-                if pending:
-                    for task in pending:
-                        task.cancel()
-
-                # Wait for all tasks to finish/cancel (with timeout to prevent hanging)
-                try:
-                    await asyncio.wait_for(
-                        asyncio.wait(pending, return_when=asyncio.ALL_COMPLETED),
-                        timeout=5.0,
-                    )
-                except asyncio.TimeoutError:
-                    logger.warning(f"Some tasks did not complete within timeout")
-
-                return None
-
-            # All tasks completed successfully (no pending tasks when using FIRST_EXCEPTION)
-            # Collect all results - all should be successful at this point
-            part_results = []
-            for task in upload_tasks:
-                try:
-                    part_results.append(task.result())
-                except Exception as e:
-                    # This shouldn't happen since we checked earlier, but handle it
-                    logger.error(f"Unexpected error collecting results: {e}")
-                    # Signal cancellation and abort
-                    cancel_event.set()
-                    try:
-                        client.uploads.cancel(upload.id)
-                    except Exception as cancel_error:
-                        logger.error(
-                            f"Error cancelling upload {upload.id}: {cancel_error}"
-                        )
-                    return None
-
-        # All parts uploaded successfully
-        logger.info(f"Uploaded {len(part_results)} parts successfully")
+    logger.info(
+        f"Uploaded {len(missing_parts)} parts successfully "
+        f"(peak concurrency {limit.peak}, final limit {limit.limit})"
+    )
 
-        # Step 4: Complete the upload
-        file_id = complete_upload_object(
+    # Complete the upload, with the part ids in part order
+    try:
+        file_id = await complete_upload_object(
             client=client,
-            upload_id=upload.id,
-            part_ids=part_results,  # All are part IDs (strings)
+            upload_id=state.upload_id,
+            part_ids=[state.part_ids[i] for i in range(len(part_offsets))],
         )
+    except OpenAIError as e:
+        if resuming and _is_upload_not_pending(e):
+            raise UploadNotPendingError(str(e)) from e
+        UploadResumeState.delete(file_path)
+        raise
+    UploadResumeState.delete(file_path)
+    return file_id
 
-        return file_id
 
-    except Exception as e:
-        logger.error(
-            f"Error uploading file {jsonl_batch_file.name}: {e}",
-            exc_info=True,
-        )
-        return None
+def _is_upload_not_pending(error: Exception) -> bool:
+    return "upload_not_pending" in str(error) or "cancelled" in str(error).lower()
 
 
-def add_upload_part_to_upload_object(
-    client: OpenAI,
+async def add_upload_part_to_upload_object(
+    client: AsyncOpenAI,
     upload_id: str,
-    data_part: bytes,
+    data_part: bytes | memoryview,
     part_number: int,
     max_retries: int = 5,  # Increased from 3 to handle transient connection issues
-    cancel_event: Optional[threading.Event] = None,
+    limit: Optional[AdaptiveConcurrencyLimit] = None,
 ) -> str:
     """
     Add a part to an Upload object with retry logic.
 
     Each Part can be at most 64 MB. Parts can be uploaded in parallel.
+    Cancelling the task stops the retries.
 
     Args:
-        client: OpenAI client instance
+        client: AsyncOpenAI client instance
         upload_id: The Upload object ID
-        data_part: The bytes to upload for this part
+        data_part: The bytes to upload for this part, a memoryview is streamed
         part_number: The part number (for logging)
         max_retries: Maximum number of retry attempts (default: 5)
-        cancel_event: Optional threading.Event to signal cancellation
+        limit: Optional concurrency limit, each attempt takes one of its slots
 
     Returns:
         part_id: The ID of the uploaded part
     """
-    import time
-    from openai import APIConnectionError, RateLimitError
-
     last_exception = None
 
     for attempt in range(max_retries):
-        # Check if cancellation was requested
-        if cancel_event and cancel_event.is_set():
-            logger.info(
-                f"Part {part_number} upload cancelled by cancel_event (attempt {attempt + 1})"
-            )
-            raise Exception(
-                f"Upload cancelled for part {part_number} (upload already failed)"
-            )
-
         try:
             if attempt > 0:
                 logger.warning(
@@ -359,10 +512,17 @@ def add_upload_part_to_upload_object(
                     f"Uploading part {part_number} ({len(data_part):,} bytes) to {upload_id}"
                 )
 
-            upload_part = client.uploads.parts.create(
-                upload_id=upload_id,
-                data=data_part,
-            )
+            async with limit.slot() if limit else nullcontext():
+                upload_part = await client.uploads.parts.create(
+                    upload_id=upload_id,
+                    data=(
+                        MemoryViewReader(data_part)
+                        if isinstance(data_part, memoryview)
+                        else data_part
+                    ),
+                )
+            if limit:
+                limit.on_success()
 
             logger.debug(f"Part {part_number} uploaded: {upload_part.id}")
             return upload_part.id
@@ -370,25 +530,18 @@ def add_upload_part_to_upload_object(
         except (APIConnectionError, RateLimitError) as e:
             # These are retryable errors - connection issues or rate limits
             last_exception = e
+            if limit:
+                limit.on_throttled()
             error_type = "rate limit" if isinstance(e, RateLimitError) else "connection"
             logger.warning(
                 f"Part {part_number} {error_type} error (attempt {attempt + 1}/{max_retries}): {e}"
             )
 
             if attempt < max_retries - 1:
-                # Check cancellation before sleeping
-                if cancel_event and cancel_event.is_set():
-                    logger.info(f"Part {part_number} cancelled during retry backoff")
-                    raise Exception(
-                        f"Upload cancelled for part {part_number} during retry"
-                    )
-
                 # Exponential backoff with jitter: base 2^attempt + random 0-1 seconds
-                import random
-
                 backoff = (2**attempt) + random.random()
                 logger.info(f"Waiting {backoff:.1f}s before retry...")
-                time.sleep(backoff)
+                await asyncio.sleep(backoff)
             else:
                 logger.error(
                     f"Failed to upload part {part_number} after {max_retries} attempts ({error_type} error)"
@@ -402,21 +555,17 @@ def add_upload_part_to_upload_object(
             )
 
             # Don't retry on upload_not_pending or similar errors
-            if "upload_not_pending" in str(e) or "cancelled" in str(e).lower():
+            if _is_upload_not_pending(e):
                 logger.info(f"Upload already cancelled, stopping part {part_number}")
-                raise Exception(f"Upload cancelled for part {part_number}") from e
+                raise UploadNotPendingError(
+                    f"Upload cancelled for part {part_number}"
+                ) from e
 
             # For other errors, retry with shorter backoff
             if attempt < max_retries - 1:
-                if cancel_event and cancel_event.is_set():
-                    logger.info(f"Part {part_number} cancelled during retry backoff")
-                    raise Exception(
-                        f"Upload cancelled for part {part_number} during retry"
-                    )
-
                 backoff = 1.0
                 logger.info(f"Waiting {backoff}s before retry...")
-                time.sleep(backoff)
+                await asyncio.sleep(backoff)
             else:
                 logger.error(
                     f"Failed to upload part {part_number} after {max_retries} attempts"
@@ -428,8 +577,8 @@ def add_upload_part_to_upload_object(
     ) from last_exception
 
 
-def find_latest_batch_of_api_key_bundle(
-    client: OpenAI,
+async def find_latest_batch_of_api_key_bundle(
+    client: AsyncOpenAI,
     api_key_bundle: APIKeyBundle,
 ) -> Optional[Batch]:
     """
@@ -440,7 +589,9 @@ def find_latest_batch_of_api_key_bundle(
         # client = OpenAI(api_key=api_key_bundle.key)
 
         # List batches, sorted by created_at descending (most recent first)
-        batches_response = client.batches.list(limit=1)  # Only need the most recent one
+        batches_response = await client.batches.list(
+            limit=1
+        )  # Only need the most recent one
 
         # Get the first (most recent) batch if any exist
         if batches_response.data:
@@ -27,6 +27,10 @@ def get_usage_key_label(key_name: str) -> str:
     return f"{KEYPOOL_PREFIX}:{key_name}:usage"
 
 
+def get_request_usage_key_label(key_name: str) -> str:
+    return f"{KEYPOOL_PREFIX}:{key_name}:request_usage"
+
+
 def get_lock_key_label(key_name: str) -> str:
     return f"{KEYPOOL_PREFIX}:{key_name}:lock"
 
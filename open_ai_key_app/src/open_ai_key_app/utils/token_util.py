@@ -1,11 +1,141 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
 import tiktoken
 from open_ai_key_app.models.gpt_model import GPTModel, GPT_4o_mini
 
+# strings shorter than this are cheaper to re-tokenize than to look up
+TOKEN_COUNT_MEMO_MIN_CHARS = 256
+TOKEN_COUNT_MEMO_MAX_ENTRIES = 10_000
+
+
+@lru_cache(maxsize=None)
+def get_encoding_for_model(model_name: str) -> tiktoken.Encoding:
+    """Resolve (once per model) the tiktoken encoding for a model name."""
+    return tiktoken.encoding_for_model(model_name)
+
+
+class TokenCountMemo:
+    """
+    Thread-safe LRU of token counts keyed by model and a hash of the text.
+
+    Lets the same scraped text or prompt be tokenized once per process, however
+    many call sites (validity checks, log lines, request builders) count it.
+    Only the 16-byte digest is kept, never the text itself.
+    """
+
+    def __init__(self, max_entries: int = TOKEN_COUNT_MEMO_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._counts: OrderedDict[tuple[str, bool, bytes], int] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(string: str, model_name: str, ordinary: bool) -> tuple[str, bool, bytes]:
+        digest = hashlib.blake2b(
+            string.encode("utf-8", "surrogatepass"), digest_size=16
+        ).digest()
+        return model_name, ordinary, digest
+
+    def get(self, key: tuple[str, bool, bytes]) -> int | None:
+        with self._lock:
+            count = self._counts.get(key)
+            if count is None:
+                self.misses += 1
+                return None
+            self._counts.move_to_end(key)
+            self.hits += 1
+            return count
+
+    def put(self, key: tuple[str, bool, bytes], count: int) -> None:
+        with self._lock:
+            self._counts[key] = count
+            self._counts.move_to_end(key)
+            while len(self._counts) > self.max_entries:
+                self._counts.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._counts.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+
+_token_count_memo = TokenCountMemo()
+
+
+def get_token_count_memo() -> TokenCountMemo:
+    return _token_count_memo
+
 
 # --- Token Estimation ---
-def num_tokens_from_string(string: str, gpt_model: GPTModel = GPT_4o_mini) -> int:
-    encoding = tiktoken.encoding_for_model(gpt_model.model_name)
-    return len(encoding.encode(string))
+def num_tokens_from_string(
+    string: str, gpt_model: GPTModel = GPT_4o_mini, memoize: bool = False
+) -> int:
+    """
+    Token count of string.
+
+    With memoize=True the count is looked up by content hash first, for texts that
+    are counted repeatedly (scraped text, prompts).
+    """
+    encoding = get_encoding_for_model(gpt_model.model_name)
+    if not memoize or len(string) < TOKEN_COUNT_MEMO_MIN_CHARS:
+        return len(encoding.encode(string))
+
+    key = TokenCountMemo.key(string, gpt_model.model_name, ordinary=False)
+    count = _token_count_memo.get(key)
+    if count is None:
+        count = len(encoding.encode(string))
+        _token_count_memo.put(key, count)
+    return count
+
+
+def count_many(
+    strings: list[str], gpt_model: GPTModel = GPT_4o_mini, memoize: bool = False
+) -> list[int]:
+    """
+    Token counts for many strings with a single batched tiktoken call.
+
+    Special-token text (e.g. "<|endoftext|>") is counted as ordinary text instead
+    of raising, which is what we want for scraped content. With memoize=True, long
+    strings already counted in this process are not tokenized again.
+    """
+    if not strings:
+        return []
+    encoding = get_encoding_for_model(gpt_model.model_name)
+    if not memoize:
+        return [len(tokens) for tokens in encoding.encode_ordinary_batch(strings)]
+
+    counts: list[int | None] = [None] * len(strings)
+    keys: dict[int, tuple[str, bool, bytes]] = {}
+    for i, string in enumerate(strings):
+        if len(string) < TOKEN_COUNT_MEMO_MIN_CHARS:
+            continue
+        keys[i] = TokenCountMemo.key(string, gpt_model.model_name, ordinary=True)
+        counts[i] = _token_count_memo.get(keys[i])
+
+    # encode each distinct missing string once, even if it repeats within the batch
+    to_encode: dict[tuple[str, bool, bytes] | int, list[int]] = {}
+    for i, count in enumerate(counts):
+        if count is None:
+            to_encode.setdefault(keys.get(i, i), []).append(i)
+    if to_encode:
+        encoded = encoding.encode_ordinary_batch(
+            [strings[indices[0]] for indices in to_encode.values()]
+        )
+        for (key, indices), tokens in zip(to_encode.items(), encoded):
+            for i in indices:
+                counts[i] = len(tokens)
+            if not isinstance(key, int):
+                _token_count_memo.put(key, len(tokens))
+
+    return counts  # type: ignore[return-value]
 
 
 if __name__ == "__main__":
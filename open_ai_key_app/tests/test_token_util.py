@@ -0,0 +1,130 @@
+import pytest
+
+from open_ai_key_app.utils import token_util
+from open_ai_key_app.utils.token_util import (
+    TOKEN_COUNT_MEMO_MIN_CHARS,
+    TokenCountMemo,
+    count_many,
+    get_token_count_memo,
+    num_tokens_from_string,
+)
+
+LONG_TEXT = "Precision CNC machining of aluminum and stainless parts.\n" * 10
+SHORT_TEXT = "CNC machining"
+
+
+class FakeEncoding:
+    """Whitespace tokenizer that records how many strings it was asked to encode."""
+
+    def __init__(self):
+        self.encoded = 0
+
+    def encode(self, string):
+        self.encoded += 1
+        return string.split()
+
+    def encode_ordinary_batch(self, strings):
+        self.encoded += len(strings)
+        return [string.split() for string in strings]
+
+
+@pytest.fixture(autouse=True)
+def encoding(monkeypatch):
+    fake = FakeEncoding()
+    monkeypatch.setattr(token_util, "get_encoding_for_model", lambda model_name: fake)
+    return fake
+
+
+@pytest.fixture(autouse=True)
+def fresh_memo(monkeypatch):
+    memo = TokenCountMemo()
+    monkeypatch.setattr(token_util, "_token_count_memo", memo)
+    return memo
+
+
+def test_memo_evicts_least_recently_used():
+    memo = TokenCountMemo(max_entries=2)
+    key_a = TokenCountMemo.key("a", "gpt-4o-mini", ordinary=False)
+    key_b = TokenCountMemo.key("b", "gpt-4o-mini", ordinary=False)
+    key_c = TokenCountMemo.key("c", "gpt-4o-mini", ordinary=False)
+
+    memo.put(key_a, 1)
+    memo.put(key_b, 2)
+    assert memo.get(key_a) == 1  # a is now most recently used
+    memo.put(key_c, 3)
+
+    assert len(memo) == 2
+    assert memo.get(key_b) is None
+    assert memo.get(key_a) == 1
+    assert memo.get(key_c) == 3
+    assert (memo.hits, memo.misses) == (3, 1)
+
+
+def test_memo_key_separates_model_and_mode():
+    keys = {
+        TokenCountMemo.key(LONG_TEXT, "gpt-4o-mini", ordinary=False),
+        TokenCountMemo.key(LONG_TEXT, "gpt-4o-mini", ordinary=True),
+        TokenCountMemo.key(LONG_TEXT, "gpt-4o", ordinary=False),
+    }
+    assert len(keys) == 3
+
+
+def test_num_tokens_memoizes_long_strings(fresh_memo, encoding):
+    first = num_tokens_from_string(LONG_TEXT, memoize=True)
+    second = num_tokens_from_string(LONG_TEXT, memoize=True)
+
+    assert encoding.encoded == 1
+    assert first == second == num_tokens_from_string(LONG_TEXT)
+    assert len(fresh_memo) == 1
+    assert (fresh_memo.hits, fresh_memo.misses) == (1, 1)
+
+
+def test_num_tokens_skips_memo_below_min_chars(fresh_memo):
+    text = "x" * (TOKEN_COUNT_MEMO_MIN_CHARS - 1)
+
+    num_tokens_from_string(text, memoize=True)
+    num_tokens_from_string(text, memoize=True)
+
+    assert len(fresh_memo) == 0
+    assert (fresh_memo.hits, fresh_memo.misses) == (0, 0)
+
+    num_tokens_from_string("x" * TOKEN_COUNT_MEMO_MIN_CHARS, memoize=True)
+    assert len(fresh_memo) == 1
+
+
+def test_memoize_false_never_touches_memo(fresh_memo):
+    num_tokens_from_string(LONG_TEXT)
+    count_many([LONG_TEXT, SHORT_TEXT])
+
+    assert len(fresh_memo) == 0
+    assert (fresh_memo.hits, fresh_memo.misses) == (0, 0)
+
+
+def test_get_token_count_memo_returns_module_memo(fresh_memo):
+    assert get_token_count_memo() is fresh_memo
+
+
+@pytest.mark.parametrize("memoize", [False, True])
+def test_count_many_matches_num_tokens_from_string(memoize):
+    strings = [LONG_TEXT, SHORT_TEXT, "", "\n", LONG_TEXT, "héllo wörld " * 40]
+
+    expected = [num_tokens_from_string(s) for s in strings]
+
+    assert count_many(strings, memoize=memoize) == expected
+    # a second pass served (partly) from the memo gives the same answer
+    assert count_many(strings, memoize=memoize) == expected
+
+
+def test_count_many_memoizes_each_distinct_long_string_once(fresh_memo, encoding):
+    count_many([LONG_TEXT, LONG_TEXT, SHORT_TEXT], memoize=True)
+
+    assert encoding.encoded == 2
+    assert len(fresh_memo) == 1
+
+    count_many([LONG_TEXT], memoize=True)
+    assert encoding.encoded == 2
+    assert fresh_memo.hits == 1
+
+
+def test_count_many_empty():
+    assert count_many([]) == []
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Benchmark the HTTP fetch tier against the Selenium-only scraper.
+
+Serves a generated fixture site from a local HTTP server (mostly static pages,
+plus a few JS app shells that must still go through the browser) and scrapes it
+with ScraperService twice: once with the HTTP tier and once browser-only. The
+browser run needs Chrome and a CHROME_PROFILE_TMPDIR, like the scrape bot.
+
+Usage:
+    python scripts/benchmark_fetch_tiers.py --static-pages 60 --js-pages 5 \
+        --browsers 4 --repeat 2
+"""
+
+import argparse
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add project to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from scraper_app.services.url_scraper_service import ScraperService
+
+PARAGRAPH = (
+    "We machine aluminium, stainless and titanium parts to tolerances of 0.01 mm "
+    "and offer anodizing, powder coating and assembly for aerospace customers. "
+)
+
+
+def build_site(static_pages: int, js_pages: int, links_per_page: int) -> dict[str, str]:
+    """Path -> HTML for a site whose pages link forward to the next few pages."""
+    paths = ["/"] + [f"/page-{i}" for i in range(1, static_pages)]
+    js_paths = [f"/app-{i}" for i in range(js_pages)]
+    site = {}
+    for i, path in enumerate(paths):
+        targets = paths[i + 1 : i + 1 + links_per_page]
+        if i < len(js_paths):
+            targets = targets + [js_paths[i]]
+        nav = " ".join(f'<a href="{target}">{target}</a>' for target in targets)
+        site[path] = (
+            f"<html><head><title>{path}</title></head><body><nav>{nav}</nav>"
+            f"<main><h1>Page {i}</h1><p>{PARAGRAPH * 8}</p></main></body></html>"
+        )
+    for path in js_paths:
+        site[path] = (
+            '<html><head><script src="/static/bundle.js"></script></head>'
+            '<body><div id="root"></div></body></html>'
+        )
+    return site
+
+
+def serve(site: dict[str, str]) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = site.get(self.path)
+            payload = (body or "").encode()
+            self.send_response(200 if body else 404)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run_tier(
+    url: str, use_http_tier: bool, browsers: int, max_depth: int, repeat: int
+) -> dict:
+    timings, pages, drivers = [], 0, 0
+    for _ in range(repeat):
+        # a fresh service per run, so the per-domain tier memory starts cold
+        scraper = ScraperService(
+            max_concurrent_browsers=browsers,
+            max_depth=max_depth,
+            use_http_tier=use_http_tier,
+        )
+        try:
+            start = time.perf_counter()
+            result = scraper.scrape(url)
+            timings.append(time.perf_counter() - start)
+            pages = result.urls_scraped
+            drivers = scraper.driver_pool.created
+        finally:
+            scraper.shutdown(wait=True)
+    return {"seconds": statistics.median(timings), "pages": pages, "drivers": drivers}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--static-pages", type=int, default=60)
+    parser.add_argument("--js-pages", type=int, default=5)
+    parser.add_argument("--links-per-page", type=int, default=4)
+    parser.add_argument("--browsers", type=int, default=4)
+    parser.add_argument("--max-depth", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=2)
+    parser.add_argument(
+        "--skip-browser-only", action="store_true", help="Only run the HTTP tier"
+    )
+    args = parser.parse_args()
+
+    site = build_site(args.static_pages, args.js_pages, args.links_per_page)
+    server = serve(site)
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+    print(f"Fixture site: {len(site)} pages ({args.js_pages} JS shells) at {url}")
+
+    runs = {"http tier": True}
+    if not args.skip_browser_only:
+        runs["browser only"] = False
+    results = {}
+    try:
+        for name, use_http_tier in runs.items():
+            results[name] = run_tier(
+                url, use_http_tier, args.browsers, args.max_depth, args.repeat
+            )
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    print(f"\n{'tier':14} {'seconds':>8} {'pages':>6} {'pages/s':>8} {'drivers':>8}")
+    for name, stats in results.items():
+        rate = stats["pages"] / max(stats["seconds"], 1e-9)
+        print(
+            f"{name:14} {stats['seconds']:8.2f} {stats['pages']:6d} {rate:8.1f} "
+            f"{stats['drivers']:8d}"
+        )
+    if len(results) == 2:
+        speedup = results["browser only"]["seconds"] / max(
+            results["http tier"]["seconds"], 1e-9
+        )
+        print(f"\nHTTP tier speedup: {speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
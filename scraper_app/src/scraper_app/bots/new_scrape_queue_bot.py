@@ -20,6 +20,7 @@ load_open_ai_app_env()
 
 from core.dependencies.aws_clients import (
     cleanup_core_aws_clients,
+    get_scrape_queue_client,
     initialize_core_aws_clients,
 )
 from data_etl_app.dependencies.aws_clients import (
@@ -36,6 +37,10 @@ from core.utils.aws.s3.scraped_text_util import (
     delete_scraped_text_from_s3_by_etld1,
     get_latest_version_id_by_mfg_etld,
 )
+from core.utils.aws.queue.sqs_consumer_util import (
+    DEFAULT_VISIBILITY_TIMEOUT,
+    SQSBatchConsumer,
+)
 from core.utils.mongo_client import init_db
 from core.utils.time_util import get_current_time
 
@@ -56,7 +61,6 @@ logger = logging.getLogger(__name__)
 # Configuration constants
 DEFAULT_SLEEP_AFTER_RETRIES = 12 * 60 * 60  # 12 hours in seconds
 RETRY_SLEEP_INTERVAL = 5  # seconds
-CONCURRENCY_CHECK_INTERVAL = 0.1  # second
 
 
 class ScrapingStats:
@@ -130,113 +134,17 @@ Here, valid_file must be set
 async def process_queue(
     scraper: ScraperService,
     push_item_to_e_queue: Callable[[ToExtractItem], Awaitable[None]],
-    poll_item_from_s_queue: Callable[
-        [], Awaitable[tuple[ToScrapeItem, str] | tuple[None, None]]
-    ],
-    delete_item_from_s_queue: Callable[[str], Awaitable[None]],
+    consumer: SQSBatchConsumer[ToScrapeItem],
 ):
     scraping_stats = ScrapingStats()  # Initialize timing stats
-    try:
-        while True:
-            item, receipt_handle = (
-                await poll_item_from_s_queue()
-            )  # 10 second long poll, doesn't block, yields control back to event loop
-
-            if item is None:
-                continue
-            elif not receipt_handle:
-                logger.error("No receipt handle found, skipping this message.")
-                continue
 
-            # Create single timestamp for this polled item - all errors will use this timestamp
-            polled_at = get_current_time()
-            mfg_etld = get_etld1_from_host(item.accessible_normalized_url)
-
-            logger.info(
-                f"Processing item: {item.accessible_normalized_url} (Batch: {item.batch.title})"
-            )
-            try:
-                manufacturer = await Manufacturer.find_one({"etld1": mfg_etld})
-                scraped_file = await get_valid_scraped_file(
-                    polled_at,
-                    item,
-                    manufacturer,
-                    redo_extraction_flag=item.redo_extraction,
-                    scraper=scraper,
-                )
+    async def handle_item(item: ToScrapeItem) -> None:
+        await scrape_and_cleanup(item, scraper, push_item_to_e_queue, scraping_stats)
 
-                if manufacturer:
-                    logger.info(f"existing manufacturer found: {manufacturer.etld1}.")
-                    manufacturer.scraped_text_file_num_tokens = scraped_file.num_tokens
-                    manufacturer.scraped_text_file_version_id = (
-                        scraped_file.s3_version_id
-                    )
-                else:
-                    logger.info(f"Creating new manufacturer for mfg_etld:{mfg_etld}.")
-                    manufacturer = Manufacturer(
-                        created_at=polled_at,
-                        etld1=mfg_etld,
-                        url_accessible_at=item.accessible_normalized_url,
-                        scraped_text_file_num_tokens=scraped_file.num_tokens,
-                        scraped_text_file_version_id=scraped_file.s3_version_id,
-                        batches=[item.batch],
-                        # Following fields will be set later during extraction
-                        name=None,
-                        is_manufacturer=None,
-                        is_contract_manufacturer=None,
-                        is_product_manufacturer=None,
-                        founded_in=None,
-                        email_addresses=None,
-                        num_employees=None,
-                        business_desc=None,
-                        business_statuses=None,
-                        primary_naics=None,
-                        secondary_naics=None,
-                        addresses=None,
-                        products=None,
-                        certificates=None,
-                        industries=None,
-                        process_caps=None,
-                        material_caps=None,
-                    )
-                    logger.info(
-                        f"Done creating new manufacturer for mfg_etld:{manufacturer.etld1}."
-                    )
-
-                await update_manufacturer(polled_at, manufacturer)
-                await push_item_to_e_queue(
-                    ToExtractItem.from_to_scrape_item(item),
-                )
-                logger.info(f"Saved manufacturer: {manufacturer.etld1}")
-                # Calculate and log timing
-                if scraped_file.last_modified_on > polled_at:
-                    # Only calculate stats if the file was modified after polling
-                    end_time = get_current_time()
-                    duration = end_time - polled_at
-                    scraping_stats.add_timing(duration.total_seconds())
-                    logger.info(
-                        f"   ⏱️  Individual time: {duration.total_seconds():.2f}s"
-                    )
-                    scraping_stats.print_stats()
-                else:
-                    logger.info(
-                        f"Skipped stats calculation: scraped_file.last_modified_on ({scraped_file.last_modified_on}) "
-                        f"is not newer than polled_at ({polled_at})"
-                    )
-            except Exception as e:
-                logger.error(
-                    f"Error processing manufacturer {item.accessible_normalized_url}: {e}"
-                )
-                await ScrapingError.insert_one(
-                    ScrapingError(
-                        created_at=polled_at,
-                        error=str(e),
-                        url=item.accessible_normalized_url,
-                        batch=item.batch,
-                    )
-                )
-            finally:
-                await delete_item_from_s_queue(receipt_handle)
+    try:
+        # receives as many items as there are free site slots, keeps the ones
+        # being scraped invisible to other bots and deletes them when done
+        await consumer.run(handle_item)
     except Exception as e:
         logger.error(f"Error processing SQS message: {e}")
     finally:
@@ -246,6 +154,97 @@ async def process_queue(
             scraping_stats.print_stats()
 
 
+async def scrape_and_cleanup(
+    item: ToScrapeItem,
+    scraper: ScraperService,
+    push_item_to_e_queue: Callable[[ToExtractItem], Awaitable[None]],
+    scraping_stats: ScrapingStats,
+):
+    # Create single timestamp for this polled item - all errors will use this timestamp
+    polled_at = get_current_time()
+    mfg_etld = get_etld1_from_host(item.accessible_normalized_url)
+
+    logger.info(
+        f"Processing item: {item.accessible_normalized_url} (Batch: {item.batch.title})"
+    )
+    try:
+        manufacturer = await Manufacturer.find_one({"etld1": mfg_etld})
+        scraped_file = await get_valid_scraped_file(
+            polled_at,
+            item,
+            manufacturer,
+            redo_extraction_flag=item.redo_extraction,
+            scraper=scraper,
+        )
+
+        if manufacturer:
+            logger.info(f"existing manufacturer found: {manufacturer.etld1}.")
+            manufacturer.scraped_text_file_num_tokens = scraped_file.num_tokens
+            manufacturer.scraped_text_file_version_id = scraped_file.s3_version_id
+        else:
+            logger.info(f"Creating new manufacturer for mfg_etld:{mfg_etld}.")
+            manufacturer = Manufacturer(
+                created_at=polled_at,
+                etld1=mfg_etld,
+                url_accessible_at=item.accessible_normalized_url,
+                scraped_text_file_num_tokens=scraped_file.num_tokens,
+                scraped_text_file_version_id=scraped_file.s3_version_id,
+                batches=[item.batch],
+                # Following fields will be set later during extraction
+                name=None,
+                is_manufacturer=None,
+                is_contract_manufacturer=None,
+                is_product_manufacturer=None,
+                founded_in=None,
+                email_addresses=None,
+                num_employees=None,
+                business_desc=None,
+                business_statuses=None,
+                primary_naics=None,
+                secondary_naics=None,
+                addresses=None,
+                products=None,
+                certificates=None,
+                industries=None,
+                process_caps=None,
+                material_caps=None,
+            )
+            logger.info(
+                f"Done creating new manufacturer for mfg_etld:{manufacturer.etld1}."
+            )
+
+        await update_manufacturer(polled_at, manufacturer)
+        await push_item_to_e_queue(
+            ToExtractItem.from_to_scrape_item(item),
+        )
+        logger.info(f"Saved manufacturer: {manufacturer.etld1}")
+        # Calculate and log timing
+        if scraped_file.last_modified_on > polled_at:
+            # Only calculate stats if the file was modified after polling
+            end_time = get_current_time()
+            duration = end_time - polled_at
+            scraping_stats.add_timing(duration.total_seconds())
+            logger.info(f"   ⏱️  Individual time: {duration.total_seconds():.2f}s")
+            scraping_stats.print_stats()
+        else:
+            logger.info(
+                f"Skipped stats calculation: scraped_file.last_modified_on ({scraped_file.last_modified_on}) "
+                f"is not newer than polled_at ({polled_at})"
+            )
+    except Exception as e:
+        logger.error(
+            f"Error processing manufacturer {item.accessible_normalized_url}: {e}"
+        )
+        await ScrapingError.insert_one(
+            ScrapingError(
+                created_at=polled_at,
+                error=str(e),
+                url=item.accessible_normalized_url,
+                batch=item.batch,
+            )
+        )
+
+
 async def get_valid_scraped_file(
     polled_at: datetime,
     item: ToScrapeItem,
@@ -358,7 +357,8 @@ async def get_valid_scraped_file(
     if not existing_scraped_file:
         logger.info(f"No valid scraped file found for {mfg_etld}. Starting new scrape.")
         # now we must scrape and upload a new file
-        scraping_result = scraper.scrape(item.accessible_normalized_url)
+        # runs on the scraper's site thread pool, keeping the event loop free
+        scraping_result = await scraper.scrape_async(item.accessible_normalized_url)
         # Save individual URL errors to database (using consistent timestamp)
         if scraping_result.has_errors:
             logger.warning(
@@ -405,7 +405,41 @@ def parse_args():
         "--max_concurrent_browsers",
         type=int,
         default=5,
-        help="Max concurrent browser tabs that can be active at once",
+        help="Max concurrent browser tabs that can be active at once (per site)",
+    )
+    parser.add_argument(
+        "--max_concurrent_sites",
+        type=int,
+        default=1,
+        help="Max number of sites scraped concurrently",
+    )
+    parser.add_argument(
+        "--visibility_timeout",
+        type=int,
+        default=DEFAULT_VISIBILITY_TIMEOUT,
+        help="Seconds a received message stays hidden from other consumers, extended by a heartbeat while it is scraped",
+    )
+    parser.add_argument(
+        "--max_total_browsers",
+        type=int,
+        default=None,
+        help="Max browsers open across all sites (default: max_concurrent_browsers * max_concurrent_sites)",
+    )
+    parser.add_argument(
+        "--max_pages_per_driver",
+        type=int,
+        default=200,
+        help="Recycle a pooled browser after it has loaded this many pages",
+    )
+    parser.add_argument(
+        "--no_driver_pool",
+        action="store_true",
+        help="Start a fresh browser per worker per site instead of reusing warm ones",
+    )
+    parser.add_argument(
+        "--no_http_tier",
+        action="store_true",
+        help="Load every page in a browser instead of trying plain HTTP first",
     )
     parser.add_argument(
         "--max_depth", type=int, default=5, help="Max depth for scraping"
@@ -424,13 +458,9 @@ async def async_main():
     from core.utils.aws.queue.priority_extract_queue_util import (
         push_item_to_priority_extract_queue,
     )
-    from core.utils.aws.queue.scrape_queue_util import (
-        poll_item_from_scrape_queue,
-        delete_item_from_scrape_queue,
-    )
+    from core.utils.aws.queue.scrape_queue_util import SCRAPE_QUEUE_URL
     from core.utils.aws.queue.priority_scrape_queue_util import (
-        poll_item_from_priority_scrape_queue,
-        delete_item_from_priority_scrape_queue,
+        PRIORITY_SCRAPE_QUEUE_URL,
     )
 
     await init_db()
@@ -457,28 +487,39 @@ async def async_main():
 
     if args.priority:
         logger.info("Running scraping in priority mode")
-        poll_item_from_s_queue = poll_item_from_priority_scrape_queue
-        delete_item_from_s_queue = delete_item_from_priority_scrape_queue
+        queue_name, queue_url = "Priority Scrape queue", PRIORITY_SCRAPE_QUEUE_URL
         push_item_to_e_queue = push_item_to_priority_extract_queue
     else:
         logger.info("Running scraping in normal mode")
-        poll_item_from_s_queue = poll_item_from_scrape_queue
-        delete_item_from_s_queue = delete_item_from_scrape_queue
+        queue_name, queue_url = "Scrape queue", SCRAPE_QUEUE_URL
         push_item_to_e_queue = push_item_to_extract_queue
+    assert queue_url, f"{queue_name} URL is not set"
+
+    consumer = SQSBatchConsumer(
+        get_scrape_queue_client(),
+        queue_url,
+        parse_body=ToScrapeItem.model_validate_json,
+        max_in_flight=args.max_concurrent_sites,
+        visibility_timeout=args.visibility_timeout,
+        name=queue_name,
+    )
 
+    scraper: ScraperService | None = None
     try:
         scraper = ScraperService(
             max_concurrent_browsers=args.max_concurrent_browsers,
             max_depth=args.max_depth,
             scrape_timeout=args.scrape_timeout,  # in minutes
+            max_concurrent_sites=args.max_concurrent_sites,
+            max_total_browsers=args.max_total_browsers,
+            use_driver_pool=not args.no_driver_pool,
+            max_pages_per_driver=args.max_pages_per_driver,
+            use_http_tier=not args.no_http_tier,
         )
-        await process_queue(
-            scraper,
-            push_item_to_e_queue,
-            poll_item_from_s_queue,
-            delete_item_from_s_queue,
-        )
+        await process_queue(scraper, push_item_to_e_queue, consumer)
     finally:
+        if scraper is not None:
+            scraper.shutdown(wait=False)
         # Clean up AWS clients
         await cleanup_data_etl_aws_clients()
         await cleanup_core_aws_clients()
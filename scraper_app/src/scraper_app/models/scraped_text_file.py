@@ -1,6 +1,7 @@
 from __future__ import (
     annotations,
 )  # This allows you to write self-referential types without quotes, because type annotations are no longer evaluated at function/class definition time
+import asyncio
 import logging
 from datetime import datetime
 from pydantic import BaseModel, ConfigDict, Field, computed_field
@@ -26,10 +27,52 @@ from core.utils.aws.s3.scraped_text_util import (
     download_scraped_text_from_s3_by_mfg_etld1,
     upload_scraped_text_to_s3,
 )
+from core.utils.aws.s3.scraped_text_cache_util import (
+    CachedScrapedText,
+    get_scraped_text_cache,
+)
 
 logger = logging.getLogger(__name__)
 
 
+async def _download_scraped_text_version(
+    mfg_etld1: str, s3_version_id: str
+) -> CachedScrapedText:
+    """Fetch a version's text, last modified date and tags from S3 concurrently."""
+    (scraped_text, _version_id), last_modified_on, tags = await asyncio.gather(
+        download_scraped_text_from_s3_by_mfg_etld1(mfg_etld1, s3_version_id),
+        get_scraped_text_file_exist_last_modified_on(
+            get_file_name_from_mfg_etld(mfg_etld1), s3_version_id
+        ),
+        get_scraped_text_object_tags_by_mfg_etld1(mfg_etld1, s3_version_id),
+    )
+    return CachedScrapedText(
+        etld1=mfg_etld1,
+        version_id=s3_version_id,
+        text=scraped_text,
+        tags=tags,
+        last_modified_on=last_modified_on,
+        num_tokens=num_tokens_from_string(scraped_text, memoize=True),
+    )
+
+
+async def get_scraped_text_version(
+    mfg_etld1: str, s3_version_id: str
+) -> CachedScrapedText:
+    """
+    Text, tags, last modified date and token count of a scraped text version.
+    Versions are immutable, so they come from the local cache when possible.
+    """
+    cache = get_scraped_text_cache()
+    if cache is None:
+        return await _download_scraped_text_version(mfg_etld1, s3_version_id)
+    return await cache.get_or_fetch(
+        mfg_etld1,
+        s3_version_id,
+        lambda: _download_scraped_text_version(mfg_etld1, s3_version_id),
+    )
+
+
 class ScrapedTextFile(BaseModel):
     # 1) Instances are immutable after creation
     model_config = ConfigDict(frozen=True, extra="forbid")
@@ -72,40 +115,30 @@ class ScrapedTextFile(BaseModel):
         cls, mfg_etld1: str, s3_version_id: str
     ) -> ScrapedTextFile:
         try:
-            scraped_text, _version_id = (
-                await download_scraped_text_from_s3_by_mfg_etld1(
-                    mfg_etld1, s3_version_id
-                )
-            )
-            last_modified_on = await get_scraped_text_file_exist_last_modified_on(
-                get_file_name_from_mfg_etld(mfg_etld1), s3_version_id
-            )
+            cached = await get_scraped_text_version(mfg_etld1, s3_version_id)
             assert (
-                last_modified_on is not None
+                cached.last_modified_on is not None
             ), "Last modified date should not be None if file exists."
-            num_tokens = num_tokens_from_string(scraped_text)
-            tags = await get_scraped_text_object_tags_by_mfg_etld1(
-                mfg_etld1, s3_version_id
-            )
 
+            tags = cached.tags
             urls_scraped = int(tags.get("urls_scraped", 0)) if tags else 0
             urls_failed = int(tags.get("urls_failed", 0)) if tags else 0
             success_rate = ScrapingResult.get_success_rate(urls_scraped, urls_failed)
 
             is_valid = ScrapingResult.is_scrape_valid(
-                scraped_text, urls_scraped, urls_failed
+                cached.text, urls_scraped, urls_failed, num_tokens=cached.num_tokens
             )
 
             return cls(
                 etld1=mfg_etld1,
                 s3_version_id=s3_version_id,
-                num_tokens=num_tokens,
-                text=scraped_text,
+                num_tokens=cached.num_tokens,
+                text=cached.text,
                 urls_scraped=urls_scraped,
                 urls_failed=urls_failed,
                 success_rate=success_rate,
                 is_valid=is_valid,
-                last_modified_on=last_modified_on,
+                last_modified_on=cached.last_modified_on,
             )
         except Exception as e:
             logger.error(
@@ -1,3 +1,4 @@
+import asyncio
 import threading
 import logging
 import time
@@ -27,8 +28,14 @@ from scraper_app.utils.selenium import (
     ChromeDriverFactory,
     LegacyDriverFactory,
 )
+from scraper_app.utils.selenium.driver_pool import (
+    DEFAULT_MAX_MEMORY_GROWTH_MB,
+    DEFAULT_MAX_PAGES_PER_DRIVER,
+    DriverPool,
+)
 from scraper_app.utils.social_media_blocker import social_media_blocker
-from scraper_app.utils.dedup_util import deduplicate_scraped_content
+from scraper_app.utils.http_fetch_util import DomainTierMemory, HttpFetcher
+from scraper_app.utils.dedup_util import DedupedContentBuffer, DedupReport
 from scraper_app.constants.scraping_constants import (
     SKIP_EXTENSIONS,
     COOKIE_ACCEPTANCE_PATTERNS,
@@ -71,7 +78,8 @@ class ScrapingResult:
 
     @property
     def num_tokens(self) -> int:
-        return num_tokens_from_string(self.content)
+        # memoized: evaluated for every log line and validity check on the same content
+        return num_tokens_from_string(self.content, memoize=True)
 
     def __str__(self) -> str:
         timeout_info = " (TIMED OUT)" if self.timed_out else ""
@@ -95,9 +103,15 @@ class ScrapingResult:
 
     @classmethod
     def is_scrape_valid(
-        cls, content: str, urls_scraped: int, urls_failed: int, timed_out: bool = False
+        cls,
+        content: str,
+        urls_scraped: int,
+        urls_failed: int,
+        timed_out: bool = False,
+        num_tokens: int | None = None,  # when already known, e.g. cached
     ) -> bool:
-        num_tokens = num_tokens_from_string(content)
+        if num_tokens is None:
+            num_tokens = num_tokens_from_string(content, memoize=True)
         success_rate = cls.get_success_rate(urls_scraped, urls_failed)
         return 30 < num_tokens and success_rate > 0.8 and not timed_out
 
@@ -119,8 +133,16 @@ class ScrapingResult:
 
 class ScraperService:
     """
-    Threaded Selenium scraper with per-page fresh drivers,
+    Threaded Selenium scraper with warm pooled drivers,
     single-pass link discovery per page, BFS up to max_depth.
+
+    Several sites can be scraped at once (scrape_async runs each scrape() on its own
+    thread); max_total_browsers caps the browsers open across all of them. Drivers
+    are reset and kept warm between sites unless use_driver_pool is False.
+
+    With use_http_tier, pages are first fetched over plain HTTP; only pages that
+    look JS-rendered or return a bot challenge are loaded in a browser, and domains
+    whose landing page needs a browser skip the HTTP tier on later scrapes.
     """
 
     def __init__(
@@ -130,10 +152,15 @@ class ScraperService:
         scrape_timeout: int = 60,  # in minutes
         headless: bool = True,
         driver_module: Optional[str] = None,  # For backward compatibility
+        max_concurrent_sites: int = 1,
+        max_total_browsers: Optional[int] = None,
+        use_driver_pool: bool = True,
+        max_pages_per_driver: int = DEFAULT_MAX_PAGES_PER_DRIVER,
+        max_driver_memory_growth_mb: Optional[int] = DEFAULT_MAX_MEMORY_GROWTH_MB,
+        use_http_tier: bool = True,
     ):
         # Locks & core state to avoid corrupt read/write to python non-thread-safe structures
         self.discovered_lock = threading.Lock()
-        self.results_lock = threading.Lock()
         self.errors_lock = threading.Lock()
         self.stats_lock = threading.Lock()
 
@@ -141,6 +168,16 @@ class ScraperService:
         self.max_depth = max_depth
         self.scrape_timeout = scrape_timeout  # in minutes
 
+        # Sites scraped concurrently by scrape_async, each on its own thread
+        self.max_concurrent_sites = max_concurrent_sites
+        self._site_executor: Optional[ThreadPoolExecutor] = None
+
+        # Browser slots shared by every site being scraped
+        self.max_total_browsers = (
+            max_total_browsers or max_concurrent_browsers * max_concurrent_sites
+        )
+        self.browser_slots = threading.BoundedSemaphore(self.max_total_browsers)
+
         # Track active drivers for cleanup
         self.active_drivers = []
         self.active_drivers_lock = threading.Lock()
@@ -149,6 +186,22 @@ class ScraperService:
         if driver_module:
             self.driver_factory = LegacyDriverFactory(driver_module, headless)
 
+        # Warm drivers kept between sites; with max_idle=0 every driver is torn down
+        # once its worker finishes, like a fresh driver per worker per scrape
+        self.driver_pool = DriverPool(
+            create_driver=self._new_driver,
+            cleanup_driver=self._cleanup_driver,
+            max_idle=self.max_total_browsers if use_driver_pool else 0,
+            max_pages_per_driver=max_pages_per_driver,
+            max_memory_growth_mb=max_driver_memory_growth_mb,
+        )
+
+        # HTTP tier, created on first use; shared by all sites
+        self.use_http_tier = use_http_tier
+        self._http_fetcher: Optional[HttpFetcher] = None
+        self._http_fetcher_lock = threading.Lock()
+        self.domain_tiers = DomainTierMemory()
+
         # Register cleanup handlers
         signal.signal(signal.SIGTERM, self._signal_handler)
         signal.signal(signal.SIGINT, self._signal_handler)
@@ -160,6 +213,16 @@ class ScraperService:
         self._cleanup_all_drivers()
         sys.exit(0)
 
+    def shutdown(self, wait: bool = True):
+        """Stop accepting scrape_async calls, release the site thread pool and warm drivers."""
+        if self._site_executor is not None:
+            self._site_executor.shutdown(wait=wait, cancel_futures=True)
+            self._site_executor = None
+        self.driver_pool.close()
+        if self._http_fetcher is not None:
+            self._http_fetcher.close()
+            self._http_fetcher = None
+
     def _cleanup_all_drivers(self):
         """Emergency cleanup of all tracked drivers."""
         with self.active_drivers_lock:
@@ -173,6 +236,8 @@ class ScraperService:
                     logger.warning(f"Error cleaning up driver: {e}")
             self.active_drivers.clear()
             logger.info("All drivers cleaned up")
+        # idle pooled drivers were in active_drivers and have just been quit
+        self.driver_pool.forget_all()
 
     # ------------------------- Page helpers ---------------------------
     def _accept_cookies(self, driver):
@@ -325,6 +390,13 @@ class ScraperService:
             return set()
 
     # ------------------------ Driver lifecycle ------------------------
+    def _acquire_browser_slot(self, cancel_event: threading.Event) -> bool:
+        """Wait for a free browser slot; False if the scrape was cancelled meanwhile."""
+        while not cancel_event.is_set():
+            if self.browser_slots.acquire(timeout=1.0):
+                return True
+        return False
+
     def _new_driver(self) -> webdriver.Chrome:
         """Create a new driver using the configured factory."""
         driver = self.driver_factory.create_driver()
@@ -339,22 +411,125 @@ class ScraperService:
             if driver in self.active_drivers:
                 self.active_drivers.remove(driver)
 
+    @staticmethod
+    def _is_followable_link(href: str, start_netloc: str) -> bool:
+        parsed_href = urlparse(href)
+
+        # Skip if different domain (stay within same site)
+        if parsed_href.netloc != start_netloc:
+            return False
+
+        # Skip unwanted file extensions
+        path_lower = parsed_href.path.lower()
+        return not any(path_lower.endswith(ext) for ext in SKIP_EXTENSIONS)
+
+    # ---------------------------- HTTP tier ----------------------------
+    def _get_http_fetcher(self) -> HttpFetcher:
+        with self._http_fetcher_lock:
+            if self._http_fetcher is None:
+                self._http_fetcher = HttpFetcher()
+            return self._http_fetcher
+
+    @staticmethod
+    def _check_not_redirected_to_social_media(final_url: str) -> None:
+        if social_media_blocker.is_social_media_url(final_url):
+            raise ValueError(
+                f"URL redirected to blocked social media site: {final_url}"
+            )
+
+    def _scrape_static_pages(
+        self,
+        resolved_start_url: str,
+        deadline: float,
+        discovered: set[str],
+        results: DedupedContentBuffer,
+        errors: list[dict],
+        stats: dict,
+    ) -> list[tuple[str, int]]:
+        """
+        Scrape every page of the site that doesn't need a browser over plain HTTP.
+
+        Returns the (url, depth) pages that must be loaded in Selenium instead: the
+        landing page alone if the site needs a browser, otherwise the individual pages
+        that looked JS-rendered or returned a challenge.
+        """
+        browser_start = [(resolved_start_url, 0)]
+        if not self.use_http_tier:
+            return browser_start
+
+        domain = urlparse(resolved_start_url).netloc
+        if self.domain_tiers.get(domain) == "browser":
+            logger.info(f"{domain} is known to need a browser, skipping HTTP tier")
+            return browser_start
+
+        start_netloc = urlparse(resolved_start_url).netloc
+        crawl = self._get_http_fetcher().crawl_site(
+            resolved_start_url,
+            max_depth=self.max_depth,
+            deadline=deadline,
+            discovered=discovered,
+            discovered_lock=self.discovered_lock,
+            should_follow=lambda href: self._is_followable_link(href, start_netloc),
+            check_final_url=self._check_not_redirected_to_social_media,
+            max_concurrency=self.max_concurrent_browsers,
+        )
+
+        landing_fallback = next(
+            (page for page in crawl.browser_pages if page.depth == 0), None
+        )
+        if landing_fallback is not None:
+            logger.info(
+                f"{domain} needs a browser ({landing_fallback.needs_browser}), "
+                f"remembering it"
+            )
+            self.domain_tiers.remember(domain, "browser")
+            return browser_start
+        if not crawl.pages:
+            # landing page failed or was skipped over HTTP (network error, non-HTML,
+            # redirect); let the browser try without deciding anything about the domain
+            return browser_start
+
+        self.domain_tiers.remember(domain, "http")
+        for page in crawl.pages:
+            results.append(
+                "##################################################\n"
+                f"{page.url}\n\n"
+                f"{page.text}\n"
+            )
+        with self.errors_lock:
+            errors.extend(crawl.errors)
+        with self.stats_lock:
+            stats["scraped"] += len(crawl.pages)
+            stats["failed"] += len(crawl.errors)
+
+        browser_pages = [(page.url, page.depth) for page in crawl.browser_pages]
+        logger.info(
+            f"HTTP tier scraped {len(crawl.pages)} pages of {domain} "
+            f"({len(crawl.errors)} failed, {len(crawl.skipped_pages)} not HTML, "
+            f"{len(browser_pages)} need a browser)"
+        )
+        if crawl.timed_out:
+            raise TimeoutError(
+                f"Scrape exceeded max duration: {self.scrape_timeout} minutes"
+            )
+        return browser_pages
+
     # --------------------------- Worker -------------------------------
     def _worker(
         self,
         queue: Queue,
         discovered: set[str],
-        results: list[str],
+        results: DedupedContentBuffer,
         errors: list[dict],
         resolved_start_url: str,
         stats: dict,
         cancel_event: threading.Event,
     ):
-        logger.info("Creating new driver for worker")
-        driver = self._new_driver()
-        logger.info(
-            f"Worker started with driver {driver.session_id} for resolved_start_url:{resolved_start_url}"
-        )
+        # A worker only takes URLs while holding a browser slot (so a URL never waits
+        # on another site's browsers), and only creates its driver on the first URL it
+        # gets, so small sites don't open browsers for workers that never get work
+        driver = None
+        holding_slot = False
         parsed_start = urlparse(resolved_start_url)
 
         while True:
@@ -362,12 +537,21 @@ class ScraperService:
             if cancel_event.is_set():
                 break
 
+            if not holding_slot:
+                if not self._acquire_browser_slot(cancel_event):
+                    break
+                holding_slot = True
+
             try:
                 # Use a short timeout so we can react quickly to cancellation
                 url, depth = queue.get(timeout=1.0)
             except Empty:
                 if cancel_event.is_set():
                     break
+                if driver is None:
+                    # no work yet, let other sites use the slot meanwhile
+                    self.browser_slots.release()
+                    holding_slot = False
                 continue
 
             if not url or not isinstance(url, str):
@@ -380,8 +564,20 @@ class ScraperService:
                 queue.task_done()
                 break
 
+            if driver is None:
+                try:
+                    driver = self.driver_pool.acquire()
+                except Exception:
+                    self.browser_slots.release()
+                    queue.task_done()
+                    raise
+                logger.info(
+                    f"Worker started with driver {driver.session_id} for resolved_start_url:{resolved_start_url}"
+                )
+
             try:
                 # Page readiness & content extraction -----
+                self.driver_pool.mark_page(driver, url)
                 content = self._extract_text_with_fallback(driver, url)
                 if not content or not content.strip():
                     raise ValueError("Empty content after extraction")
@@ -391,8 +587,7 @@ class ScraperService:
                     f"{url}\n\n"
                     f"{content}\n"
                 )
-                with self.results_lock:
-                    results.append(block)
+                results.append(block)  # deduplicated on arrival
 
                 with self.stats_lock:
                     stats["scraped"] += 1
@@ -407,15 +602,7 @@ class ScraperService:
                     )
 
                     for href in new_hrefs:
-                        parsed_href = urlparse(href)
-
-                        # Skip if different domain (stay within same site)
-                        if parsed_href.netloc != parsed_start.netloc:
-                            continue
-
-                        # Skip unwanted file extensions
-                        path_lower = parsed_href.path.lower()
-                        if any(path_lower.endswith(ext) for ext in SKIP_EXTENSIONS):
+                        if not self._is_followable_link(href, parsed_start.netloc):
                             continue
 
                         # Check if already discovered/visited
@@ -425,9 +612,12 @@ class ScraperService:
                                 queue.put((href, depth + 1))
 
             except Exception as e:
-                if isinstance(e, (TimeoutException, WebDriverException)):
-                    # fresh driver per op means just ensure cleanup below
-                    pass
+                if isinstance(
+                    e, (TimeoutException, WebDriverException)
+                ) and not DriverPool.is_healthy(driver):
+                    # browser crashed, the next URL gets a fresh driver
+                    self.driver_pool.discard(driver)
+                    driver = None
                 error_info = {
                     "url": url,
                     "error": str(e),
@@ -443,13 +633,30 @@ class ScraperService:
             finally:
                 queue.task_done()
 
-        if driver:
-            logger.info(
-                f"Worker {driver.session_id} finished processing. Closing driver."
-            )
-            self._cleanup_driver(driver)
+        try:
+            if driver:
+                logger.info(
+                    f"Worker {driver.session_id} finished processing. Returning driver to pool."
+                )
+                self.driver_pool.release(driver)
+        finally:
+            if holding_slot:
+                self.browser_slots.release()
 
     # --------------------------- Orchestrator --------------------------
+    async def scrape_async(self, start_url: str) -> ScrapingResult:
+        """
+        Run scrape() on the site thread pool so the event loop keeps serving queue
+        polls, DB writes and other sites while Selenium works.
+        """
+        if self._site_executor is None:
+            self._site_executor = ThreadPoolExecutor(
+                max_workers=self.max_concurrent_sites,
+                thread_name_prefix="site-scraper",
+            )
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._site_executor, self.scrape, start_url)
+
     def scrape(self, start_url: str) -> ScrapingResult:
         try:
             # Hard check: Block social media sites from being scraped
@@ -472,17 +679,22 @@ class ScraperService:
             logger.info("Final landing URL: %s", final_landing_url)
 
             discovered: set[str] = {final_landing_url}
-            results: list[str] = []
+            # logs the tokens each dedup rule removed once the scrape is done
+            results = DedupedContentBuffer(report=DedupReport())
             errors: list[dict] = []
             stats = {"scraped": 0, "failed": 0}
 
-            work_q = Queue()
-            work_q.put((final_landing_url, 0))
-
             cancel_event = threading.Event()
             start_time = time.monotonic()
             deadline = start_time + self.scrape_timeout * 60
 
+            work_q = Queue()
+            for url, depth in self._scrape_static_pages(
+                final_landing_url, deadline, discovered, results, errors, stats
+            ):
+                work_q.put((url, depth))
+
+            # Browser tier, only for pages the HTTP tier could not handle
             with ThreadPoolExecutor(
                 max_workers=self.max_concurrent_browsers
             ) as executor:
@@ -538,19 +750,17 @@ class ScraperService:
                         f"Scrape exceeded max duration: {self.scrape_timeout} minutes"
                     )
 
-                # Normal completion: ask workers to exit
+                # Normal completion: ask workers to exit. The event also stops workers
+                # still waiting for a browser slot, which never read a sentinel.
                 logger.info("All work finished, sending sentinels to stop workers.")
+                cancel_event.set()
                 for _ in range(self.max_concurrent_browsers):
                     work_q.put((None, 0))
 
             total_time_taken = time.monotonic() - start_time
 
-            combined = "".join(results)
-            results.clear()  # free the list before dedup allocates its own structures
-            deduped_content = deduplicate_scraped_content(combined)
-            del combined  # free the raw joined string once dedup is done
             return ScrapingResult(
-                content=deduped_content,
+                content=results.getvalue(),
                 errors=errors,
                 urls_scraped=stats["scraped"],
                 urls_failed=stats["failed"],
@@ -566,11 +776,8 @@ class ScraperService:
                 if "start_time" in locals()
                 else self.scrape_timeout * 60
             )
-            raw_content = "".join(results) if "results" in locals() else ""
-            if "results" in locals():
-                results.clear()  # free the list before dedup runs
             return ScrapingResult(
-                content=deduplicate_scraped_content(raw_content),
+                content=results.getvalue() if "results" in locals() else "",
                 errors=errors if "errors" in locals() else [],
                 urls_scraped=stats["scraped"] if "stats" in locals() else 0,
                 urls_failed=stats["failed"] if "stats" in locals() else 0,
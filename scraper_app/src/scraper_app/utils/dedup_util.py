@@ -1,19 +1,24 @@
 """
 Utility for detecting and removing duplicate content across scraped page blocks.
 
-Duplicate detection is exact-match only. It handles:
+It handles:
 - Full duplicate pages (identical blocks)
-- Repeated headers (identical leading lines shared across pages)
-- Repeated footers (identical trailing lines shared across pages)
+- Near-duplicate pages (MinHash of the body, after header/footer stripping)
+- Near-duplicate paragraphs repeated from earlier pages (MinHash per paragraph)
+- Repeated headers (leading lines shared across pages)
+- Repeated footers (trailing lines shared across pages)
 
 Memory-safety notes (designed for inputs up to ~1 GB+):
-- Full-page identity uses SHA-256 hashes, NOT the raw block text as the set key.
-- Body lines for header/footer detection are extracted one block at a time and
-  only the *reference* set (first block's lines) is kept in memory alongside
-  O(1) counters — every subsequent block is streamed and immediately discarded.
+- Pages are deduplicated incrementally (:class:`ScrapedContentDeduplicator`):
+  only the first ``_HEADER_FOOTER_SAMPLE_SIZE`` unique pages are held back, to
+  learn the common header/footer from; every later page is emitted as it
+  arrives. Scrape workers feed pages straight into a
+  :class:`DedupedContentBuffer`, so the raw site text is never joined.
+- Full-page identity uses SHA-256 digests, NOT the raw block text as the set key.
+- Near-duplicate detection keeps one 512-byte MinHash signature per kept
+  page/paragraph, indexed by bands so a lookup does not compare against all,
+  and at most ``_MAX_NEAR_DUPLICATE_SIGNATURES`` of them per index.
 - Suffix detection walks indices instead of reversing the lists (avoids a copy).
-- Output is assembled into a single ``io.StringIO`` buffer so Python never needs
-  to hold more than one rebuilt block + the output buffer in memory at once.
 - A ``deduplicate_scraped_content_stream`` generator is also provided for
   callers that want to process/write output incrementally without building one
   giant return string.
@@ -21,13 +26,24 @@ Memory-safety notes (designed for inputs up to ~1 GB+):
 Header/footer detection uses a majority-vote threshold rather than requiring
 100% agreement across all blocks. This handles real-world files where a minority
 of blocks are error pages (e.g. Cloudflare challenges) that lack the site's
-normal navigation/footer boilerplate.
+normal navigation/footer boilerplate. Lines that only differ in numbers, case or
+spacing (``Cart (0)`` / ``Cart (3)``, ``© 2024`` / ``© 2025``) still count as
+shared when an exactly shared line follows them towards the page content.
+
+Pass a :class:`DedupReport` to see how many tokens each rule removed.
 """
 
 import hashlib
 import io
 import logging
-from typing import Generator, Iterator, List, Tuple
+import re
+import threading
+from array import array
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, Generator, Iterator, List, Optional, Tuple
+
+from open_ai_key_app.utils.token_util import num_tokens_from_string
 
 logger = logging.getLogger(__name__)
 
@@ -41,8 +57,93 @@ _MIN_REPEATED_LINES = 3
 # the site's normal boilerplate without preventing detection.
 _HEADER_FOOTER_THRESHOLD = 0.95
 
+# At most this many consecutive header/footer lines may differ across blocks in
+# numbers, case or spacing only; an exact line must follow towards the content.
+_MAX_VARIANT_LINES = 1
+
+# Estimated Jaccard similarity of their word-shingle sets from which two pages
+# (or paragraphs) are near-duplicates.
+_NEAR_DUPLICATE_PAGE_SIMILARITY = 0.85
+_NEAR_DUPLICATE_PARAGRAPH_SIMILARITY = 0.85
+
+# Pages and paragraphs with fewer words are never near-duplicates: their
+# similarity estimates are noisy and dropping them saves little.
+_NEAR_DUPLICATE_MIN_WORDS = 30
+
+# Words per shingle hashed into a MinHash signature.
+_SHINGLE_SIZE = 3
+
+# Signature slots, looked up by bands of 4 slots: pairs at the similarity
+# threshold share a band with near certainty, unrelated pages rarely do.
+_MINHASH_PERMUTATIONS = 128
+_MINHASH_BANDS = 32
+_MINHASH_BYTES = _MINHASH_PERMUTATIONS * array("I").itemsize
+
+# Signatures kept per near-duplicate index (~6 KB each with their band
+# entries); the oldest are forgotten past this.
+_MAX_NEAR_DUPLICATE_SIGNATURES = 5_000
+
+# Unique pages buffered to learn the common header/footer from; pages after
+# them are deduplicated and emitted as they arrive.
+_HEADER_FOOTER_SAMPLE_SIZE = 256
+
 _SEPARATOR = "##################################################"
 
+_DUPLICATE_NOTE = "[duplicate — content identical to a previously scraped page]"
+_NEAR_DUPLICATE_NOTE = "[near-duplicate — content nearly identical to a previously scraped page]"
+
+_WORD_RE = re.compile(r"\w+")
+_DIGITS_RE = re.compile(r"\d+")
+
+# DedupReport rule names
+RULE_DUPLICATE_PAGE = "duplicate_page"
+RULE_NEAR_DUPLICATE_PAGE = "near_duplicate_page"
+RULE_HEADER = "header"
+RULE_FOOTER = "footer"
+RULE_NEAR_DUPLICATE_PARAGRAPH = "near_duplicate_paragraph"
+
+
+def _count_tokens(text: str) -> int:
+    return num_tokens_from_string(text, memoize=True)
+
+
+@dataclass
+class DedupRuleStats:
+    removed: int = 0  # pages for the page rules, lines or paragraphs otherwise
+    tokens: int = 0
+
+
+@dataclass
+class DedupReport:
+    """
+    What each dedup rule removed. Filled in by
+    :func:`deduplicate_scraped_content_stream` when passed as ``report``.
+    """
+
+    count_tokens: Callable[[str], int] = field(default=_count_tokens, repr=False)
+    rules: Dict[str, DedupRuleStats] = field(default_factory=dict)
+
+    def record(self, rule: str, removed_text: str, removed: int = 1) -> None:
+        self.record_tokens(rule, self.count_tokens(removed_text) if removed_text else 0, removed)
+
+    def record_tokens(self, rule: str, tokens: int, removed: int = 1) -> None:
+        stats = self.rules.setdefault(rule, DedupRuleStats())
+        stats.removed += removed
+        stats.tokens += tokens
+
+    @property
+    def total_tokens(self) -> int:
+        return sum(stats.tokens for stats in self.rules.values())
+
+    def summary(self) -> str:
+        if not self.rules:
+            return "nothing removed"
+        per_rule = ", ".join(
+            f"{rule}: {stats.tokens} tokens ({stats.removed} removed)"
+            for rule, stats in self.rules.items()
+        )
+        return f"removed {self.total_tokens} tokens — {per_rule}"
+
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Low-level helpers
@@ -150,6 +251,57 @@ def _prefix_lines(block: str) -> str:
 # Header / footer detection — majority-vote
 # ─────────────────────────────────────────────────────────────────────────────
 
+def _normalize_line(line: str) -> str:
+    """Line with digit runs, case and whitespace folded, for tolerant matching."""
+    return " ".join(_DIGITS_RE.sub("0", line).split()).casefold()
+
+
+def _lines_match(lines: List[str], pattern: List[str]) -> bool:
+    """True when *lines* equal *pattern* line by line, up to :func:`_normalize_line`."""
+    if lines == pattern:
+        return True
+    return len(lines) == len(pattern) and all(
+        line == ref or _normalize_line(line) == _normalize_line(ref)
+        for line, ref in zip(lines, pattern)
+    )
+
+
+def _common_run_length(
+    all_lines: List[List[str]],
+    ref_lines: List[str],
+    required: float,
+    from_end: bool,
+    max_variant_lines: int = _MAX_VARIANT_LINES,
+) -> int:
+    """
+    Number of leading (or trailing, *from_end*) reference lines that at least
+    *required* blocks share.
+
+    A position where too few blocks have the exact line may still be bridged
+    when enough of them match it after :func:`_normalize_line` — at most
+    *max_variant_lines* such positions in a row, and only if an exactly shared
+    line follows further in, so the run never ends next to the page content
+    on a line that varies.
+    """
+    run_len = 0
+    variant_lines = 0
+    for i in range(len(ref_lines)):
+        pos = -(i + 1) if from_end else i
+        candidate = ref_lines[pos]
+        present = [lines[pos] for lines in all_lines if len(lines) > i]
+        if sum(1 for line in present if line == candidate) >= required:
+            run_len = i + 1
+            variant_lines = 0
+            continue
+        variant_lines += 1
+        if variant_lines > max_variant_lines:
+            break
+        normalized = _normalize_line(candidate)
+        if sum(1 for line in present if _normalize_line(line) == normalized) < required:
+            break
+    return run_len
+
+
 def _detect_common_header_footer(
     blocks: List[str],
     min_lines: int,
@@ -164,8 +316,9 @@ def _detect_common_header_footer(
     - Pick the longest extracted lines list as the reference so short/empty
       outlier blocks don't cap the candidate length.
     - For each candidate line position scan forward (header) and backward
-      (footer), counting exact matches against the reference line. Stop
-      extending as soon as the match rate falls below *threshold*.
+      (footer), counting matches against the reference line. Stop extending
+      as soon as the match rate falls below *threshold*, see
+      :func:`_common_run_length` for lines that vary slightly.
 
     Returns ``(common_header_lines, common_footer_lines)``.
     """
@@ -183,32 +336,17 @@ def _detect_common_header_footer(
     total = len(all_lines)
     required = threshold * total  # minimum hit count
 
-    # ── header: scan forward ────────────────────────────────────────────────
-    header_len = 0
-    for pos in range(len(ref_lines)):
-        candidate = ref_lines[pos]
-        matches = sum(
-            1 for lines in all_lines
-            if len(lines) > pos and lines[pos] == candidate
-        )
-        if matches >= required:
-            header_len += 1
-        else:
-            break
-
-    # ── footer: scan backward ───────────────────────────────────────────────
-    footer_len = 0
+    header_len = _common_run_length(all_lines, ref_lines, required, from_end=False)
+    footer_len = _common_run_length(all_lines, ref_lines, required, from_end=True)
     ref_tail = len(ref_lines)
-    for i in range(1, ref_tail + 1):
-        candidate = ref_lines[ref_tail - i]
-        matches = sum(
-            1 for lines in all_lines
-            if len(lines) >= i and lines[-i] == candidate
+    if header_len + footer_len >= ref_tail:
+        # a line varying only in numbers bridged into the page content itself
+        header_len = _common_run_length(
+            all_lines, ref_lines, required, from_end=False, max_variant_lines=0
+        )
+        footer_len = _common_run_length(
+            all_lines, ref_lines, required, from_end=True, max_variant_lines=0
         )
-        if matches >= required:
-            footer_len += 1
-        else:
-            break
 
     common_header = ref_lines[:header_len] if header_len >= min_lines else []
     common_footer = ref_lines[ref_tail - footer_len:] if footer_len >= min_lines else []
@@ -225,6 +363,25 @@ def _detect_common_header_footer(
 # Block rebuilder
 # ─────────────────────────────────────────────────────────────────────────────
 
+def _strip_header_footer(
+    body: List[str],
+    common_header: List[str],
+    common_footer: List[str],
+) -> Tuple[List[str], List[str], List[str]]:
+    """Return ``(body, stripped_header, stripped_footer)`` for one block's body lines."""
+    h = len(common_header)
+    f = len(common_footer)
+    header: List[str] = []
+    footer: List[str] = []
+
+    if h and _lines_match(body[:h], common_header):
+        header, body = body[:h], body[h:]
+    if f and _lines_match(body[-f:], common_footer):
+        body, footer = body[:-f], body[-f:]
+
+    return body, header, footer
+
+
 def _rebuild_block(
     block: str,
     common_header: List[str],
@@ -235,31 +392,368 @@ def _rebuild_block(
     The prefix (separator + URL + blank line) is preserved exactly as-is.
     """
     prefix = _prefix_lines(block)   # ends with the blank line \n
-    body   = _body_lines_of_block(block)
+    body, _, _ = _strip_header_footer(
+        _body_lines_of_block(block), common_header, common_footer
+    )
+    return prefix + "".join(body)
 
-    h = len(common_header)
-    f = len(common_footer)
 
-    if h and body[:h] == common_header:
-        body = body[h:]
-    if f and body[-f:] == common_footer:
-        body = body[:-f]
+# ─────────────────────────────────────────────────────────────────────────────
+# Near-duplicate detection — MinHash
+# ─────────────────────────────────────────────────────────────────────────────
 
-    return prefix + "".join(body)
+def _words(text: str) -> List[str]:
+    return _WORD_RE.findall(text.casefold())
+
+
+def _minhash(words: List[str]) -> array:
+    """
+    MinHash signature of the set of word shingles of *words*.
+
+    Slot i holds the minimum of the i-th hash function over the shingles, so
+    the fraction of equal slots of two signatures estimates the Jaccard
+    similarity of their shingle sets.
+    """
+    if len(words) <= _SHINGLE_SIZE:
+        shingles = {" ".join(words)}
+    else:
+        shingles = {
+            " ".join(words[i:i + _SHINGLE_SIZE])
+            for i in range(len(words) - _SHINGLE_SIZE + 1)
+        }
+    # one SHAKE-128 digest per shingle gives all its 32-bit hash values at once;
+    # the signature is their slot-wise minimum over the shingles
+    rows = [
+        array("I", hashlib.shake_128(s.encode("utf-8", errors="replace")).digest(_MINHASH_BYTES))
+        for s in shingles
+    ]
+    return array("I", map(min, zip(*rows)))
+
+
+class _MinHashIndex:
+    """
+    MinHash signatures seen so far, answering "is there one at least
+    *similarity* similar?" without comparing against all of them.
+
+    Signatures are cut into bands (locality-sensitive hashing); only those
+    sharing a whole band with the query are compared slot by slot. Past
+    *max_signatures* the oldest signature is forgotten, so memory stays bounded
+    on any site size.
+    """
+
+    def __init__(
+        self,
+        similarity: float,
+        max_signatures: int = _MAX_NEAR_DUPLICATE_SIGNATURES,
+    ):
+        if not 0 < similarity <= 1:
+            raise ValueError(f"similarity must be in (0, 1], got {similarity}")
+        self.similarity = similarity
+        self.max_signatures = max_signatures
+        self._required = similarity * _MINHASH_PERMUTATIONS
+        self._buckets: List[Dict[bytes, List[array]]] = [
+            {} for _ in range(_MINHASH_BANDS)
+        ]
+        self._signatures: Deque[array] = deque()  # oldest first
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    @staticmethod
+    def _band_keys(signature: array) -> Iterator[bytes]:
+        rows = _MINHASH_PERMUTATIONS // _MINHASH_BANDS
+        for band in range(_MINHASH_BANDS):
+            yield signature[band * rows:(band + 1) * rows].tobytes()
+
+    def find_near(self, signature: array) -> bool:
+        for buckets, key in zip(self._buckets, self._band_keys(signature)):
+            for other in buckets.get(key, ()):
+                if sum(1 for x, y in zip(signature, other) if x == y) >= self._required:
+                    return True
+        return False
+
+    def add(self, signature: array) -> None:
+        for buckets, key in zip(self._buckets, self._band_keys(signature)):
+            buckets.setdefault(key, []).append(signature)
+        self._signatures.append(signature)
+        if len(self._signatures) > self.max_signatures:
+            self._forget(self._signatures.popleft())
+
+    def _forget(self, signature: array) -> None:
+        for buckets, key in zip(self._buckets, self._band_keys(signature)):
+            bucket = buckets[key]
+            # by identity: an equal signature added later must stay
+            del bucket[next(i for i, other in enumerate(bucket) if other is signature)]
+            if not bucket:
+                del buckets[key]
+
+
+def _drop_near_duplicate_paragraphs(
+    body: List[str],
+    index: _MinHashIndex,
+) -> Tuple[List[str], List[str], int]:
+    """
+    Remove paragraphs (runs of non-blank lines) near-duplicating one already in
+    *index*, together with the blank lines following them; index the others.
+
+    Returns ``(kept_lines, removed_lines, removed_paragraph_count)``.
+    """
+    kept: List[str] = []
+    removed: List[str] = []
+    removed_paragraphs = 0
+    i = 0
+    while i < len(body):
+        if not body[i].strip():
+            kept.append(body[i])
+            i += 1
+            continue
+        end = i
+        while end < len(body) and body[end].strip():
+            end += 1
+        words = _words("".join(body[i:end]))
+        if len(words) >= _NEAR_DUPLICATE_MIN_WORDS:
+            signature = _minhash(words)
+            if index.find_near(signature):
+                while end < len(body) and not body[end].strip():
+                    end += 1
+                removed.extend(body[i:end])
+                removed_paragraphs += 1
+                i = end
+                continue
+            index.add(signature)
+        kept.extend(body[i:end])
+        i = end
+    return kept, removed, removed_paragraphs
 
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Public API
 # ─────────────────────────────────────────────────────────────────────────────
 
+class ScrapedContentDeduplicator:
+    """
+    Incremental deduplication: feed page blocks with :meth:`add` as they are
+    scraped, get back the output chunks that are ready, in input order, and
+    call :meth:`finish` once at the end for the rest.
+
+    Exact duplicates are stubbed on arrival. The common header/footer is
+    learned from the first *sample_size* unique pages, which (with the stubs
+    between them) are held back until then; every later page is stripped,
+    near-duplicate filtered and returned straight away. So peak memory is the
+    sample window plus fixed-size fingerprints, whatever the site size, and
+    sites with at most *sample_size* unique pages come out exactly as if the
+    whole site had been looked at.
+
+    Not thread-safe, see :class:`DedupedContentBuffer`.
+    """
+
+    def __init__(
+        self,
+        report: Optional[DedupReport] = None,
+        page_similarity: Optional[float] = _NEAR_DUPLICATE_PAGE_SIMILARITY,
+        paragraph_similarity: Optional[float] = _NEAR_DUPLICATE_PARAGRAPH_SIMILARITY,
+        sample_size: int = _HEADER_FOOTER_SAMPLE_SIZE,
+    ):
+        if sample_size < 2:
+            raise ValueError(f"sample_size must be at least 2, got {sample_size}")
+        self.report = report
+        self.sample_size = sample_size
+
+        # digest -> body tokens of duplicates, once counted for the report
+        self._seen_hashes: Dict[bytes, Optional[int]] = {}
+        self._sample: List[Tuple[str, str]] = []   # (kind, block) in input order
+        self._unique_in_sample = 0
+        self._learning = True
+        self._finished = False
+        self._common_header: List[str] = []
+        self._common_footer: List[str] = []
+
+        self._page_index = (
+            _MinHashIndex(page_similarity) if page_similarity is not None else None
+        )
+        self._paragraph_index = (
+            _MinHashIndex(paragraph_similarity) if paragraph_similarity is not None else None
+        )
+        self.duplicates = 0
+        self.near_duplicates = 0
+
+    @property
+    def buffered(self) -> int:
+        """Blocks held back while the header/footer sample window fills."""
+        return len(self._sample)
+
+    def add(self, block: str) -> List[str]:
+        """Take one page block, return the output chunks now ready."""
+        if self._finished:
+            raise RuntimeError("add() called after finish()")
+
+        digest = bytes.fromhex(_hash_block(block))
+        if digest in self._seen_hashes:
+            stub = self._stub_duplicate(block, digest)
+            if self._learning:
+                self._sample.append(("stub", stub))
+                return []
+            return [stub]
+        self._seen_hashes[digest] = None
+
+        if not self._learning:
+            return [self._clean(block)]
+
+        self._sample.append(("full", block))
+        self._unique_in_sample += 1
+        if self._unique_in_sample < self.sample_size:
+            return []
+        return self._end_learning()
+
+    def finish(self) -> List[str]:
+        """Return the chunks still held back; no :meth:`add` afterwards."""
+        if self._finished:
+            return []
+        self._finished = True
+        chunks: List[str] = []
+        if self._learning:
+            if self._unique_in_sample < 2:
+                # Not enough unique blocks to compare — emit everything as-is
+                chunks = [block for _, block in self._sample]
+                self._sample = []
+                self._learning = False
+            else:
+                chunks = self._end_learning()
+
+        if self.duplicates:
+            logger.info(f"Stubbed {self.duplicates} fully-duplicate page block(s) (URL kept, body removed).")
+        if self.near_duplicates:
+            logger.info(f"Stubbed {self.near_duplicates} near-duplicate page block(s) (URL kept, body removed).")
+        if self.report is not None:
+            logger.info(f"Dedup report: {self.report.summary()}")
+        return chunks
+
+    def _stub_duplicate(self, block: str, digest: bytes) -> str:
+        # Subsequent duplicates are retained as URL-only stubs so the reader
+        # knows every URL that was scraped, without repeating the body content.
+        self.duplicates += 1
+        if self.report is not None:
+            # every copy has the same body, count its tokens once
+            if self._seen_hashes[digest] is None:
+                self._seen_hashes[digest] = self.report.count_tokens(
+                    "".join(_body_lines_of_block(block))
+                )
+            self.report.record_tokens(RULE_DUPLICATE_PAGE, self._seen_hashes[digest])
+        logger.debug("Duplicate block stubbed (same page content): %s",
+                     block.splitlines()[1].strip() if len(block.splitlines()) > 1 else "")
+        prefix = _prefix_lines(block)   # already ends with blank line \n
+        return f"{prefix}{_DUPLICATE_NOTE}\n"
+
+    def _end_learning(self) -> List[str]:
+        """Detect the header/footer on the sample, then release the sample."""
+        self._learning = False
+        self._common_header, self._common_footer = _detect_common_header_footer(
+            [block for kind, block in self._sample if kind == "full"],
+            _MIN_REPEATED_LINES,
+        )
+        if self._common_header:
+            logger.info(
+                f"Stripping {len(self._common_header)}-line repeated header "
+                f"(learned from {self._unique_in_sample} blocks)."
+            )
+        if self._common_footer:
+            logger.info(
+                f"Stripping {len(self._common_footer)}-line repeated footer "
+                f"(learned from {self._unique_in_sample} blocks)."
+            )
+        sample, self._sample = self._sample, []
+        return [block if kind == "stub" else self._clean(block) for kind, block in sample]
+
+    def _clean(self, block: str) -> str:
+        """
+        Strip the header/footer of a unique block, then stub it if it
+        near-duplicates an earlier page, or else drop the paragraphs
+        near-duplicating earlier ones.
+        """
+        report = self.report
+        body, header, footer = _strip_header_footer(
+            _body_lines_of_block(block), self._common_header, self._common_footer
+        )
+        if report is not None:
+            if header:
+                report.record(RULE_HEADER, "".join(header), len(header))
+            if footer:
+                report.record(RULE_FOOTER, "".join(footer), len(footer))
+
+        if self._page_index is not None:
+            words = _words("".join(body))
+            if len(words) >= _NEAR_DUPLICATE_MIN_WORDS:
+                signature = _minhash(words)
+                if self._page_index.find_near(signature):
+                    self.near_duplicates += 1
+                    if report is not None:
+                        report.record(RULE_NEAR_DUPLICATE_PAGE, "".join(body))
+                    return f"{_prefix_lines(block)}{_NEAR_DUPLICATE_NOTE}\n"
+                self._page_index.add(signature)
+
+        paragraphs_removed = 0
+        if self._paragraph_index is not None:
+            body, removed_lines, paragraphs_removed = _drop_near_duplicate_paragraphs(
+                body, self._paragraph_index
+            )
+            if report is not None and paragraphs_removed:
+                report.record(
+                    RULE_NEAR_DUPLICATE_PARAGRAPH, "".join(removed_lines), paragraphs_removed
+                )
+
+        if header or footer or paragraphs_removed:
+            return _prefix_lines(block) + "".join(body)
+        return block
+
+
+class DedupedContentBuffer:
+    """
+    Thread-safe output buffer for scrape workers: :meth:`append` page blocks
+    as they are scraped, :meth:`getvalue` returns the deduplicated content.
+
+    Pages go through a :class:`ScrapedContentDeduplicator` on arrival, so the
+    raw site text is never held in full — only the sample window and the
+    deduplicated output (what gets uploaded).
+    """
+
+    def __init__(self, **kwargs):
+        self._deduplicator = ScrapedContentDeduplicator(**kwargs)
+        self._output = io.StringIO()
+        self._lock = threading.Lock()
+
+    def append(self, text: str) -> None:
+        """Add scraped text made of one or more whole page blocks."""
+        with self._lock:
+            for block in _iter_blocks(text):
+                for chunk in self._deduplicator.add(block):
+                    self._output.write(chunk)
+
+    def getvalue(self) -> str:
+        """Deduplicated content of everything appended; ends the input."""
+        with self._lock:
+            for chunk in self._deduplicator.finish():
+                self._output.write(chunk)
+            return self._output.getvalue()
+
+
 def deduplicate_scraped_content_stream(
     combined: str,
+    report: Optional[DedupReport] = None,
+    page_similarity: Optional[float] = _NEAR_DUPLICATE_PAGE_SIMILARITY,
+    paragraph_similarity: Optional[float] = _NEAR_DUPLICATE_PARAGRAPH_SIMILARITY,
+    sample_size: int = _HEADER_FOOTER_SAMPLE_SIZE,
 ) -> Generator[str, None, None]:
     """
     Memory-efficient generator variant of :func:`deduplicate_scraped_content`.
 
-    Yields one cleaned block string at a time so callers can write directly to
-    a file or stream without buffering the entire output.
+    Yields cleaned block strings as soon as they are final so callers can
+    write directly to a file or stream without buffering the entire output;
+    see :class:`ScrapedContentDeduplicator` for what is held back.
+
+    *page_similarity* and *paragraph_similarity* are the (MinHash-estimated)
+    Jaccard similarities of word shingles from which a page or paragraph is a
+    near-duplicate of an earlier one; ``None`` turns that rule off. *report*,
+    when given, is filled in with what each rule removed.
 
     Usage::
 
@@ -271,90 +765,53 @@ def deduplicate_scraped_content_stream(
         yield combined
         return
 
-    # ── Pass 1: deduplicate blocks — keep body only for the first occurrence.
-    # Subsequent duplicates are retained as URL-only stubs so the reader knows
-    # every URL that was scraped, but without repeating the body content.
-    seen_hashes: set = set()
-    unique_blocks: List[str] = []   # full blocks  (body intact)
-    stub_blocks:   List[str] = []   # separator + URL only  (body was a duplicate)
-    all_blocks:    List[str] = []   # preserves original order
-    removed = 0
-
-    for block in _iter_blocks(combined):
-        h = _hash_block(block)
-        if h not in seen_hashes:
-            seen_hashes.add(h)
-            unique_blocks.append(block)
-            all_blocks.append(("full", block))
-        else:
-            removed += 1
-            # Build a stub: separator + URL + blank line + note, no body
-            prefix = _prefix_lines(block)   # already ends with blank line \n
-            stub = f"{prefix}[duplicate — content identical to a previously scraped page]\n"
-            stub_blocks.append(stub)
-            all_blocks.append(("stub", stub))
-            logger.debug("Duplicate block stubbed (same page content): %s",
-                         block.splitlines()[1].strip() if len(block.splitlines()) > 1 else "")
-
-    del seen_hashes  # free the hash set — no longer needed
-
-    if removed:
-        logger.info(f"Stubbed {removed} fully-duplicate page block(s) (URL kept, body removed).")
-
-    if len(unique_blocks) < 2:
-        # Not enough unique blocks to compare — emit everything as-is
-        for kind, block in all_blocks:
-            yield block
-        return
-
-    # ── Pass 2: detect shared header / footer across unique (full) blocks ───
-    common_header, common_footer = _detect_common_header_footer(
-        unique_blocks, _MIN_REPEATED_LINES
+    deduplicator = ScrapedContentDeduplicator(
+        report, page_similarity, paragraph_similarity, sample_size
     )
-
-    if common_header:
-        logger.info(
-            f"Stripping {len(common_header)}-line repeated header from "
-            f"{len(unique_blocks)} blocks."
-        )
-    if common_footer:
-        logger.info(
-            f"Stripping {len(common_footer)}-line repeated footer from "
-            f"{len(unique_blocks)} blocks."
-        )
-
-    # ── Pass 3: stream blocks in original order ──────────────────────────────
-    # Stubs are emitted as-is; full blocks have header/footer stripped.
-    for kind, block in all_blocks:
-        if kind == "stub":
-            yield block
-        elif common_header or common_footer:
-            yield _rebuild_block(block, common_header, common_footer)
-        else:
-            yield block
+    for block in _iter_blocks(combined):
+        yield from deduplicator.add(block)
+    yield from deduplicator.finish()
 
 
-def deduplicate_scraped_content(combined: str) -> str:
+def deduplicate_scraped_content(
+    combined: str,
+    report: Optional[DedupReport] = None,
+    page_similarity: Optional[float] = _NEAR_DUPLICATE_PAGE_SIMILARITY,
+    paragraph_similarity: Optional[float] = _NEAR_DUPLICATE_PARAGRAPH_SIMILARITY,
+    sample_size: int = _HEADER_FOOTER_SAMPLE_SIZE,
+) -> str:
     """
-    Remove exact-match duplicate content from a combined scraped-content string.
+    Remove duplicate and near-duplicate content from a combined scraped-content
+    string.
 
     For very large inputs prefer :func:`deduplicate_scraped_content_stream` to
     avoid buffering the full output in memory.
 
     Steps:
       1. Split into per-URL blocks (streaming — no full block list from split).
-      2. Drop fully-duplicate blocks using SHA-256 hashes (not raw text keys).
-      3. Identify common header/footer lines shared by >= 95% of blocks and
-         strip them from every block that contains them.
-      4. Re-assemble into a ``StringIO`` buffer and return as a single string.
+      2. Stub fully-duplicate blocks using SHA-256 hashes (not raw text keys).
+      3. Identify common header/footer lines shared by >= 95% of the first
+         *sample_size* unique blocks and strip them from every block that
+         contains them.
+      4. Stub pages whose remaining body near-duplicates an earlier page, and
+         drop paragraphs near-duplicating earlier ones (MinHash).
+      5. Re-assemble into a ``StringIO`` buffer and return as a single string.
 
     Args:
         combined: The raw combined string produced by the scraper.
+        report: Filled in with the tokens each rule removed, if given.
+        page_similarity: Shingle similarity for near-duplicate pages, ``None``
+            to keep them.
+        paragraph_similarity: Shingle similarity for near-duplicate paragraphs,
+            ``None`` to keep them.
+        sample_size: Unique blocks the header/footer is learned from.
 
     Returns:
         The de-duplicated content string.
     """
     buf = io.StringIO()
-    for chunk in deduplicate_scraped_content_stream(combined):
+    for chunk in deduplicate_scraped_content_stream(
+        combined, report, page_similarity, paragraph_similarity, sample_size
+    ):
         buf.write(chunk)
     return buf.getvalue()
@@ -0,0 +1,419 @@
+"""
+Lightweight HTTP tier for scraping static pages without a browser.
+
+Most manufacturer sites are plain server-rendered HTML, for which a pooled HTTP
+client and an HTML-to-text pass give the same text and links as Chrome at a
+fraction of the cost. Pages that look JS-rendered (no text, framework shells,
+meta refresh) or that answer with a bot challenge are reported back so the caller
+can load them in Selenium instead.
+"""
+
+import asyncio
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from typing import Callable, Literal, Optional
+from urllib.parse import urljoin, urldefrag
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+FetchTier = Literal["http", "browser"]
+
+DEFAULT_MAX_CONNECTIONS = 50
+DEFAULT_TIMEOUT_SECONDS = 20.0
+MAX_HTML_BYTES = 5 * 1024 * 1024  # larger responses are left to the browser
+# Pages with less visible text than this are suspicious if they also carry scripts
+MIN_STATIC_TEXT_CHARS = 200
+# A framework shell with less text than this is assumed to render client-side
+MAX_SHELL_TEXT_CHARS = 1000
+
+USER_AGENT = (
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/126.0 Safari/537.36"
+)
+
+# Content never rendered as text by the browser
+_SKIPPED_TAGS = frozenset(
+    {
+        "script",
+        "style",
+        "noscript",
+        "template",
+        "svg",
+        "head",
+        "iframe",
+        "object",
+        "canvas",
+    }
+)
+# Elements rendered on their own line(s), like innerText does
+_BLOCK_TAGS = frozenset(
+    {
+        "address", "article", "aside", "blockquote", "body", "br", "dd", "details",
+        "div", "dl", "dt", "fieldset", "figcaption", "figure", "footer", "form",
+        "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr", "li", "main", "nav",
+        "ol", "p", "pre", "section", "summary", "table", "tbody", "td", "tfoot",
+        "th", "thead", "tr", "ul",
+    }
+)  # fmt: skip
+
+_WHITESPACE = re.compile(r"\s+")
+
+# Markers of client-side rendered apps (checked against the raw HTML)
+_FRAMEWORK_MARKERS = (
+    # empty mount point of a single page app
+    re.compile(
+        r"<div[^>]+id=[\"'](?:root|app|__next|__nuxt|___gatsby)[\"'][^>]*>\s*</div>",
+        re.I,
+    ),
+    re.compile(r"__NEXT_DATA__|window\.__NUXT__|ng-version=|data-reactroot", re.I),
+    re.compile(r"<noscript[^>]*>[^<]*(?:enable|requires?)\s+javascript", re.I),
+)
+
+# Bot protection / challenge pages
+_CHALLENGE_STATUSES = frozenset({401, 403, 429, 503})
+_CHALLENGE_MARKERS = re.compile(
+    r"cf-chl|cf_chl_opt|challenge-platform|just a moment\.\.\.|attention required"
+    r"|checking your browser|captcha|ddos-guard|_incapsula_resource|px-captcha",
+    re.I,
+)
+
+
+class HtmlTextExtractor(HTMLParser):
+    """Visible text and outgoing links of an HTML document."""
+
+    def __init__(self, page_url: str):
+        super().__init__(convert_charrefs=True)
+        self.base_url = page_url
+        self.links: list[str] = []
+        self.num_scripts = 0
+        self.has_meta_refresh = False
+        self._lines: list[str] = []
+        self._current: list[str] = []
+        self._skip_depth = 0
+
+    # --------------------------- HTMLParser ----------------------------
+    def handle_starttag(self, tag, attrs):
+        if tag == "body":
+            # a missing </head> must not hide the whole document
+            self._skip_depth = 0
+        if tag == "script":
+            self.num_scripts += 1
+        elif tag == "base":
+            href = dict(attrs).get("href")
+            if href:
+                self.base_url = urljoin(self.base_url, href)
+        elif tag == "meta":
+            attr_map = dict(attrs)
+            if (attr_map.get("http-equiv") or "").lower() == "refresh":
+                self.has_meta_refresh = True
+        elif tag == "a":
+            self._add_link(dict(attrs).get("href"))
+
+        if tag in _SKIPPED_TAGS:
+            self._skip_depth += 1
+        elif tag in _BLOCK_TAGS:
+            self._flush_line()
+
+    def handle_startendtag(self, tag, attrs):
+        # self-closing tags (<br/>, <meta .../>) must not open a skipped region
+        if tag in _SKIPPED_TAGS:
+            return
+        self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        if tag in _SKIPPED_TAGS:
+            if self._skip_depth:
+                self._skip_depth -= 1
+        elif tag in _BLOCK_TAGS:
+            self._flush_line()
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self._current.append(data)
+
+    # ----------------------------- Output ------------------------------
+    @property
+    def text(self) -> str:
+        self._flush_line()
+        return "\n".join(self._lines)
+
+    def _flush_line(self):
+        if self._current:
+            line = _WHITESPACE.sub(" ", "".join(self._current)).strip()
+            if line:
+                self._lines.append(line)
+            self._current.clear()
+
+    def _add_link(self, href: Optional[str]):
+        if not href:
+            return
+        href = href.strip()
+        if href.startswith(("mailto:", "tel:", "javascript:")):
+            return
+        try:
+            absolute, _fragment = urldefrag(urljoin(self.base_url, href))
+        except ValueError:
+            return
+        if absolute.startswith(("http://", "https://")):
+            self.links.append(absolute)
+
+
+@dataclass
+class HttpPage:
+    """Outcome of fetching one page over HTTP."""
+
+    url: str
+    depth: int
+    final_url: str = ""
+    status_code: int = 0
+    text: str = ""
+    links: list[str] = field(default_factory=list)
+    # why the page has to be loaded in a browser instead, None if the text is usable
+    needs_browser: Optional[str] = None
+    # why the page has no text to scrape at all (e.g. a PDF behind an extension-less
+    # link); skipped like SKIP_EXTENSIONS links rather than counted as a failure
+    skipped: Optional[str] = None
+
+
+def browser_fallback_reason(
+    status_code: int, html: str, extractor: HtmlTextExtractor
+) -> Optional[str]:
+    """Why a fetched page can't be scraped over HTTP, or None if its text is usable."""
+    if status_code in _CHALLENGE_STATUSES and _CHALLENGE_MARKERS.search(html):
+        return f"challenge page (HTTP {status_code})"
+    if extractor.has_meta_refresh:
+        return "meta refresh"
+
+    text_len = len(extractor.text)
+    if text_len == 0:
+        return "empty body"
+    if text_len < MIN_STATIC_TEXT_CHARS and extractor.num_scripts:
+        return f"little text ({text_len} chars) with {extractor.num_scripts} scripts"
+    if text_len < MAX_SHELL_TEXT_CHARS and any(
+        marker.search(html) for marker in _FRAMEWORK_MARKERS
+    ):
+        return "client-side rendered app shell"
+    return None
+
+
+def parse_html_page(page: HttpPage, html: str) -> HttpPage:
+    extractor = HtmlTextExtractor(page.final_url or page.url)
+    extractor.feed(html)
+    extractor.close()
+    page.text = extractor.text
+    page.links = extractor.links
+    page.needs_browser = browser_fallback_reason(page.status_code, html, extractor)
+    return page
+
+
+@dataclass
+class HttpCrawlResult:
+    pages: list[HttpPage] = field(default_factory=list)  # usable static pages
+    errors: list[dict] = field(default_factory=list)
+    browser_pages: list[HttpPage] = field(default_factory=list)  # to load in Selenium
+    skipped_pages: list[HttpPage] = field(default_factory=list)  # not HTML
+    timed_out: bool = False
+
+
+class HttpFetcher:
+    """
+    Pooled async HTTP client usable from the scraper's worker threads.
+
+    The client lives on a private event loop thread, so all sites share one
+    connection pool and any thread can run a crawl with crawl_site().
+    """
+
+    def __init__(
+        self,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        timeout: float = DEFAULT_TIMEOUT_SECONDS,
+    ):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="http-fetcher", daemon=True
+        )
+        self._thread.start()
+        self._client = self._run(self._create_client(max_connections, timeout))
+
+    @staticmethod
+    async def _create_client(max_connections: int, timeout: float) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            follow_redirects=True,
+            timeout=httpx.Timeout(timeout),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+            headers={
+                "User-Agent": USER_AGENT,
+                "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.5",
+                "Accept-Language": "en-US,en;q=0.9",
+            },
+            verify=False,  # the browser tier accepts insecure certs too
+        )
+
+    def _run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def close(self) -> None:
+        if self._loop.is_closed():
+            return
+        try:
+            self._run(self._client.aclose())
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+            self._loop.close()
+
+    # ----------------------------- Fetching ----------------------------
+    async def fetch(self, url: str, depth: int = 0) -> HttpPage:
+        """
+        Fetch and parse one page. Raises on network errors; non-HTML content is
+        returned unread with page.skipped set.
+        """
+        page = HttpPage(url=url, depth=depth)
+        async with self._client.stream("GET", url) as response:
+            page.final_url = str(response.url)
+            page.status_code = response.status_code
+            content_type = response.headers.get("content-type", "text/html").lower()
+            if "html" not in content_type and "xml" not in content_type:
+                page.skipped = f"non-HTML content type: {content_type}"
+                return page
+
+            body = bytearray()
+            async for chunk in response.aiter_bytes():
+                body += chunk
+                if len(body) > MAX_HTML_BYTES:
+                    page.needs_browser = f"response larger than {MAX_HTML_BYTES} bytes"
+                    return page
+            encoding = response.encoding or "utf-8"
+
+        html = bytes(body).decode(encoding, errors="replace")
+        return parse_html_page(page, html)
+
+    def crawl_site(
+        self,
+        start_url: str,
+        max_depth: int,
+        deadline: float,
+        discovered: set[str],
+        discovered_lock: threading.Lock,
+        should_follow: Callable[[str], bool],
+        check_final_url: Callable[[str], None],
+        max_concurrency: int,
+    ) -> HttpCrawlResult:
+        """
+        BFS over a site over HTTP, from the calling (worker) thread.
+
+        Shares the caller's discovered set so URLs handed to the browser tier are not
+        queued twice. check_final_url raises to reject a page by its post-redirect
+        URL (e.g. a redirect to a blocked site).
+        """
+        return self._run(
+            self._crawl_site(
+                start_url,
+                max_depth,
+                deadline,
+                discovered,
+                discovered_lock,
+                should_follow,
+                check_final_url,
+                max_concurrency,
+            )
+        )
+
+    async def _crawl_site(
+        self,
+        start_url: str,
+        max_depth: int,
+        deadline: float,
+        discovered: set[str],
+        discovered_lock: threading.Lock,
+        should_follow: Callable[[str], bool],
+        check_final_url: Callable[[str], None],
+        max_concurrency: int,
+    ) -> HttpCrawlResult:
+        result = HttpCrawlResult()
+        queue: asyncio.Queue[tuple[str, int]] = asyncio.Queue()
+        queue.put_nowait((start_url, 0))
+
+        async def worker():
+            while True:
+                url, depth = await queue.get()
+                try:
+                    page = await self.fetch(url, depth)
+                    check_final_url(page.final_url)
+                    if page.skipped:
+                        result.skipped_pages.append(page)
+                        continue
+                    if page.needs_browser:
+                        result.browser_pages.append(page)
+                        continue
+                    result.pages.append(page)
+                    if depth >= max_depth:
+                        continue
+                    for href in page.links:
+                        if not should_follow(href):
+                            continue
+                        with discovered_lock:
+                            if href in discovered:
+                                continue
+                            discovered.add(href)
+                        queue.put_nowait((href, depth + 1))
+                except Exception as e:
+                    result.errors.append(
+                        {
+                            "url": url,
+                            "error": str(e) or repr(e),
+                            "error_type": type(e).__name__,
+                            "depth": depth,
+                        }
+                    )
+                finally:
+                    queue.task_done()
+
+        workers = [asyncio.create_task(worker()) for _ in range(max_concurrency)]
+        try:
+            await asyncio.wait_for(
+                queue.join(), timeout=max(0.0, deadline - time.monotonic())
+            )
+        except asyncio.TimeoutError:
+            result.timed_out = True
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+        return result
+
+
+class DomainTierMemory:
+    """Remembers, per domain, whether its pages could be scraped over HTTP."""
+
+    def __init__(self, max_domains: int = 100_000):
+        self.max_domains = max_domains
+        self._tiers: OrderedDict[str, FetchTier] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, domain: str) -> Optional[FetchTier]:
+        with self._lock:
+            tier = self._tiers.get(domain)
+            if tier is not None:
+                self._tiers.move_to_end(domain)
+            return tier
+
+    def remember(self, domain: str, tier: FetchTier) -> None:
+        with self._lock:
+            self._tiers[domain] = tier
+            self._tiers.move_to_end(domain)
+            while len(self._tiers) > self.max_domains:
+                self._tiers.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._tiers)
@@ -9,10 +9,12 @@ from scraper_app.utils.selenium.driver_factory import (
     ChromeDriverFactory,
     LegacyDriverFactory,
 )
+from scraper_app.utils.selenium.driver_pool import DriverPool
 
 __all__ = [
     "ChromeDriverManager",
     "DriverFactory",
     "ChromeDriverFactory",
     "LegacyDriverFactory",
+    "DriverPool",
 ]
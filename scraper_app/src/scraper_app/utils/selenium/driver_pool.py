@@ -0,0 +1,282 @@
+"""
+Pool of long-lived, warm Chrome drivers shared by scrapes.
+
+Chrome cold start (process launch + fresh profile) costs seconds, which dominates
+small sites. The pool hands out idle drivers instead, resets browser state between
+sites and recycles drivers that are unhealthy, have served too many pages or whose
+process tree has grown too much.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+from urllib.parse import urlsplit
+
+from selenium import webdriver
+
+try:
+    import psutil
+except ImportError:  # memory-based recycling is disabled without psutil
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_PAGES_PER_DRIVER = 200
+DEFAULT_MAX_MEMORY_GROWTH_MB = 512
+
+
+@dataclass
+class PooledDriverStats:
+    """Bookkeeping for one pooled driver."""
+
+    created_at: float = field(default_factory=time.monotonic)
+    pages: int = 0
+    sites: int = 0
+    baseline_rss: Optional[int] = None
+    # origins loaded since the last reset, whose storage must be cleared
+    origins: set[str] = field(default_factory=set)
+
+
+def get_origin(url: Optional[str]) -> Optional[str]:
+    """scheme://host[:port] of an http(s) URL, the unit Chrome keeps storage by."""
+    if not url:
+        return None
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return None
+    if parts.scheme not in ("http", "https") or not parts.netloc:
+        return None
+    return f"{parts.scheme}://{parts.netloc.lower()}"
+
+
+def get_driver_rss_bytes(driver: webdriver.Chrome) -> Optional[int]:
+    """Resident memory of chromedriver and every Chrome process under it."""
+    if psutil is None:
+        return None
+    try:
+        root = psutil.Process(driver.service.process.pid)
+        processes = [root, *root.children(recursive=True)]
+        total = 0
+        for process in processes:
+            try:
+                total += process.memory_info().rss
+            except psutil.NoSuchProcess:
+                continue
+        return total
+    except Exception:
+        return None
+
+
+class DriverPool:
+    """
+    Thread-safe pool of warm drivers.
+
+    Drivers are created and destroyed through the given callables, so the owner keeps
+    tracking them (e.g. ScraperService.active_drivers for signal cleanup). The pool
+    only remembers which drivers are idle and how much each has been used.
+
+    acquire() -> driver -> mark_page() per page -> release() once the site is done.
+    """
+
+    def __init__(
+        self,
+        create_driver: Callable[[], webdriver.Chrome],
+        cleanup_driver: Callable[[webdriver.Chrome], None],
+        max_idle: int,
+        max_pages_per_driver: int = DEFAULT_MAX_PAGES_PER_DRIVER,
+        max_memory_growth_mb: Optional[int] = DEFAULT_MAX_MEMORY_GROWTH_MB,
+    ):
+        self._create_driver = create_driver
+        self._cleanup_driver = cleanup_driver
+        self.max_idle = max_idle
+        self.max_pages_per_driver = max_pages_per_driver
+        self.max_memory_growth_bytes = (
+            max_memory_growth_mb * 1024 * 1024 if max_memory_growth_mb else None
+        )
+
+        self._lock = threading.Lock()
+        self._idle: deque[webdriver.Chrome] = deque()
+        self._stats: dict[int, PooledDriverStats] = {}
+        self._closed = False
+
+        # counters for logging / tests
+        self.created = 0
+        self.reused = 0
+        self.recycled = 0
+
+    # ----------------------------- Public ------------------------------
+    def acquire(self) -> webdriver.Chrome:
+        """Return a healthy idle driver, or a newly created one if none is idle."""
+        while True:
+            with self._lock:
+                driver = self._idle.pop() if self._idle else None
+            if driver is None:
+                break
+            if self.is_healthy(driver):
+                with self._lock:
+                    self.reused += 1
+                logger.info(
+                    f"Reusing warm driver {getattr(driver, 'session_id', 'unknown')}"
+                )
+                return driver
+            logger.info(
+                f"Discarding unhealthy driver {getattr(driver, 'session_id', 'unknown')}"
+            )
+            self._destroy(driver)
+
+        driver = self._create_driver()
+        stats = PooledDriverStats(baseline_rss=get_driver_rss_bytes(driver))
+        with self._lock:
+            self._stats[id(driver)] = stats
+            self.created += 1
+        return driver
+
+    def mark_page(self, driver: webdriver.Chrome, url: Optional[str] = None) -> None:
+        """
+        Count a page loaded by driver towards its recycling limit, and remember the
+        origin of url so its storage is cleared when the driver is released.
+        """
+        origin = get_origin(url)
+        with self._lock:
+            stats = self._stats.get(id(driver))
+            if stats is not None:
+                stats.pages += 1
+                if origin:
+                    stats.origins.add(origin)
+
+    def release(self, driver: webdriver.Chrome) -> None:
+        """Return driver after a site: reset it and keep it warm, or recycle it."""
+        with self._lock:
+            stats = self._stats.get(id(driver))
+            if stats is not None:
+                stats.sites += 1
+
+        reason = self._recycle_reason(driver, stats)
+        if reason is None and not self._reset_state(driver, stats.origins):
+            reason = "state reset failed"
+
+        with self._lock:
+            if reason is None and self._closed:
+                reason = "pool closed"
+            if reason is None and len(self._idle) >= self.max_idle:
+                reason = "pool full"
+            if reason is None:
+                self._idle.append(driver)
+                return
+            if reason not in ("pool closed", "pool full"):
+                self.recycled += 1
+
+        logger.info(
+            f"Recycling driver {getattr(driver, 'session_id', 'unknown')}: {reason}"
+        )
+        self._destroy(driver)
+
+    def discard(self, driver: webdriver.Chrome) -> None:
+        """Destroy a driver that must not be reused (e.g. it crashed mid-site)."""
+        self._destroy(driver)
+
+    def close(self) -> None:
+        """Destroy every idle driver; drivers released afterwards are destroyed too."""
+        with self._lock:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+        for driver in idle:
+            self._destroy(driver)
+
+    def forget_all(self) -> None:
+        """
+        Drop references to idle drivers without cleaning them up, for when the owner
+        already quit every driver (signal / atexit cleanup). Never blocks for long,
+        since it may run in a signal handler.
+        """
+        if self._lock.acquire(timeout=1.0):
+            try:
+                self._closed = True
+                self._idle.clear()
+                self._stats.clear()
+            finally:
+                self._lock.release()
+
+    @property
+    def num_idle(self) -> int:
+        return len(self._idle)
+
+    def stats_for(self, driver: webdriver.Chrome) -> Optional[PooledDriverStats]:
+        return self._stats.get(id(driver))
+
+    # ----------------------------- Helpers -----------------------------
+    def _destroy(self, driver: webdriver.Chrome) -> None:
+        with self._lock:
+            self._stats.pop(id(driver), None)
+        try:
+            self._cleanup_driver(driver)
+        except Exception as e:
+            logger.warning(f"Error cleaning up pooled driver: {e}")
+
+    def _recycle_reason(
+        self, driver: webdriver.Chrome, stats: Optional[PooledDriverStats]
+    ) -> Optional[str]:
+        if stats is None:
+            return "unknown driver"
+        if stats.pages >= self.max_pages_per_driver:
+            return f"served {stats.pages} pages"
+        if self.max_memory_growth_bytes and stats.baseline_rss:
+            rss = get_driver_rss_bytes(driver)
+            if (
+                rss is not None
+                and rss - stats.baseline_rss > self.max_memory_growth_bytes
+            ):
+                return (
+                    f"memory grew {(rss - stats.baseline_rss) / 1024 / 1024:.0f}MB "
+                    f"since creation"
+                )
+        return None
+
+    @staticmethod
+    def is_healthy(driver: webdriver.Chrome) -> bool:
+        try:
+            return driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    @staticmethod
+    def _reset_state(driver: webdriver.Chrome, origins: set[str]) -> bool:
+        """
+        Clear everything one site could leave behind for the next: extra windows,
+        cookies, cache and the storage (local/session storage, IndexedDB, service
+        workers, cache storage) of every origin the driver visited. CDP has no
+        wildcard origin, so each one is cleared separately. The profile directory
+        itself is kept.
+        """
+        try:
+            handles = driver.window_handles
+            for handle in handles[1:]:
+                driver.switch_to.window(handle)
+                driver.close()
+            driver.switch_to.window(handles[0])
+            # the current page may be a redirect target that was never marked
+            current_origin = get_origin(driver.current_url)
+            if current_origin:
+                origins.add(current_origin)
+            driver.get("about:blank")
+
+            driver.delete_all_cookies()
+            driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+            driver.execute_cdp_cmd("Network.clearBrowserCache", {})
+            for origin in sorted(origins):
+                driver.execute_cdp_cmd(
+                    "Storage.clearDataForOrigin",
+                    {"origin": origin, "storageTypes": "all"},
+                )
+            origins.clear()
+            return True
+        except Exception as e:
+            logger.warning(
+                f"Failed to reset driver {getattr(driver, 'session_id', 'unknown')}: {e}"
+            )
+            return False
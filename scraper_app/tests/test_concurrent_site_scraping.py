@@ -0,0 +1,126 @@
+"""
+Tests for scraping several sites at once with ScraperService.scrape_async and the
+shared browser cap. Drivers are fakes, no Chrome is started.
+"""
+
+import asyncio
+import threading
+import time
+from unittest.mock import Mock
+
+import pytest
+
+
+class FakeDriverFactory:
+    """Hands out mock drivers and records how many were open at once."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.open = 0
+        self.peak = 0
+        self.created = 0
+
+    def create_driver(self):
+        with self.lock:
+            self.open += 1
+            self.created += 1
+            self.peak = max(self.peak, self.open)
+            driver = Mock()
+            driver.session_id = f"fake-{self.created}"
+            driver.execute_script.return_value = 1  # healthy
+            driver.window_handles = ["main"]
+            return driver
+
+    def cleanup_driver(self, driver):
+        with self.lock:
+            self.open -= 1
+
+
+@pytest.fixture
+def scraper_factory(chrome_test_env, monkeypatch):
+    from scraper_app.services import url_scraper_service
+    from scraper_app.services.url_scraper_service import ScraperService
+
+    monkeypatch.setattr(url_scraper_service, "get_final_landing_url", lambda url: url)
+    monkeypatch.setattr(
+        url_scraper_service.signal, "signal", lambda *args, **kwargs: None
+    )
+    monkeypatch.setattr(url_scraper_service.atexit, "register", lambda fn: None)
+
+    created = []
+
+    def make(page_delay: float = 0.05, pages_per_site: int = 6, **kwargs):
+        kwargs.setdefault("use_http_tier", False)  # fake sites, browser tier only
+        scraper = ScraperService(**kwargs)
+        scraper.driver_factory = FakeDriverFactory()
+
+        def extract_text(driver, url):
+            time.sleep(page_delay)
+            return f"content of {url}"
+
+        def collect_links(driver, resolved_start_url):
+            return {f"{resolved_start_url}/page{i}" for i in range(pages_per_site - 1)}
+
+        scraper._extract_text_with_fallback = extract_text
+        scraper._collect_links_js = collect_links
+        created.append(scraper)
+        return scraper
+
+    yield make
+
+    for scraper in created:
+        scraper.shutdown(wait=True)
+
+
+@pytest.mark.asyncio
+async def test_sites_scrape_concurrently_within_browser_cap(scraper_factory):
+    scraper = scraper_factory(
+        max_concurrent_browsers=4,
+        max_depth=1,
+        max_concurrent_sites=3,
+        max_total_browsers=2,
+    )
+
+    results = await asyncio.gather(
+        *(scraper.scrape_async(f"https://site{i}.example.com") for i in range(3))
+    )
+
+    assert [r.urls_scraped for r in results] == [6, 6, 6]
+    assert all(not r.timed_out for r in results)
+    assert scraper.driver_factory.peak <= 2
+    # warm drivers stay open for the next sites until the scraper shuts down
+    assert scraper.driver_factory.open == len(scraper.active_drivers)
+    scraper.shutdown(wait=True)
+    assert scraper.driver_factory.open == 0
+    assert scraper.active_drivers == []
+
+
+@pytest.mark.asyncio
+async def test_scrape_async_keeps_event_loop_responsive(scraper_factory):
+    scraper = scraper_factory(
+        max_concurrent_browsers=1, max_depth=1, page_delay=0.1, pages_per_site=4
+    )
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    ticker_task = asyncio.create_task(ticker())
+    result = await scraper.scrape_async("https://site.example.com")
+    ticker_task.cancel()
+
+    assert result.urls_scraped == 4
+    # the scrape takes ~0.4s+; a blocked loop would not have ticked at all
+    assert ticks >= 10
+
+
+def test_single_page_site_opens_one_browser(scraper_factory):
+    scraper = scraper_factory(max_concurrent_browsers=5, max_depth=0)
+
+    result = scraper.scrape("https://tiny.example.com")
+
+    assert result.urls_scraped == 1
+    assert scraper.driver_factory.created == 1
@@ -13,6 +13,14 @@ Unit tests  (self-contained, no external files)
 - _rebuild_block               : removes detected header/footer, preserves prefix and spacing
 - deduplicate_scraped_content        : full deduplication pipeline (returns string)
 - deduplicate_scraped_content_stream : generator variant of the pipeline
+- _minhash / _MinHashIndex     : near-duplicate signatures and banded lookup
+- near-duplicate pages/paragraphs, tolerant header/footer, DedupReport token counts
+- ScrapedContentDeduplicator / DedupedContentBuffer : incremental, bounded-memory dedup
+
+Regression corpus
+-----------------
+- Output digests of the synthetic, a noisy (near-duplicates, varying boilerplate)
+  and a large (600 unique pages) site, pinned when dedup became incremental
 
 Whitespace-preservation regression tests
 -----------------------------------------
@@ -30,7 +38,9 @@ Synthetic dataset integration tests
   and performance on a realistic multi-block input
 """
 
+import hashlib
 import sys
+import threading
 import time
 import types
 
@@ -39,13 +49,24 @@ import pytest
 sys.path.insert(0, __import__("os").path.join(__import__("os").path.dirname(__file__), "..", "..", "src"))
 
 from scraper_app.utils.dedup_util import (
+    RULE_DUPLICATE_PAGE,
+    RULE_FOOTER,
+    RULE_HEADER,
+    RULE_NEAR_DUPLICATE_PAGE,
+    RULE_NEAR_DUPLICATE_PARAGRAPH,
+    DedupedContentBuffer,
+    DedupReport,
+    ScrapedContentDeduplicator,
     _SEPARATOR,
+    _MinHashIndex,
     _body_lines_of_block,
     _detect_common_header_footer,
     _hash_block,
     _iter_blocks,
     _prefix_lines,
     _rebuild_block,
+    _minhash,
+    _words,
     deduplicate_scraped_content,
     deduplicate_scraped_content_stream,
 )
@@ -817,6 +838,361 @@ class TestDeduplicateScrapedContentStream:
         assert "Unique B" in written
 
 
+# ─────────────────────────────────────────────────────────────────────────────
+# Near-duplicate detection, tolerant header/footer, dedup report
+# ─────────────────────────────────────────────────────────────────────────────
+
+_LONG_TEXT = (
+    "Our machine shop provides precision CNC milling and turning services for "
+    "aerospace, medical and automotive customers. We machine aluminum, stainless "
+    "steel, titanium and engineering plastics to tight tolerances, with in-house "
+    "inspection on calibrated equipment and full material traceability for every job."
+)
+
+
+def _word_count(text: str) -> int:
+    return len(text.split())
+
+
+def _filler(tag: str) -> str:
+    """Forty words no other filler shares."""
+    return " ".join(f"{tag}{j}" for j in range(40))
+
+
+class TestMinHash:
+    def test_one_word_changed_stays_above_threshold(self):
+        near = _LONG_TEXT.replace("every job", "every order")
+        index = _MinHashIndex(similarity=0.85)
+        index.add(_minhash(_words(_LONG_TEXT)))
+        assert index.find_near(_minhash(_words(near)))
+
+    def test_same_template_different_numbers_not_near(self):
+        # Pages built from one template with different specs stay apart.
+        index = _MinHashIndex(similarity=0.85)
+        for body in _UNIQUE_BODIES:
+            signature = _minhash(_words(body))
+            assert not index.find_near(signature)
+            index.add(signature)
+
+    def test_signature_is_deterministic(self):
+        assert _minhash(_words(_LONG_TEXT)) == _minhash(_words(_LONG_TEXT))
+
+    def test_invalid_similarity_rejected(self):
+        with pytest.raises(ValueError):
+            _MinHashIndex(similarity=0)
+
+
+class TestNearDuplicatePages:
+    def test_near_duplicate_page_stubbed(self):
+        combined = _make_combined(
+            ("https://example.com/a", _LONG_TEXT),
+            ("https://example.com/b", _LONG_TEXT.replace("every job", "every order")),
+        )
+        result = deduplicate_scraped_content(combined)
+        blocks = list(_iter_blocks(result))
+        assert "precision CNC milling" in blocks[0]
+        assert "https://example.com/b" in blocks[1]
+        assert "[near-duplicate" in blocks[1]
+        assert "precision CNC milling" not in blocks[1]
+
+    def test_disabled_with_none(self):
+        combined = _make_combined(
+            ("https://example.com/a", _LONG_TEXT),
+            ("https://example.com/b", _LONG_TEXT.replace("every job", "every order")),
+        )
+        result = deduplicate_scraped_content(
+            combined, page_similarity=None, paragraph_similarity=None
+        )
+        assert "[near-duplicate" not in result
+        assert "every order" in result
+
+    def test_compared_after_boilerplate_is_stripped(self):
+        # Pages sharing a long header and footer but little else are not near-duplicates.
+        header = "\n".join(f"Navigation link number {i} of the site menu" for i in range(8))
+        footer = "\n".join(f"Footer legal line {i} with company address" for i in range(8))
+        combined = _make_combined(*(
+            (f"https://example.com/p{i}", f"{header}\nProduct {i} rated {i * 10} kg\n{footer}")
+            for i in range(3)
+        ))
+        result = deduplicate_scraped_content(combined)
+        assert "[near-duplicate" not in result
+        for i in range(3):
+            assert f"Product {i} rated" in result
+
+    def test_short_pages_never_near_duplicates(self):
+        combined = _make_combined(
+            ("https://example.com/a", "Contact us at 555-0100 today"),
+            ("https://example.com/b", "Contact us at 555-0199 today"),
+        )
+        assert "[near-duplicate" not in deduplicate_scraped_content(combined)
+
+
+class TestNearDuplicateParagraphs:
+    def test_repeated_paragraph_dropped_from_later_pages(self):
+        combined = _make_combined(
+            ("https://example.com/a", f"{_filler('a')}\n\n{_LONG_TEXT}\n\nPage A details"),
+            ("https://example.com/b",
+             f"{_filler('b')}\n\n{_LONG_TEXT.replace('tight', 'close')}\n\nPage B details"),
+        )
+        result = deduplicate_scraped_content(combined)
+        blocks = list(_iter_blocks(result))
+        assert "precision CNC milling" in blocks[0]
+        assert "precision CNC milling" not in blocks[1]
+        assert f"{_filler('b')}\n\nPage B details" in blocks[1]
+
+    def test_disabled_with_none(self):
+        combined = _make_combined(
+            ("https://example.com/a", f"{_filler('a')}\n\n{_LONG_TEXT}"),
+            ("https://example.com/b", f"{_filler('b')}\n\n{_LONG_TEXT}"),
+        )
+        result = deduplicate_scraped_content(combined, paragraph_similarity=None)
+        assert result.count("precision CNC milling") == 2
+        assert "[near-duplicate" not in result
+
+
+class TestTolerantHeaderFooter:
+    def _blocks(self, *bodies):
+        return [_make_block(f"https://example.com/p{i}", b)
+                for i, b in enumerate(bodies)]
+
+    def test_line_varying_in_numbers_bridged_inside_header(self):
+        blocks = self._blocks(*(
+            f"Nav\nMy Account  Cart ({i})\nLogo\nBanner\nUnique {chr(65 + i)}"
+            for i in range(4)
+        ))
+        header, _ = _detect_common_header_footer(blocks, min_lines=3)
+        assert len(header) == 4
+
+    def test_varying_line_on_the_outer_edge_included(self):
+        blocks = self._blocks(*(
+            f"Unique {chr(65 + i)}\nFoot1\nFoot2\nFoot3\n© {2020 + i} ACME"
+            for i in range(4)
+        ))
+        _, footer = _detect_common_header_footer(blocks, min_lines=3)
+        assert [l.rstrip("\n") for l in footer][:3] == ["Foot1", "Foot2", "Foot3"]
+        assert len(footer) == 4
+
+    def test_varying_line_next_to_content_not_included(self):
+        blocks = self._blocks(*(
+            f"Unique {chr(65 + i)}\nIn stock: {i}\nFoot1\nFoot2\nFoot3"
+            for i in range(4)
+        ))
+        _, footer = _detect_common_header_footer(blocks, min_lines=3)
+        assert [l.rstrip("\n") for l in footer] == ["Foot1", "Foot2", "Foot3"]
+
+    def test_two_varying_lines_in_a_row_end_the_run(self):
+        blocks = self._blocks(*(
+            f"Nav\nLogo\nBanner\nWidth {i} mm\nHeight {i} mm\nMenu\nUnique {chr(65 + i)}"
+            for i in range(4)
+        ))
+        header, _ = _detect_common_header_footer(blocks, min_lines=3)
+        assert [l.rstrip("\n") for l in header] == ["Nav", "Logo", "Banner"]
+
+    def test_variant_header_stripped_from_every_page(self):
+        combined = _make_combined(*(
+            (f"https://example.com/p{i}",
+             f"Nav\nMy Account  Cart ({i})\nLogo\nBanner\nUnique {chr(65 + i)}")
+            for i in range(4)
+        ))
+        result = deduplicate_scraped_content(combined)
+        assert "Cart (" not in result
+        for i in range(4):
+            assert f"Unique {chr(65 + i)}" in result
+
+
+class TestDedupReport:
+    def test_tokens_counted_per_rule(self):
+        page_a = f"Page A\n\n{_filler('a')}"
+        near_a = f"{page_a} a40"
+        combined = _make_combined(
+            ("https://example.com/a", f"Nav\nLogo\nBanner\n{page_a}"),
+            ("https://example.com/b", f"Nav\nLogo\nBanner\n{_filler('b')}\n\n{_LONG_TEXT}"),
+            ("https://example.com/c", f"Nav\nLogo\nBanner\n{_filler('c')}\n\n{_LONG_TEXT}"),
+            ("https://example.com/a2", f"Nav\nLogo\nBanner\n{near_a}"),
+            ("https://example.com/b2", f"Nav\nLogo\nBanner\n{_filler('b')}\n\n{_LONG_TEXT}"),
+            ("https://example.com/d", "Nav\nLogo\nBanner\nPage D"),
+        )
+        report = DedupReport(count_tokens=_word_count)
+        deduplicate_scraped_content(combined, report=report)
+
+        long_words = _word_count(_LONG_TEXT)
+        rules = report.rules
+        assert (rules[RULE_DUPLICATE_PAGE].removed,
+                rules[RULE_DUPLICATE_PAGE].tokens) == (1, 3 + 40 + long_words)
+        assert (rules[RULE_HEADER].removed, rules[RULE_HEADER].tokens) == (15, 15)
+        assert RULE_FOOTER not in rules
+        assert (rules[RULE_NEAR_DUPLICATE_PAGE].removed,
+                rules[RULE_NEAR_DUPLICATE_PAGE].tokens) == (1, 2 + 41)
+        assert (rules[RULE_NEAR_DUPLICATE_PARAGRAPH].removed,
+                rules[RULE_NEAR_DUPLICATE_PARAGRAPH].tokens) == (1, long_words)
+        assert report.total_tokens == sum(stats.tokens for stats in rules.values())
+        assert "near_duplicate_page" in report.summary()
+
+    def test_report_does_not_change_output(self):
+        report = DedupReport(count_tokens=_word_count)
+        assert deduplicate_scraped_content(_SYNTHETIC_RAW, report=report) == \
+            deduplicate_scraped_content(_SYNTHETIC_RAW)
+        assert report.rules[RULE_DUPLICATE_PAGE].removed == 50
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Incremental deduplication and regression corpus
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _build_noisy_site() -> str:
+    """120 pages with varying cart/copyright lines, near-duplicates and exact duplicates."""
+    blocks = []
+    for i in range(120):
+        header = f"Home | Shop | About\nMy Account  Cart ({i % 4})\nACME Fabrication\nSearch...\n"
+        footer = f"Contact: 555-0100\nNewsletter signup\n© {2023 + i % 2} ACME\n"
+        if i % 7 == 0:
+            body = f"{_LONG_TEXT}\n\nItem {i} specifics: {_filler(f'n{i}_')}\n"
+        elif i % 11 == 0:
+            body = f"{_filler('shared')} tail{i}\n"
+        else:
+            body = f"Item {i}\n\n{_filler(f'i{i}_')}\n\nIn stock.\n"
+        blocks.append(_make_block(f"https://noisy.example.com/p/{i}", header + body + footer))
+        if i % 9 == 0:
+            blocks.append(_make_block(f"https://noisy.example.com/dup/{i}", header + body + footer))
+    blocks.append(_make_block("https://noisy.example.com/challenge", "Checking your browser...\n"))
+    return "".join(blocks)
+
+
+def _build_large_site(pages: int = 600) -> str:
+    """More unique pages than the header/footer sample window."""
+    return "".join(
+        _make_block(
+            f"https://large.example.com/{i}",
+            f"Nav A\nNav B\nNav C\nPage {i}\n{_filler(f'l{i}_')}\n\nFoot A\nFoot B\nFoot C\n",
+        )
+        for i in range(pages)
+    )
+
+
+# sha256 of deduplicate_scraped_content(raw) before dedup became incremental
+_REGRESSION_CORPUS = {
+    "synthetic": (lambda: _SYNTHETIC_RAW,
+                  "b19090dd85817ce85cea14b815041b8d34dfebc61bf13060deb785d5355e0654"),
+    "noisy": (_build_noisy_site,
+              "e94ed349066e0c0a69564ea701eabd7ffd6f99729a9b0582d0d8e8c22243480c"),
+    "large": (_build_large_site,
+              "b177a313b6596a9a39bcd3ff65c10f4ac4cf200e022dcb98ef95685c35a72346"),
+}
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class TestRegressionCorpus:
+    @pytest.mark.parametrize("name", sorted(_REGRESSION_CORPUS))
+    def test_output_unchanged(self, name):
+        build, digest = _REGRESSION_CORPUS[name]
+        assert _sha256(deduplicate_scraped_content(build())) == digest
+
+    @pytest.mark.parametrize("name", sorted(_REGRESSION_CORPUS))
+    def test_buffer_fed_page_by_page_matches(self, name):
+        build, digest = _REGRESSION_CORPUS[name]
+        buffer = DedupedContentBuffer()
+        for block in _iter_blocks(build()):
+            buffer.append(block)
+        assert _sha256(buffer.getvalue()) == digest
+
+
+class TestScrapedContentDeduplicator:
+    def test_buffers_only_the_sample_window(self):
+        deduplicator = ScrapedContentDeduplicator(sample_size=10)
+        peak = 0
+        emitted = []
+        for i, block in enumerate(_iter_blocks(_SYNTHETIC_RAW)):
+            chunks = deduplicator.add(block)
+            peak = max(peak, deduplicator.buffered)
+            if i >= 10:
+                assert len(chunks) == 1  # later pages come out on arrival
+            emitted.extend(chunks)
+        emitted.extend(deduplicator.finish())
+
+        assert peak == 9  # the 10th unique page releases the window
+        assert len(emitted) == _TOTAL_BLOCKS
+        output = "".join(emitted)
+        assert output.count("[duplicate") == 50
+        assert output.count("Powered by Shopify") < _SYNTHETIC_RAW.count("Powered by Shopify")
+        for i in range(200):
+            assert f"SKU {i:04d}" in output
+
+    def test_sample_covering_the_site_matches_default(self):
+        raw = _build_noisy_site()
+        assert deduplicate_scraped_content(raw, sample_size=1000) == \
+            deduplicate_scraped_content(raw)
+
+    def test_stubs_held_back_keep_input_order(self):
+        deduplicator = ScrapedContentDeduplicator(sample_size=3)
+        blocks = [
+            _make_block("https://example.com/a", "Nav\nLogo\nBanner\nA"),
+            _make_block("https://example.com/a2", "Nav\nLogo\nBanner\nA"),
+            _make_block("https://example.com/b", "Nav\nLogo\nBanner\nB"),
+            _make_block("https://example.com/c", "Nav\nLogo\nBanner\nC"),
+        ]
+        assert deduplicator.add(blocks[0]) == []
+        assert deduplicator.add(blocks[1]) == []
+        assert deduplicator.add(blocks[2]) == []
+        chunks = deduplicator.add(blocks[3])
+        assert [chunk.splitlines()[1] for chunk in chunks] == [
+            "https://example.com/a", "https://example.com/a2",
+            "https://example.com/b", "https://example.com/c",
+        ]
+        assert "[duplicate" in chunks[1]
+        assert "Nav" not in "".join(chunks)
+        assert deduplicator.finish() == []
+
+    def test_add_after_finish_rejected(self):
+        deduplicator = ScrapedContentDeduplicator()
+        deduplicator.finish()
+        with pytest.raises(RuntimeError):
+            deduplicator.add(_make_block("https://example.com", "Content"))
+
+    def test_index_forgets_oldest_signatures(self):
+        index = _MinHashIndex(similarity=0.85, max_signatures=2)
+        signatures = [_minhash(_words(_filler(tag))) for tag in ("a", "b", "c")]
+        for signature in signatures:
+            index.add(signature)
+        assert len(index) == 2
+        assert not index.find_near(signatures[0])
+        assert index.find_near(signatures[1])
+        assert index.find_near(signatures[2])
+
+
+class TestDedupedContentBuffer:
+    def test_concurrent_appends(self):
+        blocks = list(_iter_blocks(_SYNTHETIC_RAW))
+        buffer = DedupedContentBuffer()
+
+        def append_every(offset):
+            for block in blocks[offset::4]:
+                buffer.append(block)
+
+        threads = [threading.Thread(target=append_every, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        output = buffer.getvalue()
+
+        assert len(list(_iter_blocks(output))) == _TOTAL_BLOCKS
+        assert output.count("[duplicate") + output.count("[near-duplicate") == 50
+        for i in range(200):
+            assert f"https://acme-fab.example.com/products/item-{i:04d}" in output
+
+    def test_append_splits_joined_blocks(self):
+        combined = _make_combined(("https://a.com", "Alpha"), ("https://b.com", "Alpha"))
+        buffer = DedupedContentBuffer()
+        buffer.append(combined)
+        assert buffer.getvalue() == deduplicate_scraped_content(combined)
+
+    def test_empty_buffer(self):
+        assert DedupedContentBuffer().getvalue() == ""
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # Whitespace-preservation regression suite
 # ─────────────────────────────────────────────────────────────────────────────
@@ -0,0 +1,223 @@
+"""
+Tests for DriverPool: reuse of warm drivers, health checks, recycling and state
+reset between sites. Drivers are mocks, no Chrome is started.
+"""
+
+from unittest.mock import Mock
+
+import pytest
+
+from scraper_app.utils.selenium import driver_pool as driver_pool_module
+from scraper_app.utils.selenium.driver_pool import DriverPool, get_origin
+
+
+class Drivers:
+    """create/cleanup callables that record what the pool did."""
+
+    def __init__(self):
+        self.created: list[Mock] = []
+        self.cleaned: list[Mock] = []
+
+    def create(self):
+        driver = Mock()
+        driver.session_id = f"fake-{len(self.created)}"
+        driver.execute_script.return_value = 1
+        driver.window_handles = ["main"]
+        driver.current_url = "about:blank"
+        self.created.append(driver)
+        return driver
+
+    def cleanup(self, driver):
+        self.cleaned.append(driver)
+
+
+@pytest.fixture
+def drivers():
+    return Drivers()
+
+
+def make_pool(drivers: Drivers, **kwargs) -> DriverPool:
+    kwargs.setdefault("max_idle", 2)
+    kwargs.setdefault("max_memory_growth_mb", None)
+    return DriverPool(drivers.create, drivers.cleanup, **kwargs)
+
+
+def test_released_driver_is_reused(drivers):
+    pool = make_pool(drivers)
+
+    first = pool.acquire()
+    pool.release(first)
+    second = pool.acquire()
+
+    assert second is first
+    assert len(drivers.created) == 1
+    assert (pool.created, pool.reused) == (1, 1)
+
+
+def cleared_origins(driver) -> list[str]:
+    return [
+        call.args[1]["origin"]
+        for call in driver.execute_cdp_cmd.call_args_list
+        if call.args[0] == "Storage.clearDataForOrigin"
+    ]
+
+
+def test_get_origin():
+    assert get_origin("https://Example.com:8443/a/b?q=1") == "https://example.com:8443"
+    assert get_origin("http://example.com") == "http://example.com"
+    assert get_origin("about:blank") is None
+    assert get_origin("data:text/html,hi") is None
+    assert get_origin(None) is None
+
+
+def test_release_resets_browser_state(drivers):
+    pool = make_pool(drivers)
+    driver = pool.acquire()
+    driver.window_handles = ["main", "popup"]
+
+    pool.release(driver)
+
+    driver.close.assert_called_once()
+    driver.get.assert_called_with("about:blank")
+    driver.delete_all_cookies.assert_called_once()
+    cdp_commands = [call.args[0] for call in driver.execute_cdp_cmd.call_args_list]
+    assert "Network.clearBrowserCookies" in cdp_commands
+    assert "Network.clearBrowserCache" in cdp_commands
+    assert pool.num_idle == 1
+
+
+def test_release_clears_storage_of_each_visited_origin(drivers):
+    pool = make_pool(drivers)
+    driver = pool.acquire()
+    pool.mark_page(driver, "https://acme.com/")
+    pool.mark_page(driver, "https://acme.com/products")
+    pool.mark_page(driver, "https://shop.acme.com/cart")
+    # last page redirected somewhere that was never marked
+    driver.current_url = "https://login.example.org/sso"
+
+    pool.release(driver)
+
+    assert cleared_origins(driver) == [
+        "https://acme.com",
+        "https://login.example.org",
+        "https://shop.acme.com",
+    ]
+    for call in driver.execute_cdp_cmd.call_args_list:
+        if call.args[0] == "Storage.clearDataForOrigin":
+            assert call.args[1]["storageTypes"] == "all"
+    assert pool.num_idle == 1
+
+
+def test_origins_do_not_carry_over_to_next_site(drivers):
+    pool = make_pool(drivers)
+    driver = pool.acquire()
+    pool.mark_page(driver, "https://first-site.com/")
+    pool.release(driver)
+
+    assert pool.acquire() is driver
+    driver.execute_cdp_cmd.reset_mock()
+    pool.mark_page(driver, "https://second-site.com/")
+    pool.release(driver)
+
+    assert cleared_origins(driver) == ["https://second-site.com"]
+    assert pool.stats_for(driver).origins == set()
+
+
+def test_failed_origin_clear_recycles_driver(drivers):
+    pool = make_pool(drivers)
+    driver = pool.acquire()
+    pool.mark_page(driver, "https://acme.com/")
+
+    def execute_cdp_cmd(command, params):
+        if command == "Storage.clearDataForOrigin":
+            raise RuntimeError("Invalid origin")
+
+    driver.execute_cdp_cmd.side_effect = execute_cdp_cmd
+
+    pool.release(driver)
+
+    assert drivers.cleaned == [driver]
+    assert pool.num_idle == 0
+
+
+def test_failed_reset_recycles_driver(drivers):
+    pool = make_pool(drivers)
+    driver = pool.acquire()
+    driver.delete_all_cookies.side_effect = RuntimeError("session gone")
+
+    pool.release(driver)
+
+    assert drivers.cleaned == [driver]
+    assert pool.num_idle == 0
+
+
+def test_unhealthy_idle_driver_is_replaced(drivers):
+    pool = make_pool(drivers)
+    driver = pool.acquire()
+    pool.release(driver)
+    driver.execute_script.side_effect = RuntimeError("chrome crashed")
+
+    replacement = pool.acquire()
+
+    assert replacement is not driver
+    assert drivers.cleaned == [driver]
+
+
+def test_driver_recycled_after_max_pages(drivers):
+    pool = make_pool(drivers, max_pages_per_driver=3)
+    driver = pool.acquire()
+    for _ in range(3):
+        pool.mark_page(driver)
+
+    pool.release(driver)
+
+    assert drivers.cleaned == [driver]
+    assert pool.recycled == 1
+
+
+def test_driver_recycled_on_memory_growth(drivers, monkeypatch):
+    rss = {"value": 100 * 1024 * 1024}
+    monkeypatch.setattr(
+        driver_pool_module, "get_driver_rss_bytes", lambda driver: rss["value"]
+    )
+    pool = make_pool(drivers, max_memory_growth_mb=50)
+    driver = pool.acquire()
+
+    rss["value"] += 60 * 1024 * 1024
+    pool.release(driver)
+
+    assert drivers.cleaned == [driver]
+    assert pool.recycled == 1
+
+
+def test_pool_keeps_at_most_max_idle(drivers):
+    pool = make_pool(drivers, max_idle=1)
+    a, b = pool.acquire(), pool.acquire()
+
+    pool.release(a)
+    pool.release(b)
+
+    assert pool.num_idle == 1
+    assert drivers.cleaned == [b]
+
+
+def test_close_destroys_idle_and_later_released_drivers(drivers):
+    pool = make_pool(drivers)
+    idle, busy = pool.acquire(), pool.acquire()
+    pool.release(idle)
+
+    pool.close()
+    pool.release(busy)
+
+    assert drivers.cleaned == [idle, busy]
+    assert pool.num_idle == 0
+
+
+def test_pool_of_size_zero_behaves_like_fresh_drivers(drivers):
+    pool = make_pool(drivers, max_idle=0)
+
+    for _ in range(3):
+        pool.release(pool.acquire())
+
+    assert len(drivers.created) == 3
+    assert len(drivers.cleaned) == 3
@@ -0,0 +1,232 @@
+"""
+Tests for the HTTP scraping tier: HTML-to-text, browser fallback detection, the
+crawl against a local fixture site and its use by ScraperService.
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import Mock
+
+import pytest
+
+from scraper_app.utils.http_fetch_util import (
+    HtmlTextExtractor,
+    HttpFetcher,
+    browser_fallback_reason,
+)
+
+LOREM = "Precision CNC machining and sheet metal fabrication for aerospace. " * 5
+
+FIXTURE_SITE = {
+    "/": f"""<html><head><title>Acme</title><style>p {{color: red}}</style></head>
+        <body><nav><a href="/about">About</a> <a href="/spa#top">App</a>
+        <a href="/catalog.pdf">Catalog</a> <a href="mailto:sales@acme.test">Mail</a>
+        <a href="https://elsewhere.test/">Partner</a></nav>
+        <main><h1>Acme Manufacturing</h1><p>{LOREM}</p></main>
+        <script>var tracking = "not text";</script></body></html>""",
+    "/about": f"""<html><body><h1>About us</h1><p>{LOREM}</p>
+        <a href="contact">Contact</a> <a href="/brochure">Brochure</a></body></html>""",
+    "/contact": f"<html><body><p>Call us. {LOREM}</p></body></html>",
+    "/spa": """<html><head><script src="/bundle.js"></script></head>
+        <body><div id="root"></div></body></html>""",
+    "/challenge": """<html><head><title>Just a moment...</title></head>
+        <body><div class="cf-chl-widget"></div></body></html>""",
+}
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    requests: list[str] = []
+
+    def do_GET(self):
+        FixtureHandler.requests.append(self.path)
+        path = self.path.split("#")[0]
+        if path in ("/catalog.pdf", "/brochure"):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/pdf")
+            self.end_headers()
+            self.wfile.write(b"%PDF-1.4")
+            return
+        body = FIXTURE_SITE.get(path)
+        status = 403 if path == "/challenge" else 200 if body else 404
+        payload = (body or "<html><body>Not found</body></html>").encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def fixture_site():
+    FixtureHandler.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def fetcher():
+    fetcher = HttpFetcher(max_connections=4, timeout=5)
+    yield fetcher
+    fetcher.close()
+
+
+def parse(html: str, url: str = "https://acme.test/products/") -> HtmlTextExtractor:
+    extractor = HtmlTextExtractor(url)
+    extractor.feed(html)
+    extractor.close()
+    return extractor
+
+
+def test_extractor_keeps_visible_text_only():
+    extractor = parse(FIXTURE_SITE["/"])
+
+    assert "Acme Manufacturing" in extractor.text
+    assert "Precision CNC machining" in extractor.text
+    assert "tracking" not in extractor.text
+    assert "color: red" not in extractor.text
+    assert "Acme\n" not in extractor.text  # <title> lives in <head>
+
+
+def test_extractor_puts_blocks_on_their_own_lines():
+    extractor = parse("<body><h1>Title</h1><p>One <b>bold</b>\n word</p>x<br>y</body>")
+
+    assert extractor.text.split("\n") == ["Title", "One bold word", "x", "y"]
+
+
+def test_extractor_resolves_links():
+    extractor = parse(
+        '<a href="cnc.html#specs">a</a><a href="/about">b</a>'
+        '<a href="tel:123">c</a><a href="javascript:void(0)">d</a>'
+        '<a href="https://other.test/x">e</a>'
+    )
+
+    assert extractor.links == [
+        "https://acme.test/products/cnc.html",
+        "https://acme.test/about",
+        "https://other.test/x",
+    ]
+
+
+def test_extractor_honours_base_href():
+    extractor = parse(
+        '<head><base href="https://cdn.acme.test/en/"></head><a href="x">x</a>'
+    )
+
+    assert extractor.links == ["https://cdn.acme.test/en/x"]
+
+
+@pytest.mark.parametrize(
+    "status, html, expected",
+    [
+        (200, FIXTURE_SITE["/"], None),
+        (200, FIXTURE_SITE["/spa"], "empty body"),
+        (403, FIXTURE_SITE["/challenge"], "challenge page (HTTP 403)"),
+        (200, "<body><p>Loading</p><script src=a.js></script></body>", "little text"),
+        (200, f"<body><div id='app'></div><p>{LOREM}</p></body>", "client-side"),
+        (200, '<head><meta http-equiv="refresh" content="0;url=/x"></head>', "meta"),
+        (404, f"<body><p>Not found. {LOREM}</p></body>", None),
+    ],
+)
+def test_browser_fallback_reason(status, html, expected):
+    reason = browser_fallback_reason(status, html, parse(html))
+
+    if expected is None:
+        assert reason is None
+    else:
+        assert reason is not None and reason.startswith(expected)
+
+
+def test_crawl_site_splits_static_and_browser_pages(fixture_site, fetcher):
+    discovered = {f"{fixture_site}/"}
+
+    crawl = fetcher.crawl_site(
+        f"{fixture_site}/",
+        max_depth=5,
+        deadline=time.monotonic() + 30,
+        discovered=discovered,
+        discovered_lock=threading.Lock(),
+        should_follow=lambda href: href.startswith(fixture_site)
+        and not href.endswith(".pdf"),
+        check_final_url=lambda url: None,
+        max_concurrency=3,
+    )
+
+    assert sorted(page.url for page in crawl.pages) == [
+        f"{fixture_site}/",
+        f"{fixture_site}/about",
+        f"{fixture_site}/contact",
+    ]
+    assert [page.url for page in crawl.browser_pages] == [f"{fixture_site}/spa"]
+    assert [page.url for page in crawl.skipped_pages] == [f"{fixture_site}/brochure"]
+    assert crawl.errors == []
+    assert not crawl.timed_out
+    assert f"{fixture_site}/catalog.pdf" not in discovered
+
+
+def test_fetch_skips_non_html(fixture_site, fetcher):
+    page = fetcher._run(fetcher.fetch(f"{fixture_site}/brochure"))
+
+    assert page.skipped == "non-HTML content type: application/pdf"
+    assert page.text == ""
+    assert page.needs_browser is None
+
+
+# ------------------------- ScraperService integration -------------------------
+
+
+@pytest.fixture
+def scraper(chrome_test_env, monkeypatch):
+    from scraper_app.services import url_scraper_service
+    from scraper_app.services.url_scraper_service import ScraperService
+
+    monkeypatch.setattr(url_scraper_service, "get_final_landing_url", lambda url: url)
+    monkeypatch.setattr(
+        url_scraper_service.signal, "signal", lambda *args, **kwargs: None
+    )
+    monkeypatch.setattr(url_scraper_service.atexit, "register", lambda fn: None)
+
+    scraper = ScraperService(max_concurrent_browsers=2, max_depth=3)
+    scraper.driver_factory = Mock()
+    scraper.driver_factory.create_driver.side_effect = lambda: Mock(session_id="fake")
+    browser_urls: list[str] = []
+
+    def extract_text(driver, url):
+        browser_urls.append(url)
+        return f"rendered {url}"
+
+    scraper._extract_text_with_fallback = extract_text
+    scraper._collect_links_js = lambda driver, start_url: set()
+    scraper.browser_urls = browser_urls
+    yield scraper
+    scraper.shutdown(wait=True)
+
+
+def test_scraper_uses_browser_only_for_js_pages(fixture_site, scraper):
+    result = scraper.scrape(f"{fixture_site}/")
+
+    assert scraper.browser_urls == [f"{fixture_site}/spa"]
+    assert result.urls_scraped == 4
+    assert result.urls_failed == 0  # the PDF behind /brochure is skipped
+    assert "Acme Manufacturing" in result.content
+    assert f"rendered {fixture_site}/spa" in result.content
+    assert scraper.domain_tiers.get(f"127.0.0.1:{fixture_site.rsplit(':', 1)[1]}") == (
+        "http"
+    )
+
+
+def test_scraper_remembers_domains_that_need_a_browser(fixture_site, scraper):
+    scraper.scrape(f"{fixture_site}/spa")
+    FixtureHandler.requests.clear()
+
+    scraper.scrape(f"{fixture_site}/spa")
+
+    assert FixtureHandler.requests == []  # HTTP tier skipped on the second scrape
+    assert scraper.browser_urls == [f"{fixture_site}/spa"] * 2